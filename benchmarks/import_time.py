@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+"""
+Cold-start benchmark: wall time of fresh interpreters importing mychatai.
+
+    python benchmarks/import_time.py                 # median of 7 runs per scenario
+    python benchmarks/import_time.py -n 15 -o imports.json
+
+Each scenario runs in a new ``python -c`` process, so nothing is warm but
+the OS file cache; the interpreter's own start-up is measured separately
+(``python -c pass``) and reported alongside.  ``-X importtime`` output for
+any scenario shows where the time goes:
+
+    python -X importtime -c "import mychatai.clients.ollama" 2>&1 | sort -t'|' -k2 -n | tail
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+ROOT = Path(__file__).resolve().parent.parent
+
+SCENARIOS: Dict[str, str] = {
+    "interpreter": "pass",
+    "import mychatai": "import mychatai",
+    "ChatService": "from mychatai import ChatService",
+    "ask --help": "import sys; sys.argv = ['ask', '--help']\n"
+                  "import runpy\n"
+                  "try:\n    runpy.run_path('scripts/ask.py', run_name='__main__')\n"
+                  "except SystemExit:\n    pass",
+    **{
+        f"client:{name}": (
+            "from mychatai import ChatService\n"
+            "from mychatai.providers import providers\n"
+            f"providers.get({name!r})"
+        )
+        for name in ("ollama", "openai", "deepseek", "anthropic", "gemini")
+    },
+}
+
+
+def measure(code: str, runs: int) -> List[float]:
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        subprocess.run(
+            [sys.executable, "-c", code], cwd=ROOT, check=True,
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-n", "--runs", type=int, default=7)
+    parser.add_argument("-s", "--scenario", action="append", choices=list(SCENARIOS), dest="scenarios")
+    parser.add_argument("--output", "-o", type=Path, help="write JSON here instead of stdout")
+    args = parser.parse_args(argv)
+
+    results = []
+    for name in args.scenarios or list(SCENARIOS):
+        samples = measure(SCENARIOS[name], args.runs)
+        results.append({
+            "scenario": name,
+            "median_s": statistics.median(samples),
+            "min_s": min(samples),
+            "max_s": max(samples),
+        })
+        print(f"{name:<18} {statistics.median(samples) * 1000:8.1f} ms", file=sys.stderr)
+
+    report = json.dumps({
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "runs": args.runs,
+        },
+        "results": results,
+    }, indent=2)
+    if args.output:
+        args.output.write_text(report + "\n")
+    else:
+        print(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,412 @@
+#!/usr/bin/env python
+"""
+Local stand-in LLM server for offline benchmarks (stdlib only).
+
+Speaks just enough of four wire formats for the mychatai clients:
+
+    POST /v1/chat/completions                 OpenAI / DeepSeek (JSON or SSE)
+    POST /v1/messages                         Anthropic (JSON or SSE events)
+    POST /api/chat                            Ollama (JSON or NDJSON)
+    POST /api/embed                           Ollama embeddings (hashed bag of words)
+    POST /v1beta/models/<m>:generateContent   Gemini
+    POST /v1beta/models/<m>:streamGenerateContent   (JSON array, or SSE with alt=sse)
+
+Every reply waits *latency* seconds before its first byte, then emits
+*tokens* words at *token_rate* words/second (0 = as fast as possible); a
+fraction *error_rate* of requests fails with *error_status* instead.
+
+    python benchmarks/mock_server.py --port 8000 --latency 0.2 --token-rate 50
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import socket
+import sys
+import threading
+import time
+import uuid
+import zlib
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterator, List, Optional
+from urllib.parse import parse_qs, urlsplit
+
+_WORDS = (
+    "the quick brown fox jumps over a lazy dog while camera calibration "
+    "maps every pixel ray onto the epipolar line of its twin"
+).split()
+
+
+@dataclass
+class MockConfig:
+    latency: float = 0.0            # seconds before the first byte
+    token_rate: float = 0.0         # words / second while streaming, 0 = unthrottled
+    tokens: int = 64                # words per completion
+    error_rate: float = 0.0         # fraction of requests that fail
+    error_status: int = 503
+    retry_after: Optional[float] = None
+    seed: Optional[int] = None
+
+
+class MockLLMServer(ThreadingHTTPServer):
+    """Threaded HTTP/1.1 server; ``start()`` runs it on a daemon thread."""
+
+    daemon_threads = True
+    request_queue_size = 1024
+
+    def __init__(self, config: Optional[MockConfig] = None, host: str = "127.0.0.1", port: int = 0) -> None:
+        super().__init__((host, port), _Handler)
+        self.config = config or MockConfig()
+        self.requests = 0
+        self._random = random.Random(self.config.seed)
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> str:
+        self._thread = threading.Thread(target=self.serve_forever, name="mock-llm", daemon=True)
+        self._thread.start()
+        return self.url
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self) -> "MockLLMServer":
+        self.start()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.stop()
+
+    def should_fail(self) -> bool:
+        with self._lock:
+            self.requests += 1
+            return self.config.error_rate > 0 and self._random.random() < self.config.error_rate
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"       # keep-alive, so client pooling is exercised
+    server: MockLLMServer
+
+    def setup(self) -> None:
+        super().setup()
+        # headers, body and every stream chunk are separate writes; without
+        # NODELAY, Nagle + delayed ACK adds ~40 ms to each response
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+    def do_POST(self) -> None:
+        length = int(self.headers.get("content-length") or 0)
+        body = json.loads(self.rfile.read(length) or b"{}")
+        parts = urlsplit(self.path)
+        path, query = parts.path, parse_qs(parts.query)
+
+        if path.endswith("/api/embed"):
+            inputs = body.get("input", [])
+            inputs = [inputs] if isinstance(inputs, str) else inputs
+            self._send_json(200, {"model": body.get("model"), "embeddings": [_embedding(t) for t in inputs]})
+            return
+
+        if path.endswith("/chat/completions"):
+            kind = "openai"
+        elif path.endswith("/messages"):
+            kind = "anthropic"
+        elif path.endswith("/api/chat"):
+            kind = "ollama"
+        elif ":generateContent" in path or ":streamGenerateContent" in path:
+            kind = "gemini"
+        else:
+            self._send_json(404, {"error": {"message": f"unknown path {path}"}})
+            return
+
+        config = self.server.config
+        if self.server.should_fail():
+            time.sleep(config.latency)
+            self._send_error(kind, config)
+            return
+
+        prompt_tokens = _prompt_tokens(kind, body)
+        model = body.get("model") or path.rsplit("/", 1)[-1].split(":")[0]
+        time.sleep(config.latency)
+
+        if kind == "gemini":
+            stream = ":streamGenerateContent" in path
+        else:
+            stream = bool(body.get("stream", kind == "ollama"))     # Ollama streams by default
+        if not stream:
+            words = [f"{w} " for w in _completion(config.tokens)]
+            self._send_json(200, _FULL[kind](model, "".join(words), prompt_tokens, len(words)))
+            return
+
+        if kind == "openai":
+            include_usage = bool((body.get("stream_options") or {}).get("include_usage"))
+            self._stream("text/event-stream", _openai_events(model, config, prompt_tokens, include_usage))
+        elif kind == "anthropic":
+            self._stream("text/event-stream", _anthropic_events(model, config, prompt_tokens))
+        elif kind == "ollama":
+            self._stream("application/x-ndjson", _ollama_lines(model, config, prompt_tokens))
+        elif query.get("alt", [""])[0] == "sse":
+            self._stream("text/event-stream", _gemini_sse(config, prompt_tokens))
+        else:
+            self._stream("application/json", _gemini_array(config, prompt_tokens))
+
+    # ── writing ────────────────────────────────────────────────────────────
+    def _send_json(self, status: int, payload: Any, headers: Optional[Dict[str, str]] = None) -> None:
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("content-type", "application/json")
+        self.send_header("content-length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_error(self, kind: str, config: MockConfig) -> None:
+        message = f"injected failure ({config.error_status})"
+        if kind == "anthropic":
+            payload: Any = {"type": "error", "error": {"type": "overloaded_error", "message": message}}
+        elif kind == "ollama":
+            payload = {"error": message}
+        elif kind == "gemini":
+            payload = {"error": {"code": config.error_status, "message": message, "status": "UNAVAILABLE"}}
+        else:
+            payload = {"error": {"message": message, "type": "server_error", "code": None}}
+        headers = {}
+        if config.retry_after is not None:
+            headers["retry-after"] = f"{config.retry_after:g}"
+        self._send_json(config.error_status, payload, headers)
+
+    def _stream(self, content_type: str, pieces: Iterator[bytes]) -> None:
+        self.send_response(200)
+        self.send_header("content-type", content_type)
+        self.send_header("transfer-encoding", "chunked")
+        self.end_headers()
+        try:
+            for piece in pieces:
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(piece), piece))
+                self.wfile.flush()
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True        # client hung up mid-stream
+
+
+# ── payloads ───────────────────────────────────────────────────────────────
+def _completion(n: int) -> List[str]:
+    return [_WORDS[i % len(_WORDS)] for i in range(n)]
+
+
+def _paced(config: MockConfig) -> Iterator[str]:
+    """Completion words, released at the configured token rate."""
+    interval = 1.0 / config.token_rate if config.token_rate > 0 else 0.0
+    start = time.perf_counter()
+    for i, word in enumerate(_completion(config.tokens)):
+        if interval:
+            delay = start + i * interval - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        yield f"{word} "
+
+
+def _prompt_tokens(kind: str, body: Dict[str, Any]) -> int:
+    if kind == "gemini":
+        texts = [p.get("text", "") for c in body.get("contents", []) for p in c.get("parts", [])]
+    else:
+        texts = [m.get("content", "") for m in body.get("messages", []) if isinstance(m.get("content"), str)]
+        texts.append(body.get("system", "") if isinstance(body.get("system"), str) else "")
+    return max(1, sum(len(t) for t in texts) // 4)
+
+
+def _embedding(text: str, dim: int = 64) -> List[float]:
+    """Deterministic stand-in: texts sharing words get similar vectors."""
+    vector = [0.0] * dim
+    for word in text.lower().split():
+        vector[zlib.crc32(word.strip("?.,!").encode()) % dim] += 1.0
+    return vector
+
+
+def _sse(payload: Any, event: Optional[str] = None) -> bytes:
+    head = f"event: {event}\n" if event else ""
+    return f"{head}data: {json.dumps(payload)}\n\n".encode()
+
+
+def _openai_full(model: str, text: str, prompt_tokens: int, completion_tokens: int) -> Dict[str, Any]:
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [
+            {"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}
+        ],
+        "usage": _openai_usage(prompt_tokens, completion_tokens),
+    }
+
+
+def _openai_usage(prompt_tokens: int, completion_tokens: int) -> Dict[str, int]:
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens,
+    }
+
+
+def _openai_events(model: str, config: MockConfig, prompt_tokens: int, include_usage: bool) -> Iterator[bytes]:
+    base = {"id": f"chatcmpl-{uuid.uuid4().hex[:12]}", "object": "chat.completion.chunk",
+            "created": int(time.time()), "model": model}
+
+    def chunk(delta: Dict[str, Any], finish: Optional[str] = None) -> bytes:
+        return _sse({**base, "choices": [{"index": 0, "delta": delta, "finish_reason": finish}]})
+
+    yield chunk({"role": "assistant", "content": ""})
+    n = 0
+    for word in _paced(config):
+        n += 1
+        yield chunk({"content": word})
+    yield chunk({}, "stop")
+    if include_usage:
+        yield _sse({**base, "choices": [], "usage": _openai_usage(prompt_tokens, n)})
+    yield b"data: [DONE]\n\n"
+
+
+def _anthropic_full(model: str, text: str, prompt_tokens: int, completion_tokens: int) -> Dict[str, Any]:
+    return {
+        "id": f"msg_{uuid.uuid4().hex[:12]}",
+        "type": "message",
+        "role": "assistant",
+        "model": model,
+        "content": [{"type": "text", "text": text}],
+        "stop_reason": "end_turn",
+        "stop_sequence": None,
+        "usage": {"input_tokens": prompt_tokens, "output_tokens": completion_tokens},
+    }
+
+
+def _anthropic_events(model: str, config: MockConfig, prompt_tokens: int) -> Iterator[bytes]:
+    message = _anthropic_full(model, "", prompt_tokens, 1)
+    message["content"], message["stop_reason"] = [], None
+    yield _sse({"type": "message_start", "message": message}, "message_start")
+    yield _sse({"type": "content_block_start", "index": 0,
+                "content_block": {"type": "text", "text": ""}}, "content_block_start")
+    n = 0
+    for word in _paced(config):
+        n += 1
+        yield _sse({"type": "content_block_delta", "index": 0,
+                    "delta": {"type": "text_delta", "text": word}}, "content_block_delta")
+    yield _sse({"type": "content_block_stop", "index": 0}, "content_block_stop")
+    yield _sse({"type": "message_delta", "delta": {"stop_reason": "end_turn", "stop_sequence": None},
+                "usage": {"output_tokens": n}}, "message_delta")
+    yield _sse({"type": "message_stop"}, "message_stop")
+
+
+def _ollama_full(model: str, text: str, prompt_tokens: int, completion_tokens: int) -> Dict[str, Any]:
+    return {
+        "model": model,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "message": {"role": "assistant", "content": text},
+        "done": True,
+        "done_reason": "stop",
+        "prompt_eval_count": prompt_tokens,
+        "eval_count": completion_tokens,
+    }
+
+
+def _ollama_lines(model: str, config: MockConfig, prompt_tokens: int) -> Iterator[bytes]:
+    started = time.perf_counter_ns()
+    n = 0
+    for word in _paced(config):
+        n += 1
+        line = {"model": model, "message": {"role": "assistant", "content": word}, "done": False}
+        yield json.dumps(line).encode() + b"\n"
+    done = _ollama_full(model, "", prompt_tokens, n)
+    done["eval_duration"] = done["total_duration"] = time.perf_counter_ns() - started
+    yield json.dumps(done).encode() + b"\n"
+
+
+def _gemini_full(model: str, text: str, prompt_tokens: int, completion_tokens: int) -> Dict[str, Any]:
+    return _gemini_chunk(text, prompt_tokens, completion_tokens, "STOP")
+
+
+def _gemini_chunk(text: str, prompt_tokens: int, completion_tokens: int, finish: Optional[str] = None) -> Dict[str, Any]:
+    candidate: Dict[str, Any] = {"content": {"parts": [{"text": text}], "role": "model"}, "index": 0}
+    if finish:
+        candidate["finishReason"] = finish
+    return {
+        "candidates": [candidate],
+        "usageMetadata": {
+            "promptTokenCount": prompt_tokens,
+            "candidatesTokenCount": completion_tokens,
+            "totalTokenCount": prompt_tokens + completion_tokens,
+        },
+    }
+
+
+def _gemini_array(config: MockConfig, prompt_tokens: int) -> Iterator[bytes]:
+    yield b"["
+    for i, payload in enumerate(_gemini_stream(config, prompt_tokens)):
+        yield (b"," if i else b"") + json.dumps(payload).encode() + b"\n"
+    yield b"]"
+
+
+def _gemini_sse(config: MockConfig, prompt_tokens: int) -> Iterator[bytes]:
+    for payload in _gemini_stream(config, prompt_tokens):
+        yield _sse(payload)
+
+
+def _gemini_stream(config: MockConfig, prompt_tokens: int) -> Iterator[Dict[str, Any]]:
+    n = 0
+    for word in _paced(config):
+        n += 1
+        yield _gemini_chunk(word, prompt_tokens, n, "STOP" if n == config.tokens else None)
+
+
+_FULL = {
+    "openai": _openai_full,
+    "anthropic": _anthropic_full,
+    "ollama": _ollama_full,
+    "gemini": _gemini_full,
+}
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=0, help="0 picks a free port")
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--token-rate", type=float, default=0.0)
+    parser.add_argument("--tokens", type=int, default=64)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--retry-after", type=float, default=None)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    config = MockConfig(
+        latency=args.latency,
+        token_rate=args.token_rate,
+        tokens=args.tokens,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        retry_after=args.retry_after,
+        seed=args.seed,
+    )
+    server = MockLLMServer(config, args.host, args.port)
+    print(server.url, flush=True)          # first line: where to point the clients
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,338 @@
+#!/usr/bin/env python
+"""
+Offline benchmark runner: every client against the local mock server.
+
+    python benchmarks/run.py                                   # all providers, all modes
+    python benchmarks/run.py -p openai -p ollama -m stream --latency 0.05 --token-rate 200
+    python benchmarks/run.py --output before.json
+    python benchmarks/run.py --output after.json --compare before.json
+
+Modes (each one drives ``ChatService.answer``):
+
+    sync     sequential non-streamed calls        latency percentiles
+    stream   sequential streamed calls             TTFT + latency percentiles
+    batch    ``answer_many`` with --concurrency    throughput
+    cached   one question repeated, LRUCache on    cache-hit path cost
+
+``--baseline`` adds ``raw`` rows that talk to the mock with bare httpx (no
+SDK, no mychatai), so the difference is what the whole client stack costs.
+Results go to stdout (or --output) as JSON; a summary table goes to stderr.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import httpx  # noqa: E402
+
+from mychatai import ChatService, settings  # noqa: E402
+from mychatai.cache import LRUCache  # noqa: E402
+from mychatai.clients.base import AbstractModelClient  # noqa: E402
+
+try:
+    import resource
+except ImportError:                      # Windows
+    resource = None  # type: ignore[assignment]
+
+PROVIDERS = ("openai", "deepseek", "anthropic", "ollama", "gemini")
+MODES = ("sync", "stream", "batch", "cached")
+
+
+# ── mock server ────────────────────────────────────────────────────────────
+def start_server(args: argparse.Namespace) -> Tuple[subprocess.Popen, str]:
+    """Run the mock in its own process so it does not compete for our GIL."""
+    cmd = [
+        sys.executable, str(Path(__file__).with_name("mock_server.py")),
+        "--latency", str(args.latency),
+        "--token-rate", str(args.token_rate),
+        "--tokens", str(args.tokens),
+        "--error-rate", str(args.error_rate),
+        "--error-status", str(args.error_status),
+        "--seed", "0",
+    ]
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, text=True)
+    assert proc.stdout is not None
+    url = proc.stdout.readline().strip()
+    if not url:
+        proc.kill()
+        raise RuntimeError("mock server failed to start")
+    return proc, url
+
+
+def point_settings_at(url: str) -> None:
+    settings.openai_url = f"{url}/v1"
+    settings.deepseek_url = f"{url}/v1"
+    settings.anthropic_url = url
+    settings.ollama_url = f"{url}/api/chat"
+    settings.gemini_endpoint = url
+
+
+def make_client(provider: str) -> AbstractModelClient:
+    if provider == "openai":
+        from mychatai.clients.openai import OpenAIClient
+        return OpenAIClient(api_key="bench")
+    if provider == "deepseek":
+        from mychatai.clients.deepseek import DeepSeekClient
+        return DeepSeekClient(api_key="bench")
+    if provider == "anthropic":
+        from mychatai.clients.claude import AnthropicClient
+        return AnthropicClient(api_key="bench")
+    if provider == "ollama":
+        from mychatai.clients.ollama import OllamaClient
+        return OllamaClient()
+    if provider == "gemini":
+        from mychatai.clients.gemini import GeminiClient
+        return GeminiClient(api_key="bench")
+    raise ValueError(f"unknown provider {provider!r}")
+
+
+# ── measurements ───────────────────────────────────────────────────────────
+class Sample:
+    __slots__ = ("latency", "ttft", "tokens", "error")
+
+    def __init__(self, latency: float, ttft: Optional[float], tokens: int, error: bool) -> None:
+        self.latency, self.ttft, self.tokens, self.error = latency, ttft, tokens, error
+
+
+def timed(call: Callable[[], Any], stream: bool) -> Sample:
+    started = time.perf_counter()
+    ttft: Optional[float] = None
+    tokens = 0
+    try:
+        reply = call()
+        if stream:
+            for _ in reply:
+                if ttft is None:
+                    ttft = time.perf_counter() - started
+                tokens += 1
+        else:
+            tokens = len(reply.split())
+    except Exception:
+        return Sample(time.perf_counter() - started, None, 0, True)
+    return Sample(time.perf_counter() - started, ttft, tokens, False)
+
+
+def run_mode(chat: ChatService, mode: str, args: argparse.Namespace) -> Tuple[List[Sample], float]:
+    questions = [f"benchmark question {i}" for i in range(args.requests)]
+    started = time.perf_counter()
+    if mode == "batch":
+        results = chat.answer_many(questions, concurrency=args.concurrency)
+        wall = time.perf_counter() - started
+        samples = [
+            Sample(float("nan"), None, len(r.answer.split()) if r.ok else 0, not r.ok) for r in results
+        ]
+        return samples, wall
+    if mode == "cached":
+        questions = [questions[0]] * args.requests
+    stream = mode == "stream"
+    samples = [timed(lambda q=q: chat.answer(q, stream=stream), stream) for q in questions]
+    return samples, time.perf_counter() - started
+
+
+def run_raw(url: str, mode: str, args: argparse.Namespace) -> Tuple[List[Sample], float]:
+    """Bare httpx against the OpenAI wire format: the floor every client sits on."""
+    client = httpx.Client(base_url=url, timeout=60)
+    stream = mode == "stream"
+
+    def call(question: str) -> Any:
+        payload = {
+            "model": "raw",
+            "messages": [{"role": "user", "content": question}],
+            "stream": stream,
+        }
+        if not stream:
+            response = client.post("/v1/chat/completions", json=payload)
+            response.raise_for_status()
+            return response.json()["choices"][0]["message"]["content"]
+        return _raw_tokens(client, payload)
+
+    started = time.perf_counter()
+    samples = [timed(lambda i=i: call(f"benchmark question {i}"), stream) for i in range(args.requests)]
+    wall = time.perf_counter() - started
+    client.close()
+    return samples, wall
+
+
+def _raw_tokens(client: httpx.Client, payload: Dict[str, Any]) -> Iterator[str]:
+    with client.stream("POST", "/v1/chat/completions", json=payload) as response:
+        response.raise_for_status()
+        for line in response.iter_lines():
+            if not line.startswith("data: ") or line == "data: [DONE]":
+                continue
+            delta = json.loads(line[6:])["choices"][0]["delta"]
+            if delta.get("content"):
+                yield delta["content"]
+
+
+def summarise(
+    provider: str,
+    mode: str,
+    samples: List[Sample],
+    wall: float,
+    memory: Dict[str, Optional[float]],
+) -> Dict[str, Any]:
+    ok = [s for s in samples if not s.error]
+    tokens = sum(s.tokens for s in ok)
+    latencies = [s.latency for s in ok if s.latency == s.latency]      # drop NaN (batch)
+    ttfts = [s.ttft for s in ok if s.ttft is not None]
+    return {
+        "provider": provider,
+        "mode": mode,
+        "requests": len(samples),
+        "errors": len(samples) - len(ok),
+        "wall_s": wall,
+        "requests_per_s": len(ok) / wall if wall else None,
+        "tokens_per_s": tokens / wall if wall else None,
+        "latency_s": percentiles(latencies),
+        "ttft_s": percentiles(ttfts),
+        **memory,
+    }
+
+
+def percentiles(values: List[float]) -> Optional[Dict[str, float]]:
+    if not values:
+        return None
+    ordered = sorted(values)
+
+    def q(p: float) -> float:
+        return ordered[min(len(ordered) - 1, int(p * len(ordered)))]
+
+    return {
+        "mean": sum(ordered) / len(ordered),
+        "p50": q(0.50),
+        "p95": q(0.95),
+        "p99": q(0.99),
+        "max": ordered[-1],
+    }
+
+
+def measured(run: Callable[[], Tuple[List[Sample], float]], trace: bool) -> Tuple[List[Sample], float, Dict[str, Optional[float]]]:
+    """Run a scenario, recording peak RSS growth and (with --tracemalloc) peak Python heap."""
+    rss_before = _max_rss_kib()
+    if trace:
+        tracemalloc.start()
+    try:
+        samples, wall = run()
+        peak = tracemalloc.get_traced_memory()[1] / 1024 if trace else None
+    finally:
+        if trace:
+            tracemalloc.stop()
+    rss_after = _max_rss_kib()
+    growth = rss_after - rss_before if rss_after is not None and rss_before is not None else None
+    return samples, wall, {"max_rss_kib": rss_after, "rss_growth_kib": growth, "heap_peak_kib": peak}
+
+
+def _max_rss_kib() -> Optional[float]:
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / 1024 if sys.platform == "darwin" else float(rss)     # macOS reports bytes
+
+
+# ── reporting ──────────────────────────────────────────────────────────────
+def metadata(args: argparse.Namespace) -> Dict[str, Any]:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "http2": settings.http2,
+        "args": {k: v for k, v in vars(args).items() if k not in ("output", "compare")},
+    }
+
+
+def print_table(results: List[Dict[str, Any]], previous: Optional[Dict[Tuple[str, str], Dict[str, Any]]]) -> None:
+    header = f"{'provider':<10} {'mode':<7} {'req/s':>9} {'tok/s':>10} {'p50 ms':>8} {'p95 ms':>8} {'ttft ms':>8} {'err':>4}"
+    if previous is not None:
+        header += f" {'Δreq/s':>8}"
+    print(header, file=sys.stderr)
+    for r in results:
+        lat, ttft = r["latency_s"] or {}, r["ttft_s"] or {}
+        line = (
+            f"{r['provider']:<10} {r['mode']:<7} {r['requests_per_s'] or 0:>9.1f} {r['tokens_per_s'] or 0:>10.0f}"
+            f" {_ms(lat.get('p50')):>8} {_ms(lat.get('p95')):>8} {_ms(ttft.get('p50')):>8} {r['errors']:>4}"
+        )
+        old = previous.get((r["provider"], r["mode"])) if previous is not None else None
+        if old and old.get("requests_per_s") and r["requests_per_s"]:
+            line += f" {100 * (r['requests_per_s'] / old['requests_per_s'] - 1):>+7.1f}%"
+        print(line, file=sys.stderr)
+
+
+def _ms(seconds: Optional[float]) -> str:
+    return "-" if seconds is None else f"{seconds * 1000:.1f}"
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-p", "--provider", action="append", choices=PROVIDERS, dest="providers")
+    parser.add_argument("-m", "--mode", action="append", choices=MODES, dest="modes")
+    parser.add_argument("-n", "--requests", type=int, default=100, help="requests per scenario")
+    parser.add_argument("--warmup", type=int, default=5, help="unmeasured requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=16, help="workers in batch mode")
+    parser.add_argument("--latency", type=float, default=0.0, help="mock: seconds before first byte")
+    parser.add_argument("--token-rate", type=float, default=0.0, help="mock: tokens/s, 0 = unthrottled")
+    parser.add_argument("--tokens", type=int, default=64, help="mock: tokens per completion")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="mock: fraction of failed requests")
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--baseline", action="store_true", help="add bare-httpx rows")
+    parser.add_argument("--tracemalloc", action="store_true", help="record peak Python heap (slower)")
+    parser.add_argument("--output", "-o", type=Path, help="write JSON here instead of stdout")
+    parser.add_argument("--compare", type=Path, help="previous JSON run to diff the summary against")
+    args = parser.parse_args(argv)
+    providers = args.providers or list(PROVIDERS)
+    modes = args.modes or list(MODES)
+
+    proc, url = start_server(args)
+    results: List[Dict[str, Any]] = []
+    try:
+        point_settings_at(url)
+        if args.baseline:
+            for mode in ("sync", "stream"):
+                if mode in modes:
+                    run_raw(url, mode, argparse.Namespace(**{**vars(args), "requests": args.warmup}))
+                    samples, wall, memory = measured(lambda: run_raw(url, mode, args), args.tracemalloc)
+                    results.append(summarise("raw", mode, samples, wall, memory))
+        for provider in providers:
+            client = make_client(provider)
+            for mode in modes:
+                chat = ChatService(client, cache=LRUCache() if mode == "cached" else None)
+                run_mode(chat, mode, argparse.Namespace(**{**vars(args), "requests": args.warmup}))
+                samples, wall, memory = measured(lambda: run_mode(chat, mode, args), args.tracemalloc)
+                results.append(summarise(provider, mode, samples, wall, memory))
+    finally:
+        proc.terminate()
+        proc.wait()
+
+    previous = None
+    if args.compare:
+        old = json.loads(args.compare.read_text())
+        previous = {(r["provider"], r["mode"]): r for r in old["results"]}
+    print_table(results, previous)
+
+    report = json.dumps({"meta": metadata(args), "results": results}, indent=2)
+    if args.output:
+        args.output.write_text(report + "\n")
+    else:
+        print(report)
+
+
+if __name__ == "__main__":
+    main()
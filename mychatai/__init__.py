@@ -3,15 +3,35 @@ mychatai Unified chat-LLM orchestration layer.
 
 Expose only the high-level façade so that users do:
     from mychatai import ChatService, OpenAIClient, OllamaClient, settings
+
+Names are imported on first access, so ``from mychatai import OllamaClient``
+never loads the OpenAI, Anthropic or Gemini SDKs.
 """
+from __future__ import annotations
+
+import importlib
+from typing import TYPE_CHECKING, Any
 
 from .config import settings                       # singleton settings object
-from .chat_service import ChatService
-from .clients.openai import OpenAIClient
-from .clients.ollama import OllamaClient
-from .clients.gemini import GeminiClient
-from .clients.claude import AnthropicClient
-from .clients.deepseek import DeepSeekClient
+
+if TYPE_CHECKING:
+    from .chat_service import ChatService
+    from .clients.openai import OpenAIClient
+    from .clients.ollama import OllamaClient
+    from .clients.gemini import GeminiClient
+    from .clients.claude import AnthropicClient
+    from .clients.deepseek import DeepSeekClient
+    from .clients.response import ChatResponse
+
+_LAZY = {
+    "ChatService": ".chat_service",
+    "OpenAIClient": ".clients.openai",
+    "OllamaClient": ".clients.ollama",
+    "GeminiClient": ".clients.gemini",
+    "AnthropicClient": ".clients.claude",
+    "DeepSeekClient": ".clients.deepseek",
+    "ChatResponse": ".clients.response",
+}
 
 __all__ = [
     "ChatService",
@@ -20,5 +40,19 @@ __all__ = [
     "GeminiClient",
     "AnthropicClient",
     "DeepSeekClient",
+    "ChatResponse",
     "settings",
 ]
+
+
+def __getattr__(name: str) -> Any:
+    module = _LAZY.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value                         # later lookups skip __getattr__
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(__all__))
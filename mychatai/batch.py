@@ -0,0 +1,210 @@
+"""
+Bounded-concurrency batch execution behind ``ChatService.answer_many``.
+
+Questions are pulled lazily from any iterable, at most a small window of
+them is in flight, and each one yields a :class:`BatchResult` (answer *or*
+captured error) so one bad item never aborts the run.
+
+With a *token_budget* the window is also bounded by the summed size of the
+questions in flight (as measured by *weigh*, e.g. prompt + max_tokens), so
+many short prompts run side by side while long ones are spaced out.
+"""
+from __future__ import annotations
+
+import asyncio
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import AsyncIterator, Awaitable, Callable, Dict, Hashable, Iterable, Iterator, Optional, Tuple
+
+from .exceptions import ProviderError
+
+
+@dataclass
+class BatchResult:
+    """Outcome of one question in a batch (``index`` is its input position)."""
+
+    index: int
+    question: str
+    answer: Optional[str] = None
+    error: Optional[ProviderError] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def run_batch(
+    fn: Callable[[str], str],
+    questions: Iterable[str],
+    *,
+    concurrency: int = 8,
+    ordered: bool = True,
+    token_budget: Optional[int] = None,
+    weigh: Optional[Callable[[str], int]] = None,
+) -> Iterator[BatchResult]:
+    """
+    Call *fn* on every question from a thread pool of *concurrency* workers.
+
+    Results are yielded as they complete, or in input order when *ordered*
+    (holding back at most ``2 * concurrency`` finished results).  With a
+    *token_budget*, a question is only started while the ``weigh(question)``
+    of everything in flight stays within it (one question always may run).
+    """
+    if concurrency < 1:
+        raise ValueError("concurrency must be >= 1")
+    window = concurrency * 2 if ordered else concurrency
+    admit = _Admission(enumerate(questions), token_budget, weigh)
+
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="mychatai-batch") as pool:
+        pending: deque[Future] = deque()
+
+        def submit_next() -> bool:
+            item = admit.next(bool(pending))
+            if item is None:
+                return False
+            index, question, weight = item
+            future = pool.submit(_capture, fn, index, question)
+            admit.started(future, weight)
+            pending.append(future)
+            return True
+
+        while len(pending) < window and submit_next():
+            pass
+
+        try:
+            while pending:
+                if ordered:
+                    done = [pending.popleft()]
+                    done[0].result()
+                else:
+                    finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    done = [f for f in pending if f in finished]
+                    for f in done:
+                        pending.remove(f)
+                for f in done:
+                    admit.finished(f)
+                while len(pending) < window and submit_next():
+                    pass
+                for f in done:
+                    yield f.result()
+        finally:
+            # consumer stopped early: drop queued work instead of finishing it
+            for f in pending:
+                f.cancel()
+
+
+async def arun_batch(
+    fn: Callable[[str], Awaitable[str]],
+    questions: Iterable[str],
+    *,
+    concurrency: int = 8,
+    ordered: bool = True,
+    token_budget: Optional[int] = None,
+    weigh: Optional[Callable[[str], int]] = None,
+) -> AsyncIterator[BatchResult]:
+    """Async :func:`run_batch`: at most *concurrency* coroutines in flight."""
+    if concurrency < 1:
+        raise ValueError("concurrency must be >= 1")
+    window = concurrency * 2 if ordered else concurrency
+    semaphore = asyncio.Semaphore(concurrency)
+    admit = _Admission(enumerate(questions), token_budget, weigh)
+
+    async def guarded(index: int, question: str) -> BatchResult:
+        async with semaphore:
+            return await _acapture(fn, index, question)
+
+    pending: deque[asyncio.Task] = deque()
+
+    def submit_next() -> bool:
+        item = admit.next(bool(pending))
+        if item is None:
+            return False
+        index, question, weight = item
+        task = asyncio.ensure_future(guarded(index, question))
+        admit.started(task, weight)
+        pending.append(task)
+        return True
+
+    while len(pending) < window and submit_next():
+        pass
+
+    try:
+        while pending:
+            if ordered:
+                done = [pending.popleft()]
+                await done[0]
+            else:
+                finished, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                done = [t for t in pending if t in finished]
+                for t in done:
+                    pending.remove(t)
+            for t in done:
+                admit.finished(t)
+            while len(pending) < window and submit_next():
+                pass
+            for t in done:
+                yield t.result()
+    finally:
+        for t in pending:
+            t.cancel()
+
+
+class _Admission:
+    """Hands out questions while the in-flight token weight stays within budget."""
+
+    def __init__(
+        self,
+        items: Iterator[Tuple[int, str]],
+        budget: Optional[int],
+        weigh: Optional[Callable[[str], int]],
+    ) -> None:
+        self._items = items
+        self._budget = budget
+        self._weigh = weigh if budget is not None else None
+        self._held: Optional[Tuple[int, str, int]] = None    # pulled, not yet admitted
+        self._weights: Dict[Hashable, int] = {}
+        self._in_flight = 0
+
+    def next(self, busy: bool) -> Optional[Tuple[int, str, int]]:
+        """The next (index, question, weight) to start, or None (input exhausted / over budget)."""
+        if self._held is None:
+            for index, question in self._items:
+                self._held = (index, question, self._weigh(question) if self._weigh else 0)
+                break
+            else:
+                return None
+        index, question, weight = self._held
+        if busy and self._budget is not None and self._in_flight + weight > self._budget:
+            return None
+        self._held = None
+        return index, question, weight
+
+    def started(self, handle: Hashable, weight: int) -> None:
+        self._weights[handle] = weight
+        self._in_flight += weight
+
+    def finished(self, handle: Hashable) -> None:
+        self._in_flight -= self._weights.pop(handle, 0)
+
+
+def _capture(fn: Callable[[str], str], index: int, question: str) -> BatchResult:
+    try:
+        return BatchResult(index, question, answer=fn(question))
+    except Exception as exc:
+        return BatchResult(index, question, error=_as_provider_error(exc))
+
+
+async def _acapture(fn: Callable[[str], Awaitable[str]], index: int, question: str) -> BatchResult:
+    try:
+        return BatchResult(index, question, answer=await fn(question))
+    except Exception as exc:
+        return BatchResult(index, question, error=_as_provider_error(exc))
+
+
+def _as_provider_error(exc: Exception) -> ProviderError:
+    if isinstance(exc, ProviderError):
+        return exc
+    error = ProviderError(f"{type(exc).__name__}: {exc}")
+    error.__cause__ = exc
+    return error
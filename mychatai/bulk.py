@@ -0,0 +1,376 @@
+"""
+Bulk question answering across worker processes (``ask batch``).
+
+    from mychatai.bulk import run_bulk
+    stats = run_bulk("questions.jsonl", "answers.jsonl", provider="openai", workers=4, concurrency=32)
+
+Questions are streamed from JSONL, CSV or plain text (one per line, ``-`` is
+stdin) in small chunks to *workers* processes.  Each worker imports the
+provider SDK and builds its client once, then keeps *concurrency* requests
+in flight on its own event loop.  Memory stays bounded by the chunks
+queued and in flight, whatever the input size.
+
+Results are appended to the output JSONL as they arrive, one object per
+question:
+
+    {"id": 17, "question": "...", "answer": "...", "error": null, "seconds": 1.42}
+
+The output doubles as the checkpoint: rerunning the same command skips
+every id already answered (failed ones are retried), so an interrupted or
+crashed run resumes where it stopped.
+"""
+from __future__ import annotations
+
+import asyncio
+import csv
+import json
+import multiprocessing as mp
+import queue
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import IO, Any, Callable, Dict, Iterator, List, Optional, Set, Tuple, Union
+
+from .batch import _acapture
+
+Item = Tuple[Any, str]          # (id, question)
+
+_FORMATS = ("jsonl", "csv", "text")
+
+
+# ── input ──────────────────────────────────────────────────────────────────
+def detect_format(source: Union[str, Path]) -> str:
+    suffix = Path(str(source)).suffix.lower()
+    if suffix in (".jsonl", ".ndjson"):
+        return "jsonl"
+    if suffix == ".csv":
+        return "csv"
+    return "text"
+
+
+def read_questions(
+    source: Union[str, Path, IO[str]],
+    fmt: Optional[str] = None,
+    *,
+    field: str = "question",
+    id_field: str = "id",
+) -> Iterator[Item]:
+    """
+    Lazily yield ``(id, question)`` pairs.
+
+    JSONL lines may be bare strings or objects holding *field*; CSV rows
+    need a *field* column.  Ids come from *id_field* when present, else the
+    question's position in the input.  Blank questions are skipped.
+    """
+    if isinstance(source, (str, Path)):
+        fmt = fmt or detect_format(source)
+        if str(source) == "-":
+            yield from read_questions(sys.stdin, fmt, field=field, id_field=id_field)
+            return
+        with open(Path(source).expanduser(), encoding="utf-8", newline="") as f:
+            yield from read_questions(f, fmt, field=field, id_field=id_field)
+        return
+
+    fmt = fmt or "text"
+    if fmt not in _FORMATS:
+        raise ValueError(f"unknown input format {fmt!r} (expected one of {', '.join(_FORMATS)})")
+    if fmt == "csv":
+        rows: Iterator[Any] = csv.DictReader(source)
+    elif fmt == "jsonl":
+        rows = (json.loads(line) for line in source if line.strip())
+    else:
+        rows = (line.rstrip("\r\n") for line in source)
+    for index, row in enumerate(rows):
+        if isinstance(row, dict):
+            if field not in row:
+                raise ValueError(f"input row {index} has no {field!r} field")
+            question, item_id = row[field], row.get(id_field, index)
+        else:
+            question, item_id = row, index
+        if question and str(question).strip():
+            yield item_id, str(question)
+
+
+def count_rows(source: Union[str, Path], fmt: Optional[str] = None) -> Optional[int]:
+    """Number of input rows (for the ETA), or None for stdin; a fast line count."""
+    if str(source) == "-":
+        return None
+    lines = 0
+    with open(Path(source).expanduser(), "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            lines += block.count(b"\n")
+    return max(lines - 1, 0) if (fmt or detect_format(source)) == "csv" else lines
+
+
+def completed_ids(output: Union[str, Path]) -> Set[Any]:
+    """Ids already answered successfully in an existing output file."""
+    done: Set[Any] = set()
+    path = Path(output).expanduser()
+    if not path.exists():
+        return done
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:              # torn last line of a killed run
+                continue
+            if record.get("error") is None:
+                done.add(_key(record.get("id")))
+    return done
+
+
+def _key(item_id: Any) -> Any:
+    return tuple(item_id) if isinstance(item_id, list) else item_id
+
+
+# ── progress ───────────────────────────────────────────────────────────────
+@dataclass
+class BulkStats:
+    """Counts for one run (``skipped``: already answered by an earlier run)."""
+
+    total: Optional[int] = None         # rows in the input, when known
+    skipped: int = 0
+    ok: int = 0
+    failed: int = 0
+    started: float = field(default_factory=time.monotonic)
+
+    @property
+    def done(self) -> int:
+        return self.ok + self.failed
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+    @property
+    def rate(self) -> float:
+        """Questions answered per second in this run."""
+        elapsed = self.elapsed
+        return self.done / elapsed if elapsed > 0 else 0.0
+
+    @property
+    def eta(self) -> Optional[float]:
+        """Seconds until the input is exhausted at the current rate."""
+        if self.total is None or not self.rate:
+            return None
+        return max(self.total - self.skipped - self.done, 0) / self.rate
+
+    def summary(self) -> str:
+        total = "?" if self.total is None else str(max(self.total - self.skipped, 0))
+        text = (
+            f"{self.done}/{total} answered ({self.failed} failed) · "
+            f"{self.rate:.1f} q/s · {_duration(self.elapsed)}"
+        )
+        if self.skipped:
+            text += f" · {self.skipped} done earlier"
+        eta = self.eta
+        if eta is not None and self.done < max((self.total or 0) - self.skipped, 0):
+            text += f" · ETA {_duration(eta)}"
+        return text
+
+
+def _duration(seconds: float) -> str:
+    seconds = int(seconds)
+    if seconds < 60:
+        return f"{seconds}s"
+    if seconds < 3600:
+        return f"{seconds // 60}m{seconds % 60:02d}s"
+    return f"{seconds // 3600}h{seconds // 60 % 60:02d}m"
+
+
+class _Progress:
+    """Live one-line summary on stderr: redrawn on a terminal, every 10 s otherwise."""
+
+    def __init__(self, stats: BulkStats, enabled: bool) -> None:
+        self._stats = stats
+        self._enabled = enabled
+        self._tty = sys.stderr.isatty()
+        self._interval = 0.5 if self._tty else 10.0
+        self._shown = time.monotonic()
+
+    def tick(self) -> None:
+        if self._enabled and time.monotonic() - self._shown >= self._interval:
+            self._show()
+
+    def close(self) -> None:
+        if self._enabled:
+            self._show()
+            if self._tty:
+                sys.stderr.write("\n")
+
+    def _show(self) -> None:
+        self._shown = time.monotonic()
+        sys.stderr.write(("\r\x1b[K" if self._tty else "") + self._stats.summary() + ("" if self._tty else "\n"))
+        sys.stderr.flush()
+
+
+# ── workers ────────────────────────────────────────────────────────────────
+def _worker(
+    provider: str,
+    concurrency: int,
+    model_kwargs: Dict[str, Any],
+    inbox: "mp.Queue[Optional[List[Item]]]",
+    outbox: "mp.Queue[Optional[Dict[str, Any]]]",
+) -> None:
+    from .chat_service import ChatService
+    from .providers import providers
+
+    chat = ChatService(providers.create(provider))
+    asyncio.run(_serve(chat, concurrency, model_kwargs, inbox, outbox))
+    outbox.put(None)                    # finished; a crash shows as a non-zero exit code instead
+
+
+async def _serve(
+    chat: Any,
+    concurrency: int,
+    model_kwargs: Dict[str, Any],
+    inbox: "mp.Queue[Optional[List[Item]]]",
+    outbox: "mp.Queue[Optional[Dict[str, Any]]]",
+) -> None:
+    slots = asyncio.Semaphore(concurrency)
+    tasks: Set[asyncio.Task] = set()
+
+    async def answer(item_id: Any, question: str) -> None:
+        try:
+            started = time.monotonic()
+            result = await _acapture(
+                lambda q: chat.aanswer(q, stream=False, **model_kwargs), 0, question
+            )
+            outbox.put({
+                "id": item_id,
+                "question": question,
+                "answer": result.answer,
+                "error": None if result.ok else f"{type(result.error).__name__}: {result.error}",
+                "seconds": round(time.monotonic() - started, 3),
+            })
+        finally:
+            slots.release()
+
+    while True:
+        chunk = await asyncio.to_thread(inbox.get)
+        if chunk is None:
+            break
+        for item_id, question in chunk:
+            await slots.acquire()
+            task = asyncio.create_task(answer(item_id, question))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+    if tasks:
+        await asyncio.gather(*tasks)
+
+
+# ── driver ─────────────────────────────────────────────────────────────────
+def run_bulk(
+    source: Union[str, Path],
+    output: Union[str, Path],
+    *,
+    provider: str,
+    workers: int = 2,
+    concurrency: int = 16,
+    fmt: Optional[str] = None,
+    field: str = "question",
+    id_field: str = "id",
+    resume: bool = True,
+    chunk_size: int = 32,
+    model_kwargs: Optional[Dict[str, Any]] = None,
+    progress: bool = True,
+    on_result: Optional[Callable[[Dict[str, Any]], None]] = None,
+) -> BulkStats:
+    """
+    Answer every question in *source* with *workers* processes of
+    *concurrency* in-flight calls each, appending results to *output*.
+
+    resume  – skip ids already answered in *output* (else it is truncated).
+    """
+    if workers < 1 or concurrency < 1:
+        raise ValueError("workers and concurrency must be >= 1")
+    fmt = fmt or detect_format(source)
+    out_path = Path(output).expanduser()
+    done = completed_ids(out_path) if resume else set()
+    stats = BulkStats()
+    display = _Progress(stats, progress)
+
+    if str(source) != "-":              # count in the background; the ETA appears when known
+        def count() -> None:
+            stats.total = count_rows(source, fmt)
+        threading.Thread(target=count, name="mychatai-bulk-count", daemon=True).start()
+
+    # spawn: workers must not inherit the parent's threads or open sockets
+    ctx = mp.get_context("spawn")
+    inbox = ctx.Queue(maxsize=workers * 2)      # backpressure on the reader
+    outbox = ctx.Queue()
+    procs = [
+        ctx.Process(
+            target=_worker,
+            args=(provider, concurrency, dict(model_kwargs or {}), inbox, outbox),
+            name=f"mychatai-bulk-{n}",
+            daemon=True,
+        )
+        for n in range(workers)
+    ]
+    for p in procs:
+        p.start()
+
+    feed_error: List[BaseException] = []
+
+    def feed() -> None:
+        try:
+            chunk: List[Item] = []
+            for item_id, question in read_questions(source, fmt, field=field, id_field=id_field):
+                if _key(item_id) in done:
+                    stats.skipped += 1
+                    continue
+                chunk.append((item_id, question))
+                if len(chunk) >= chunk_size:
+                    inbox.put(chunk)
+                    chunk = []
+            if chunk:
+                inbox.put(chunk)
+        except BaseException as exc:        # bad input row: stop the run, keep what's written
+            feed_error.append(exc)
+        finally:
+            done.clear()                    # no longer needed; free it
+            for _ in procs:
+                inbox.put(None)
+
+    feeder = threading.Thread(target=feed, name="mychatai-bulk-feed", daemon=True)
+    feeder.start()
+
+    finished = 0
+    try:
+        with open(out_path, "a" if resume else "w", encoding="utf-8") as out:
+            while finished < len(procs):
+                try:
+                    record = outbox.get(timeout=0.2)
+                except queue.Empty:
+                    out.flush()
+                    crashed = [p for p in procs if p.exitcode not in (None, 0)]
+                    if crashed:
+                        raise RuntimeError(
+                            f"worker {crashed[0].name} exited with code {crashed[0].exitcode}; "
+                            "rerun the same command to resume"
+                        )
+                    display.tick()
+                    continue
+                if record is None:
+                    finished += 1
+                    continue
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                if record["error"] is None:
+                    stats.ok += 1
+                else:
+                    stats.failed += 1
+                if on_result is not None:
+                    on_result(record)
+                display.tick()
+    finally:
+        for p in procs:
+            if p.is_alive():
+                p.terminate()
+            p.join(timeout=5)
+        display.close()
+    if feed_error:
+        raise feed_error[0]
+    return stats
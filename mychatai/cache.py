@@ -0,0 +1,272 @@
+"""
+Response caching for ``ChatService``.
+
+``build_messages`` makes the prompt deterministic for a given question, so an
+identical (provider, model, messages, sampling kwargs) tuple can be answered
+from a cache instead of the provider:
+
+    from mychatai.cache import LRUCache, SQLiteCache
+    chat = ChatService(OpenAIClient(), cache=LRUCache(maxsize=2048, ttl=3600))
+    chat = ChatService(OpenAIClient(), cache=SQLiteCache("~/.mychatai/cache.db"))
+
+Streaming calls are cached once the stream has been fully consumed and are
+replayed as a token stream on later hits.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass, asdict
+from functools import partial
+from pathlib import Path
+from typing import Any, AsyncGenerator, AsyncIterator, Callable, Generator, Iterable, Iterator, Mapping, Optional
+
+_TOKEN_RE = re.compile(r"\s*\S+|\s+")
+
+# Per-call kwargs that never change the reply, so they stay out of the key.
+_NON_SEMANTIC_KWARGS = frozenset({"stream", "timeout"})
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+
+    @property
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def as_dict(self) -> dict[str, float]:
+        return {**asdict(self), "hit_ratio": self.hit_ratio}
+
+
+class ResponseCache(ABC):
+    """Backend interface: a string-to-string store that keeps its own stats."""
+
+    def __init__(self) -> None:
+        self.stats = CacheStats()
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached reply, or None (counted as a miss)."""
+
+    @abstractmethod
+    def set(self, key: str, value: str) -> None:
+        """Store *value* under *key*, evicting as needed."""
+
+    @abstractmethod
+    def clear(self) -> None:
+        """Drop every entry."""
+
+
+# ── In-memory LRU ──────────────────────────────────────────────────────────
+class LRUCache(ResponseCache):
+    """Thread-safe in-memory LRU with an optional time-to-live (seconds)."""
+
+    def __init__(self, maxsize: int = 1024, ttl: float | None = None) -> None:
+        super().__init__()
+        self._maxsize = maxsize
+        self._ttl = ttl
+        self._data: OrderedDict[str, tuple[float, str]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and self._ttl is not None and _expired(entry[0], self._ttl):
+                del self._data[key]
+                self.stats.evictions += 1
+                entry = None
+            if entry is None:
+                self.stats.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.stats.hits += 1
+            return entry[1]
+
+    def set(self, key: str, value: str) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic(), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self._maxsize:
+                self._data.popitem(last=False)
+                self.stats.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+# ── Persistent SQLite store ────────────────────────────────────────────────
+class SQLiteCache(ResponseCache):
+    """
+    On-disk cache that survives restarts.
+
+    Entries older than *ttl* seconds are treated as misses and removed; once
+    more than *max_entries* rows exist the least recently used ones go.  The
+    size check runs every ~1% of *max_entries* writes, so the table may
+    briefly overshoot by that much.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        *,
+        ttl: float | None = None,
+        max_entries: int | None = 100_000,
+    ) -> None:
+        super().__init__()
+        self._path = Path(path).expanduser()
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        self._ttl = ttl
+        self._max_entries = max_entries
+        self._trim_every = max(1, (max_entries or 0) // 100)
+        self._writes = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self._path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY, value TEXT NOT NULL,"
+            " created REAL NOT NULL, accessed REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses(accessed)")
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(
+                "SELECT value, created FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and self._ttl is not None and now - row[1] > self._ttl:
+                self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self.stats.evictions += 1
+                row = None
+            if row is None:
+                self.stats.misses += 1
+                return None
+            self._db.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+            self.stats.hits += 1
+            return row[0]
+
+    def set(self, key: str, value: str) -> None:
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses (key, value, created, accessed)"
+                " VALUES (?, ?, ?, ?)",
+                (key, value, now, now),
+            )
+            self._writes += 1
+            if self._max_entries is not None and self._writes % self._trim_every == 0:
+                cur = self._db.execute(
+                    "DELETE FROM responses WHERE key IN ("
+                    " SELECT key FROM responses ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+                    (self._max_entries,),
+                )
+                self.stats.evictions += max(cur.rowcount, 0)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._db.execute("DELETE FROM responses")
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+
+# ── Keys & stream helpers ──────────────────────────────────────────────────
+def make_key(
+    provider: str,
+    model: str,
+    messages: Iterable[Mapping[str, Any]],
+    kwargs: Mapping[str, Any],
+) -> str:
+    """Stable digest of everything that determines the reply."""
+    normalized = [
+        {"role": str(m.get("role", "")).strip().lower(), "content": str(m.get("content", "")).strip()}
+        for m in messages
+    ]
+    sampling = {k: v for k, v in kwargs.items() if k not in _NON_SEMANTIC_KWARGS}
+    blob = json.dumps(
+        [provider, model, normalized, sampling],
+        sort_keys=True,
+        separators=(",", ":"),
+        ensure_ascii=False,
+        default=repr,
+    )
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+def replay(text: str) -> Generator[str, None, None]:
+    """Re-emit a cached reply as a token stream (one word per chunk)."""
+    for match in _TOKEN_RE.finditer(text):
+        yield match.group()
+
+
+async def areplay(text: str) -> AsyncGenerator[str, None]:
+    for match in _TOKEN_RE.finditer(text):
+        yield match.group()
+
+
+def record(cache: ResponseCache, key: str, tokens: Iterator[str]) -> Generator[str, None, None]:
+    """Pass tokens through and store the full reply once the stream completes."""
+    return collect(tokens, partial(cache.set, key))
+
+
+def arecord(
+    cache: ResponseCache, key: str, tokens: AsyncIterator[str]
+) -> AsyncGenerator[str, None]:
+    return acollect(tokens, partial(cache.set, key))
+
+
+def collect(tokens: Iterator[str], done: Callable[[str], Any]) -> Generator[str, None, None]:
+    """
+    Pass tokens through and call ``done(full_text)`` once the stream
+    completes; a consumer that stops early closes *tokens* instead.
+    """
+    parts: list[str] = []
+    try:
+        for token in tokens:
+            parts.append(token)
+            yield token
+    finally:
+        close = getattr(tokens, "close", None)
+        if close is not None:
+            close()
+    done("".join(parts))
+
+
+async def acollect(
+    tokens: AsyncIterator[str], done: Callable[[str], Any]
+) -> AsyncGenerator[str, None]:
+    parts: list[str] = []
+    try:
+        async for token in tokens:
+            parts.append(token)
+            yield token
+    finally:
+        aclose = getattr(tokens, "aclose", None)
+        if aclose is not None:
+            await aclose()
+    done("".join(parts))
+
+
+def _expired(stamp: float, ttl: float) -> bool:
+    return time.monotonic() - stamp > ttl
@@ -1,13 +1,74 @@
 """High-level façade that orchestrates prompts and model calls."""
 from __future__ import annotations
-from typing import Iterable, Generator
-from .clients.base import AbstractModelClient
-from .prompts import build_messages
+import time
+from functools import partial
+from typing import (
+    TYPE_CHECKING, Any, AsyncGenerator, AsyncIterable, AsyncIterator, Callable, Iterable, Iterator, Generator,
+    Optional, Union,
+)
+from .batch import BatchResult, run_batch, arun_batch
+from .cache import ResponseCache, acollect, arecord, areplay, collect, make_key, record, replay
+from .clients.base import AbstractModelClient, message
+from .clients.response import ChatChunk, ChatResponse, _aclose, _close
+from .config import settings
+from .exceptions import ProviderError
+from .instrumentation import CallRecord, instrumentation
+from .prompts import build_messages, prompt_layout
+from .scheduler import arun_as, batch_request, run_as
+from .singleflight import SingleFlight, flights
+from .tokens import Estimate, count_messages, estimate, validate
+
+if TYPE_CHECKING:
+    from .semantic_cache import SemanticCache
+    from .session import ChatSession
 
 
 class ChatService:
-    def  __init__(self, model_client: AbstractModelClient):
-         self._model = model_client
+    def __init__(
+        self,
+        model_client: AbstractModelClient,
+        *,
+        cache: Optional[ResponseCache] = None,
+        coalesce: Union[bool, SingleFlight] = False,
+        prompt_cache: Optional[bool] = None,
+        semantic_cache: Optional["SemanticCache"] = None,
+        preflight: bool = False,
+        template: Optional[str] = None,
+    ):
+        """
+        cache     – optional response cache (see ``mychatai.cache``).
+        coalesce  – share one upstream call between identical concurrent
+                    requests; True uses the process-wide group so separate
+                    ChatService instances coalesce too.
+
+        prompt_cache – lay prompts out prefix-stable (shared instructions in
+                    the system message) so provider prompt caches hit;
+                    defaults to ``settings.prompt_cache``.  Enable it on
+                    the client too for provider-specific hints.
+
+        semantic_cache – answer paraphrases of earlier questions from a
+                    ``mychatai.semantic_cache.SemanticCache``; consulted by
+                    :meth:`answer` / :meth:`aanswer` before ``cache``.
+
+        preflight – count prompt tokens before each call and raise
+                    ``ContextWindowError`` instead of sending a prompt
+                    (plus ``max_tokens``) the model cannot take.
+
+        template  – prompt set questions are asked with (see
+                    ``mychatai.prompts``); defaults to ``settings.prompt_template``.
+
+        Calls are measured (see ``mychatai.instrumentation``) whenever an
+        instrumentation hook is registered.
+        """
+        self._model = model_client
+        self._cache = cache
+        if coalesce is True:
+            coalesce = flights
+        self._flights: Optional[SingleFlight] = coalesce or None
+        self.prompt_cache = settings.prompt_cache if prompt_cache is None else prompt_cache
+        self._semantic = semantic_cache
+        self._preflight = preflight
+        self.template = template
 
     def answer(
         self,
@@ -15,5 +76,499 @@ class ChatService:
         stream: bool = False,
         **model_kwargs,
     ) -> str | Generator[str, None, None]:
-        messages = build_messages(question)
-        return self._model.chat(messages, stream=stream, **model_kwargs)
+        if not instrumentation.enabled:
+            messages = self._messages(question)
+            return self._answer_question(question, messages, stream, model_kwargs)
+        call = self._begin(stream)
+        messages = self._messages(question)
+        call.prompt_build = time.perf_counter() - call.started
+        return instrumentation.run(
+            call, lambda: self._answer_question(question, messages, stream, model_kwargs, call)
+        )
+
+    def complete(
+        self,
+        messages: Iterable[message],
+        stream: bool = False,
+        **model_kwargs,
+    ) -> str | Generator[str, None, None]:
+        """Like :meth:`answer` for a ready-made message list (multi-turn, custom prompts)."""
+        if not instrumentation.enabled:
+            return self._answer(list(messages), stream, model_kwargs)
+        call = self._begin(stream)
+        messages = list(messages)
+        return instrumentation.run(call, lambda: self._answer(messages, stream, model_kwargs, call))
+
+    def _answer_question(
+        self,
+        question: str,
+        messages: list[message],
+        stream: bool,
+        model_kwargs: dict[str, Any],
+        call: Optional[CallRecord] = None,
+    ) -> Any:
+        semantic = self._semantic
+        if semantic is None:
+            return self._answer(messages, stream, model_kwargs, call)
+        try:
+            vector = semantic.embed(question)
+        except ProviderError:               # embedder unavailable: just ask the model
+            return self._answer(messages, stream, model_kwargs, call)
+        scope = self._semantic_scope(messages, model_kwargs)
+        hit = semantic.search(vector, scope)
+        if hit is not None:
+            _note_semantic_hit(call, hit.similarity)
+            return replay(hit.answer) if stream else hit.answer
+
+        reply = self._answer(messages, stream, model_kwargs, call)
+        if stream:
+            return collect(reply, lambda text: semantic.add(vector, question, text, scope))
+        semantic.add(vector, question, reply, scope)
+        return reply
+
+    def _answer(
+        self,
+        messages: list[message],
+        stream: bool,
+        model_kwargs: dict[str, Any],
+        call: Optional[CallRecord] = None,
+    ) -> Any:
+        if self._preflight:
+            self._validate(messages, model_kwargs)
+        if self._cache is None and self._flights is None:
+            return self._model.chat(messages, stream=stream, **model_kwargs)
+
+        key = self._request_key(messages, model_kwargs)
+        if self._cache is not None:
+            cached = self._cache.get(key)
+            if call is not None:
+                call.cache = "miss" if cached is None else "hit"
+            if cached is not None:
+                return replay(cached) if stream else cached
+
+        def upstream() -> Any:
+            reply = self._model.chat(messages, stream=stream, **model_kwargs)
+            if self._cache is None:
+                return reply
+            if stream:
+                return record(self._cache, key, reply)
+            self._cache.set(key, reply)
+            return reply
+
+        if self._flights is None:
+            return upstream()
+        if stream:
+            return self._flights.stream(key, upstream)
+        return self._flights.do(key, upstream)
+
+    async def aanswer(
+        self,
+        question: str,
+        stream: bool = False,
+        **model_kwargs,
+    ) -> str | AsyncGenerator[str, None]:
+        """Async twin of :meth:`answer`; many calls can share one event loop."""
+        if not instrumentation.enabled:
+            messages = self._messages(question)
+            return await self._aanswer_question(question, messages, stream, model_kwargs)
+        call = self._begin(stream)
+        messages = self._messages(question)
+        call.prompt_build = time.perf_counter() - call.started
+        return await instrumentation.arun(
+            call, lambda: self._aanswer_question(question, messages, stream, model_kwargs, call)
+        )
+
+    async def acomplete(
+        self,
+        messages: Iterable[message],
+        stream: bool = False,
+        **model_kwargs,
+    ) -> str | AsyncGenerator[str, None]:
+        """Async :meth:`complete`."""
+        if not instrumentation.enabled:
+            return await self._aanswer(list(messages), stream, model_kwargs)
+        call = self._begin(stream)
+        messages = list(messages)
+        return await instrumentation.arun(call, lambda: self._aanswer(messages, stream, model_kwargs, call))
+
+    async def _aanswer_question(
+        self,
+        question: str,
+        messages: list[message],
+        stream: bool,
+        model_kwargs: dict[str, Any],
+        call: Optional[CallRecord] = None,
+    ) -> Any:
+        semantic = self._semantic
+        if semantic is None:
+            return await self._aanswer(messages, stream, model_kwargs, call)
+        try:
+            vector = await semantic.aembed(question)
+        except ProviderError:
+            return await self._aanswer(messages, stream, model_kwargs, call)
+        scope = self._semantic_scope(messages, model_kwargs)
+        hit = semantic.search(vector, scope)
+        if hit is not None:
+            _note_semantic_hit(call, hit.similarity)
+            return areplay(hit.answer) if stream else hit.answer
+
+        reply = await self._aanswer(messages, stream, model_kwargs, call)
+        if stream:
+            return acollect(reply, lambda text: semantic.add(vector, question, text, scope))
+        semantic.add(vector, question, reply, scope)
+        return reply
+
+    async def _aanswer(
+        self,
+        messages: list[message],
+        stream: bool,
+        model_kwargs: dict[str, Any],
+        call: Optional[CallRecord] = None,
+    ) -> Any:
+        if self._preflight:
+            self._validate(messages, model_kwargs)
+        if self._cache is None and self._flights is None:
+            return await self._model.achat(messages, stream=stream, **model_kwargs)
+
+        key = self._request_key(messages, model_kwargs)
+        if self._cache is not None:
+            cached = self._cache.get(key)
+            if call is not None:
+                call.cache = "miss" if cached is None else "hit"
+            if cached is not None:
+                return areplay(cached) if stream else cached
+
+        async def upstream() -> Any:
+            reply = await self._model.achat(messages, stream=stream, **model_kwargs)
+            if self._cache is None:
+                return reply
+            if stream:
+                return arecord(self._cache, key, reply)
+            self._cache.set(key, reply)
+            return reply
+
+        if self._flights is None:
+            return await upstream()
+        if stream:
+            return self._flights.astream(key, upstream)
+        return await self._flights.ado(key, upstream)
+
+    # ── structured replies ─────────────────────────────────────────────────
+    def respond(
+        self,
+        messages: Iterable[message],
+        stream: bool = False,
+        **model_kwargs,
+    ) -> ChatResponse:
+        """
+        Like :meth:`complete` but returns the :class:`ChatResponse`, with
+        its finish reason and usage.  Cache hits have neither.
+        """
+        if not instrumentation.enabled:
+            return self._respond(list(messages), stream, model_kwargs)
+        call = self._begin(stream)
+        messages = list(messages)
+        return instrumentation.run(call, lambda: self._respond(messages, stream, model_kwargs, call))
+
+    async def arespond(
+        self,
+        messages: Iterable[message],
+        stream: bool = False,
+        **model_kwargs,
+    ) -> ChatResponse:
+        """Async :meth:`respond`."""
+        if not instrumentation.enabled:
+            return await self._arespond(list(messages), stream, model_kwargs)
+        call = self._begin(stream)
+        messages = list(messages)
+        return await instrumentation.arun(call, lambda: self._arespond(messages, stream, model_kwargs, call))
+
+    def _respond(
+        self,
+        messages: list[message],
+        stream: bool,
+        model_kwargs: dict[str, Any],
+        call: Optional[CallRecord] = None,
+    ) -> ChatResponse:
+        if self._preflight:
+            self._validate(messages, model_kwargs)
+        if self._cache is None and self._flights is None:
+            return self._model.respond(messages, stream=stream, **model_kwargs)
+
+        key = self._request_key(messages, model_kwargs)
+        cache = self._cache
+        if cache is not None:
+            cached = cache.get(key)
+            if call is not None:
+                call.cache = "miss" if cached is None else "hit"
+            if cached is not None:
+                if stream:
+                    return ChatResponse(self._provider, self._model.model, chunks=iter([ChatChunk(cached)]))
+                return ChatResponse(self._provider, self._model.model, text=cached)
+
+        def upstream() -> ChatResponse:
+            reply = self._model.respond(messages, stream=stream, **model_kwargs)
+            if cache is None:
+                return reply
+            if stream:
+                return reply.pipe(lambda chunks: _record_chunks(chunks, partial(cache.set, key)))
+            cache.set(key, reply.text)
+            return reply
+
+        if self._flights is None:
+            return upstream()
+        # shared under their own keys: these flights carry ChatResponses / ChatChunks, not text
+        if stream:
+            shared = self._flights.stream(("chunks", key), lambda: iter(upstream()))
+            return ChatResponse(self._provider, self._model.model, chunks=_copies(shared))
+        return self._flights.do(("reply", key), upstream).copy()
+
+    async def _arespond(
+        self,
+        messages: list[message],
+        stream: bool,
+        model_kwargs: dict[str, Any],
+        call: Optional[CallRecord] = None,
+    ) -> ChatResponse:
+        if self._preflight:
+            self._validate(messages, model_kwargs)
+        if self._cache is None and self._flights is None:
+            return await self._model.arespond(messages, stream=stream, **model_kwargs)
+
+        key = self._request_key(messages, model_kwargs)
+        cache = self._cache
+        if cache is not None:
+            cached = cache.get(key)
+            if call is not None:
+                call.cache = "miss" if cached is None else "hit"
+            if cached is not None:
+                if stream:
+                    return ChatResponse(self._provider, self._model.model, chunks=_aiter([ChatChunk(cached)]))
+                return ChatResponse(self._provider, self._model.model, text=cached)
+
+        async def upstream() -> ChatResponse:
+            reply = await self._model.arespond(messages, stream=stream, **model_kwargs)
+            if cache is None:
+                return reply
+            if stream:
+                return reply.pipe(lambda chunks: _arecord_chunks(chunks, partial(cache.set, key)))
+            cache.set(key, reply.text)
+            return reply
+
+        if self._flights is None:
+            return await upstream()
+        if stream:
+            async def chunks() -> AsyncIterator[ChatChunk]:
+                return (await upstream()).__aiter__()
+
+            shared = self._flights.astream(("chunks", key), chunks)
+            return ChatResponse(self._provider, self._model.model, chunks=_acopies(shared))
+        return (await self._flights.ado(("reply", key), upstream)).copy()
+
+    # ── batches ────────────────────────────────────────────────────────────
+    def answer_many(
+        self,
+        questions: Iterable[str],
+        *,
+        concurrency: int = 8,
+        ordered: bool = True,
+        token_budget: Optional[int] = None,
+        **model_kwargs,
+    ) -> list[BatchResult]:
+        """
+        Answer many questions on a thread pool of *concurrency* workers.
+
+        Failures are captured per item as ``BatchResult.error``
+        (a ``ProviderError``) instead of aborting the batch.  *token_budget*
+        caps the prompt (+ ``max_tokens``) tokens in flight at once, e.g.
+        to stay inside a tokens-per-minute limit or a local server's memory.
+        Scheduled clients see these calls at ``batch`` priority unless the
+        caller is inside a ``scheduling()`` block (see ``mychatai.scheduler``).
+        """
+        return list(
+            self.iter_answers(
+                questions, concurrency=concurrency, ordered=ordered, token_budget=token_budget, **model_kwargs
+            )
+        )
+
+    def iter_answers(
+        self,
+        questions: Iterable[str],
+        *,
+        concurrency: int = 8,
+        ordered: bool = False,
+        token_budget: Optional[int] = None,
+        **model_kwargs,
+    ) -> Iterator[BatchResult]:
+        """Like :meth:`answer_many` but yields results as they complete."""
+        model_kwargs.pop("stream", None)
+        request = batch_request()           # pool threads don't inherit the caller's context
+        return run_batch(
+            lambda q: run_as(request, self.answer, q, stream=False, **model_kwargs),
+            questions,
+            concurrency=concurrency,
+            ordered=ordered,
+            token_budget=token_budget,
+            weigh=lambda q: self._question_tokens(q, model_kwargs),
+        )
+
+    async def aanswer_many(
+        self,
+        questions: Iterable[str],
+        *,
+        concurrency: int = 32,
+        ordered: bool = True,
+        token_budget: Optional[int] = None,
+        **model_kwargs,
+    ) -> list[BatchResult]:
+        """Async :meth:`answer_many`: one event loop, *concurrency* calls in flight."""
+        return [
+            result
+            async for result in self.aiter_answers(
+                questions, concurrency=concurrency, ordered=ordered, token_budget=token_budget, **model_kwargs
+            )
+        ]
+
+    def aiter_answers(
+        self,
+        questions: Iterable[str],
+        *,
+        concurrency: int = 32,
+        ordered: bool = False,
+        token_budget: Optional[int] = None,
+        **model_kwargs,
+    ) -> AsyncIterator[BatchResult]:
+        """Async :meth:`iter_answers`."""
+        model_kwargs.pop("stream", None)
+        request = batch_request()
+        return arun_batch(
+            lambda q: arun_as(request, self.aanswer, q, stream=False, **model_kwargs),
+            questions,
+            concurrency=concurrency,
+            ordered=ordered,
+            token_budget=token_budget,
+            weigh=lambda q: self._question_tokens(q, model_kwargs),
+        )
+
+    # ── pre-flight ─────────────────────────────────────────────────────────
+    def estimate(self, question: Union[str, Iterable[message]], **model_kwargs: Any) -> Estimate:
+        """
+        Expected prompt tokens, cost and latency of answering *question*
+        (or of a ready-made message list) without sending anything.
+        """
+        if isinstance(question, str):
+            messages = self._messages(question)
+        else:
+            messages = list(question)
+        estimator = getattr(self._model, "estimate", None)
+        if estimator is not None:                   # RouterClient: the route tried first
+            return next(iter(estimator(messages, max_tokens=model_kwargs.get("max_tokens")).values()))
+        return estimate(
+            messages, self._provider, self._model.model, max_tokens=model_kwargs.get("max_tokens")
+        )
+
+    # ── conversations ──────────────────────────────────────────────────────
+    def session(self, session_id: Optional[str] = None, **session_kwargs: Any) -> "ChatSession":
+        """A multi-turn :class:`~mychatai.session.ChatSession` on this service."""
+        from .session import ChatSession
+        return ChatSession(self, session_id=session_id, **session_kwargs)
+
+    def prompt_layout(self) -> tuple[str, str]:
+        """(system prompt, user template) this service asks questions with."""
+        return prompt_layout(self.prompt_cache, template=self.template, provider=self._provider)
+
+    @property
+    def client(self) -> AbstractModelClient:
+        """The model client requests go to."""
+        return self._model
+
+    @property
+    def cache(self) -> Optional[ResponseCache]:
+        """The response cache in use (its ``stats`` count hits/misses/evictions)."""
+        return self._cache
+
+    @property
+    def semantic_cache(self) -> Optional["SemanticCache"]:
+        return self._semantic
+
+    @property
+    def _provider(self) -> str:
+        return self._model.provider or type(self._model).__name__
+
+    def _messages(self, question: str) -> list[message]:
+        return build_messages(
+            question, prefix_stable=self.prompt_cache, template=self.template, provider=self._provider
+        )
+
+    def _begin(self, stream: bool) -> CallRecord:
+        return CallRecord(self._provider, self._model.model, stream)
+
+    def _request_key(self, messages: Iterable[message], model_kwargs: dict[str, Any]) -> str:
+        """Cache / coalescing key: provider, model, messages, sampling kwargs."""
+        return make_key(self._provider, self._model.model, messages, model_kwargs)
+
+    def _validate(self, messages: list[message], model_kwargs: dict[str, Any]) -> None:
+        if getattr(self._model, "estimate", None) is None:      # routers check per route
+            validate(messages, self._provider, self._model.model, max_tokens=model_kwargs.get("max_tokens"))
+
+    def _question_tokens(self, question: str, model_kwargs: dict[str, Any]) -> int:
+        messages = self._messages(question)
+        return count_messages(messages, self._provider, self._model.model) + (model_kwargs.get("max_tokens") or 0)
+
+    def _semantic_scope(self, messages: Iterable[message], model_kwargs: dict[str, Any]) -> str:
+        """Everything but the question: answers are only reused within one scope."""
+        system = [m for m in messages if m.get("role") == "system"]
+        return self._request_key(system, model_kwargs)
+
+
+def _note_semantic_hit(call: Optional[CallRecord], similarity: float) -> None:
+    if call is not None:
+        call.cache = "semantic"
+        call.attributes["semantic_cache.similarity"] = similarity
+
+
+def _record_chunks(chunks: Iterable[ChatChunk], done: Callable[[str], Any]) -> Generator[ChatChunk, None, None]:
+    """Pass chunks through and call ``done(full_text)`` once the stream completes."""
+    parts: list[str] = []
+    try:
+        for chunk in chunks:
+            parts.append(chunk.text)
+            yield chunk
+    finally:
+        _close(chunks)
+    done("".join(parts))
+
+
+async def _arecord_chunks(
+    chunks: AsyncIterable[ChatChunk], done: Callable[[str], Any]
+) -> AsyncGenerator[ChatChunk, None]:
+    parts: list[str] = []
+    try:
+        async for chunk in chunks:
+            parts.append(chunk.text)
+            yield chunk
+    finally:
+        await _aclose(chunks)
+    done("".join(parts))
+
+
+def _copies(chunks: Iterator[ChatChunk]) -> Generator[ChatChunk, None, None]:
+    """Each subscriber of a shared stream stamps its own chunks."""
+    try:
+        for chunk in chunks:
+            yield chunk.copy()
+    finally:
+        _close(chunks)
+
+
+async def _acopies(chunks: AsyncIterator[ChatChunk]) -> AsyncGenerator[ChatChunk, None]:
+    try:
+        async for chunk in chunks:
+            yield chunk.copy()
+    finally:
+        await _aclose(chunks)
+
+
+async def _aiter(chunks: Iterable[ChatChunk]) -> AsyncGenerator[ChatChunk, None]:
+    for chunk in chunks:
+        yield chunk
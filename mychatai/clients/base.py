@@ -1,19 +1,253 @@
 """Abstract client interface (Strategy pattern)."""
 from __future__ import annotations
+import asyncio
+import time
 from abc import ABC, abstractmethod
-from typing import Iterable, Generator, Dict
+from typing import Any, AsyncGenerator, AsyncIterator, Callable, Iterable, Iterator, Generator, Dict, Optional, TypeVar
+
+from .response import ChatChunk, ChatResponse
 
 message = Dict[str, str]
 
+_EXHAUSTED = object()
+
+T = TypeVar("T")
+
+
 class AbstractModelClient(ABC):
     """A minimal interface every concrete client must implement."""
 
+    #: Short provider name ("openai", "ollama", ...); part of response-cache keys.
+    provider: str = ""
+
+    @property
+    def model(self) -> str:
+        """Model identifier this client sends requests to."""
+        return getattr(self, "_model", "")
+
     @abstractmethod
     def chat(
         self,
-	messages: Iterable[message],
+        messages: Iterable[message],
         *,
-	stream: bool = False,
-	**kwargs,
-    ) -> str | Generator[str, None, None]: 
+        stream: bool = False,
+        **kwargs,
+    ) -> str | Generator[str, None, None]:
         """Return the model's reply or a generator of tokens."""
+
+    async def achat(
+        self,
+        messages: Iterable[message],
+        *,
+        stream: bool = False,
+        **kwargs: Any,
+    ) -> str | AsyncGenerator[str, None]:
+        """
+        Async twin of :meth:`chat`: await it for the reply or for an async
+        generator of tokens.
+
+        Built-in clients override this with their provider's native async
+        API; the fallback here runs the sync call on a worker thread so
+        third-party clients keep working unchanged.
+        """
+        msgs = list(messages)
+        if not stream:
+            return await asyncio.to_thread(self.chat, msgs, stream=False, **kwargs)
+
+        tokens = await asyncio.to_thread(self.chat, msgs, stream=True, **kwargs)
+        return _iterate_in_thread(tokens)
+
+    def respond(
+        self,
+        messages: Iterable[message],
+        *,
+        stream: bool = False,
+        **kwargs: Any,
+    ) -> ChatResponse:
+        """
+        The reply as a :class:`~mychatai.clients.response.ChatResponse`;
+        with ``stream=True`` it yields :class:`ChatChunk` s as they arrive.
+
+        Built-in clients fill in usage, finish reason and response ids.  The
+        fallback here wraps :meth:`chat`, so wrappers and third-party
+        clients report the text and its timing only.
+        """
+        started = time.perf_counter()
+        reply = self.chat(messages, stream=stream, **kwargs)
+        if stream:
+            return ChatResponse(self.provider, self.model, chunks=_chunks(reply), started=started)
+        return ChatResponse(self.provider, self.model, text=reply, started=started)
+
+    async def arespond(
+        self,
+        messages: Iterable[message],
+        *,
+        stream: bool = False,
+        **kwargs: Any,
+    ) -> ChatResponse:
+        """Async :meth:`respond`; iterate a streamed reply with ``async for``."""
+        started = time.perf_counter()
+        reply = await self.achat(messages, stream=stream, **kwargs)
+        if stream:
+            return ChatResponse(self.provider, self.model, chunks=_achunks(reply), started=started)
+        return ChatResponse(self.provider, self.model, text=reply, started=started)
+
+
+class StructuredClient(AbstractModelClient):
+    """
+    Base for clients that build :class:`ChatResponse` s natively: they
+    implement :meth:`respond` / :meth:`arespond`, and :meth:`chat` /
+    :meth:`achat` return the text of those.
+    """
+
+    @abstractmethod
+    def respond(
+        self,
+        messages: Iterable[message],
+        *,
+        stream: bool = False,
+        **kwargs: Any,
+    ) -> ChatResponse:
+        """The reply, complete or streaming."""
+
+    @abstractmethod
+    async def arespond(
+        self,
+        messages: Iterable[message],
+        *,
+        stream: bool = False,
+        **kwargs: Any,
+    ) -> ChatResponse:
+        """Async :meth:`respond`."""
+
+    def chat(
+        self,
+        messages: Iterable[message],
+        *,
+        stream: bool = False,
+        **kwargs: Any,
+    ) -> str | Generator[str, None, None]:
+        reply = self.respond(messages, stream=stream, **kwargs)
+        return reply.texts() if stream else reply.text
+
+    async def achat(
+        self,
+        messages: Iterable[message],
+        *,
+        stream: bool = False,
+        **kwargs: Any,
+    ) -> str | AsyncGenerator[str, None]:
+        reply = await self.arespond(messages, stream=stream, **kwargs)
+        return reply.atexts() if stream else reply.text
+
+
+class DelegatingClient(StructuredClient):
+    """
+    Base for clients that wrap another client (rate limiting, retries, ...).
+
+    Forwards calls unchanged and reports the wrapped client's provider and
+    model, so caches and metrics see through the wrapper.  Wrappers hook
+    :meth:`respond` / :meth:`arespond`; ``chat`` is the text of those, so
+    usage, finish reason and ids reach the caller through any stack of
+    wrappers.
+    """
+
+    def __init__(self, inner: AbstractModelClient) -> None:
+        self._inner = inner
+
+    @property
+    def provider(self) -> str:  # type: ignore[override]
+        return self._inner.provider
+
+    @property
+    def model(self) -> str:
+        return self._inner.model
+
+    @property
+    def inner(self) -> AbstractModelClient:
+        return self._inner
+
+    def respond(
+        self,
+        messages: Iterable[message],
+        *,
+        stream: bool = False,
+        **kwargs: Any,
+    ) -> ChatResponse:
+        return self._inner.respond(messages, stream=stream, **kwargs)
+
+    async def arespond(
+        self,
+        messages: Iterable[message],
+        *,
+        stream: bool = False,
+        **kwargs: Any,
+    ) -> ChatResponse:
+        return await self._inner.arespond(messages, stream=stream, **kwargs)
+
+
+class ReleaseOnce:
+    """
+    Calls *fn* once: when called, or when garbage-collected uncalled.
+
+    Pass one to a generator that holds a slot (a concurrency permit, a
+    stream subscription) and call it in the generator's ``finally``: a
+    generator that is never iterated never runs its ``finally``, but
+    dropping it still drops its arguments, and with them this guard.
+    """
+
+    __slots__ = ("_fn",)
+
+    def __init__(self, fn: Callable[[], Any]) -> None:
+        self._fn: Optional[Callable[[], Any]] = fn
+
+    def __call__(self, *args: Any) -> None:
+        fn, self._fn = self._fn, None
+        if fn is not None:
+            fn(*args)
+
+    def __del__(self) -> None:
+        self()
+
+
+async def _iterate_in_thread(items: Iterator[T]) -> AsyncGenerator[T, None]:
+    """
+    Drain a blocking iterator (tokens, chunks) without stalling the event
+    loop; it is closed on a worker thread when done or abandoned.
+    """
+    pending: Optional[asyncio.Future] = None
+    try:
+        while True:
+            pending = asyncio.ensure_future(asyncio.to_thread(next, items, _EXHAUSTED))
+            item = await asyncio.shield(pending)    # a cancelled caller leaves next() to finish
+            if item is _EXHAUSTED:
+                return
+            yield item
+    finally:
+        close = getattr(items, "close", None)
+        if close is not None:
+            if pending is None or pending.done():
+                await asyncio.to_thread(close)
+            else:   # a generator can't be closed while next() runs on another thread
+                loop = asyncio.get_running_loop()
+                pending.add_done_callback(lambda _: loop.run_in_executor(None, close))
+
+
+def _chunks(tokens: Iterator[str]) -> Generator[ChatChunk, None, None]:
+    try:
+        for token in tokens:
+            yield ChatChunk(token)
+    finally:
+        close = getattr(tokens, "close", None)
+        if close is not None:
+            close()
+
+
+async def _achunks(tokens: AsyncIterator[str]) -> AsyncGenerator[ChatChunk, None]:
+    try:
+        async for token in tokens:
+            yield ChatChunk(token)
+    finally:
+        aclose = getattr(tokens, "aclose", None)
+        if aclose is not None:
+            await aclose()
@@ -0,0 +1,376 @@
+"""
+Local-first cascade: answer with a fast draft model, escalate when unsure.
+
+``CascadeClient`` is a model client of its own.  Every request goes to the
+draft client first (by default the local Ollama model).  The draft is
+scored with pluggable confidence checks, and only a score below
+*threshold* sends the request on to the fallback (a cloud provider):
+
+    cascade = CascadeClient(OllamaClient(), OpenAIClient(), checks=[
+        min_length(20),
+        refusal(),
+        verifier(lambda messages, text: "def " in text),   # any fn -> bool / 0..1
+    ])
+    chat = ChatService(cascade)
+
+Streaming holds back the draft's first *commit_chars* characters.  Once
+they (or the whole draft, if it is shorter) pass the checks, the held text
+is released and the rest streams straight from the draft.  Otherwise the
+draft is closed and the reply streams from the fallback.  The checks
+therefore see a prefix of long drafts; pass ``commit_chars=None`` to score
+complete drafts only.
+
+With ``race=True`` the fallback starts alongside the draft, so an
+escalation costs no extra time to first token.  The side not used is
+cancelled: its task in :meth:`arespond`, its open stream in both modes.  A
+sync non-streamed fallback can't be interrupted, so its reply is discarded
+when it arrives.  Replies are the answering client's, with its usage and
+finish reason.
+"""
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import re
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import (
+    Any,
+    AsyncGenerator,
+    AsyncIterator,
+    Callable,
+    Generator,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Pattern,
+    Sequence,
+    Tuple,
+    Union,
+)
+
+from ..config import settings
+from .base import AbstractModelClient, StructuredClient, message
+from .response import ChatChunk, ChatResponse, _aclose, _close
+
+# fn(messages, draft_text) -> confidence in [0, 1] (True / False work too)
+Check = Callable[[List[message], str], Union[float, bool]]
+
+REFUSAL_PATTERNS: Tuple[str, ...] = (
+    r"\bI(?:'m| am) (?:sorry|unable|not able)\b",
+    r"\bI can(?:not|'t)\b",
+    r"\bI don't (?:know|have (?:access|enough))\b",
+    r"\bI(?:'m| am) not (?:sure|certain)\b",
+    r"\bas an AI\b",
+)
+
+
+# ── confidence checks ──────────────────────────────────────────────────────
+def min_length(chars: int = 20) -> Check:
+    """Too short to be an answer (empty, "Yes.", a truncated reply) → 0."""
+    def check(messages: List[message], text: str) -> float:
+        return 1.0 if len(text.strip()) >= chars else 0.0
+    return check
+
+
+def refusal(patterns: Sequence[str] = REFUSAL_PATTERNS, window: int = 200) -> Check:
+    """Refusals and hedges in the first *window* characters → 0."""
+    compiled: List[Pattern[str]] = [re.compile(p, re.IGNORECASE) for p in patterns]
+
+    def check(messages: List[message], text: str) -> float:
+        head = text[:window]
+        return 0.0 if any(p.search(head) for p in compiled) else 1.0
+    return check
+
+
+def verifier(fn: Callable[[List[message], str], Union[float, bool]]) -> Check:
+    """Any callable judging the draft, e.g. a schema validator or a grader model."""
+    def check(messages: List[message], text: str) -> float:
+        return float(fn(messages, text))
+    return check
+
+
+def default_checks() -> List[Check]:
+    return [min_length(), refusal()]
+
+
+class CascadeStats:
+    """How often the draft was good enough."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.accepted = 0
+        self.escalated = 0
+        self.draft_errors = 0           # escalations because the draft failed outright
+
+    def record(self, accepted: bool, error: bool = False) -> None:
+        with self._lock:
+            if accepted:
+                self.accepted += 1
+            else:
+                self.escalated += 1
+                self.draft_errors += error
+
+    @property
+    def escalation_rate(self) -> float:
+        total = self.accepted + self.escalated
+        return self.escalated / total if total else 0.0
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "accepted": self.accepted,
+            "escalated": self.escalated,
+            "draft_errors": self.draft_errors,
+            "escalation_rate": self.escalation_rate,
+        }
+
+
+class CascadeClient(StructuredClient):
+    """Draft with a fast client; escalate low-confidence drafts to a stronger one."""
+
+    provider = "cascade"
+
+    def __init__(
+        self,
+        draft: AbstractModelClient,
+        fallback: AbstractModelClient,
+        *,
+        checks: Optional[Iterable[Check]] = None,
+        threshold: float = 0.5,
+        race: bool = False,
+        commit_chars: Optional[int] = 160,
+    ) -> None:
+        """
+        checks       – confidence checks; the draft's score is the lowest
+                       (default: :func:`min_length` and :func:`refusal`).
+        threshold    – escalate when the score is below this.
+        race         – start the fallback together with the draft.
+        commit_chars – streamed characters held back and checked before the
+                       draft is committed to (None: the whole draft).
+        """
+        self._draft = draft
+        self._fallback = fallback
+        self._checks = list(checks) if checks is not None else default_checks()
+        self._threshold = threshold
+        self._race = race
+        self._commit_chars = commit_chars
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._pool_lock = threading.Lock()
+        self.stats = CascadeStats()
+
+    @property
+    def model(self) -> str:
+        return f"{_name(self._draft)}>{_name(self._fallback)}"
+
+    @property
+    def draft(self) -> AbstractModelClient:
+        return self._draft
+
+    @property
+    def fallback(self) -> AbstractModelClient:
+        return self._fallback
+
+    def score(self, messages: List[message], text: str) -> float:
+        """The draft's confidence: the lowest score of all checks."""
+        return min((float(check(messages, text)) for check in self._checks), default=1.0)
+
+    def _accept(self, messages: List[message], text: str) -> bool:
+        accepted = self.score(messages, text) >= self._threshold
+        self.stats.record(accepted)
+        return accepted
+
+    # ── sync ───────────────────────────────────────────────────────────────
+    def respond(
+        self,
+        messages: Iterable[message],
+        *,
+        stream: bool = False,
+        **kwargs: Any,
+    ) -> ChatResponse:
+        """The accepted draft's reply, else the fallback's (usage and finish reason included)."""
+        msgs = list(messages)
+        early = None
+        if self._race:
+            # in the caller's context, like the draft: call records, scheduling, budgets
+            early = self._executor().submit(
+                contextvars.copy_context().run, self._open_fallback, msgs, stream, kwargs
+            )
+        if stream:
+            return ChatResponse(self.provider, self.model, chunks=self._stream(msgs, kwargs, early))
+        try:
+            draft = self._draft.respond(msgs, stream=False, **kwargs)
+        except Exception:
+            self.stats.record(False, error=True)
+        else:
+            if self._accept(msgs, draft.text):
+                _abandon(early)
+                return draft
+        if early is not None:
+            return early.result()
+        return self._fallback.respond(msgs, stream=False, **kwargs)
+
+    def _stream(
+        self, msgs: List[message], kwargs: dict[str, Any], early: Optional[Future]
+    ) -> Generator[ChatChunk, None, None]:
+        held: List[ChatChunk] = []
+        chunks: Optional[Iterator[ChatChunk]] = None
+        try:
+            try:
+                chunks = iter(self._draft.respond(msgs, stream=True, **kwargs))
+                finished = self._hold(chunks, held)
+            except Exception:
+                self.stats.record(False, error=True)
+                accepted = False
+            else:
+                accepted = self._accept(msgs, _text(held))
+            if accepted:
+                _abandon(early)
+                yield from held
+                if not finished:
+                    yield from chunks       # type: ignore[misc]
+                return
+            _close(chunks)
+            if early is not None:
+                yield from early.result()
+            else:
+                yield from self._fallback.respond(msgs, stream=True, **kwargs)
+        finally:
+            _close(chunks)
+            _abandon(early)                 # consumer went away before a decision
+
+    def _hold(self, chunks: Iterator[ChatChunk], held: List[ChatChunk]) -> bool:
+        """Buffer up to ``commit_chars``; True when the draft ended first."""
+        chars = 0
+        for chunk in chunks:
+            held.append(chunk)
+            chars += len(chunk.text)
+            if self._commit_chars is not None and chars >= self._commit_chars:
+                return False
+        return True
+
+    def _open_fallback(self, msgs: List[message], stream: bool, kwargs: dict[str, Any]) -> ChatResponse:
+        """The fallback's reply, a stream up to its first chunk (runs on the pool)."""
+        return self._fallback.respond(msgs, stream=stream, **kwargs).prefetch()
+
+    def _executor(self) -> ThreadPoolExecutor:
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=32, thread_name_prefix="mychatai-cascade")
+            return self._pool
+
+    # ── async ──────────────────────────────────────────────────────────────
+    async def arespond(
+        self,
+        messages: Iterable[message],
+        *,
+        stream: bool = False,
+        **kwargs: Any,
+    ) -> ChatResponse:
+        msgs = list(messages)
+        early = asyncio.ensure_future(self._aopen_fallback(msgs, stream, kwargs)) if self._race else None
+        if stream:
+            return ChatResponse(self.provider, self.model, chunks=self._astream(msgs, kwargs, early))
+        try:
+            draft = await self._draft.arespond(msgs, stream=False, **kwargs)
+        except asyncio.CancelledError:
+            _acancel(early)
+            raise
+        except Exception:
+            self.stats.record(False, error=True)
+        else:
+            if self._accept(msgs, draft.text):
+                _acancel(early)
+                return draft
+        if early is not None:
+            return await early
+        return await self._fallback.arespond(msgs, stream=False, **kwargs)
+
+    async def _astream(
+        self, msgs: List[message], kwargs: dict[str, Any], early: Optional[asyncio.Future]
+    ) -> AsyncGenerator[ChatChunk, None]:
+        held: List[ChatChunk] = []
+        chunks: Optional[AsyncIterator[ChatChunk]] = None
+        try:
+            try:
+                chunks = (await self._draft.arespond(msgs, stream=True, **kwargs)).__aiter__()
+                finished = await self._ahold(chunks, held)
+            except Exception:
+                self.stats.record(False, error=True)
+                accepted = False
+            else:
+                accepted = self._accept(msgs, _text(held))
+            if accepted:
+                _acancel(early)
+                for chunk in held:
+                    yield chunk
+                if not finished:
+                    async for chunk in chunks:      # type: ignore[union-attr]
+                        yield chunk
+                return
+            await _aclose(chunks)
+            fallback = await early if early is not None else await self._fallback.arespond(
+                msgs, stream=True, **kwargs
+            )
+            rest = fallback.__aiter__()
+            try:
+                async for chunk in rest:
+                    yield chunk
+            finally:
+                await rest.aclose()
+        finally:
+            await _aclose(chunks)
+            _acancel(early)                 # consumer went away before a decision
+
+    async def _ahold(self, chunks: AsyncIterator[ChatChunk], held: List[ChatChunk]) -> bool:
+        chars = 0
+        async for chunk in chunks:
+            held.append(chunk)
+            chars += len(chunk.text)
+            if self._commit_chars is not None and chars >= self._commit_chars:
+                return False
+        return True
+
+    async def _aopen_fallback(self, msgs: List[message], stream: bool, kwargs: dict[str, Any]) -> ChatResponse:
+        return await (await self._fallback.arespond(msgs, stream=stream, **kwargs)).aprefetch()
+
+    # ── construction ───────────────────────────────────────────────────────
+    @classmethod
+    def from_settings(cls, **cascade_kwargs: Any) -> "CascadeClient":
+        """Ollama drafts, ``settings.cascade_fallback`` answers what it can't."""
+        from ..providers import providers
+        cascade_kwargs.setdefault("threshold", settings.cascade_threshold)
+        cascade_kwargs.setdefault("race", settings.cascade_race)
+        return cls(providers.create("ollama"), providers.create(settings.cascade_fallback), **cascade_kwargs)
+
+
+# ── helpers ────────────────────────────────────────────────────────────────
+def _name(client: AbstractModelClient) -> str:
+    return f"{client.provider or type(client).__name__}:{client.model}"
+
+
+def _text(chunks: List[ChatChunk]) -> str:
+    return "".join(chunk.text for chunk in chunks)
+
+
+def _abandon(early: Optional[Future]) -> None:
+    """Drop a raced sync fallback: cancel it if queued, close its stream once open."""
+    if early is None or early.cancel():
+        return
+
+    def close(future: Future) -> None:
+        if not future.cancelled() and future.exception() is None:
+            future.result().close()
+    early.add_done_callback(close)
+
+
+def _acancel(early: Optional[asyncio.Future]) -> None:
+    """Cancel a raced async fallback; close its stream if it already opened."""
+    if early is None:
+        return
+    if not early.done():
+        early.cancel()
+    elif not early.cancelled() and early.exception() is None:
+        reply = early.result()
+        if not reply.done:
+            asyncio.ensure_future(reply.aclose())
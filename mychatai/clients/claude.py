@@ -1,26 +1,42 @@
 from __future__ import annotations
 
-from collections.abc import Iterable, Generator
+import time
+from collections.abc import Iterable, Generator, AsyncGenerator
 from typing import Any
 
 import anthropic
 
 from ..config import settings
-from .base import AbstractModelClient, message         # ✅ correct alias
-from ..prompts import _SYSTEM_PROMPT                     # (build_messages is used earlier in ChatService)
+from ..transport import transports
+from .base import StructuredClient, message         # ✅ correct alias
+from .response import ChatChunk, ChatResponse, Usage
+from ..instrumentation import current_call
+from .errors import map_errors
+from ..tokens import default_max_tokens
+from ..prompts import system_prompt                      # (build_messages is used earlier in ChatService)
 
 
-class AnthropicClient(AbstractModelClient):
+class AnthropicClient(StructuredClient):
     """Thin wrapper around Anthropic Claude API."""
 
+    provider = "anthropic"
+
     def __init__(
         self,
         model: str | None = None,
         *,
         api_key: str | None = None,
         timeout: int | None = None,
+        prompt_cache: bool | None = None,
     ) -> None:
+        """
+        prompt_cache – mark the system prompt (and the conversation so far)
+                       with cache_control breakpoints so repeated prefixes
+                       are read from Anthropic's prompt cache; defaults to
+                       ``settings.prompt_cache``.
+        """
         self._model = model or settings.anthropic_model
+        self._prompt_cache = settings.prompt_cache if prompt_cache is None else prompt_cache
         key = api_key or settings.anthropic_api_key
         if not key:
             raise RuntimeError(
@@ -28,54 +44,195 @@ class AnthropicClient(AbstractModelClient):
                 "Set ANTHROPIC_API_KEY or pass api_key=..."
             )
 
+        timeout = timeout or settings.request_timeout
+        base_url = settings.anthropic_url
         self._client = anthropic.Anthropic(
             api_key=key,
-            timeout=timeout or settings.request_timeout,
+            base_url=base_url,
+            timeout=timeout,
+            http_client=transports.client(base_url, credentials=key, timeout=timeout),
+        )
+        self._aclient = anthropic.AsyncAnthropic(
+            api_key=key,
+            base_url=base_url,
+            timeout=timeout,
+            http_client=transports.async_client(base_url, credentials=key, timeout=timeout),
         )
 
     # ------------------------------------------------------------------ #
-    def chat(
+    def respond(
         self,
         messages: Iterable[message],
         *,
         stream: bool = False,
-        max_tokens: int = 900,
+        max_tokens: int | None = None,
         temperature: float = 0.7,
         **kwargs: Any,
-    ) -> str | Generator[str, None, None]:
+    ) -> ChatResponse:
         """
         Call Claude 3.  Any 'system' role in the incoming list is hoisted
         to the top-level system= parameter as Anthropic requires.
         """
-        msgs = list(messages)  # materialise the iterator once
-
-        # ── Hoist the system prompt (if present) ────────────────────────────
-        sys_prompt = _SYSTEM_PROMPT
-        pruned: list[dict[str, str]] = []
-        for m in msgs:
-            if m.get("role") == "system" and not pruned:
-                sys_prompt = m["content"]
-                continue                    # drop from messages[]
-            pruned.append(m)                # keep user/assistant
-
-        response = self._client.messages.create(
-            model=self._model,
-            system=sys_prompt,
-            messages=pruned,                # no 'system' roles here
-            max_tokens=max_tokens,
-            temperature=temperature,
-            stream=stream,
-            **kwargs,
-        )
+        sys_prompt, pruned = _hoist_system(messages)
+        system: Any = sys_prompt
+        if self._prompt_cache:
+            system, pruned = _cache_breakpoints(sys_prompt, pruned)
+
+        started = time.perf_counter()
+        with map_errors(self.provider):
+            response = self._client.messages.create(
+                model=self._model,
+                system=system,
+                messages=pruned,            # no 'system' roles here
+                max_tokens=max_tokens or _default_max_tokens(self._model, stream),
+                temperature=temperature,
+                stream=stream,
+                **kwargs,
+            )
+
+        if stream:
+            def _generator() -> Generator[ChatChunk, None, None]:
+                try:
+                    with map_errors(self.provider):
+                        for event in response:
+                            if (chunk := _chunk(event)) is not None:
+                                yield chunk
+                finally:
+                    response.close()
+            return ChatResponse(self.provider, self._model, chunks=_generator(), started=started)
+
+        return _response(response, self._model, started)
+
+    async def arespond(
+        self,
+        messages: Iterable[message],
+        *,
+        stream: bool = False,
+        max_tokens: int | None = None,
+        temperature: float = 0.7,
+        **kwargs: Any,
+    ) -> ChatResponse:
+        """Native async variant of :meth:`respond` (AsyncAnthropic)."""
+        sys_prompt, pruned = _hoist_system(messages)
+        system: Any = sys_prompt
+        if self._prompt_cache:
+            system, pruned = _cache_breakpoints(sys_prompt, pruned)
+
+        started = time.perf_counter()
+        with map_errors(self.provider):
+            response = await self._aclient.messages.create(
+                model=self._model,
+                system=system,
+                messages=pruned,
+                max_tokens=max_tokens or _default_max_tokens(self._model, stream),
+                temperature=temperature,
+                stream=stream,
+                **kwargs,
+            )
 
         if stream:
-            def _generator() -> Generator[str, None, None]:
-                for chunk in response:
-                    for block in chunk.content:
-                        if block.type == "text":
-                            yield block.text
-            return _generator()
-
-        return "".join(
-            block.text for block in response.content if block.type == "text"
-        )
\ No newline at end of file
+            async def _agenerator() -> AsyncGenerator[ChatChunk, None]:
+                try:
+                    with map_errors(self.provider):
+                        async for event in response:
+                            if (chunk := _chunk(event)) is not None:
+                                yield chunk
+                finally:
+                    await response.close()
+            return ChatResponse(self.provider, self._model, chunks=_agenerator(), started=started)
+
+        return _response(response, self._model, started)
+
+
+# ── helpers ────────────────────────────────────────────────────────────────
+_EPHEMERAL = {"type": "ephemeral"}
+# The SDK rejects non-streaming requests whose max_tokens could take longer
+# than its timeout allows (8192 for the largest models).
+_NON_STREAMING_MAX_TOKENS = 8_192
+
+
+def _default_max_tokens(model: str, stream: bool) -> int:
+    """Anthropic requires max_tokens: allow the model's full output unless told otherwise."""
+    limit = default_max_tokens("anthropic", model)
+    return limit if stream else min(limit, _NON_STREAMING_MAX_TOKENS)
+
+
+def _hoist_system(messages: Iterable[message]) -> tuple[str, list[dict[str, str]]]:
+    """Split a leading 'system' message off into Anthropic's system= field."""
+    msgs = list(messages)  # materialise the iterator once
+
+    sys_prompt = system_prompt()
+    pruned: list[dict[str, str]] = []
+    for m in msgs:
+        if m.get("role") == "system" and not pruned:
+            sys_prompt = m["content"]
+            continue                    # drop from messages[]
+        pruned.append(m)                # keep user/assistant
+    return sys_prompt, pruned
+
+
+def _cache_breakpoints(sys_prompt: str, pruned: list[dict[str, Any]]) -> tuple[list[dict[str, Any]], list[dict[str, Any]]]:
+    """
+    Cache the system block and, in multi-turn chats, everything up to the
+    latest user message, so the next turn reads the whole history from cache.
+    """
+    system = [{"type": "text", "text": sys_prompt, "cache_control": _EPHEMERAL}]
+    if len(pruned) >= 3:
+        history = dict(pruned[-2])          # copy: callers may reuse their dicts
+        content = history["content"]
+        if isinstance(content, str):
+            content = [{"type": "text", "text": content}]
+        history["content"] = [*content[:-1], {**content[-1], "cache_control": _EPHEMERAL}]
+        pruned = [*pruned[:-2], history, pruned[-1]]
+    return system, pruned
+
+
+def _delta_text(event: Any) -> str | None:
+    """Text carried by a raw stream event, if any (only text deltas carry it)."""
+    if event.type == "content_block_delta" and event.delta.type == "text_delta":
+        return event.delta.text
+    return None
+
+
+def _response(message: Any, model: str, started: float) -> ChatResponse:
+    return ChatResponse(
+        AnthropicClient.provider,
+        model,
+        text="".join(block.text for block in message.content if block.type == "text"),
+        id=message.id,
+        finish_reason=message.stop_reason,
+        usage=_usage(message.usage),
+        started=started,
+    )
+
+
+def _chunk(event: Any) -> ChatChunk | None:
+    """
+    Text deltas; the id and input tokens arrive on message_start, the stop
+    reason and output count on message_delta.
+    """
+    if (text := _delta_text(event)) is not None:
+        return ChatChunk(text)
+    if event.type == "message_start":
+        return ChatChunk(id=event.message.id, usage=_usage(event.message.usage))
+    if event.type == "message_delta":
+        return ChatChunk(finish_reason=event.delta.stop_reason, usage=_usage(getattr(event, "usage", None)))
+    return None
+
+
+def _usage(usage: Any) -> Usage | None:
+    if usage is None:
+        return None
+    # input_tokens excludes cache reads/writes; report the full prompt size
+    # like the other providers do
+    read = getattr(usage, "cache_read_input_tokens", None) or 0
+    written = getattr(usage, "cache_creation_input_tokens", None) or 0
+    fresh = getattr(usage, "input_tokens", None)
+    call = current_call()
+    if written and call is not None:
+        call.attributes["anthropic.cache_creation_input_tokens"] = written
+    return Usage(
+        fresh + read + written if fresh is not None else None,
+        getattr(usage, "output_tokens", None),
+        read if fresh is not None else None,
+    )
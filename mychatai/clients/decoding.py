@@ -0,0 +1,94 @@
+"""
+Incremental decoding of streamed NDJSON bodies (Ollama's chat stream).
+
+The decoder takes raw byte chunks as they arrive (``response.iter_bytes()``)
+and keeps one growing ``bytearray``: complete lines are parsed in place and
+the consumed prefix is dropped once per chunk, so there is no
+``iter_lines()`` / ``strip()`` copy per line.
+
+    decoder = NDJSONDecoder()
+    for chunk in response.iter_bytes():
+        for obj in decoder.feed(chunk):
+            ...
+    for obj in decoder.flush():     # a last line without a trailing newline
+        ...
+
+JSON is parsed with ``orjson`` or ``msgspec`` when installed (straight from
+a memoryview of the buffer), otherwise with the standard library.
+"""
+from __future__ import annotations
+
+import json
+from typing import Any, Callable, Iterator
+
+try:
+    import orjson
+
+    _loads: Callable[[Any], Any] = orjson.loads
+    _ZERO_COPY = True
+except ImportError:
+    try:
+        import msgspec
+
+        _loads = msgspec.json.Decoder().decode
+        _ZERO_COPY = True
+    except ImportError:
+        _loads = json.loads
+        _ZERO_COPY = False      # json.loads wants bytes, not a memoryview
+
+_BLANK = frozenset(b" \t\r")
+
+
+def loads(data: Any) -> Any:
+    """Parse JSON from bytes / bytearray / str with the fastest available parser."""
+    return _loads(data)
+
+
+def _parse(buf: bytearray, start: int, end: int) -> Any:
+    if _ZERO_COPY:
+        # the temporary view is gone before the buffer is next resized
+        return _loads(memoryview(buf)[start:end])
+    return _loads(bytes(buf[start:end]))
+
+
+def _blank(buf: bytearray, start: int, end: int) -> bool:
+    return end - start <= 1 and (end == start or buf[start] in _BLANK)
+
+
+class NDJSONDecoder:
+    """Newline-delimited JSON → one object per line."""
+
+    def __init__(self) -> None:
+        self._buf = bytearray()
+
+    def feed(self, chunk: bytes) -> Iterator[Any]:
+        """Objects completed by *chunk* (a partial trailing line is kept for later)."""
+        buf = self._buf
+        buf += chunk
+        start = 0
+        try:
+            while True:
+                end = buf.find(b"\n", start)
+                if end < 0:
+                    return
+                if not _blank(buf, start, end):
+                    yield _parse(buf, start, end)
+                start = end + 1
+        finally:
+            del buf[:start]
+
+    def flush(self) -> Iterator[Any]:
+        """A final line that arrived without a trailing newline."""
+        buf = self._buf
+        if buf.strip():
+            yield _parse(buf, 0, len(buf))
+        buf.clear()
+
+
+def iter_ndjson(chunks: Iterator[bytes]) -> Iterator[Any]:
+    """Decode an iterable of byte chunks as NDJSON."""
+    decoder = NDJSONDecoder()
+    for chunk in chunks:
+        yield from decoder.feed(chunk)
+    yield from decoder.flush()
+
@@ -1,19 +1,24 @@
 from __future__ import annotations
-from collections.abc import Iterable, Generator
-from typing import Any, Dict    
+import time
+from collections.abc import Iterable
+from typing import Any
 from ..config import settings
-from .base import AbstractModelClient, message
-#from google.generativeai import GenerativeModel, GenerativeModelClient
-from openai import OpenAI 
+from ..transport import transports
+from .base import StructuredClient, message
+from .openai import _achunks, _chunks, _request_stream_usage, _response
+from .response import ChatResponse, Usage
+from .errors import map_errors
+from openai import OpenAI, AsyncOpenAI
 
 
-
-class DeepSeekClient(AbstractModelClient):
+class DeepSeekClient(StructuredClient):
     """Thin wrapper around DeepSeek API."""
 
+    provider = "deepseek"
+
     def __init__(self, model: str | None = None, *, api_key: str | None = None) -> None:
-        self._model = settings.deepseek_model
-        deepseek_key = settings.deepseek_api_key
+        self._model = model or settings.deepseek_model
+        deepseek_key = api_key or settings.deepseek_api_key
         deepseek_url = settings.deepseek_url
         
         if not deepseek_key:
@@ -22,29 +27,69 @@ class DeepSeekClient(AbstractModelClient):
                 "Set the DEEPSEEK_API_KEY environment variable or pass api_key=..."
             )
         
-        self._client = OpenAI(api_key=deepseek_key, base_url=deepseek_url, timeout=settings.request_timeout)
+        self._client = OpenAI(
+            api_key=deepseek_key,
+            base_url=deepseek_url,
+            timeout=settings.request_timeout,
+            http_client=transports.client(deepseek_url, credentials=deepseek_key),
+        )
+        self._aclient = AsyncOpenAI(
+            api_key=deepseek_key,
+            base_url=deepseek_url,
+            timeout=settings.request_timeout,
+            http_client=transports.async_client(deepseek_url, credentials=deepseek_key),
+        )
     
-    def chat(
+    def respond(
         self,
         messages: Iterable[message],
         *,
         stream: bool = False,
         **kwargs: Any,
-    ) -> str | Generator[str, None, None]:
-        """Return either the full response text or stream the tokens."""
-        response = self._client.chat.completions.create(
-            model=self._model,
-            messages=list(messages),
-            stream=stream,
-            **kwargs,
-        )
-        # Note: DeepSeek's API is similar to OpenAI's, so we can use the same method 
+    ) -> ChatResponse:
+        """Return the full response or one streaming its chunks."""
         if stream:
-            def _generator() -> Generator[str, None, None]:
-                for chunk in response:
-                    if (delta := chunk.choices[0].delta).content:
-                        yield delta.content
-            return _generator()
+            _request_stream_usage(kwargs)
+        started = time.perf_counter()
+        with map_errors(self.provider):
+            response = self._client.chat.completions.create(
+                model=self._model,
+                messages=list(messages),
+                stream=stream,
+                **kwargs,
+            )
+        # DeepSeek's API is OpenAI's, so its replies convert the same way
+        if stream:
+            return ChatResponse(
+                self.provider, self._model, chunks=_chunks(response, self.provider, _usage), started=started
+            )
+        return _response(response, self.provider, self._model, _usage, started)
+
+    async def arespond(
+        self,
+        messages: Iterable[message],
+        *,
+        stream: bool = False,
+        **kwargs: Any,
+    ) -> ChatResponse:
+        """Native async variant of :meth:`respond` (AsyncOpenAI against DeepSeek)."""
+        if stream:
+            _request_stream_usage(kwargs)
+        started = time.perf_counter()
+        with map_errors(self.provider):
+            response = await self._aclient.chat.completions.create(
+                model=self._model,
+                messages=list(messages),
+                stream=stream,
+                **kwargs,
+            )
+        if stream:
+            return ChatResponse(
+                self.provider, self._model, chunks=_achunks(response, self.provider, _usage), started=started
+            )
+        return _response(response, self.provider, self._model, _usage, started)
+
 
-        # non-streamed
-        return response.choices[0].message.content
\ No newline at end of file
+def _usage(usage: Any) -> Usage:
+    # DeepSeek reports its context-cache hits as prompt_cache_hit_tokens
+    return Usage(usage.prompt_tokens, usage.completion_tokens, getattr(usage, "prompt_cache_hit_tokens", None))
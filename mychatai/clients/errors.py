@@ -0,0 +1,94 @@
+"""
+Map SDK / transport exceptions onto ``mychatai.exceptions``.
+
+Every client wraps its provider calls (and stream iteration) in
+:func:`map_errors`, so callers only ever see ``ProviderError`` and its
+retryable subclasses, whatever SDK sits underneath.  Detection is
+duck-typed (``status_code`` / ``code`` attributes, exception class names)
+so this module never imports a provider SDK.
+"""
+from __future__ import annotations
+
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+import httpx
+
+from ..exceptions import (
+    ProviderError,
+    ProviderTimeoutError,
+    RateLimitError,
+    RetryableProviderError,
+)
+
+# 408 timeout, 409 conflict/lock, 425 too early, 5xx, 529 Anthropic "overloaded"
+RETRYABLE_STATUSES = frozenset({408, 409, 425, 500, 502, 503, 504, 529})
+
+_TIMEOUT_NAMES = frozenset({"APITimeoutError", "Timeout", "ReadTimeout", "DeadlineExceeded"})
+_CONNECTION_NAMES = frozenset({"APIConnectionError", "ConnectionError", "ServiceUnavailable"})
+
+
+@contextmanager
+def map_errors(provider: str) -> Iterator[None]:
+    """Re-raise provider/transport failures as ``ProviderError`` subclasses."""
+    try:
+        yield
+    except ProviderError:
+        raise
+    except Exception as exc:
+        mapped = translate(exc, provider)
+        if mapped is None:
+            raise
+        raise mapped from exc
+
+
+def translate(exc: BaseException, provider: str) -> Optional[ProviderError]:
+    """The ``ProviderError`` equivalent of *exc*, or None for non-provider bugs."""
+    if isinstance(exc, ProviderError):
+        return exc
+    status = status_of(exc)
+    message = f"{provider}: {exc}"
+    if status == 429:
+        return RateLimitError(
+            message, provider=provider, status_code=status, retry_after=retry_after_of(exc)
+        )
+    if status in RETRYABLE_STATUSES:
+        return RetryableProviderError(
+            message, provider=provider, status_code=status, retry_after=retry_after_of(exc)
+        )
+    if status is not None:
+        return ProviderError(message, provider=provider, status_code=status)
+    if isinstance(exc, httpx.TimeoutException) or _named(exc, _TIMEOUT_NAMES):
+        return ProviderTimeoutError(message, provider=provider)
+    if isinstance(exc, (httpx.TransportError, ConnectionError)) or _named(exc, _CONNECTION_NAMES):
+        return RetryableProviderError(message, provider=provider)
+    return None
+
+
+def status_of(exc: BaseException) -> Optional[int]:
+    """HTTP status carried by an SDK, httpx or google-api-core exception."""
+    status = getattr(exc, "status_code", None)
+    if status is None:                          # httpx / requests HTTP errors
+        status = getattr(getattr(exc, "response", None), "status_code", None)
+    if status is None:
+        code = getattr(exc, "code", None)       # google.api_core: int HTTP code
+        status = code if isinstance(code, int) else None
+    return status
+
+
+def retry_after_of(exc: BaseException) -> Optional[float]:
+    """Seconds from a ``retry-after`` header on the failed response, if any."""
+    retry_after = getattr(exc, "retry_after", None)
+    if retry_after is not None:
+        return retry_after
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None)
+    value = headers.get("retry-after") if headers is not None else None
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def _named(exc: BaseException, names: frozenset[str]) -> bool:
+    return any(cls.__name__ in names for cls in type(exc).__mro__)
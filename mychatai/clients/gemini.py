@@ -1,65 +1,29 @@
-""" from __future__ import annotations
-from collections.abc import Iterable, Generator
-from typing import Any, Dict    
-from ..config import settings
-from .base import AbstractModelClient, message
-#from google.generativeai import GenerativeModel, GenerativeModelClient
-from openai import OpenAI 
-
-
-class GeminiClient(AbstractModelClient):
-    #Thin wrapper around Google Gemini API.
-
-    def __init__(self, model: str | None = None, *, api_key: str | None = None) -> None:
-        self._model = settings.gemini_model
-        gemini_key = settings.gemini_api_key
-        gemini_url = settings.gemini_url
-        
-        if not gemini_key:
-            raise RuntimeError(
-                "Gemini API key not found. "
-                "Set the GEMINI_API_KEY environment variable or pass api_key=..."
-            )
-        
-        self._client = OpenAI(gemini_key, gemini_url, timeout=settings.request_timeout)
-    
-    def chat(
-        self,
-        messages: Iterable[message],
-        *,
-        stream: bool = False,
-        **kwargs: Any,
-    ) -> str | Generator[str, None, None]:
-        #Return either the full response text or stream the tokens.
-        response = self._client.chat.completions.create(
-            model=self._model,
-            messages=list(messages),
-            stream=stream,
-            **kwargs,
-        )
-
-        if stream:
-            def _generator() -> Generator[str, None, None]:
-                for chunk in response:
-                    if (delta := chunk.choices[0].delta).content:
-                        yield delta.content
-            return _generator()
-
-        # non-streamed
-        return response.choices[0].message.content """
-
 from __future__ import annotations
-from collections.abc import Iterable, Generator
-from typing import Any, Optional
+import asyncio
+import threading
+import time
+from collections.abc import Iterable, Generator, AsyncGenerator
+from typing import Any, Dict, List, Optional, Tuple
 
-import google.generativeai as genai
+from google.ai import generativelanguage as glm
 
 from ..config import settings
-from .base import AbstractModelClient, message
+from .base import StructuredClient, _iterate_in_thread, message
+from .errors import map_errors
+from .response import ChatChunk, ChatResponse, Usage
+
 
+class GeminiClient(StructuredClient):
+    """
+    Wrapper around Google Generative AI / Gemini.
 
-class GeminiClient(AbstractModelClient):
-    """Wrapper around Google Generative AI / Gemini."""
+    Messages are sent as native multi-turn ``contents`` (assistant turns as
+    ``model``), with system messages as the ``system_instruction``.  Requests
+    go straight to the ``GenerativeService`` API clients, which are built
+    once per GeminiClient and reused by every call.
+    """
+
+    provider = "gemini"
 
     def __init__(
         self,
@@ -67,7 +31,14 @@ class GeminiClient(AbstractModelClient):
         *,
         api_key: Optional[str] = None,
         timeout: int | None = None,
+        transport: str = "rest",
     ) -> None:
+        """
+        transport – "rest" (default) or "grpc".  The REST transport has no
+                    async client, so with "rest" :meth:`arespond` runs on
+                    worker threads; any gRPC transport gets a native
+                    ``grpc_asyncio`` client for :meth:`arespond`.
+        """
         key = api_key or settings.gemini_api_key
         if not key:
             raise RuntimeError(
@@ -75,42 +46,202 @@ class GeminiClient(AbstractModelClient):
                 "Set GOOGLE_API_KEY (or GEMINI_API_KEY) or pass api_key=..."
             )
 
-        genai.configure(api_key=key, transport="rest")  # or "grpc"
+        self._key = key
+        self._transport = transport
         self._model = model or settings.gemini_model
         self._timeout = timeout or settings.request_timeout
+        self._clients_lock = threading.Lock()
+        self._client: Any = None
+        self._async_client: Any = None
 
     # --------------------------------------------------------------------- #
-    def chat(
+    def respond(
         self,
         messages: Iterable[message],
         *,
         stream: bool = False,
         temperature: float = 0.7,
-        max_tokens: int = 1,
+        max_tokens: Optional[int] = None,
         **kwargs: Any,
-    ) -> str | Generator[str, None, None]:
-        """
-        Google’s SDK expects a single flattened prompt string for chat.
-        We concatenate the role/content pairs into one long prompt.
-        """
-        prompt = "\n".join(f"{m['role'].upper()}: {m['content']}" for m in messages)
-
-        gen_model = genai.GenerativeModel(self._model)
-        response = gen_model.generate_content(
-            prompt,
-            generation_config={
-                "temperature": temperature,
-                "max_output_tokens": max_tokens,
-            },
-            stream=stream,
-            **kwargs,
-        )
+    ) -> ChatResponse:
+        """Extra *kwargs* are ``GenerateContentRequest`` fields, plus ``request_options``."""
+        options = kwargs.pop("request_options", None) or {"timeout": self._timeout}
+        request = self._request(messages, temperature, max_tokens, kwargs)
+        client = self._sync_client()
+        started = time.perf_counter()
+        with map_errors(self.provider):
+            if stream:
+                response = client.stream_generate_content(request, **options)
+            else:
+                response = client.generate_content(request, **options)
 
         if stream:
-            def _gen() -> Generator[str, None, None]:
-                for chunk in response:
-                    if chunk.text:
-                        yield chunk.text
-            return _gen()
+            return ChatResponse(self.provider, self._model, chunks=_stream(response), started=started)
+        with map_errors(self.provider):
+            return self._response(response, started)
+
+    async def arespond(
+        self,
+        messages: Iterable[message],
+        *,
+        stream: bool = False,
+        temperature: float = 0.7,
+        max_tokens: Optional[int] = None,
+        **kwargs: Any,
+    ) -> ChatResponse:
+        """Async variant of :meth:`respond` (see ``transport``)."""
+        options = kwargs.pop("request_options", None) or {"timeout": self._timeout}
+        request = self._request(messages, temperature, max_tokens, kwargs)
+        started = time.perf_counter()
+        if self._transport == "rest":
+            client = self._sync_client()
+            with map_errors(self.provider):
+                if stream:
+                    response = await asyncio.to_thread(client.stream_generate_content, request, **options)
+                    # the raw stream, drained on worker threads and closed with the reply
+                    chunks = _iterate_in_thread(_stream(response))
+                    return ChatResponse(self.provider, self._model, chunks=chunks, started=started)
+                response = await asyncio.to_thread(client.generate_content, request, **options)
+        else:
+            client = self._grpc_async_client()
+            with map_errors(self.provider):
+                if stream:
+                    response = await client.stream_generate_content(request, **options)
+                    return ChatResponse(self.provider, self._model, chunks=_astream(response), started=started)
+                response = await client.generate_content(request, **options)
+
+        with map_errors(self.provider):
+            return self._response(response, started)
+
+    def _response(self, response: Any, started: float) -> ChatResponse:
+        return ChatResponse(
+            self.provider,
+            self._model,
+            text=_text(response),
+            finish_reason=_finish_reason(response),
+            usage=_usage(response),
+            started=started,
+        )
+
+    def _request(
+        self,
+        messages: Iterable[message],
+        temperature: float,
+        max_tokens: Optional[int],
+        fields: Dict[str, Any],
+    ) -> glm.GenerateContentRequest:
+        system, contents = _contents(messages)
+        return glm.GenerateContentRequest(
+            model=self._model if "/" in self._model else f"models/{self._model}",
+            contents=[{"role": c["role"], "parts": [{"text": p} for p in c["parts"]]} for c in contents],
+            system_instruction={"parts": [{"text": system}]} if system else None,
+            generation_config=_generation_config(temperature, max_tokens),
+            **fields,
+        )
 
-        return response.text
+    # ── API clients ────────────────────────────────────────────────────────
+    def _sync_client(self) -> Any:
+        with self._clients_lock:
+            if self._client is None:
+                transport = "grpc" if self._transport == "grpc_asyncio" else self._transport
+                self._client = glm.GenerativeServiceClient(transport=transport, client_options=self._options())
+            return self._client
+
+    def _grpc_async_client(self) -> Any:
+        # a sync gRPC channel can't be awaited, so gRPC gets its own asyncio client
+        with self._clients_lock:
+            if self._async_client is None:
+                self._async_client = glm.GenerativeServiceAsyncClient(
+                    transport="grpc_asyncio", client_options=self._options()
+                )
+            return self._async_client
+
+    def _options(self) -> Dict[str, Any]:
+        options: Dict[str, Any] = {"api_key": self._key}
+        if settings.gemini_endpoint:
+            options["api_endpoint"] = settings.gemini_endpoint
+        return options
+
+
+def _stream(response: Any) -> Generator[ChatChunk, None, None]:
+    try:
+        with map_errors(GeminiClient.provider):
+            for chunk in response:
+                yield _chunk(chunk)
+    finally:
+        _cancel(response)
+
+
+async def _astream(response: Any) -> AsyncGenerator[ChatChunk, None]:
+    try:
+        with map_errors(GeminiClient.provider):
+            async for chunk in response:
+                yield _chunk(chunk)
+    finally:
+        _cancel(response)
+
+
+def _cancel(response: Any) -> None:
+    """Stop a response stream that wasn't read to the end (a no-op once it was)."""
+    cancel = getattr(response, "cancel", None)
+    if cancel is not None:
+        cancel()
+
+
+def _contents(messages: Iterable[message]) -> Tuple[Optional[str], List[Dict[str, Any]]]:
+    """
+    ``(system_instruction, contents)`` for *messages*: system messages are
+    joined into the instruction, consecutive turns of one role are merged.
+    """
+    system: List[str] = []
+    contents: List[Dict[str, Any]] = []
+    for m in messages:
+        role, text = m["role"], m["content"]
+        if role == "system":
+            system.append(text)
+            continue
+        role = "model" if role in ("assistant", "model") else "user"
+        if contents and contents[-1]["role"] == role:
+            contents[-1]["parts"].append(text)
+        else:
+            contents.append({"role": role, "parts": [text]})
+    if not contents:        # a bare system prompt: send it as the user turn
+        return None, [{"role": "user", "parts": system or [""]}]
+    return ("\n\n".join(system) or None), contents
+
+
+def _generation_config(temperature: float, max_tokens: Optional[int]) -> dict[str, Any]:
+    """Sampling settings; the output length is only capped when asked to."""
+    config: dict[str, Any] = {"temperature": temperature}
+    if max_tokens is not None:
+        config["max_output_tokens"] = max_tokens
+    return config
+
+
+def _text(response: Any) -> str:
+    """The first candidate's text; "" for a chunk with none (``.text`` raises there)."""
+    candidates = getattr(response, "candidates", None)
+    content = getattr(candidates[0], "content", None) if candidates else None
+    return "".join(getattr(part, "text", "") or "" for part in getattr(content, "parts", None) or ())
+
+
+def _chunk(response: Any) -> ChatChunk:
+    return ChatChunk(_text(response), finish_reason=_finish_reason(response), usage=_usage(response))
+
+
+def _finish_reason(response: Any) -> Optional[str]:
+    candidates = getattr(response, "candidates", None)
+    reason = candidates[0].finish_reason if candidates else None
+    return reason.name if reason else None      # 0: unspecified (a chunk mid-stream)
+
+
+def _usage(response: Any) -> Optional[Usage]:
+    """Usage metadata (cumulative while streaming, so the last chunk wins)."""
+    usage = getattr(response, "usage_metadata", None)
+    if usage is None:
+        return None
+    return Usage(
+        getattr(usage, "prompt_token_count", None) or None,
+        getattr(usage, "candidates_token_count", None) or None,
+        getattr(usage, "cached_content_token_count", None) or None,
+    )
@@ -1,49 +1,221 @@
 from __future__ import annotations 
+import time
 import httpx
-import requests
-import json
-from typing import Iterable, Generator, Dict, Any
-from .base import AbstractModelClient, message
+from typing import Iterable, Generator, AsyncGenerator, Dict, Any
+from .base import StructuredClient, message
+from .response import ChatChunk, ChatResponse, Usage
+from .decoding import NDJSONDecoder, loads
+from .errors import map_errors
+from ..exceptions import ProviderError
+from ..instrumentation import current_call
 from ..config import settings
+from ..transport import transports
 
+# OpenAI-style sampling arguments and the Ollama option each one sets, so
+# callers (and the layers that read max_tokens) needn't special-case Ollama
+_OPTIONS = {
+    "max_tokens": "num_predict",
+    "max_completion_tokens": "num_predict",
+    "temperature": "temperature",
+    "top_p": "top_p",
+    "seed": "seed",
+    "stop": "stop",
+}
 
-class OllamaClient(AbstractModelClient):
+
+def _with_options(kwargs: Dict[str, Any]) -> Dict[str, Any]:
+    """*kwargs* with OpenAI-style sampling arguments moved into ``options`` (explicit options win)."""
+    if not any(name in kwargs for name in _OPTIONS):
+        return kwargs
+    kwargs = dict(kwargs)
+    options = {_OPTIONS[name]: kwargs.pop(name) for name in list(kwargs) if name in _OPTIONS}
+    options = {key: value for key, value in options.items() if value is not None}
+    options.update(kwargs.get("options") or {})
+    kwargs["options"] = options
+    return kwargs
+
+
+class OllamaClient(StructuredClient):
     """ HTTP client for the Ollama /api/chat endpoint."""
 
-    def __init__(self, model: str | None = None, *, client: httpx.Client | None = None):
+    provider = "ollama"
+
+    def __init__(
+        self,
+        model: str | None = None,
+        *,
+        client: httpx.Client | None = None,
+        async_client: httpx.AsyncClient | None = None,
+        prompt_cache: bool | None = None,
+        keep_alive: str | None = None,
+    ):
+        """
+        prompt_cache – keep the model loaded between calls (``keep_alive``,
+                       default "30m") so Ollama can reuse the KV cache of a
+                       shared prompt prefix; defaults to ``settings.prompt_cache``.
+        keep_alive   – explicit keep_alive for every request (e.g. "1h", "-1").
+        """
         self._base_url = settings.ollama_url
-        self._model = settings.ollama_model
+        self._model = model or settings.ollama_model
         self._headers = settings.ollama_headers
-        self._client = client or httpx.Client(timeout=settings.request_timeout)
+        if prompt_cache is None:
+            prompt_cache = settings.prompt_cache
+        self._keep_alive = keep_alive or settings.ollama_keep_alive or ("30m" if prompt_cache else None)
+        # local plain-HTTP endpoint: keep-alive pooling, no HTTP/2
+        self._client = client or transports.client(self._base_url, http2=False)
+        self._aclient = async_client or transports.async_client(self._base_url, http2=False)
+
+    def respond(self, messages: Iterable[message], *, stream: bool = False, **kwargs: Any) -> ChatResponse:
+        payload = self._payload(messages, stream, kwargs)
+        started = time.perf_counter()
+        if stream:
+            request = self._client.build_request(
+                "POST", self._base_url, json=payload, headers=self._headers
+            )
+            with map_errors(self.provider):
+                # stream=True on the transport too, or httpx buffers the whole body
+                response = self._client.send(request, stream=True)
+                try:
+                    response.raise_for_status()
+                except httpx.HTTPStatusError:
+                    response.close()
+                    raise
+            return ChatResponse(self.provider, self._model, chunks=_chunks(response), started=started)
+
+        with map_errors(self.provider):
+            response = self._client.post(self._base_url, json=payload, headers=self._headers)
+            response.raise_for_status()
+        return self._response(loads(response.content), started)
+
+    async def arespond(
+        self,
+        messages: Iterable[message],
+        *,
+        stream: bool = False,
+        **kwargs: Any,
+    ) -> ChatResponse:
+        """Native async variant of :meth:`respond` (httpx.AsyncClient)."""
+        payload = self._payload(messages, stream, kwargs)
+        started = time.perf_counter()
+        if stream:
+            request = self._aclient.build_request(
+                "POST", self._base_url, json=payload, headers=self._headers
+            )
+            with map_errors(self.provider):
+                response = await self._aclient.send(request, stream=True)
+                try:
+                    response.raise_for_status()
+                except httpx.HTTPStatusError:
+                    await response.aclose()
+                    raise
+            return ChatResponse(self.provider, self._model, chunks=_achunks(response), started=started)
+
+        with map_errors(self.provider):
+            response = await self._aclient.post(self._base_url, json=payload, headers=self._headers)
+            response.raise_for_status()
+        return self._response(loads(response.content), started)
 
-    def chat(self, messages: Iterable[message], *, stream: bool = False, **kwargs: Any,) -> str | Generator[str, None, None]:
+    def _payload(self, messages: Iterable[message], stream: bool, kwargs: Dict[str, Any]) -> Dict[str, Any]:
         payload = {
             "model": self._model,
             "messages": list(messages),
             "stream": stream,
-            **kwargs,
+            **_with_options(kwargs),
         }
-        if stream:
-            response = self._client.post(self._base_url, json=payload, headers=self._headers)  
+        if self._keep_alive is not None:
+            payload.setdefault("keep_alive", self._keep_alive)
+        return payload
+
+    def _response(self, data: Dict[str, Any], started: float) -> ChatResponse:
+        _record_timings(data)
+        return ChatResponse(
+            self.provider,
+            self._model,
+            text=data["message"]["content"],
+            finish_reason=data.get("done_reason"),
+            usage=_usage(data),
+            started=started,
+        )
+
+    # ── embeddings ─────────────────────────────────────────────────────────
+    def embed(self, texts: Iterable[str], *, model: str | None = None) -> list[list[float]]:
+        """One embedding per text from /api/embed (default model ``settings.ollama_embed_model``)."""
+        payload = {"model": model or settings.ollama_embed_model, "input": list(texts)}
+        with map_errors(self.provider):
+            response = self._client.post(self._embed_url, json=payload, headers=self._headers)
             response.raise_for_status()
+        return loads(response.content)["embeddings"]
+
+    async def aembed(self, texts: Iterable[str], *, model: str | None = None) -> list[list[float]]:
+        """Async :meth:`embed`."""
+        payload = {"model": model or settings.ollama_embed_model, "input": list(texts)}
+        with map_errors(self.provider):
+            response = await self._aclient.post(self._embed_url, json=payload, headers=self._headers)
+            response.raise_for_status()
+        return loads(response.content)["embeddings"]
+
+    @property
+    def _embed_url(self) -> str:
+        # OLLAMA_URL points at /api/chat; embeddings live next to it
+        return self._base_url.rsplit("/api/", 1)[0] + "/api/embed"
 
-            def _generator():
-                for line in response.iter_lines():
-                    line = line.strip()
-                    if not line:
-                        continue
-                    data = json.loads(line)
+
+# ── streamed replies ───────────────────────────────────────────────────────
+# NDJSON frames are decoded as the bytes arrive; Ollama's final ``done``
+# frame carries the token counts and server-side phase timings.
+def _chunks(response: httpx.Response) -> Generator[ChatChunk, None, None]:
+    decoder = NDJSONDecoder()
+    try:
+        with map_errors(OllamaClient.provider):
+            for block in response.iter_bytes():
+                for data in decoder.feed(block):
+                    yield _chunk(data)
+                    if data.get("done"):
+                        return
+            for data in decoder.flush():        # a last frame without its newline
+                yield _chunk(data)
+    finally:
+        response.close()
+
+
+async def _achunks(response: httpx.Response) -> AsyncGenerator[ChatChunk, None]:
+    decoder = NDJSONDecoder()
+    try:
+        with map_errors(OllamaClient.provider):
+            async for block in response.aiter_bytes():
+                for data in decoder.feed(block):
+                    yield _chunk(data)
                     if data.get("done"):
-                        break
-                    yield data["message"]["content"]
+                        return
+            for data in decoder.flush():        # a last frame without its newline
+                yield _chunk(data)
+    finally:
+        await response.aclose()
+
+
+def _chunk(data: Dict[str, Any]) -> ChatChunk:
+    if not data.get("done"):
+        return ChatChunk(_content(data))
+    _record_timings(data)
+    text = (data.get("message") or {}).get("content", "")
+    return ChatChunk(text, finish_reason=data.get("done_reason"), usage=_usage(data))
 
-            return _generator()
-        response = self._client.post(self._base_url, json=payload)
-        response.raise_for_status()
-        return response.json()["message"]["content"]
 
+def _content(data: Dict[str, Any]) -> str:
+    if "error" in data:             # Ollama reports mid-stream failures in-band
+        raise ProviderError(f"ollama: {data['error']}", provider="ollama")
+    return data["message"]["content"]
 
 
-        
+def _usage(data: Dict[str, Any]) -> Usage:
+    return Usage(data.get("prompt_eval_count"), data.get("eval_count"))
 
 
+def _record_timings(data: Dict[str, Any]) -> None:
+    """Server-side phase timings from Ollama's final message."""
+    call = current_call()
+    if call is None:
+        return
+    for field in ("load_duration", "prompt_eval_duration", "eval_duration"):
+        if field in data:
+            call.attributes[f"ollama.{field}_s"] = data[field] / 1e9     # reported in ns
@@ -1,49 +1,186 @@
 from __future__ import annotations
-from collections.abc import Iterable, Generator
-from typing import Any, Dict
+import hashlib
+import time
+from collections.abc import Iterable, Generator, AsyncGenerator
+from functools import lru_cache
+from typing import Any, Callable, Dict
 
 from ..config import settings
-from .base import AbstractModelClient, message
-from openai import OpenAI
+from ..transport import transports
+from .base import StructuredClient, message
+from .response import ChatChunk, ChatResponse, Usage
+from ..instrumentation import current_call
+from .errors import map_errors
+from openai import OpenAI, AsyncOpenAI
 
 
-class OpenAIClient(AbstractModelClient):
+class OpenAIClient(StructuredClient):
     """Thin wrapper around openai.chat.completions.create (v1 Python SDK)."""
 
-    def __init__(self, model: str | None = None, *, api_key: str | None = None) -> None:
-        self._model = settings.openai_model
-        key = settings.openai_api_key
+    provider = "openai"
+
+    def __init__(
+        self,
+        model: str | None = None,
+        *,
+        api_key: str | None = None,
+        prompt_cache: bool | None = None,
+    ) -> None:
+        """
+        prompt_cache – send a ``prompt_cache_key`` derived from the system
+                       prompt so requests sharing it are routed to the same
+                       prompt cache; defaults to ``settings.prompt_cache``.
+        """
+        self._model = model or settings.openai_model
+        self._prompt_cache = settings.prompt_cache if prompt_cache is None else prompt_cache
+        key = api_key or settings.openai_api_key
        
         if not key:
             raise RuntimeError(
                 "OpenAI API key not found. "
                 "Set the OPENAI_API_KEY environment variable or pass api_key=..."
             )
-        # create a dedicated client instance instead of mutating global state
-        self._client = OpenAI(api_key=key, timeout=settings.request_timeout)
+        # create a dedicated client instance instead of mutating global state;
+        # the HTTP connection pool underneath is shared process-wide
+        base_url = settings.openai_url
+        self._client = OpenAI(
+            api_key=key,
+            base_url=base_url,
+            timeout=settings.request_timeout,
+            http_client=transports.client(base_url, credentials=key),
+        )
+        self._aclient = AsyncOpenAI(
+            api_key=key,
+            base_url=base_url,
+            timeout=settings.request_timeout,
+            http_client=transports.async_client(base_url, credentials=key),
+        )
 
     # ──────────────────────────────────────────────────────────────────────────
-    def chat(
+    def respond(
         self,
         messages: Iterable[message],
         *,
         stream: bool = False,
         **kwargs: Any,
-    ) -> str | Generator[str, None, None]:
-        """Return either the full response text or stream the tokens."""
-        response = self._client.chat.completions.create(
-            model=self._model,
-            messages=list(messages),
-            stream=stream,
-            **kwargs,
-        )
+    ) -> ChatResponse:
+        """Return the full response or one streaming its chunks."""
+        msgs = list(messages)
+        if self._prompt_cache:
+            _add_cache_key(msgs, kwargs)
+        if stream:
+            _request_stream_usage(kwargs)
+        started = time.perf_counter()
+        with map_errors(self.provider):
+            response = self._client.chat.completions.create(
+                model=self._model,
+                messages=msgs,
+                stream=stream,
+                **kwargs,
+            )
+
+        if stream:
+            return ChatResponse(
+                self.provider, self._model, chunks=_chunks(response, self.provider, _usage), started=started
+            )
+        return _response(response, self.provider, self._model, _usage, started)
+
+    async def arespond(
+        self,
+        messages: Iterable[message],
+        *,
+        stream: bool = False,
+        **kwargs: Any,
+    ) -> ChatResponse:
+        """Native async variant of :meth:`respond` (AsyncOpenAI)."""
+        msgs = list(messages)
+        if self._prompt_cache:
+            _add_cache_key(msgs, kwargs)
+        if stream:
+            _request_stream_usage(kwargs)
+        started = time.perf_counter()
+        with map_errors(self.provider):
+            response = await self._aclient.chat.completions.create(
+                model=self._model,
+                messages=msgs,
+                stream=stream,
+                **kwargs,
+            )
 
         if stream:
-            def _generator() -> Generator[str, None, None]:
-                for chunk in response:
-                    if (delta := chunk.choices[0].delta).content:
-                        yield delta.content
-            return _generator()
-
-        # non-streamed
-        return response.choices[0].message.content
+            return ChatResponse(
+                self.provider, self._model, chunks=_achunks(response, self.provider, _usage), started=started
+            )
+        return _response(response, self.provider, self._model, _usage, started)
+
+
+# ── chat.completions → ChatResponse (shared with DeepSeek) ─────────────────
+def _response(
+    completion: Any, provider: str, model: str, usage: Callable[[Any], Usage], started: float
+) -> ChatResponse:
+    choice = completion.choices[0]
+    return ChatResponse(
+        provider,
+        model,
+        text=choice.message.content or "",
+        id=completion.id,
+        finish_reason=choice.finish_reason,
+        usage=usage(completion.usage) if completion.usage is not None else None,
+        started=started,
+    )
+
+
+def _chunk(event: Any, usage: Callable[[Any], Usage]) -> ChatChunk:
+    text, finish_reason = "", None
+    if event.choices:
+        choice = event.choices[0]
+        text, finish_reason = choice.delta.content or "", choice.finish_reason
+    reported = getattr(event, "usage", None)
+    return ChatChunk(
+        text,
+        finish_reason=finish_reason,
+        usage=usage(reported) if reported is not None else None,
+        id=event.id,
+    )
+
+
+def _chunks(stream: Any, provider: str, usage: Callable[[Any], Usage]) -> Generator[ChatChunk, None, None]:
+    try:
+        with map_errors(provider):
+            for event in stream:
+                yield _chunk(event, usage)
+    finally:
+        stream.close()
+
+
+async def _achunks(stream: Any, provider: str, usage: Callable[[Any], Usage]) -> AsyncGenerator[ChatChunk, None]:
+    try:
+        with map_errors(provider):
+            async for event in stream:
+                yield _chunk(event, usage)
+    finally:
+        await stream.close()
+
+
+def _add_cache_key(messages: list[message], kwargs: Dict[str, Any]) -> None:
+    """Route requests sharing a system prompt to the same cache (via extra_body for older SDKs)."""
+    if not messages or messages[0].get("role") != "system" or "prompt_cache_key" in kwargs:
+        return
+    key = _cache_key(str(messages[0]["content"]))
+    kwargs["extra_body"] = {"prompt_cache_key": key, **(kwargs.get("extra_body") or {})}
+
+
+@lru_cache(maxsize=64)
+def _cache_key(system_prompt: str) -> str:
+    return "mychatai-" + hashlib.sha256(system_prompt.encode()).hexdigest()[:16]
+
+
+def _request_stream_usage(kwargs: Dict[str, Any]) -> None:
+    """Ask for the trailing usage chunk when the call is being measured."""
+    if current_call() is not None:
+        kwargs.setdefault("stream_options", {"include_usage": True})
+
+
+def _usage(usage: Any) -> Usage:
+    details = getattr(usage, "prompt_tokens_details", None)
+    return Usage(usage.prompt_tokens, usage.completion_tokens, getattr(details, "cached_tokens", None))
@@ -0,0 +1,323 @@
+"""
+Structured replies: text plus usage, finish reason, timing and provider ids.
+
+``client.respond()`` returns a :class:`ChatResponse` from every built-in
+client (``chat()`` is its text-only view):
+
+    reply = client.respond(messages)
+    reply.text, reply.finish_reason, reply.usage, reply.latency
+
+    reply = client.respond(messages, stream=True)
+    for chunk in reply:                 # ChatChunk: text, elapsed, finish_reason, usage
+        print(chunk.text, end="")
+    reply.text, reply.ttft, reply.usage # filled in as the stream is consumed
+
+A streamed response keeps its chunks' text in a list and joins it once, on
+first access to :attr:`ChatResponse.text`, so callers don't have to rebuild
+the reply by repeated concatenation.  Usage is also reported to the
+current instrumentation record (see ``mychatai.instrumentation``).
+"""
+from __future__ import annotations
+
+import time
+from typing import (
+    Any,
+    AsyncGenerator,
+    AsyncIterable,
+    AsyncIterator,
+    Callable,
+    Dict,
+    Generator,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+)
+
+_END = object()     # "stream produced no chunks at all"
+
+
+class Usage(NamedTuple):
+    """Provider-reported token counts; None where the provider didn't say."""
+
+    prompt_tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
+    cached_tokens: Optional[int] = None         # prompt tokens read from the provider's cache
+
+    def merge(self, other: "Usage") -> "Usage":
+        """*other*'s counts where it has them (streams report usage piecemeal)."""
+        return Usage(*(b if b is not None else a for a, b in zip(self, other)))
+
+
+class ChatChunk:
+    """One streamed piece of a reply; the owning response stamps ``index`` and ``elapsed``."""
+
+    __slots__ = ("text", "index", "elapsed", "finish_reason", "usage", "id")
+
+    def __init__(
+        self,
+        text: str = "",
+        *,
+        finish_reason: Optional[str] = None,
+        usage: Optional[Usage] = None,
+        id: Optional[str] = None,
+    ) -> None:
+        self.text = text
+        self.index = -1
+        self.elapsed: Optional[float] = None     # seconds since the request was sent
+        self.finish_reason = finish_reason
+        self.usage = usage
+        self.id = id
+
+    def __repr__(self) -> str:
+        return f"ChatChunk({self.text!r}, index={self.index}, elapsed={self.elapsed})"
+
+    def copy(self) -> "ChatChunk":
+        """The same piece, unstamped: for a reader of a shared stream."""
+        return ChatChunk(self.text, finish_reason=self.finish_reason, usage=self.usage, id=self.id)
+
+
+class ChatResponse:
+    """
+    A model reply.  Complete when built with *text*; built with *chunks*
+    it streams them once (``for`` / ``async for``), accumulating as it goes.
+    """
+
+    __slots__ = (
+        "provider", "model", "id", "finish_reason", "usage",
+        "started", "first_token", "latency",
+        "_parts", "_text", "_chunks", "_count",
+    )
+
+    def __init__(
+        self,
+        provider: str = "",
+        model: str = "",
+        *,
+        text: Optional[str] = None,
+        chunks: Optional[Iterable[ChatChunk] | AsyncIterable[ChatChunk]] = None,
+        id: Optional[str] = None,
+        finish_reason: Optional[str] = None,
+        usage: Optional[Usage] = None,
+        started: Optional[float] = None,
+    ) -> None:
+        """started – ``time.perf_counter()`` when the request was sent (default: now)."""
+        self.provider = provider
+        self.model = model
+        self.id = id
+        self.finish_reason = finish_reason
+        self.usage: Optional[Usage] = None
+        self.started = time.perf_counter() if started is None else started
+        self.first_token: Optional[float] = None    # seconds to the first text
+        self.latency: Optional[float] = None        # seconds to the end of the reply
+        self._parts: List[str] = []
+        self._text: Optional[str] = None
+        self._chunks = chunks
+        self._count = 0
+        if usage is not None:
+            self._add_usage(usage)
+        if chunks is None:
+            self._text = text or ""
+            self.latency = self.first_token = time.perf_counter() - self.started
+
+    # ── results ────────────────────────────────────────────────────────────
+    @property
+    def text(self) -> str:
+        """The reply so far (all of it once the stream is exhausted)."""
+        if self._text is None:
+            self._text = "".join(self._parts)
+            self._parts = [self._text] if self._text else []
+        return self._text
+
+    @property
+    def done(self) -> bool:
+        return self.latency is not None
+
+    @property
+    def ttft(self) -> Optional[float]:
+        return self.first_token
+
+    @property
+    def tokens_per_second(self) -> Optional[float]:
+        """Generation speed after the first token (streamed replies with usage only)."""
+        if self.usage is None or not self.usage.completion_tokens or self.latency is None:
+            return None
+        generating = self.latency - (self.first_token or 0.0)
+        return self.usage.completion_tokens / generating if generating > 0 else None
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "provider": self.provider,
+            "model": self.model,
+            "id": self.id,
+            "text": self.text,
+            "finish_reason": self.finish_reason,
+            "usage": self.usage._asdict() if self.usage is not None else None,
+            "ttft": self.first_token,
+            "latency": self.latency,
+        }
+
+    def copy(self) -> "ChatResponse":
+        """An independent copy of a complete reply, timings included (e.g. per caller of a shared call)."""
+        reply = ChatResponse(
+            self.provider,
+            self.model,
+            text=self.text,
+            id=self.id,
+            finish_reason=self.finish_reason,
+            usage=self.usage,
+            started=self.started,
+        )
+        reply.first_token, reply.latency = self.first_token, self.latency
+        return reply
+
+    def __str__(self) -> str:
+        return self.text
+
+    def __repr__(self) -> str:
+        state = "done" if self.done else "streaming"
+        return f"<ChatResponse {self.provider}:{self.model} {state} {len(self.text)} chars>"
+
+    # ── streaming ──────────────────────────────────────────────────────────
+    def __iter__(self) -> Generator[ChatChunk, None, None]:
+        chunks, self._chunks = self._chunks, None
+        if chunks is None:                  # complete, or already being consumed
+            return
+        try:
+            for chunk in chunks:            # type: ignore[union-attr]
+                self._add(chunk)
+                yield chunk
+        finally:
+            _close(chunks)
+            self._finish()
+
+    async def __aiter__(self) -> AsyncGenerator[ChatChunk, None]:
+        chunks, self._chunks = self._chunks, None
+        if chunks is None:
+            return
+        try:
+            async for chunk in chunks:      # type: ignore[union-attr]
+                self._add(chunk)
+                yield chunk
+        finally:
+            await _aclose(chunks)
+            self._finish()
+
+    def texts(self) -> Generator[str, None, None]:
+        """The streamed text pieces (what ``chat(stream=True)`` yields)."""
+        chunks = iter(self)
+        try:
+            for chunk in chunks:
+                if chunk.text:
+                    yield chunk.text
+        finally:
+            chunks.close()
+
+    async def atexts(self) -> AsyncGenerator[str, None]:
+        chunks = self.__aiter__()
+        try:
+            async for chunk in chunks:
+                if chunk.text:
+                    yield chunk.text
+        finally:
+            await chunks.aclose()
+
+    def close(self) -> None:
+        """Release a stream that won't be read (a started one closes with its iterator)."""
+        chunks, self._chunks = self._chunks, None
+        if chunks is not None:
+            _close(chunks)
+            self._finish()
+
+    async def aclose(self) -> None:
+        chunks, self._chunks = self._chunks, None
+        if chunks is not None:
+            await _aclose(chunks)
+            self._finish()
+
+    def pipe(self, fn: Callable[[Any], Any]) -> "ChatResponse":
+        """
+        Route the chunks still to come through ``fn(chunks)`` and return
+        self: how client wrappers follow a stream (release a slot when it
+        ends, count its tokens) without consuming it themselves.  *fn*
+        should close *chunks* when it is closed.
+        """
+        if self._chunks is not None:
+            self._chunks = fn(self._chunks)
+        return self
+
+    def prefetch(self) -> "ChatResponse":
+        """Wait for the first chunk without consuming it, so a failure to start raises here."""
+        if self._chunks is not None:
+            chunks = iter(self._chunks)             # type: ignore[arg-type]
+            self._chunks = _chain(next(chunks, _END), chunks)
+        return self
+
+    async def aprefetch(self) -> "ChatResponse":
+        if self._chunks is not None:
+            chunks = self._chunks.__aiter__()       # type: ignore[union-attr]
+            try:
+                first = await chunks.__anext__()
+            except StopAsyncIteration:
+                first = _END
+            self._chunks = _achain(first, chunks)
+        return self
+
+    def _add(self, chunk: ChatChunk) -> None:
+        now = time.perf_counter() - self.started
+        chunk.index = self._count
+        chunk.elapsed = now
+        self._count += 1
+        if chunk.text:
+            if self.first_token is None:
+                self.first_token = now
+            self._parts.append(chunk.text)
+            self._text = None
+        if chunk.id is not None and self.id is None:
+            self.id = chunk.id
+        if chunk.finish_reason is not None:
+            self.finish_reason = chunk.finish_reason
+        if chunk.usage is not None:
+            self._add_usage(chunk.usage)
+
+    def _add_usage(self, usage: Usage) -> None:
+        from ..instrumentation import record_usage      # instrumentation imports clients.base
+
+        self.usage = usage if self.usage is None else self.usage.merge(usage)
+        record_usage(*usage)
+
+    def _finish(self) -> None:
+        if self.latency is None:
+            self.latency = time.perf_counter() - self.started
+
+
+def _chain(first: Any, rest: Iterator[ChatChunk]) -> Generator[ChatChunk, None, None]:
+    try:
+        if first is not _END:
+            yield first
+            yield from rest
+    finally:
+        _close(rest)
+
+
+async def _achain(first: Any, rest: AsyncIterator[ChatChunk]) -> AsyncGenerator[ChatChunk, None]:
+    try:
+        if first is not _END:
+            yield first
+            async for chunk in rest:
+                yield chunk
+    finally:
+        await _aclose(rest)
+
+
+def _close(chunks: Any) -> None:
+    close = getattr(chunks, "close", None)
+    if close is not None:
+        close()
+
+
+async def _aclose(chunks: Any) -> None:
+    aclose = getattr(chunks, "aclose", None)
+    if aclose is not None:
+        await aclose()
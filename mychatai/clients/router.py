@@ -0,0 +1,380 @@
+"""
+Latency-aware multi-provider router with failover.
+
+``RouterClient`` is itself a model client: it keeps rolling EWMA
+estimates of time-to-first-token, throughput and error rate for each
+wrapped client and sends every request to the fastest healthy one.  Its
+replies are the chosen client's ``ChatResponse``, usage and finish reason
+included.
+
+    router = RouterClient([
+        Route(OpenAIClient(), cost_per_1k=0.6),
+        Route(AnthropicClient(), weight=0.5, cost_per_1k=3.0),
+        OllamaClient(),                       # bare clients: weight 1, list price
+    ], max_cost_per_1k=5.0)
+    chat = ChatService(router)
+
+A route's cost defaults to its model's list price (the mean of the input
+and output prices in ``mychatai.tokens``), so ``max_cost_per_1k`` also
+filters routes given as bare clients.
+
+If the chosen client fails with a ``ProviderError`` before its first
+token, the request fails over to the next candidate; errors after the
+first token are reported to the caller, since those tokens are already
+out.  Routes whose context window cannot hold the prompt plus
+``max_tokens`` are skipped.
+
+    router.estimate(messages, max_tokens=500)   # {route name: Estimate}, in try order
+"""
+from __future__ import annotations
+
+import threading
+import time
+from dataclasses import dataclass, field
+from functools import partial
+from typing import (
+    Any,
+    AsyncGenerator,
+    AsyncIterable,
+    Dict,
+    Iterable,
+    Generator,
+    List,
+    Optional,
+    Union,
+)
+
+from ..exceptions import ContextWindowError, ProviderError
+from ..tokens import Estimate, count_messages, estimate, model_info, tokenizer_family
+from .base import AbstractModelClient, StructuredClient, message
+from .response import ChatChunk, ChatResponse, Usage, _aclose, _close
+
+
+class RouteStats:
+    """EWMA latency / throughput / error estimates for one route."""
+
+    def __init__(self, alpha: float) -> None:
+        self._alpha = alpha
+        self._lock = threading.Lock()
+        self.ttft: Optional[float] = None           # seconds
+        self.throughput: Optional[float] = None     # tokens / second
+        self.error_rate = 0.0
+        self.last_failure = 0.0
+        self.calls = 0
+
+    def success(self, ttft: float, tokens: float, generation: float) -> None:
+        with self._lock:
+            self.calls += 1
+            self.ttft = self._ewma(self.ttft, ttft)
+            if tokens and generation > 0:
+                self.throughput = self._ewma(self.throughput, tokens / generation)
+            self.error_rate = (1 - self._alpha) * self.error_rate
+
+    def failure(self) -> None:
+        with self._lock:
+            self.calls += 1
+            self.error_rate = (1 - self._alpha) * self.error_rate + self._alpha
+            self.last_failure = time.monotonic()
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "ttft": self.ttft,
+            "throughput": self.throughput,
+            "error_rate": self.error_rate,
+            "calls": self.calls,
+        }
+
+    def _ewma(self, current: Optional[float], sample: float) -> float:
+        return sample if current is None else (1 - self._alpha) * current + self._alpha * sample
+
+
+@dataclass
+class Route:
+    """
+    A routable client; higher *weight* is preferred, *cost_per_1k* is USD /
+    1k tokens (default: the model's list price).
+    """
+
+    client: AbstractModelClient
+    weight: float = 1.0
+    cost_per_1k: Optional[float] = None
+    name: str = ""
+    list_price: bool = field(default=False, init=False)    # cost_per_1k came from the model table
+
+    def __post_init__(self) -> None:
+        if not self.name:
+            self.name = f"{self.client.provider or type(self.client).__name__}:{self.client.model}"
+        if self.cost_per_1k is None:
+            info = model_info(self.client.provider, self.client.model)
+            self.cost_per_1k = (info.input_cost + info.output_cost) / 2 / 1000
+            self.list_price = True
+
+
+class RouterClient(StructuredClient):
+    """Routes each call to the fastest healthy client, failing over on errors."""
+
+    provider = "router"
+
+    def __init__(
+        self,
+        routes: Iterable[Union[Route, AbstractModelClient]],
+        *,
+        max_cost_per_1k: Optional[float] = None,
+        alpha: float = 0.2,
+        unhealthy_error_rate: float = 0.5,
+        cooldown: float = 30.0,
+    ) -> None:
+        """
+        max_cost_per_1k      – skip routes dearer than this (per call:
+                               pass ``max_cost_per_1k=`` to chat()).
+        alpha                – EWMA smoothing factor for all estimates.
+        unhealthy_error_rate – error-rate EWMA above which a route is benched…
+        cooldown             – …until this many seconds after its last failure.
+        """
+        self._routes: List[Route] = [
+            r if isinstance(r, Route) else Route(r) for r in routes
+        ]
+        if not self._routes:
+            raise ValueError("RouterClient needs at least one route")
+        self._stats = {id(route): RouteStats(alpha) for route in self._routes}
+        self._max_cost = max_cost_per_1k
+        self._unhealthy = unhealthy_error_rate
+        self._cooldown = cooldown
+
+    @property
+    def model(self) -> str:
+        return ",".join(r.name for r in self._routes)
+
+    @property
+    def routes(self) -> List[Route]:
+        return list(self._routes)
+
+    def stats(self) -> dict[str, dict[str, Any]]:
+        """Current estimates per route name."""
+        return {r.name: self._stats[id(r)].snapshot() for r in self._routes}
+
+    # ── routing ────────────────────────────────────────────────────────────
+    def ranked(self, max_cost_per_1k: Optional[float] = None) -> List[Route]:
+        """Routes in the order they will be tried: healthy before benched, then by score."""
+        ceiling = max_cost_per_1k if max_cost_per_1k is not None else self._max_cost
+        candidates = [r for r in self._routes if ceiling is None or r.cost_per_1k <= ceiling]
+        if not candidates:
+            raise ProviderError(f"no route within the cost ceiling of {ceiling}/1k tokens")
+        now = time.monotonic()
+        return sorted(candidates, key=lambda r: (not self._healthy(r, now), self._score(r)))
+
+    def fitting(
+        self, messages: List[message], max_tokens: Optional[int] = None, routes: Optional[List[Route]] = None
+    ) -> List[Route]:
+        """*routes* (default: all) whose context window holds *messages* plus *max_tokens*."""
+        routes = self._routes if routes is None else routes
+        counts = _PromptTokens(messages)
+        fit = [
+            r for r in routes
+            if counts.of(r) + (max_tokens or 0) <= model_info(r.client.provider, r.client.model).context_window
+        ]
+        if not fit:
+            smallest = min(routes, key=counts.of)
+            raise ContextWindowError(
+                f"no route's context window holds {counts.of(smallest)} prompt tokens"
+                + (f" + {max_tokens} max_tokens" if max_tokens else ""),
+                provider=self.provider,
+                prompt_tokens=counts.of(smallest),
+            )
+        return fit
+
+    def estimate(self, messages: Iterable[message], max_tokens: Optional[int] = None) -> Dict[str, Estimate]:
+        """
+        Pre-flight estimate per fitting route, in the order they would be
+        tried.  Measured TTFT / throughput replace the table's typical
+        values once a route has served calls; a route's own ``cost_per_1k``
+        replaces the list prices.
+        """
+        msgs = list(messages)
+        counts = _PromptTokens(msgs)
+        estimates: Dict[str, Estimate] = {}
+        for route in self.fitting(msgs, max_tokens, self.ranked()):
+            stats = self._stats[id(route)]
+            est = estimate(
+                msgs,
+                route.client.provider,
+                route.client.model,
+                max_tokens=max_tokens,
+                ttft=stats.ttft,
+                tokens_per_second=stats.throughput,
+                prompt_tokens=counts.of(route),
+            )
+            if not route.list_price:
+                est.cost = est.total_tokens * route.cost_per_1k / 1000
+            estimates[route.name] = est
+        return estimates
+
+    def _candidates(
+        self, msgs: List[message], max_cost_per_1k: Optional[float], max_tokens: Optional[int]
+    ) -> List[Route]:
+        return self.fitting(msgs, max_tokens, self.ranked(max_cost_per_1k))
+
+    def _healthy(self, route: Route, now: float) -> bool:
+        stats = self._stats[id(route)]
+        return stats.error_rate < self._unhealthy or now - stats.last_failure > self._cooldown
+
+    def _score(self, route: Route) -> float:
+        """Expected time-to-first-token, discounted by weight; unmeasured routes go first."""
+        stats = self._stats[id(route)]
+        if stats.ttft is None:
+            return float("inf") if stats.calls else 0.0     # only ever failed → last
+        return stats.ttft * (1 + stats.error_rate) / max(route.weight, 1e-9)
+
+    # ── sync ───────────────────────────────────────────────────────────────
+    def respond(
+        self,
+        messages: Iterable[message],
+        *,
+        stream: bool = False,
+        max_cost_per_1k: Optional[float] = None,
+        **kwargs: Any,
+    ) -> ChatResponse:
+        """The chosen route's reply, with its usage, finish reason and id."""
+        msgs = list(messages)
+        error: Optional[BaseException] = None
+        for route in self._candidates(msgs, max_cost_per_1k, kwargs.get("max_tokens")):
+            stats = self._stats[id(route)]
+            started = time.monotonic()
+            try:
+                reply = route.client.respond(msgs, stream=stream, **kwargs)
+                if not stream:
+                    elapsed = time.monotonic() - started
+                    stats.success(elapsed, _reply_tokens(reply), elapsed)
+                    return reply
+                reply.prefetch()                # fail over before the first chunk
+            except ProviderError as exc:
+                stats.failure()
+                error = exc
+                continue
+            return reply.pipe(partial(self._follow, stats, started))
+        assert error is not None
+        raise error
+
+    def _follow(
+        self, stats: RouteStats, started: float, chunks: Iterable[ChatChunk]
+    ) -> Generator[ChatChunk, None, None]:
+        progress = _Progress(started)
+        try:
+            for chunk in chunks:
+                progress.add(chunk)
+                yield chunk
+        except ProviderError:
+            stats.failure()
+            raise
+        finally:
+            _close(chunks)
+        progress.report(stats)
+
+    # ── async ──────────────────────────────────────────────────────────────
+    async def arespond(
+        self,
+        messages: Iterable[message],
+        *,
+        stream: bool = False,
+        max_cost_per_1k: Optional[float] = None,
+        **kwargs: Any,
+    ) -> ChatResponse:
+        msgs = list(messages)
+        error: Optional[BaseException] = None
+        for route in self._candidates(msgs, max_cost_per_1k, kwargs.get("max_tokens")):
+            stats = self._stats[id(route)]
+            started = time.monotonic()
+            try:
+                reply = await route.client.arespond(msgs, stream=stream, **kwargs)
+                if not stream:
+                    elapsed = time.monotonic() - started
+                    stats.success(elapsed, _reply_tokens(reply), elapsed)
+                    return reply
+                await reply.aprefetch()
+            except ProviderError as exc:
+                stats.failure()
+                error = exc
+                continue
+            return reply.pipe(partial(self._afollow, stats, started))
+        assert error is not None
+        raise error
+
+    async def _afollow(
+        self, stats: RouteStats, started: float, chunks: AsyncIterable[ChatChunk]
+    ) -> AsyncGenerator[ChatChunk, None]:
+        progress = _Progress(started)
+        try:
+            async for chunk in chunks:
+                progress.add(chunk)
+                yield chunk
+        except ProviderError:
+            stats.failure()
+            raise
+        finally:
+            await _aclose(chunks)
+        progress.report(stats)
+
+    # ── construction ───────────────────────────────────────────────────────
+    @classmethod
+    def from_settings(cls, **router_kwargs: Any) -> "RouterClient":
+        """Route across every provider that has credentials configured (plus Ollama)."""
+        from ..providers import ROUTABLE, providers
+        routes = [providers.create(name) for name in ROUTABLE if providers.configured(name)]
+        return cls(routes, **router_kwargs)
+
+
+class _PromptTokens:
+    """Prompt token counts of one message list, computed once per tokenizer family."""
+
+    def __init__(self, messages: List[message]) -> None:
+        self._messages = messages
+        self._counts: Dict[str, int] = {}
+
+    def of(self, route: Route) -> int:
+        provider, model = route.client.provider, route.client.model
+        family = tokenizer_family(provider, model)
+        count = self._counts.get(family)
+        if count is None:
+            count = self._counts[family] = count_messages(self._messages, provider, model)
+        return count
+
+
+class _Progress:
+    """TTFT, size and generation time of a streamed reply, for :class:`RouteStats`."""
+
+    def __init__(self, started: float) -> None:
+        self._started = started
+        self._first_at: Optional[float] = None
+        self._chars = 0
+        self._usage: Optional[Usage] = None
+
+    def add(self, chunk: ChatChunk) -> None:
+        if chunk.text:
+            if self._first_at is None:
+                self._first_at = time.monotonic()
+            self._chars += len(chunk.text)
+        if chunk.usage is not None:
+            self._usage = chunk.usage if self._usage is None else self._usage.merge(chunk.usage)
+
+    def report(self, stats: RouteStats) -> None:
+        now = time.monotonic()
+        if self._first_at is None:
+            stats.success(now - self._started, 0, 0)
+            return
+        tokens = _completion_tokens(self._usage, self._chars)
+        stats.success(self._first_at - self._started, tokens, now - self._first_at)
+
+
+def _reply_tokens(reply: ChatResponse) -> float:
+    return _completion_tokens(reply.usage, len(reply.text))
+
+
+def _completion_tokens(usage: Optional[Usage], chars: int) -> float:
+    """Provider-reported completion tokens, else an estimate from the text size."""
+    if usage is not None and usage.completion_tokens is not None:
+        return usage.completion_tokens
+    return _tokens_from_chars(chars)
+
+
+def _tokens_from_chars(chars: int) -> float:
+    return chars / 4        # ~4 characters per token for English text
@@ -1,7 +1,7 @@
 """Centralised configuration & secrets (Pydantic-Settings)."""
 
 from functools import lru_cache
-from typing import Optional
+from typing import Dict, Optional
 
 from pydantic import Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
@@ -16,6 +16,8 @@ class Settings(BaseSettings):
 
     # ── End-points ─────────────────────────────────────────────────────────────
     ollama_url:  str = Field("http://localhost:11434/api/chat", env="OLLAMA_URL")
+    openai_url:  str = Field("https://api.openai.com/v1", env="OPENAI_URL")
+    anthropic_url: str = Field("https://api.anthropic.com", env="ANTHROPIC_URL")
 
     @property
     def ollama_headers(self) -> dict[str, str]:
@@ -37,6 +39,8 @@ class Settings(BaseSettings):
         "https://api.deepseek.com/v1",
         env="DEEPSEEK_URL",
     )
+    # native Gemini API host used by GeminiClient (None = Google's default)
+    gemini_endpoint: Optional[str] = Field(None, env="GEMINI_ENDPOINT")
 
     # ── Model defaults ─────────────────────────────────────────────────────────
     openai_model:    str = "gpt-4o-mini"
@@ -44,6 +48,72 @@ class Settings(BaseSettings):
     gemini_model:    str = "gemini-2.5-flash"
     anthropic_model: str = "claude-sonnet-4-20250514"
     deepseek_model:  str = "deepseek-chat"
+    ollama_embed_model: str = "nomic-embed-text"     # OllamaClient.embed / semantic cache
+
+    # ── HTTP connection pool (shared by every client, see transport.py) ────────
+    http_max_connections:           int   = 100
+    http_max_keepalive_connections: int   = 20
+    http_keepalive_expiry:          float = 30.0    # seconds an idle socket is kept
+    http2:                          bool  = True    # only used if `h2` is installed
+
+    # ── Client-side rate limiting (see ratelimit.py) ───────────────────────────
+    # Keyed by "provider" or "provider:model", e.g. RATE_LIMITS='{"openai": {"rpm": 500,
+    # "tpm": 200000}, "openai:gpt-4o": {"rpm": 100}}'.  Missing / 0 = unlimited.
+    rate_limits:                 Dict[str, Dict[str, float]] = {}
+    rate_limit_concurrency:      int = 16       # initial adaptive concurrency limit
+    rate_limit_max_concurrency:  int = 256
+
+    # ── Provider prompt caching (opt-in) ──────────────────────────────────────
+    # prefix-stable prompt layout + Anthropic cache_control breakpoints +
+    # OpenAI prompt_cache_key + Ollama keep_alive
+    prompt_cache:      bool          = False
+    ollama_keep_alive: Optional[str] = None     # e.g. "30m"; "30m" when prompt_cache is on
+
+    # ── Prompt templates (see prompts.py) ──────────────────────────────────────
+    prompt_dir:             Optional[str] = None       # directory of prompt sets, one sub-directory each
+    prompt_template:        str           = "default"  # set used when a ChatService names none
+    prompt_reload_interval: float         = 2.0        # seconds between checks for edited files; 0 = every call
+
+    # ── Conversation sessions (see session.py) ─────────────────────────────────
+    session_context_tokens: int = 8192      # history + prompt budget per request
+    session_reply_tokens:   int = 1024      # kept free for the model's answer
+
+    # ── Token estimates (see tokens.py) ────────────────────────────────────────
+    # overrides for the built-in model table, keyed by "provider:model", model or
+    # provider, e.g. MODEL_INFO='{"ollama:llama3.2": {"context_window": 32768}}'
+    model_info:             Dict[str, Dict[str, float]] = {}
+    expected_output_tokens: int = 512       # reply size assumed by estimates without max_tokens
+
+    # ── Local-first cascade (see clients/cascade.py) ───────────────────────────
+    cascade_fallback:  str   = "openai"     # provider asked when the Ollama draft isn't good enough
+    cascade_threshold: float = 0.5          # escalate drafts scoring below this
+    cascade_race:      bool  = False        # start the fallback alongside the draft
+
+    # ── Request scheduler (see scheduler.py) ───────────────────────────────────
+    scheduler_concurrency:         Dict[str, int]   = {"ollama": 2}  # calls in flight per provider
+    scheduler_default_concurrency: int              = 32
+    scheduler_max_queue:           int              = 1024           # waiting calls before shedding
+    scheduler_tenant_weights:      Dict[str, float] = {}             # tenant → fair share (default 1)
+
+    # ── Semantic cache (see semantic_cache.py) ─────────────────────────────────
+    semantic_cache_threshold: float = 0.92  # cosine similarity needed to reuse an answer
+
+    # ── Gradio app (scripts/serve_gradio.py) ───────────────────────────────────
+    # concurrent requests per provider, e.g. UI_CONCURRENCY='{"ollama": 2, "openai": 32}';
+    # providers not listed get ui_default_concurrency
+    ui_concurrency:         Dict[str, int] = {"ollama": 2}
+    ui_default_concurrency: int   = 16
+    ui_queue_size:          int   = 256     # waiting requests before the queue rejects
+    ui_update_interval_ms:  int   = 50      # streamed text is pushed at most this often
+
+    # ── OpenAI-compatible gateway (see gateway.py) ─────────────────────────────
+    gateway_provider:       str   = "auto"  # for requests whose model names no provider
+    # concurrent requests per route, e.g. GATEWAY_CONCURRENCY='{"/v1/chat/completions": 256}'
+    gateway_concurrency:    Dict[str, int] = {"/v1/chat/completions": 512}
+    gateway_queue_timeout:  float = 0.5     # seconds to wait for a slot before a 429
+    gateway_max_body_bytes: int   = 1 << 20
+    gateway_cache_size:     int   = 0       # in-memory LRU response cache entries; 0 = off
+    gateway_scheduler:      bool  = False   # admit upstream calls through scheduler.py (x-priority header)
 
     # ── Misc ───────────────────────────────────────────────────────────────────
     request_timeout: int = 60
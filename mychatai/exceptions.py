@@ -1,5 +1,8 @@
 
 """Library-specific exception hierarchy."""
+from __future__ import annotations
+from typing import Optional
+
 
 class MyChatAIError(Exception):
     """ Base class for all custon errors. """
@@ -7,5 +10,62 @@ class MyChatAIError(Exception):
 class ProviderError(MyChatAIError):
     """ Unrecoverable error returned by upstream LLM Provider."""
 
+    def __init__(
+        self,
+        message: str = "",
+        *,
+        provider: Optional[str] = None,
+        status_code: Optional[int] = None,
+    ) -> None:
+        super().__init__(message)
+        self.provider = provider
+        self.status_code = status_code
+
 class RetryableProviderError(ProviderError):
-    """ Temporary failure - consider retry/backoff."""
\ No newline at end of file
+    """ Temporary failure - consider retry/backoff."""
+
+    def __init__(
+        self,
+        message: str = "",
+        *,
+        provider: Optional[str] = None,
+        status_code: Optional[int] = None,
+        retry_after: Optional[float] = None,
+    ) -> None:
+        super().__init__(message, provider=provider, status_code=status_code)
+        self.retry_after = retry_after      # seconds, when the provider said so
+
+class RateLimitError(RetryableProviderError):
+    """ Provider throttled the request (HTTP 429)."""
+
+class ProviderTimeoutError(RetryableProviderError):
+    """ Request timed out or the connection dropped before a reply."""
+
+class ContextWindowError(ProviderError):
+    """ Prompt plus requested output does not fit the model's context window."""
+
+    def __init__(
+        self,
+        message: str = "",
+        *,
+        provider: Optional[str] = None,
+        prompt_tokens: Optional[int] = None,
+        context_window: Optional[int] = None,
+    ) -> None:
+        super().__init__(message, provider=provider, status_code=400)
+        self.prompt_tokens = prompt_tokens
+        self.context_window = context_window
+
+class OverloadedError(RetryableProviderError):
+    """ Rejected by the local scheduler before reaching the provider (load shed)."""
+
+    def __init__(
+        self,
+        message: str = "",
+        *,
+        provider: Optional[str] = None,
+        reason: str = "overloaded",
+        retry_after: Optional[float] = None,
+    ) -> None:
+        super().__init__(message, provider=provider, status_code=503, retry_after=retry_after)
+        self.reason = reason            # "queue_full", "shed" or "deadline"
@@ -0,0 +1,529 @@
+"""
+OpenAI-compatible HTTP gateway: ``ChatService`` behind ``/v1/chat/completions``.
+
+A dependency-free ASGI app; run it with any ASGI server:
+
+    uvicorn mychatai.gateway:app --host 0.0.0.0 --port 8000 --workers 4
+    # or: python scripts/serve_gateway.py
+
+    from openai import OpenAI
+    OpenAI(base_url="http://localhost:8000/v1", api_key="-").chat.completions.create(
+        model="ollama", messages=[{"role": "user", "content": "Hi"}], stream=True)
+
+``model`` selects the provider: a provider name ("openai", "ollama", "auto",
+...) uses that provider's default model, ``"provider/model"`` a specific one
+and anything else ``Settings.gateway_provider``.  Clients, connection pools,
+the router's health estimates and the optional response cache live as long
+as the process, so every request shares them.
+
+* Replies carry the upstream finish reason ("length" for a reply cut off by
+  ``max_tokens``) and token usage; a stream reports them in its last chunk.
+* Streaming replies are server-sent events in OpenAI's chunk format.  The
+  next upstream token is only read once the previous write was accepted, so
+  a slow client throttles the upstream read instead of filling memory.
+* A client that disconnects cancels its request, which closes the upstream
+  stream / HTTP call.
+* Each route has a concurrency limit; requests wait at most
+  ``gateway_queue_timeout`` seconds for a slot and get a 429 otherwise.
+* With ``gateway_scheduler`` upstream calls go through ``mychatai.scheduler``:
+  ``x-priority: interactive|default|batch`` picks the class, the API key is
+  the fair-queuing tenant and ``x-request-timeout`` (seconds) the deadline.
+  Rejected calls get a 503; ``/healthz`` reports the queues.
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Mapping, MutableMapping, Optional, Tuple
+
+from .cache import LRUCache, ResponseCache
+from .chat_service import ChatService
+from .clients.base import message
+from .clients.decoding import loads
+from .clients.response import ChatResponse
+from .config import settings
+from .exceptions import (
+    ContextWindowError,
+    ProviderError,
+    ProviderTimeoutError,
+    RateLimitError,
+    RetryableProviderError,
+)
+from .providers import providers
+from .scheduler import PRIORITIES, ScheduledClient, schedulers, scheduling
+from .transport import transports
+
+try:
+    import orjson
+
+    def _dumps(obj: Any) -> bytes:
+        return orjson.dumps(obj)
+except ImportError:
+    def _dumps(obj: Any) -> bytes:
+        return json.dumps(obj, separators=(",", ":"), ensure_ascii=False).encode()
+
+Scope = MutableMapping[str, Any]
+Receive = Callable[[], Awaitable[MutableMapping[str, Any]]]
+Send = Callable[[MutableMapping[str, Any]], Awaitable[None]]
+
+CHAT_ROUTE = "/v1/chat/completions"
+
+_SSE_HEADERS = [
+    (b"content-type", b"text/event-stream; charset=utf-8"),
+    (b"cache-control", b"no-cache"),
+    (b"x-accel-buffering", b"no"),          # nginx: don't buffer the stream
+]
+_JSON_HEADERS = [(b"content-type", b"application/json")]
+_DONE = b"data: [DONE]\n\n"
+
+# Anthropic / Gemini finish reasons → OpenAI's
+_FINISH_REASONS = {
+    "end_turn": "stop",
+    "stop_sequence": "stop",
+    "max_tokens": "length",
+    "MAX_TOKENS": "length",
+    "tool_use": "tool_calls",
+    "SAFETY": "content_filter",
+    "RECITATION": "content_filter",
+}
+
+
+class HTTPError(Exception):
+    """An error answered with an OpenAI-style ``{"error": {...}}`` body."""
+
+    def __init__(
+        self,
+        status: int,
+        message: str,
+        *,
+        type: str = "invalid_request_error",
+        retry_after: Optional[float] = None,
+    ) -> None:
+        super().__init__(message)
+        self.status = status
+        self.type = type
+        self.retry_after = retry_after
+
+    @classmethod
+    def from_provider(cls, exc: ProviderError) -> "HTTPError":
+        if isinstance(exc, ContextWindowError):
+            return cls(400, str(exc), type="context_length_exceeded")
+        if isinstance(exc, RateLimitError):
+            status = 429
+        elif isinstance(exc, ProviderTimeoutError):
+            status = 504
+        elif isinstance(exc, RetryableProviderError):
+            status = 503
+        else:
+            status = 502
+        return cls(
+            status,
+            str(exc) or type(exc).__name__,
+            type="upstream_error",
+            retry_after=getattr(exc, "retry_after", None),
+        )
+
+    def body(self) -> Dict[str, Any]:
+        return {"error": {"message": str(self), "type": self.type, "code": self.status}}
+
+
+class Gateway:
+    """
+    The ASGI application.
+
+    services    – pre-built ``ChatService`` per model name; others are
+                  created on first use through the provider registry.
+    cache       – response cache shared by every service (None = off).
+    coalesce    – share one upstream call between identical in-flight
+                  requests.
+    limits      – concurrent requests per route path.
+    scheduled   – admit upstream calls through the per-provider scheduler
+                  (default ``settings.gateway_scheduler``).
+    """
+
+    def __init__(
+        self,
+        *,
+        services: Optional[Mapping[str, ChatService]] = None,
+        default_provider: Optional[str] = None,
+        cache: Optional[ResponseCache] = None,
+        coalesce: bool = True,
+        limits: Optional[Mapping[str, int]] = None,
+        queue_timeout: Optional[float] = None,
+        max_body_bytes: Optional[int] = None,
+        scheduled: Optional[bool] = None,
+    ) -> None:
+        self._services: Dict[str, ChatService] = dict(services or {})
+        self._scheduled = settings.gateway_scheduler if scheduled is None else scheduled
+        self._default = default_provider or settings.gateway_provider
+        self._cache = cache
+        self._coalesce = coalesce
+        self._limits = dict(settings.gateway_concurrency if limits is None else limits)
+        self._slots: Dict[str, asyncio.Semaphore] = {}
+        self._queue_timeout = settings.gateway_queue_timeout if queue_timeout is None else queue_timeout
+        self._max_body = max_body_bytes or settings.gateway_max_body_bytes
+        self._routes: Dict[Tuple[str, str], Callable[[Scope, Receive, Send], Awaitable[None]]] = {
+            ("POST", CHAT_ROUTE): self._chat_completions,
+            ("GET", "/v1/models"): self._models,
+            ("GET", "/healthz"): self._health,
+        }
+
+    # ── ASGI entry point ───────────────────────────────────────────────────
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+            return
+        if scope["type"] != "http":
+            return
+        path = scope["path"]
+        handler = self._routes.get((scope["method"], path))
+        try:
+            if handler is None:
+                if any(route_path == path for _, route_path in self._routes):
+                    raise HTTPError(405, f"method {scope['method']} not allowed")
+                raise HTTPError(404, f"no route {path}", type="not_found")
+            async with self._slot(path):
+                await handler(scope, receive, send)
+        except HTTPError as exc:
+            await _send_error(send, exc)
+        except _Disconnected:
+            pass
+
+    def service(self, model: str) -> ChatService:
+        """The (long-lived) service answering requests for *model*."""
+        service = self._services.get(model)
+        if service is None:
+            provider, model_name = self._resolve(model)
+            key = f"{provider}/{model_name}" if model_name else provider
+            service = self._services.get(key)
+            if service is None:
+                if not providers.configured(provider):
+                    raise HTTPError(
+                        400, f"provider {provider!r} is not configured on this gateway"
+                    )
+                client = (
+                    providers.create(provider, model=model_name)
+                    if model_name else providers.create(provider)
+                )
+                if self._scheduled:
+                    client = ScheduledClient(client)
+                service = ChatService(client, cache=self._cache, coalesce=self._coalesce)
+                self._services[key] = service
+        return service
+
+    # ── routes ─────────────────────────────────────────────────────────────
+    async def _chat_completions(self, scope: Scope, receive: Receive, send: Send) -> None:
+        body = await self._read_json(receive)
+        messages = _messages(body)
+        model = body.get("model") or self._default
+        if not isinstance(model, str):
+            raise HTTPError(400, "'model' must be a string")
+        service = self.service(model)
+        kwargs = _sampling(body)
+        stream = bool(body.get("stream"))
+
+        # Run the call next to a watcher for the client going away; whichever
+        # finishes first wins, and a disconnect cancels the upstream call.
+        # The task copies the scheduling context as it is created.
+        with scheduling(**_scheduling_headers(scope)):
+            work = asyncio.ensure_future(
+                self._stream(send, service, model, messages, kwargs)
+                if stream else self._complete(send, service, model, messages, kwargs)
+            )
+        watcher = asyncio.ensure_future(_disconnected(receive))
+        try:
+            await asyncio.wait({work, watcher}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in (work, watcher):
+                task.cancel()
+            await asyncio.gather(work, watcher, return_exceptions=True)
+        if work.done() and not work.cancelled() and work.exception() is not None:
+            raise work.exception()  # type: ignore[misc]
+
+    async def _complete(
+        self,
+        send: Send,
+        service: ChatService,
+        model: str,
+        messages: List[message],
+        kwargs: Dict[str, Any],
+    ) -> None:
+        try:
+            reply = await service.arespond(messages, stream=False, **kwargs)
+        except ProviderError as exc:
+            raise HTTPError.from_provider(exc) from exc
+        payload = {
+            "id": _completion_id(),
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": reply.text},
+                "finish_reason": _finish_reason(reply.finish_reason),
+            }],
+        }
+        usage = _usage(reply)
+        if usage is not None:
+            payload["usage"] = usage
+        await _send_json(send, 200, payload)
+
+    async def _stream(
+        self,
+        send: Send,
+        service: ChatService,
+        model: str,
+        messages: List[message],
+        kwargs: Dict[str, Any],
+    ) -> None:
+        try:
+            reply = await service.arespond(messages, stream=True, **kwargs)
+        except ProviderError as exc:
+            raise HTTPError.from_provider(exc) from exc     # nothing sent yet: plain error reply
+
+        chunk = _Chunks(model)
+        chunks = reply.__aiter__()
+        try:
+            await send({"type": "http.response.start", "status": 200, "headers": _SSE_HEADERS})
+            await _send_body(send, chunk.event({"role": "assistant", "content": ""}))
+            try:
+                async for piece in chunks:
+                    # awaiting send() before pulling the next chunk is the backpressure
+                    if piece.text:
+                        await _send_body(send, chunk.event({"content": piece.text}))
+            except ProviderError as exc:
+                # headers are out: report in-band the way OpenAI does, then end
+                await _send_body(send, b"data: " + _dumps(HTTPError.from_provider(exc).body()) + b"\n\n")
+            else:
+                await _send_body(
+                    send, chunk.event({}, finish_reason=_finish_reason(reply.finish_reason), usage=_usage(reply))
+                )
+            await send({"type": "http.response.body", "body": _DONE, "more_body": False})
+        finally:
+            await chunks.aclose()      # also on disconnect: closes the upstream stream
+
+    async def _models(self, scope: Scope, receive: Receive, send: Send) -> None:
+        created = int(time.time())
+        await _send_json(send, 200, {
+            "object": "list",
+            "data": [
+                {"id": name, "object": "model", "created": created, "owned_by": "mychatai"}
+                for name in providers.names() if providers.configured(name)
+            ],
+        })
+
+    async def _health(self, scope: Scope, receive: Receive, send: Send) -> None:
+        health: Dict[str, Any] = {"status": "ok"}
+        if self._scheduled:
+            health["schedulers"] = schedulers.stats()
+        await _send_json(send, 200, health)
+
+    # ── internals ──────────────────────────────────────────────────────────
+    def _resolve(self, model: str) -> Tuple[str, Optional[str]]:
+        """``"provider/model"`` / ``"provider"`` / anything → (provider, model or None)."""
+        provider, _, name = model.partition("/")
+        if name and provider in providers:
+            return provider, name
+        if model in providers:
+            return model, None
+        return self._default, None
+
+    def _slot(self, path: str) -> "_Slot":
+        limit = self._limits.get(path)
+        if not limit:
+            return _Slot(None, 0.0)
+        slots = self._slots.get(path)
+        if slots is None:
+            # created lazily so the semaphore belongs to the server's event loop
+            slots = self._slots[path] = asyncio.Semaphore(limit)
+        return _Slot(slots, self._queue_timeout)
+
+    async def _read_json(self, receive: Receive) -> Dict[str, Any]:
+        body = bytearray()
+        while True:
+            event = await receive()
+            if event["type"] == "http.disconnect":
+                raise _Disconnected
+            body += event.get("body", b"")
+            if len(body) > self._max_body:
+                raise HTTPError(413, f"request body exceeds {self._max_body} bytes")
+            if not event.get("more_body"):
+                break
+        try:
+            data = loads(body)
+        except ValueError:
+            raise HTTPError(400, "request body is not valid JSON") from None
+        if not isinstance(data, dict):
+            raise HTTPError(400, "request body must be a JSON object")
+        return data
+
+    async def _lifespan(self, receive: Receive, send: Send) -> None:
+        while True:
+            event = await receive()
+            if event["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif event["type"] == "lifespan.shutdown":
+                await transports.aclose()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+
+class _Disconnected(Exception):
+    """The client went away before its request was read."""
+
+
+class _Slot:
+    """``async with`` a route's semaphore, waiting at most *timeout* seconds."""
+
+    def __init__(self, semaphore: Optional[asyncio.Semaphore], timeout: float) -> None:
+        self._semaphore = semaphore
+        self._timeout = timeout
+
+    async def __aenter__(self) -> None:
+        if self._semaphore is None:
+            return
+        if not self._semaphore.locked():
+            await self._semaphore.acquire()         # free slot: never suspends
+            return
+        try:
+            if self._timeout <= 0:
+                raise asyncio.TimeoutError
+            await asyncio.wait_for(self._semaphore.acquire(), self._timeout)
+        except asyncio.TimeoutError:
+            raise HTTPError(
+                429, "gateway is at capacity, retry shortly",
+                type="rate_limit_error", retry_after=1.0,
+            ) from None
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        if self._semaphore is not None:
+            self._semaphore.release()
+
+
+class _Chunks:
+    """Encodes ``chat.completion.chunk`` SSE events for one reply."""
+
+    def __init__(self, model: str) -> None:
+        self._head = {
+            "id": _completion_id(),
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": model,
+        }
+
+    def event(
+        self,
+        delta: Dict[str, Any],
+        finish_reason: Optional[str] = None,
+        usage: Optional[Dict[str, int]] = None,
+    ) -> bytes:
+        payload = dict(self._head, choices=[{"index": 0, "delta": delta, "finish_reason": finish_reason}])
+        if usage is not None:
+            payload["usage"] = usage
+        return b"data: " + _dumps(payload) + b"\n\n"
+
+
+def create_app(**gateway_kwargs: Any) -> Gateway:
+    """A :class:`Gateway` configured from ``settings`` (plus overrides)."""
+    if "cache" not in gateway_kwargs and settings.gateway_cache_size:
+        gateway_kwargs["cache"] = LRUCache(settings.gateway_cache_size)
+    return Gateway(**gateway_kwargs)
+
+
+def _messages(body: Mapping[str, Any]) -> List[message]:
+    raw = body.get("messages")
+    if not isinstance(raw, list) or not raw:
+        raise HTTPError(400, "'messages' must be a non-empty array")
+    messages: List[message] = []
+    for item in raw:
+        if not isinstance(item, dict) or not isinstance(item.get("role"), str):
+            raise HTTPError(400, "each message needs a 'role' and 'content'")
+        content = item.get("content")
+        if isinstance(content, list):       # [{"type": "text", "text": ...}, ...]
+            content = "".join(
+                part.get("text", "") for part in content
+                if isinstance(part, dict) and part.get("type") == "text"
+            )
+        if not isinstance(content, str):
+            raise HTTPError(400, "message 'content' must be a string or text parts")
+        role = "system" if item["role"] == "developer" else item["role"]
+        messages.append({"role": role, "content": content})
+    return messages
+
+
+def _sampling(body: Mapping[str, Any]) -> Dict[str, Any]:
+    """The request's sampling options (clients translate them for their provider)."""
+    temperature = body.get("temperature")
+    max_tokens = body.get("max_completion_tokens", body.get("max_tokens"))
+    kwargs: Dict[str, Any] = {}
+    if temperature is not None:
+        kwargs["temperature"] = temperature
+    if max_tokens is not None:
+        kwargs["max_tokens"] = max_tokens
+    return kwargs
+
+
+def _finish_reason(reason: Optional[str]) -> str:
+    """A provider's finish reason in OpenAI's terms ("stop" when unknown)."""
+    if not reason:
+        return "stop"
+    return _FINISH_REASONS.get(reason, reason.lower())
+
+
+def _usage(reply: ChatResponse) -> Optional[Dict[str, int]]:
+    usage = reply.usage
+    if usage is None or usage.prompt_tokens is None or usage.completion_tokens is None:
+        return None
+    return {
+        "prompt_tokens": usage.prompt_tokens,
+        "completion_tokens": usage.completion_tokens,
+        "total_tokens": usage.prompt_tokens + usage.completion_tokens,
+    }
+
+
+def _scheduling_headers(scope: Scope) -> Dict[str, Any]:
+    """``scheduling()`` arguments from the request headers."""
+    headers = {name.decode("latin-1").lower(): value.decode("latin-1") for name, value in scope.get("headers", [])}
+    priority = headers.get("x-priority") or None
+    if priority is not None and priority not in PRIORITIES:
+        raise HTTPError(400, f"x-priority must be one of {', '.join(PRIORITIES)}")
+    timeout = headers.get("x-request-timeout")
+    try:
+        seconds = float(timeout) if timeout else None
+    except ValueError:
+        raise HTTPError(400, "x-request-timeout must be a number of seconds") from None
+    key = headers.get("authorization", "").partition(" ")[2]
+    # the API key identifies the tenant; only a digest ends up in queues and stats
+    tenant = hashlib.sha256(key.encode()).hexdigest()[:16] if key else ""
+    return {"priority": priority, "tenant": tenant, "timeout": seconds}
+
+
+def _completion_id() -> str:
+    return f"chatcmpl-{uuid.uuid4().hex}"
+
+
+async def _disconnected(receive: Receive) -> None:
+    while (await receive())["type"] != "http.disconnect":
+        pass
+
+
+async def _send_body(send: Send, body: bytes) -> None:
+    await send({"type": "http.response.body", "body": body, "more_body": True})
+
+
+async def _send_json(send: Send, status: int, payload: Any, headers: Optional[list] = None) -> None:
+    await send({"type": "http.response.start", "status": status, "headers": _JSON_HEADERS + (headers or [])})
+    await send({"type": "http.response.body", "body": _dumps(payload)})
+
+
+async def _send_error(send: Send, exc: HTTPError) -> None:
+    headers = []
+    if exc.retry_after is not None:
+        headers.append((b"retry-after", str(max(1, round(exc.retry_after))).encode()))
+    await _send_json(send, exc.status, exc.body(), headers)
+
+
+app = create_app()
@@ -0,0 +1,454 @@
+"""
+Per-call latency / throughput instrumentation.
+
+Register a hook (or an exporter, which is just a hook) and every call made
+through ``ChatService`` — or through a client wrapped in
+:class:`InstrumentedClient` — produces a :class:`CallRecord`:
+
+    from mychatai.instrumentation import instrumentation, PrometheusExporter
+    prom = PrometheusExporter()
+    instrumentation.add_hook(prom)
+    instrumentation.add_hook(lambda rec: print(rec.ttft, rec.tokens_per_second))
+    ...
+    print(prom.render())          # Prometheus text exposition format
+
+While a call is running its record is reachable through
+:func:`current_call`, so lower layers can annotate it: clients report
+provider usage fields via :func:`record_usage`, the shared transport adds
+TCP/TLS connect time, ``RetryingClient`` counts retries and hedges.
+
+With no hooks registered nothing is measured; the only cost left on the
+hot path is one attribute check per call.
+"""
+from __future__ import annotations
+
+import contextvars
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import (
+    Any,
+    AsyncGenerator,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    Generator,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+)
+
+from .clients.base import DelegatingClient, message
+from .clients.response import ChatResponse, _aclose, _close
+
+Hook = Callable[["CallRecord"], None]
+
+_current: contextvars.ContextVar[Optional[CallRecord]] = contextvars.ContextVar(
+    "mychatai_current_call", default=None
+)
+
+
+@dataclass
+class CallRecord:
+    """Timings (seconds) and counters for one model call."""
+
+    provider: str
+    model: str
+    stream: bool
+    start_ns: int = field(default_factory=time.time_ns)     # wall clock, for tracing
+    started: float = field(default_factory=time.perf_counter)
+    prompt_build: Optional[float] = None
+    connect: float = 0.0                # TCP + TLS set-up paid by this call
+    ttft: Optional[float] = None        # time to first token (== total if not streamed)
+    total: Optional[float] = None
+    chunks: int = 0
+    max_gap: float = 0.0                # longest pause between two streamed chunks
+    prompt_tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
+    cached_tokens: Optional[int] = None
+    cache: Optional[str] = None         # "hit" / "miss" / "semantic" when a cache is used
+    queue_wait: Optional[float] = None  # time spent in a scheduler queue (see scheduler.py)
+    retries: int = 0
+    hedged: bool = False
+    error: Optional[str] = None
+    attributes: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def generation(self) -> Optional[float]:
+        """Time spent streaming after the first token."""
+        if self.total is None or self.ttft is None:
+            return None
+        return self.total - self.ttft
+
+    @property
+    def mean_gap(self) -> Optional[float]:
+        """Mean inter-token gap."""
+        if self.chunks < 2 or self.generation is None:
+            return None
+        return self.generation / (self.chunks - 1)
+
+    @property
+    def tokens_per_second(self) -> Optional[float]:
+        """Completion tokens per second of generation (whole call if not streamed)."""
+        span = self.generation if self.stream else self.total
+        if not self.completion_tokens or not span:
+            return None
+        return self.completion_tokens / span
+
+    @property
+    def end_ns(self) -> int:
+        return self.start_ns + int((self.total or 0.0) * 1e9)
+
+
+class Instrumentation:
+    """Registry of hooks; enabled exactly while at least one hook is registered."""
+
+    def __init__(self) -> None:
+        self._hooks: List[Hook] = []
+        self._lock = threading.Lock()
+        self.enabled = False
+
+    def add_hook(self, hook: Hook) -> Hook:
+        with self._lock:
+            self._hooks = [*self._hooks, hook]
+            self.enabled = True
+        return hook
+
+    def remove_hook(self, hook: Hook) -> None:
+        with self._lock:
+            self._hooks = [h for h in self._hooks if h is not hook]
+            self.enabled = bool(self._hooks)
+
+    def emit(self, record: CallRecord) -> None:
+        for hook in self._hooks:
+            hook(record)
+
+    # ── measuring a call ───────────────────────────────────────────────────
+    def run(self, record: CallRecord, call: Callable[[], Any]) -> Any:
+        """
+        Run *call* with *record* active; a returned stream (a token iterator
+        or a streaming :class:`ChatResponse`) is measured as it is consumed.
+        """
+        active = _current.set(record)
+        try:
+            reply = call()
+        except BaseException as exc:
+            self.finish(record, exc)
+            raise
+        finally:
+            _current.reset(active)
+        if record.stream:
+            if isinstance(reply, ChatResponse):
+                return reply.pipe(lambda chunks: self.track(record, chunks))
+            return self.track(record, reply)
+        record.ttft = time.perf_counter() - record.started
+        self.finish(record)
+        return reply
+
+    async def arun(self, record: CallRecord, call: Callable[[], Awaitable[Any]]) -> Any:
+        active = _current.set(record)
+        try:
+            reply = await call()
+        except BaseException as exc:
+            self.finish(record, exc)
+            raise
+        finally:
+            _current.reset(active)
+        if record.stream:
+            if isinstance(reply, ChatResponse):
+                return reply.pipe(lambda chunks: self.atrack(record, chunks))
+            return self.atrack(record, reply)
+        record.ttft = time.perf_counter() - record.started
+        self.finish(record)
+        return reply
+
+    def track(self, record: CallRecord, tokens: Iterator[Any]) -> Generator[Any, None, None]:
+        """
+        Yield from *tokens* (str tokens or ``ChatChunk`` s), recording TTFT,
+        chunk gaps and total time.
+        """
+        source = tokens
+        tokens = iter(tokens)
+        last = record.started
+        error: Optional[BaseException] = None
+        try:
+            while True:
+                # The record is re-activated around every pull so that usage
+                # reported by the client while iterating lands on it.
+                active = _current.set(record)
+                try:
+                    token = next(tokens)
+                except StopIteration:
+                    break
+                finally:
+                    _current.reset(active)
+                last = self._tick(record, last, token)
+                yield token
+        except BaseException as exc:
+            error = exc
+            raise
+        finally:
+            _close(source)
+            self.finish(record, error)
+
+    async def atrack(self, record: CallRecord, tokens: AsyncIterator[Any]) -> AsyncGenerator[Any, None]:
+        source = tokens
+        tokens = tokens.__aiter__()
+        last = record.started
+        error: Optional[BaseException] = None
+        try:
+            while True:
+                active = _current.set(record)
+                try:
+                    token = await tokens.__anext__()
+                except StopAsyncIteration:
+                    break
+                finally:
+                    _current.reset(active)
+                last = self._tick(record, last, token)
+                yield token
+        except BaseException as exc:
+            error = exc
+            raise
+        finally:
+            await _aclose(source)
+            self.finish(record, error)
+
+    @staticmethod
+    def _tick(record: CallRecord, last: float, token: Any) -> float:
+        # a ChatChunk's usage is recorded by its response outside this
+        # record's context, and usage-only chunks carry no text to time
+        usage = getattr(token, "usage", None)
+        if usage is not None:
+            _apply_usage(record, *usage)
+        if not getattr(token, "text", True):
+            return last
+        now = time.perf_counter()
+        if record.chunks == 0:
+            record.ttft = now - record.started
+        elif now - last > record.max_gap:
+            record.max_gap = now - last
+        record.chunks += 1
+        return now
+
+    def finish(self, record: CallRecord, error: Optional[BaseException] = None) -> None:
+        record.total = time.perf_counter() - record.started
+        if error is not None and not isinstance(error, GeneratorExit):
+            record.error = type(error).__name__
+        self.emit(record)
+
+
+instrumentation = Instrumentation()
+
+
+def current_call() -> Optional[CallRecord]:
+    """Record of the call in progress on this thread / task, if it is measured."""
+    return _current.get()
+
+
+def record_usage(
+    prompt_tokens: Optional[int] = None,
+    completion_tokens: Optional[int] = None,
+    cached_tokens: Optional[int] = None,
+) -> None:
+    """Attach provider-reported token usage to the current call (no-op if unmeasured)."""
+    record = _current.get()
+    if record is not None:
+        _apply_usage(record, prompt_tokens, completion_tokens, cached_tokens)
+
+
+def _apply_usage(
+    record: CallRecord,
+    prompt_tokens: Optional[int],
+    completion_tokens: Optional[int],
+    cached_tokens: Optional[int],
+) -> None:
+    if prompt_tokens is not None:
+        record.prompt_tokens = prompt_tokens
+    if completion_tokens is not None:
+        record.completion_tokens = completion_tokens
+    if cached_tokens is not None:
+        record.cached_tokens = cached_tokens
+
+
+class InstrumentedClient(DelegatingClient):
+    """Measures direct client calls (``ChatService`` already measures its own)."""
+
+    def respond(
+        self,
+        messages: Iterable[message],
+        *,
+        stream: bool = False,
+        **kwargs: Any,
+    ) -> ChatResponse:
+        if not instrumentation.enabled:
+            return self._inner.respond(messages, stream=stream, **kwargs)
+        record = CallRecord(self.provider, self.model, stream)
+        return instrumentation.run(record, lambda: self._inner.respond(messages, stream=stream, **kwargs))
+
+    async def arespond(
+        self,
+        messages: Iterable[message],
+        *,
+        stream: bool = False,
+        **kwargs: Any,
+    ) -> ChatResponse:
+        if not instrumentation.enabled:
+            return await self._inner.arespond(messages, stream=stream, **kwargs)
+        record = CallRecord(self.provider, self.model, stream)
+        return await instrumentation.arun(record, lambda: self._inner.arespond(messages, stream=stream, **kwargs))
+
+
+# ── Exporters ──────────────────────────────────────────────────────────────
+_DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class PrometheusExporter:
+    """
+    Hook that aggregates records into Prometheus metrics; :meth:`render`
+    returns the text exposition format for a ``/metrics`` endpoint.
+    """
+
+    def __init__(self, namespace: str = "mychatai", buckets: Tuple[float, ...] = _DEFAULT_BUCKETS) -> None:
+        self._ns = namespace
+        self._buckets = buckets
+        self._lock = threading.Lock()
+        self._counters: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float] = {}
+        self._histograms: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], List[float]] = {}
+
+    def __call__(self, record: CallRecord) -> None:
+        labels = (("provider", record.provider), ("model", record.model))
+        outcome = labels + (("outcome", "error" if record.error else "ok"),)
+        with self._lock:
+            self._inc("calls_total", outcome)
+            if record.cache:
+                self._inc("cache_lookups_total", labels + (("result", record.cache),))
+            if record.retries:
+                self._inc("retries_total", labels, record.retries)
+            if record.hedged:
+                self._inc("hedged_calls_total", labels)
+            for kind, value in (
+                ("prompt", record.prompt_tokens),
+                ("completion", record.completion_tokens),
+                ("cached", record.cached_tokens),
+            ):
+                if value:
+                    self._inc("tokens_total", labels + (("kind", kind),), value)
+            for name, value in (
+                ("ttft_seconds", record.ttft),
+                ("call_seconds", record.total),
+                ("connect_seconds", record.connect or None),
+                ("prompt_build_seconds", record.prompt_build),
+            ):
+                if value is not None:
+                    self._observe(name, labels, value)
+            if record.queue_wait is not None:
+                priority = str(record.attributes.get("priority", "default"))
+                self._observe("queue_wait_seconds", labels + (("priority", priority),), record.queue_wait)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        with self._lock:
+            seen: set[str] = set()
+            for (name, labels), value in sorted(self._counters.items()):
+                metric = f"{self._ns}_{name}"
+                if metric not in seen:
+                    seen.add(metric)
+                    lines.append(f"# TYPE {metric} counter")
+                lines.append(f"{metric}{_labels(labels)} {value:g}")
+            for (name, labels), counts in sorted(self._histograms.items()):
+                metric = f"{self._ns}_{name}"
+                if metric not in seen:
+                    seen.add(metric)
+                    lines.append(f"# TYPE {metric} histogram")
+                *per_bucket, total, count = counts
+                cumulative = 0.0
+                for bound, n in zip(self._buckets, per_bucket):
+                    cumulative += n
+                    lines.append(f"{metric}_bucket{_labels(labels + (('le', f'{bound:g}'),))} {cumulative:g}")
+                lines.append(f"{metric}_bucket{_labels(labels + (('le', '+Inf'),))} {count:g}")
+                lines.append(f"{metric}_sum{_labels(labels)} {total:g}")
+                lines.append(f"{metric}_count{_labels(labels)} {count:g}")
+        return "\n".join(lines) + "\n"
+
+    def _inc(self, name: str, labels: Tuple[Tuple[str, str], ...], amount: float = 1) -> None:
+        key = (name, labels)
+        self._counters[key] = self._counters.get(key, 0) + amount
+
+    def _observe(self, name: str, labels: Tuple[Tuple[str, str], ...], value: float) -> None:
+        key = (name, labels)
+        counts = self._histograms.get(key)
+        if counts is None:
+            counts = self._histograms[key] = [0.0] * (len(self._buckets) + 2)
+        for i, bound in enumerate(self._buckets):
+            if value <= bound:
+                counts[i] += 1
+                break
+        counts[-2] += value
+        counts[-1] += 1
+
+
+class OpenTelemetryExporter:
+    """
+    Hook that turns each record into an OpenTelemetry span named
+    ``chat <model>`` with GenAI semantic-convention attributes and a
+    ``first_token`` event.  Needs ``opentelemetry-api`` (and an SDK to ship
+    the spans anywhere).
+    """
+
+    def __init__(self, tracer: Any = None) -> None:
+        if tracer is None:
+            try:
+                from opentelemetry import trace
+            except ImportError as exc:          # optional dependency
+                raise ImportError(
+                    "OpenTelemetryExporter needs `pip install opentelemetry-api`"
+                ) from exc
+            tracer = trace.get_tracer("mychatai")
+        self._tracer = tracer
+
+    def __call__(self, record: CallRecord) -> None:
+        span = self._tracer.start_span(
+            f"chat {record.model}", start_time=record.start_ns, attributes=span_attributes(record)
+        )
+        if record.ttft is not None:
+            span.add_event("first_token", timestamp=record.start_ns + int(record.ttft * 1e9))
+        if record.error:
+            from opentelemetry.trace import Status, StatusCode
+            span.set_status(Status(StatusCode.ERROR, record.error))
+        span.end(end_time=record.end_ns)
+
+
+def span_attributes(record: CallRecord) -> Dict[str, Any]:
+    """OpenTelemetry GenAI-style attributes for *record* (None values dropped)."""
+    attributes = {
+        "gen_ai.system": record.provider,
+        "gen_ai.request.model": record.model,
+        "gen_ai.usage.input_tokens": record.prompt_tokens,
+        "gen_ai.usage.output_tokens": record.completion_tokens,
+        "mychatai.stream": record.stream,
+        "mychatai.ttft_s": record.ttft,
+        "mychatai.connect_s": record.connect or None,
+        "mychatai.prompt_build_s": record.prompt_build,
+        "mychatai.chunks": record.chunks or None,
+        "mychatai.max_gap_s": record.max_gap or None,
+        "mychatai.cached_tokens": record.cached_tokens,
+        "mychatai.cache": record.cache,
+        "mychatai.retries": record.retries or None,
+        "mychatai.hedged": record.hedged or None,
+        "error.type": record.error,
+        **record.attributes,
+    }
+    return {k: v for k, v in attributes.items() if v is not None}
+
+
+def _labels(labels: Iterable[Tuple[str, str]]) -> str:
+    body = ",".join(f'{k}="{_escape(v)}"' for k, v in labels)
+    return f"{{{body}}}" if body else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
@@ -1,9 +1,51 @@
-"""Prompt-building helpers."""
+"""
+Prompt-building helpers and the prompt template registry.
+
+A prompt set is a sub-directory of ``settings.prompt_dir`` (``PROMPT_DIR``):
+
+    prompts/
+      sql/
+        system.txt              # system prompt
+        user.txt                # user template; {question} marks the question
+        instructions.txt        # optional: user.txt's text after {question} as a
+                                # standing instruction, for the prefix-stable layout
+        system.ollama.txt       # optional per-provider variant of any file
+
+Files a set leaves out come from the built-in ``default`` set
+(system_prompt.txt and :data:`USER_TEMPLATE`); a ``default/`` directory
+overrides it.  Select a set per service or per call:
+
+    chat = ChatService(OpenAIClient(), template="sql")
+    build_messages("top customers by revenue?", template="sql", provider="openai")
+
+Each (set, provider) is compiled once: the template is split around
+``{question}`` and both layouts' system prompts are rendered up front, so a
+call only concatenates the question into the user message.  The static
+prefix is byte-identical across calls, which is what provider prompt caches
+key on.  Edited files are picked up without a restart: a set's file mtimes
+are re-checked at most every ``settings.prompt_reload_interval`` seconds.
+"""
+from __future__ import annotations
+
+import os
+import threading
+import time
+from functools import lru_cache
 from pathlib import Path
+from string import Formatter
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
 from .config import settings
 
 _ROOT = Path(__file__).resolve().parent
-_SYSTEM_PROMPT = (_ROOT / "system_prompt.txt").read_text(encoding="utf-8")
+
+DEFAULT = "default"
+
+
+@lru_cache(maxsize=None)
+def system_prompt() -> str:
+    """Contents of system_prompt.txt, read on first use rather than at import."""
+    return (_ROOT / "system_prompt.txt").read_text(encoding="utf-8")
 
 
 USER_TEMPLATE = (
@@ -16,26 +58,260 @@ USER_TEMPLATE = (
     "  • Business use-cases\n"
     "  • Edge-case resilience strategy\n" )
 
-USER_TEMPLATE_embeded = (
-    "You have received the following technical question:\n"
-    "{What is Camera Calibration}\n\n"
-    "Please  provide:\n"
-    "  • Concept explanation\n"
-    "  • Implementation diagram (ASCII acceptable)\n"
-    "  • Architecture specification\n"
-    "  • Business use-cases\n"
-    "  • Edge-case resilience strategy\n" )
+EXAMPLE_QUESTION = "What is Camera Calibration"
 
-def build_messages(question: str) -> list[dict[str, str]]:
-    """Return OpenAI-compatible chat messages."""
-    return [
-        {"role": "system", "content": _SYSTEM_PROMPT},
-        {"role": "user", "content": USER_TEMPLATE.format(question=question)},
-    ]
+# USER_TEMPLATE filled in with a sample question
+USER_TEMPLATE_embeded = USER_TEMPLATE.format(question=EXAMPLE_QUESTION)
+
+
+# ── compiled templates ─────────────────────────────────────────────────────
+class PromptTemplate:
+    """
+    A compiled prompt set.
+
+    The plain layout sends *system* and the filled-in *user* template.  The
+    prefix-stable layout moves the instructions after ``{question}`` into the
+    system prompt, so only the question itself varies.
+    """
+
+    def __init__(
+        self,
+        system: str,
+        user: str,
+        *,
+        instructions: Optional[str] = None,
+        name: str = DEFAULT,
+    ) -> None:
+        """instructions – the tail as a standing instruction (default: derived from it)."""
+        self.name = name
+        self.system = system
+        self.user = user
+        self.head, self.tail = _split(user)
+        if instructions is None:
+            instructions = _standing_instructions(self.tail)
+        self.instructions = instructions.strip()
+        self.cacheable_system = f"{system.rstrip()}\n\n{self.instructions}\n" if self.instructions else system
+
+    def messages(self, question: str, *, prefix_stable: bool = False) -> list[dict[str, str]]:
+        if prefix_stable:
+            return [
+                {"role": "system", "content": self.cacheable_system},
+                {"role": "user", "content": self.head + question},
+            ]
+        return [
+            {"role": "system", "content": self.system},
+            {"role": "user", "content": self.head + question + self.tail},
+        ]
+
+    def layout(self, prefix_stable: bool = False) -> tuple[str, str]:
+        """(system prompt, ``str.format`` user template) pair for :meth:`messages`."""
+        if prefix_stable:
+            return self.cacheable_system, _escape(self.head) + "{question}"
+        return self.system, self.user
+
+    def __repr__(self) -> str:
+        return f"PromptTemplate({self.name!r})"
+
+
+def _split(user: str) -> tuple[str, str]:
+    """The literal text before and after the template's single ``{question}``."""
+    parts = list(Formatter().parse(user))
+    fields = [(field, spec, conversion) for _, field, spec, conversion in parts if field is not None]
+    if fields != [("question", "", None)]:
+        found = ", ".join(f"{{{field}}}" for field, _, _ in fields) or "none"
+        raise ValueError(f"a user template needs exactly one plain {{question}} field (found {found})")
+    head: List[str] = []
+    tail: List[str] = []
+    out = head
+    for literal, field, _, _ in parts:
+        out.append(literal)
+        if field is not None:
+            out = tail
+    return "".join(head), "".join(tail)
+
+
+def _escape(text: str) -> str:
+    return text.replace("{", "{{").replace("}", "}}")
+
+
+def _standing_instructions(tail: str) -> str:
+    """'Please provide: …' after the question → 'For every question you receive, provide: …'."""
+    tail = tail.strip()
+    if not tail:
+        return ""
+    if tail.lower().startswith("please"):
+        return f"For every question you receive, {tail[len('please'):].lstrip()}"
+    return f"For every question you receive:\n{tail}"
 
-def build_user_prompt() -> list[dict[str, str]]:
-    
+
+@lru_cache(maxsize=None)
+def _builtin() -> PromptTemplate:
+    tail = _split(USER_TEMPLATE)[1].strip()
+    return PromptTemplate(
+        system_prompt(),
+        USER_TEMPLATE,
+        instructions=f"For every technical question you receive, {tail.removeprefix('Please').lstrip()}",
+    )
+
+
+# ── registry ───────────────────────────────────────────────────────────────
+class _Entry(NamedTuple):
+    template: PromptTemplate
+    stamp: Optional[Tuple[Tuple[str, int, int], ...]]   # the set's files when compiled
+    checked: float
+
+
+class TemplateRegistry:
+    """Prompt sets from a directory, compiled once per (set, provider), reloaded on change."""
+
+    def __init__(self, directory: Optional[str | Path] = None, *, reload_interval: Optional[float] = None) -> None:
+        """
+        directory       – prompt sets (default ``settings.prompt_dir``).
+        reload_interval – seconds between mtime checks (default
+                          ``settings.prompt_reload_interval``; 0 checks every call).
+        """
+        self._directory = directory
+        self._reload_interval = reload_interval
+        self._entries: Dict[Tuple[str, Optional[str]], _Entry] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def directory(self) -> Optional[Path]:
+        directory = self._directory if self._directory is not None else settings.prompt_dir
+        return Path(directory).expanduser() if directory else None
+
+    def names(self) -> List[str]:
+        names = {DEFAULT}
+        directory = self.directory
+        if directory is not None and directory.is_dir():
+            names.update(p.name for p in directory.iterdir() if p.is_dir())
+        return sorted(names)
+
+    def get(self, name: Optional[str] = None, provider: Optional[str] = None) -> PromptTemplate:
+        """Set *name* (default ``settings.prompt_template``) as compiled for *provider*."""
+        key = (name or settings.prompt_template, provider)
+        entry = self._entries.get(key)
+        now = time.monotonic()
+        if entry is not None and now - entry.checked < self._interval():
+            return entry.template
+        with self._lock:
+            path = self._path(key[0])
+            stamp = _stamp(path)
+            entry = self._entries.get(key)
+            if entry is None or entry.stamp != stamp:
+                template = self._compile(key[0], path, provider)
+            else:
+                template = entry.template
+            self._entries[key] = _Entry(template, stamp, now)
+            return template
+
+    def clear(self) -> None:
+        """Forget every compiled set; the next :meth:`get` reads the files again."""
+        with self._lock:
+            self._entries.clear()
+
+    def _interval(self) -> float:
+        return settings.prompt_reload_interval if self._reload_interval is None else self._reload_interval
+
+    def _path(self, name: str) -> Optional[Path]:
+        directory = self.directory
+        if directory is not None and name not in (".", "..") and os.sep not in name:
+            path = directory / name
+            if path.is_dir():
+                return path
+        if name == DEFAULT:
+            return None
+        raise ValueError(f"unknown prompt template {name!r}; available: {', '.join(self.names())}")
+
+    def _compile(self, name: str, path: Optional[Path], provider: Optional[str]) -> PromptTemplate:
+        if path is None:
+            return _builtin()
+
+        def read(stem: str) -> Optional[str]:
+            candidates = ([f"{stem}.{provider}.txt"] if provider else []) + [f"{stem}.txt"]
+            for candidate in candidates:
+                file = path / candidate
+                if file.is_file():
+                    return file.read_text(encoding="utf-8")
+            return None
+
+        builtin = _builtin()
+        system = read("system")
+        user = read("user")
+        instructions = read("instructions")
+        if user is None:
+            user = builtin.user
+            if instructions is None:
+                instructions = builtin.instructions
+        try:
+            return PromptTemplate(
+                builtin.system if system is None else system,
+                user,
+                instructions=instructions,
+                name=name,
+            )
+        except ValueError as exc:
+            raise ValueError(f"prompt template {name!r}: {exc}") from None
+
+
+def _stamp(path: Optional[Path]) -> Optional[Tuple[Tuple[str, int, int], ...]]:
+    """(name, mtime, size) of every file in a set: any edit, addition or removal changes it."""
+    if path is None:
+        return None
+    try:
+        with os.scandir(path) as entries:
+            files = [(e.name, e.stat()) for e in entries if e.is_file()]
+    except FileNotFoundError:
+        return None
+    return tuple(sorted((name, st.st_mtime_ns, st.st_size) for name, st in files))
+
+
+templates = TemplateRegistry()
+
+
+# ── message building ───────────────────────────────────────────────────────
+def cacheable_system_prompt() -> str:
+    return _builtin().cacheable_system
+
+
+def __getattr__(name: str) -> str:
+    # _SYSTEM_PROMPT used to be a module constant; keep it importable
+    if name == "_SYSTEM_PROMPT":
+        return system_prompt()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def build_messages(
+    question: str,
+    *,
+    prefix_stable: bool = False,
+    template: Optional[str] = None,
+    provider: Optional[str] = None,
+) -> list[dict[str, str]]:
+    """
+    Return OpenAI-compatible chat messages.
+
+    prefix_stable – keep everything but the question in the system message,
+                    so providers can serve the whole shared prefix from
+                    their prompt cache.
+    template      – prompt set (default ``settings.prompt_template``).
+    provider      – use the set's variants for this provider, if it has any.
+    """
+    return templates.get(template, provider).messages(question, prefix_stable=prefix_stable)
+
+
+def prompt_layout(
+    prefix_stable: bool = False,
+    *,
+    template: Optional[str] = None,
+    provider: Optional[str] = None,
+) -> tuple[str, str]:
+    """(system prompt, user template) pair used by :func:`build_messages`."""
+    return templates.get(template, provider).layout(prefix_stable)
+
+
+def build_user_prompt(question: str = EXAMPLE_QUESTION) -> list[dict[str, str]]:
+    """A lone user message asking *question* through :data:`USER_TEMPLATE`."""
     return [
-        {"role": "user", "content": USER_TEMPLATE_embeded},  
+        {"role": "user", "content": USER_TEMPLATE.format(question=question)},
     ]
-
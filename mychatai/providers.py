@@ -0,0 +1,126 @@
+"""
+Provider registry: resolve clients by name, importing only the SDK you use.
+
+    from mychatai.providers import providers
+    client = providers.create("ollama")             # imports mychatai.clients.ollama only
+    providers.names()                               # built-ins + installed plugins
+
+Third-party packages add providers through the ``mychatai.providers``
+entry-point group; the value is ``"module:Class"`` (or any callable that
+returns an ``AbstractModelClient``):
+
+    [project.entry-points."mychatai.providers"]
+    groq = "mychatai_groq:GroqClient"
+
+or at runtime with ``providers.register("groq", "mychatai_groq:GroqClient")``.
+"""
+from __future__ import annotations
+
+import importlib
+import threading
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Union
+
+from .config import settings
+
+if TYPE_CHECKING:
+    from .clients.base import AbstractModelClient
+
+ENTRY_POINT_GROUP = "mychatai.providers"
+
+Factory = Callable[..., "AbstractModelClient"]
+
+
+@dataclass
+class ProviderSpec:
+    """Where to find a provider and which setting holds its credentials."""
+
+    name: str
+    target: Union[str, Factory]         # "module:attr[.attr]" or the factory itself
+    credential: Optional[str] = None    # settings attribute that must be set, if any
+
+    def load(self) -> Factory:
+        if callable(self.target):
+            return self.target
+        module_name, _, attr = self.target.partition(":")
+        obj: Any = importlib.import_module(module_name)
+        for part in attr.split("."):
+            obj = getattr(obj, part)
+        self.target = obj                   # resolve once
+        return obj
+
+
+class ProviderRegistry:
+    """Name → lazily imported client factory."""
+
+    def __init__(self) -> None:
+        self._specs: Dict[str, ProviderSpec] = {}
+        self._lock = threading.Lock()
+        self._discovered = False
+
+    def register(
+        self,
+        name: str,
+        target: Union[str, Factory],
+        *,
+        credential: Optional[str] = None,
+    ) -> None:
+        with self._lock:
+            self._specs[name] = ProviderSpec(name, target, credential)
+
+    def names(self) -> List[str]:
+        self._discover()
+        return list(self._specs)
+
+    def spec(self, name: str) -> ProviderSpec:
+        if name not in self._specs:
+            self._discover()
+        try:
+            return self._specs[name]
+        except KeyError:
+            raise ValueError(
+                f"unknown provider {name!r}; choose from {', '.join(self.names())}"
+            ) from None
+
+    def get(self, name: str) -> Factory:
+        """The client class / factory for *name* (imports its module on first use)."""
+        return self.spec(name).load()
+
+    def create(self, name: str, **kwargs: Any) -> "AbstractModelClient":
+        return self.get(name)(**kwargs)
+
+    def configured(self, name: str) -> bool:
+        """Whether the credentials *name* needs are present in ``settings``."""
+        credential = self.spec(name).credential
+        return credential is None or bool(getattr(settings, credential, None))
+
+    def __contains__(self, name: object) -> bool:
+        return isinstance(name, str) and name in self.names()
+
+    def _discover(self) -> None:
+        if self._discovered:
+            return
+        from importlib.metadata import entry_points
+
+        try:
+            found = entry_points(group=ENTRY_POINT_GROUP)
+        except TypeError:                                   # Python 3.9
+            found = entry_points().get(ENTRY_POINT_GROUP, [])
+        with self._lock:
+            for ep in found:
+                self._specs.setdefault(ep.name, ProviderSpec(ep.name, ep.value))
+            self._discovered = True
+
+
+# One registry per process, pre-filled with the built-in clients.
+providers = ProviderRegistry()
+providers.register("openai", "mychatai.clients.openai:OpenAIClient", credential="openai_api_key")
+providers.register("ollama", "mychatai.clients.ollama:OllamaClient")
+providers.register("anthropic", "mychatai.clients.claude:AnthropicClient", credential="anthropic_api_key")
+providers.register("gemini", "mychatai.clients.gemini:GeminiClient", credential="gemini_api_key")
+providers.register("deepseek", "mychatai.clients.deepseek:DeepSeekClient", credential="deepseek_api_key")
+providers.register("auto", "mychatai.clients.router:RouterClient.from_settings")
+providers.register("cascade", "mychatai.clients.cascade:CascadeClient.from_settings")
+
+# Providers RouterClient.from_settings() spreads traffic over.
+ROUTABLE = ("openai", "anthropic", "gemini", "deepseek", "ollama")
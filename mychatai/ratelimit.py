@@ -0,0 +1,458 @@
+"""
+Client-side rate limiting and adaptive concurrency, per provider and model.
+
+Wrap any client to keep it inside its request / token budgets:
+
+    from mychatai.ratelimit import RateLimitedClient
+    chat = ChatService(RateLimitedClient(OpenAIClient()))
+
+Each (provider, model) pair gets a :class:`ProviderLimiter` holding
+
+* a requests-per-minute and a tokens-per-minute token bucket, configured
+  from ``Settings.rate_limits`` and re-synced from the provider's
+  rate-limit response headers whenever they are present;
+* an AIMD concurrency limit that halves on 429/503 responses and grows
+  back by one slot per window of successful calls.
+"""
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import re
+import threading
+import time
+from collections import deque
+from functools import partial
+from datetime import datetime, timezone
+from typing import (
+    Any,
+    AsyncGenerator,
+    AsyncIterable,
+    Dict,
+    Generator,
+    Iterable,
+    List,
+    Mapping,
+    Optional,
+    Tuple,
+)
+
+import httpx
+
+from .clients.base import AbstractModelClient, DelegatingClient, ReleaseOnce, message
+from .clients.response import ChatChunk, ChatResponse, Usage, _aclose, _close
+from .clients.errors import retry_after_of, status_of
+from .config import settings
+from .tokens import count_messages, count_tokens
+from .transport import transports
+
+_OVERLOAD_STATUSES = frozenset({429, 503, 529})     # 529: Anthropic "overloaded"
+
+# Limiter of the call currently in progress on this thread / task; lets the
+# transport-level response listener attribute headers to the right budget.
+_active: contextvars.ContextVar[Optional[ProviderLimiter]] = contextvars.ContextVar(
+    "mychatai_active_limiter", default=None
+)
+
+
+class TokenBucket:
+    """
+    Token bucket refilled continuously at *per_minute* / 60 per second.
+
+    :meth:`reserve` never blocks: it takes the tokens (possibly going into
+    debt) and returns how long the caller must wait before proceeding, so the
+    same bucket serves threads and coroutines alike.
+    """
+
+    def __init__(self, per_minute: float) -> None:
+        self._lock = threading.Lock()
+        self.configure(per_minute)
+        self._level = self._capacity
+        self._stamp = time.monotonic()
+
+    @property
+    def unlimited(self) -> bool:
+        return self._capacity <= 0
+
+    def configure(self, per_minute: float) -> None:
+        with self._lock:
+            self._capacity = float(per_minute or 0)
+            self._rate = self._capacity / 60.0
+
+    def reserve(self, amount: float) -> float:
+        if self.unlimited:
+            return 0.0
+        with self._lock:
+            self._refill()
+            self._level -= min(amount, self._capacity)
+            return 0.0 if self._level >= 0 else -self._level / self._rate
+
+    def refund(self, amount: float) -> None:
+        """Give back tokens reserved but not used (never above capacity)."""
+        if self.unlimited:
+            return
+        with self._lock:
+            self._refill()
+            self._level = min(self._capacity, self._level + amount)
+
+    def sync(self, remaining: float, reset_after: Optional[float] = None) -> None:
+        """Adopt the server's view of what is left (and when it refills)."""
+        if self.unlimited:
+            return
+        with self._lock:
+            self._refill()
+            self._level = min(self._level, remaining)
+            if reset_after and remaining <= 0:
+                self._level = min(self._level, -reset_after * self._rate)
+
+    def pause(self, seconds: float) -> None:
+        """Block new reservations for *seconds* (e.g. after ``retry-after``)."""
+        if self.unlimited:
+            return
+        with self._lock:
+            self._refill()
+            self._level = min(self._level, -seconds * self._rate)
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._level = min(self._capacity, self._level + (now - self._stamp) * self._rate)
+        self._stamp = now
+
+
+class AdaptiveConcurrency:
+    """
+    AIMD concurrency limit shared by threads and coroutines.
+
+    The limit grows by ``increase / limit`` per success (about +increase per
+    full window) and is multiplied by *backoff* on overload, at most once per
+    *cooldown* seconds so a burst of 429s counts as one signal.
+    """
+
+    def __init__(
+        self,
+        initial: int = 16,
+        *,
+        min_limit: int = 1,
+        max_limit: int = 256,
+        increase: float = 1.0,
+        backoff: float = 0.5,
+        cooldown: float = 1.0,
+    ) -> None:
+        self._limit = float(initial)
+        self._min, self._max = min_limit, max_limit
+        self._increase, self._backoff, self._cooldown = increase, backoff, cooldown
+        self._last_backoff = 0.0
+        self._in_flight = 0
+        self._cond = threading.Condition()
+        self._awaiting: deque[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = deque()
+
+    @property
+    def limit(self) -> int:
+        return max(self._min, int(self._limit))
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def acquire(self) -> None:
+        with self._cond:
+            while self._in_flight >= self.limit:
+                self._cond.wait()
+            self._in_flight += 1
+
+    async def aacquire(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._cond:
+                if self._in_flight < self.limit:
+                    self._in_flight += 1
+                    return
+                waiter = loop.create_future()
+                self._awaiting.append((loop, waiter))
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                with self._cond:
+                    if (loop, waiter) in self._awaiting:
+                        self._awaiting.remove((loop, waiter))
+                    else:
+                        self._wake()  # we were woken: pass the turn on
+                raise
+
+    def release(self) -> None:
+        with self._cond:
+            self._in_flight -= 1
+            self._wake()
+
+    def on_success(self) -> None:
+        with self._cond:
+            self._limit = min(self._max, self._limit + self._increase / max(self._limit, 1.0))
+            self._wake()
+
+    def on_overload(self) -> None:
+        now = time.monotonic()
+        with self._cond:
+            if now - self._last_backoff < self._cooldown:
+                return
+            self._last_backoff = now
+            self._limit = max(self._min, self._limit * self._backoff)
+
+    def _wake(self) -> None:
+        free = self.limit - self._in_flight
+        if free <= 0:
+            return
+        self._cond.notify(free)
+        while free > 0 and self._awaiting:
+            loop, waiter = self._awaiting.popleft()
+            loop.call_soon_threadsafe(_resolve, waiter)
+            free -= 1
+
+
+class ProviderLimiter:
+    """Request + token buckets and an adaptive concurrency cap for one model."""
+
+    def __init__(self, rpm: float = 0, tpm: float = 0, *, concurrency: int | None = None) -> None:
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.concurrency = AdaptiveConcurrency(
+            concurrency or settings.rate_limit_concurrency,
+            max_limit=settings.rate_limit_max_concurrency,
+        )
+        self.throttled = 0          # calls that had to wait for budget
+        self.overloads = 0          # 429 / 503 responses seen
+
+    # ── admission ──────────────────────────────────────────────────────────
+    def acquire(self, tokens: float) -> None:
+        delay = self._reserve(tokens)
+        if delay:
+            time.sleep(delay)
+        self.concurrency.acquire()
+
+    async def aacquire(self, tokens: float) -> None:
+        delay = self._reserve(tokens)
+        if delay:
+            await asyncio.sleep(delay)
+        await self.concurrency.aacquire()
+
+    def release(
+        self,
+        error: Optional[BaseException] = None,
+        *,
+        output_tokens: float = 0,
+        reserved: float = 0,
+    ) -> None:
+        """
+        Free the concurrency slot and feed the outcome back into AIMD.
+
+        reserved – completion tokens already taken at admission (the call's
+                   ``max_tokens``); only the difference to *output_tokens*
+                   is charged or refunded.
+        """
+        self.concurrency.release()
+        if output_tokens > reserved:
+            self.tokens.reserve(output_tokens - reserved)
+        elif reserved > output_tokens:
+            self.tokens.refund(reserved - output_tokens)
+        if error is None:
+            self.concurrency.on_success()
+        elif status_of(error) in _OVERLOAD_STATUSES:
+            self.overloads += 1
+            self.concurrency.on_overload()
+            retry_after = retry_after_of(error)
+            if retry_after:
+                self.requests.pause(retry_after)
+
+    # ── header feedback ────────────────────────────────────────────────────
+    def observe_headers(self, headers: Mapping[str, str]) -> None:
+        """Re-sync the buckets from OpenAI/DeepSeek or Anthropic rate-limit headers."""
+        for bucket, kind in ((self.requests, "requests"), (self.tokens, "tokens")):
+            limit = _first(headers, f"x-ratelimit-limit-{kind}", f"anthropic-ratelimit-{kind}-limit")
+            remaining = _first(
+                headers, f"x-ratelimit-remaining-{kind}", f"anthropic-ratelimit-{kind}-remaining"
+            )
+            reset = _first(headers, f"x-ratelimit-reset-{kind}", f"anthropic-ratelimit-{kind}-reset")
+            if limit is not None and bucket.unlimited:
+                bucket.configure(float(limit))
+            if remaining is not None:
+                bucket.sync(float(remaining), _parse_reset(reset))
+
+    def _reserve(self, tokens: float) -> float:
+        delay = max(self.requests.reserve(1), self.tokens.reserve(tokens))
+        if delay:
+            self.throttled += 1
+        return delay
+
+
+class LimiterRegistry:
+    """Process-wide map of (provider, model) → :class:`ProviderLimiter`."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._limiters: Dict[Tuple[str, str], ProviderLimiter] = {}
+
+    def get(self, provider: str, model: str) -> ProviderLimiter:
+        key = (provider, model)
+        with self._lock:
+            limiter = self._limiters.get(key)
+            if limiter is None:
+                cfg = settings.rate_limits.get(f"{provider}:{model}") or settings.rate_limits.get(provider) or {}
+                limiter = self._limiters[key] = ProviderLimiter(
+                    cfg.get("rpm", 0), cfg.get("tpm", 0), concurrency=int(cfg.get("concurrency", 0)) or None
+                )
+            return limiter
+
+
+limiters = LimiterRegistry()
+
+
+class RateLimitedClient(DelegatingClient):
+    """Admits calls to the wrapped client only within its provider's budget."""
+
+    def __init__(self, inner: AbstractModelClient, *, limiter: ProviderLimiter | None = None) -> None:
+        super().__init__(inner)
+        self._limiter = limiter or limiters.get(inner.provider or type(inner).__name__, inner.model)
+
+    @property
+    def limiter(self) -> ProviderLimiter:
+        return self._limiter
+
+    def respond(
+        self,
+        messages: Iterable[message],
+        *,
+        stream: bool = False,
+        **kwargs: Any,
+    ) -> ChatResponse:
+        msgs = list(messages)
+        cap = _completion_cap(kwargs)
+        self._limiter.acquire(count_messages(msgs, self._inner.provider, self._inner.model) + cap)
+        active = _active.set(self._limiter)
+        try:
+            reply = self._inner.respond(msgs, stream=stream, **kwargs)
+        except BaseException as exc:
+            self._limiter.release(exc, reserved=cap)
+            raise
+        finally:
+            _active.reset(active)
+        if stream:
+            release = ReleaseOnce(partial(self._release, cap))
+            return reply.pipe(lambda chunks: self._track(chunks, release))
+        self._limiter.release(output_tokens=self._output_tokens(reply.usage, reply.text), reserved=cap)
+        return reply
+
+    async def arespond(
+        self,
+        messages: Iterable[message],
+        *,
+        stream: bool = False,
+        **kwargs: Any,
+    ) -> ChatResponse:
+        msgs = list(messages)
+        cap = _completion_cap(kwargs)
+        await self._limiter.aacquire(count_messages(msgs, self._inner.provider, self._inner.model) + cap)
+        active = _active.set(self._limiter)
+        try:
+            reply = await self._inner.arespond(msgs, stream=stream, **kwargs)
+        except BaseException as exc:
+            self._limiter.release(exc, reserved=cap)
+            raise
+        finally:
+            _active.reset(active)
+        if stream:
+            release = ReleaseOnce(partial(self._release, cap))
+            return reply.pipe(lambda chunks: self._atrack(chunks, release))
+        self._limiter.release(output_tokens=self._output_tokens(reply.usage, reply.text), reserved=cap)
+        return reply
+
+    # A stream holds its concurrency slot until it is exhausted or closed;
+    # *release* also fires if the stream is dropped without being read.
+    def _track(self, chunks: Iterable[ChatChunk], release: ReleaseOnce) -> Generator[ChatChunk, None, None]:
+        parts: List[str] = []
+        usage: Optional[Usage] = None
+        error = None
+        try:
+            for chunk in chunks:
+                parts.append(chunk.text)
+                if chunk.usage is not None:
+                    usage = chunk.usage if usage is None else usage.merge(chunk.usage)
+                yield chunk
+        except BaseException as exc:
+            error = exc
+            raise
+        finally:
+            _close(chunks)
+            release(error, self._output_tokens(usage, "".join(parts)))
+
+    async def _atrack(
+        self, chunks: AsyncIterable[ChatChunk], release: ReleaseOnce
+    ) -> AsyncGenerator[ChatChunk, None]:
+        parts: List[str] = []
+        usage: Optional[Usage] = None
+        error = None
+        try:
+            async for chunk in chunks:
+                parts.append(chunk.text)
+                if chunk.usage is not None:
+                    usage = chunk.usage if usage is None else usage.merge(chunk.usage)
+                yield chunk
+        except BaseException as exc:
+            error = exc
+            raise
+        finally:
+            await _aclose(chunks)
+            release(error, self._output_tokens(usage, "".join(parts)))
+
+    def _release(self, reserved: float, error: Optional[BaseException] = None, output_tokens: float = 0) -> None:
+        self._limiter.release(error, output_tokens=output_tokens, reserved=reserved)
+
+    def _output_tokens(self, usage: Optional[Usage], text: str) -> float:
+        """Provider-reported completion tokens, else the tokenizer's count of *text*."""
+        if usage is not None and usage.completion_tokens is not None:
+            return usage.completion_tokens
+        return count_tokens(text, self._inner.provider, self._inner.model) if text else 0
+
+
+# ── helpers ────────────────────────────────────────────────────────────────
+def _on_response(response: httpx.Response) -> None:
+    limiter = _active.get()
+    if limiter is not None:
+        limiter.observe_headers(response.headers)
+
+
+transports.add_response_listener(_on_response)
+
+
+def _completion_cap(kwargs: Mapping[str, Any]) -> float:
+    """The requested completion cap, reserved at admission and settled on release."""
+    return kwargs.get("max_tokens") or kwargs.get("max_completion_tokens") or 0
+
+
+def _first(headers: Mapping[str, str], *names: str) -> Optional[str]:
+    for name in names:
+        value = headers.get(name)
+        if value is not None:
+            return value
+    return None
+
+
+_DURATION_RE = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_UNIT_SECONDS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+def _parse_reset(value: Optional[str]) -> Optional[float]:
+    """Seconds until reset from "6m0s"/"20ms" (OpenAI) or an RFC 3339 stamp (Anthropic)."""
+    if not value:
+        return None
+    parts = _DURATION_RE.findall(value)
+    if parts and "T" not in value:
+        return sum(float(n) * _UNIT_SECONDS[unit] for n, unit in parts)
+    try:
+        stamp = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    return max(0.0, (stamp - datetime.now(timezone.utc)).total_seconds())
+
+
+def _resolve(waiter: asyncio.Future) -> None:
+    if not waiter.done():
+        waiter.set_result(None)
@@ -0,0 +1,285 @@
+"""
+Retries with exponential backoff, jitter and deadlines, plus hedged requests.
+
+    from mychatai.retry import RetryingClient, RetryPolicy
+    client = RetryingClient(OpenAIClient(), RetryPolicy(max_attempts=5), hedge=True)
+
+Only ``RetryableProviderError`` (and subclasses such as ``RateLimitError``)
+is retried; a provider's ``retry-after`` always wins over a shorter
+backoff.  Streams are retried only until their first token has been
+produced, since tokens already handed to the caller cannot be taken back.
+
+Hedging: when a call has not produced its first token within the p95
+time-to-first-token seen so far (``hedge=True``) or within a fixed number
+of seconds (``hedge=1.5``), a second identical call is fired and whichever
+answers first wins; the loser is cancelled or closed.
+"""
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Iterable, Optional, Union
+
+from .clients.base import AbstractModelClient, DelegatingClient, message
+from .clients.response import ChatResponse
+from .exceptions import RetryableProviderError
+from .instrumentation import current_call
+
+
+@dataclass
+class RetryPolicy:
+    """Exponential backoff with jitter, bounded by attempts and a total deadline."""
+
+    max_attempts: int = 4
+    base_delay: float = 0.5                 # seconds before the 2nd attempt
+    max_delay: float = 20.0
+    multiplier: float = 2.0
+    jitter: float = 1.0                     # 1.0 = "full jitter", 0 = none
+    deadline: Optional[float] = 120.0       # total seconds across all attempts
+
+    def delay(self, attempt: int, error: BaseException) -> float:
+        """Seconds to wait after failed *attempt* (1-based)."""
+        backoff = min(self.max_delay, self.base_delay * self.multiplier ** (attempt - 1))
+        backoff = backoff * (1 - self.jitter) + random.uniform(0, backoff * self.jitter)
+        retry_after = getattr(error, "retry_after", None) or 0.0
+        return max(backoff, retry_after)
+
+    def allows(self, attempt: int, started: float, delay: float) -> bool:
+        """Whether another attempt fits the attempt count and deadline budget."""
+        if attempt >= self.max_attempts:
+            return False
+        return self.deadline is None or time.monotonic() - started + delay <= self.deadline
+
+
+class LatencyWindow:
+    """Rolling window of latency samples with a cheap quantile query."""
+
+    def __init__(self, size: int = 256, min_samples: int = 20) -> None:
+        self._samples: deque[float] = deque(maxlen=size)
+        self._min_samples = min_samples
+        self._lock = threading.Lock()
+
+    def add(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """The *q*-quantile, or None until enough samples have been seen."""
+        with self._lock:
+            if len(self._samples) < self._min_samples:
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class RetryingClient(DelegatingClient):
+    """Retries transient provider failures and optionally hedges slow calls."""
+
+    def __init__(
+        self,
+        inner: AbstractModelClient,
+        policy: Optional[RetryPolicy] = None,
+        *,
+        hedge: Union[bool, float] = False,
+        hedge_quantile: float = 0.95,
+        max_hedge_workers: int = 64,
+    ) -> None:
+        super().__init__(inner)
+        self.policy = policy or RetryPolicy()
+        self._hedge = hedge
+        self._hedge_quantile = hedge_quantile
+        self._ttft = {True: LatencyWindow(), False: LatencyWindow()}    # keyed by stream
+        self._max_hedge_workers = max_hedge_workers
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._pool_lock = threading.Lock()
+        self.retries = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    # ── sync ───────────────────────────────────────────────────────────────
+    def respond(
+        self,
+        messages: Iterable[message],
+        *,
+        stream: bool = False,
+        **kwargs: Any,
+    ) -> ChatResponse:
+        msgs = list(messages)
+
+        def attempt() -> ChatResponse:
+            started = time.monotonic()
+            reply = self._inner.respond(msgs, stream=stream, **kwargs)
+            if stream:
+                reply.prefetch()
+            self._ttft[stream].add(time.monotonic() - started)
+            return reply
+
+        return self._retry(lambda: self._hedged(attempt, stream))
+
+    def _retry(self, call: Callable[[], Any]) -> Any:
+        started, attempt = time.monotonic(), 0
+        while True:
+            attempt += 1
+            try:
+                return call()
+            except RetryableProviderError as exc:
+                delay = self.policy.delay(attempt, exc)
+                if not self.policy.allows(attempt, started, delay):
+                    raise
+                self.retries += 1
+                _note_retry()
+                time.sleep(delay)
+
+    def _hedged(self, attempt: Callable[[], Any], stream: bool) -> Any:
+        threshold = self._hedge_threshold(stream)
+        if threshold is None:
+            return attempt()
+
+        # each attempt runs in a copy of the caller's context, so the current
+        # call record, scheduling request and rate-limit budget follow it
+        pool = self._executor()
+        primary = pool.submit(contextvars.copy_context().run, attempt)
+        done, _ = wait([primary], timeout=threshold)
+        if done:
+            return primary.result()
+
+        self.hedges += 1
+        _note_hedge()
+        backup = pool.submit(contextvars.copy_context().run, attempt)
+        pending = [primary, backup]
+        error: Optional[BaseException] = None
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in [f for f in pending if f in done]:
+                pending.remove(future)
+                if future.exception() is None:
+                    for loser in pending:
+                        loser.cancel()
+                        loser.add_done_callback(_discard)
+                    if future is backup:
+                        self.hedge_wins += 1
+                    return future.result()
+                error = future.exception()
+        assert error is not None
+        raise error
+
+    def _executor(self) -> ThreadPoolExecutor:
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(
+                    max_workers=self._max_hedge_workers, thread_name_prefix="mychatai-hedge"
+                )
+            return self._pool
+
+    # ── async ──────────────────────────────────────────────────────────────
+    async def arespond(
+        self,
+        messages: Iterable[message],
+        *,
+        stream: bool = False,
+        **kwargs: Any,
+    ) -> ChatResponse:
+        msgs = list(messages)
+
+        async def attempt() -> ChatResponse:
+            started = time.monotonic()
+            reply = await self._inner.arespond(msgs, stream=stream, **kwargs)
+            if stream:
+                await reply.aprefetch()
+            self._ttft[stream].add(time.monotonic() - started)
+            return reply
+
+        return await self._aretry(lambda: self._ahedged(attempt, stream))
+
+    async def _aretry(self, call: Callable[[], Awaitable[Any]]) -> Any:
+        started, attempt = time.monotonic(), 0
+        while True:
+            attempt += 1
+            try:
+                return await call()
+            except RetryableProviderError as exc:
+                delay = self.policy.delay(attempt, exc)
+                if not self.policy.allows(attempt, started, delay):
+                    raise
+                self.retries += 1
+                _note_retry()
+                await asyncio.sleep(delay)
+
+    async def _ahedged(self, attempt: Callable[[], Awaitable[Any]], stream: bool) -> Any:
+        threshold = self._hedge_threshold(stream)
+        if threshold is None:
+            return await attempt()
+
+        primary = asyncio.ensure_future(attempt())
+        try:
+            return await asyncio.wait_for(asyncio.shield(primary), threshold)
+        except asyncio.TimeoutError:
+            pass
+        except BaseException:
+            primary.cancel()
+            raise
+
+        self.hedges += 1
+        _note_hedge()
+        backup = asyncio.ensure_future(attempt())
+        pending = {primary, backup}
+        error: Optional[BaseException] = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                winners = [t for t in done if t.exception() is None]
+                if winners:
+                    for extra in winners[1:]:
+                        _adiscard(extra)
+                    if winners[0] is backup:
+                        self.hedge_wins += 1
+                    return winners[0].result()
+                error = next(iter(done)).exception()
+        finally:
+            for loser in pending:
+                loser.cancel()
+                loser.add_done_callback(_adiscard)
+        assert error is not None
+        raise error
+
+    # ── shared ─────────────────────────────────────────────────────────────
+    def _hedge_threshold(self, stream: bool) -> Optional[float]:
+        if self._hedge is False:
+            return None
+        if self._hedge is True:
+            return self._ttft[stream].quantile(self._hedge_quantile)
+        return float(self._hedge)
+
+
+# ── helpers ────────────────────────────────────────────────────────────────
+def _note_retry() -> None:
+    call = current_call()
+    if call is not None:
+        call.retries += 1
+
+
+def _note_hedge() -> None:
+    call = current_call()
+    if call is not None:
+        call.hedged = True
+
+
+def _discard(future: Future) -> None:
+    """Close the stream a losing hedge produced after the race was decided."""
+    if future.cancelled() or future.exception() is not None:
+        return
+    future.result().close()
+
+
+def _adiscard(task: asyncio.Future) -> None:
+    if task.cancelled() or task.exception() is not None:
+        return
+    reply = task.result()
+    if not reply.done:
+        asyncio.ensure_future(reply.aclose())
@@ -0,0 +1,539 @@
+"""
+Priority scheduling with weighted fair queuing, deadlines and load shedding.
+
+Wrap a client so its calls are admitted by a per-provider :class:`Scheduler`:
+
+    from mychatai.scheduler import ScheduledClient, scheduling
+    chat = ChatService(ScheduledClient(OpenAIClient()))
+
+    with scheduling(priority="interactive", tenant="alice", timeout=5.0):
+        chat.answer("What is camera calibration?")
+
+Calls beyond the scheduler's concurrency wait in a queue per priority class
+(``interactive`` before ``default`` before ``batch``).  Within a class,
+tenants get slots in proportion to their weight (start-time fair queuing,
+with each call costing its estimated tokens), so one tenant's flood can't
+monopolise the class.
+
+A call whose *timeout* can't be met is rejected up front with
+``OverloadedError(reason="deadline")``, judged from the queue ahead of it and
+the measured time calls hold a slot.  A full queue sheds its newest
+lowest-priority waiter to make room for more important work, or rejects
+the newcomer (``"shed"`` / ``"queue_full"``).  ``OverloadedError`` is
+retryable and maps to HTTP 503 in the gateway.
+
+``ChatService.answer_many`` and friends run at ``batch`` priority unless the
+caller chose one.  ``Scheduler.stats()`` reports queue depth, admissions,
+rejections and wait-time percentiles per class; with instrumentation on,
+each ``CallRecord`` carries its ``queue_wait``.
+"""
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import heapq
+import itertools
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass, replace
+from typing import (
+    Any,
+    AsyncGenerator,
+    AsyncIterable,
+    Awaitable,
+    Callable,
+    Dict,
+    Generator,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Tuple,
+    TypeVar,
+)
+
+from .clients.base import AbstractModelClient, DelegatingClient, ReleaseOnce, message
+from .clients.response import ChatChunk, ChatResponse, _aclose
+from .config import settings
+from .exceptions import OverloadedError
+from .instrumentation import current_call
+from .tokens import count_messages
+
+T = TypeVar("T")
+
+# Lower rank is served first.
+PRIORITIES: Dict[str, int] = {"interactive": 0, "default": 1, "batch": 2}
+_NAMES = sorted(PRIORITIES, key=PRIORITIES.__getitem__)
+
+_WAITING, _GRANTED, _REJECTED, _ABANDONED = range(4)
+
+
+# ── per-request scheduling context ─────────────────────────────────────────
+@dataclass(frozen=True)
+class RequestContext:
+    priority: Optional[str] = None      # None: the client's default
+    tenant: str = ""
+    deadline: Optional[float] = None    # time.monotonic() by which the call must be done
+
+
+_request: contextvars.ContextVar[RequestContext] = contextvars.ContextVar(
+    "mychatai_request", default=RequestContext()
+)
+
+
+def current_request() -> RequestContext:
+    return _request.get()
+
+
+@contextmanager
+def scheduling(
+    priority: Optional[str] = None,
+    tenant: Optional[str] = None,
+    timeout: Optional[float] = None,
+) -> Iterator[RequestContext]:
+    """Schedule calls made inside the block with these settings (nested blocks refine outer ones)."""
+    if priority is not None and priority not in PRIORITIES:
+        raise ValueError(f"unknown priority {priority!r}; choose from {', '.join(_NAMES)}")
+    current = _request.get()
+    deadline = current.deadline
+    if timeout is not None:
+        ends = time.monotonic() + timeout
+        deadline = ends if deadline is None else min(deadline, ends)
+    request = RequestContext(
+        priority or current.priority,
+        current.tenant if tenant is None else tenant,
+        deadline,
+    )
+    token = _request.set(request)
+    try:
+        yield request
+    finally:
+        _request.reset(token)
+
+
+def batch_request() -> RequestContext:
+    """The caller's request context, at ``batch`` priority unless one was chosen."""
+    request = _request.get()
+    return request if request.priority is not None else replace(request, priority="batch")
+
+
+def run_as(request: RequestContext, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Call *fn* under *request* (e.g. on a worker thread, which starts with an empty context)."""
+    token = _request.set(request)
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        _request.reset(token)
+
+
+async def arun_as(request: RequestContext, fn: Callable[..., Awaitable[T]], *args: Any, **kwargs: Any) -> T:
+    token = _request.set(request)
+    try:
+        return await fn(*args, **kwargs)
+    finally:
+        _request.reset(token)
+
+
+# ── scheduler ──────────────────────────────────────────────────────────────
+class _Waiter:
+    __slots__ = (
+        "rank", "tenant", "start", "seq", "deadline", "enqueued",
+        "state", "reason", "granted", "event", "loop", "future",
+    )
+
+    def __init__(self, rank: int, tenant: str, start: float, seq: int, deadline: Optional[float]) -> None:
+        self.rank = rank
+        self.tenant = tenant
+        self.start = start
+        self.seq = seq
+        self.deadline = deadline
+        self.enqueued = time.monotonic()
+        self.state = _WAITING
+        self.reason = ""
+        self.granted = 0.0
+        self.event: Optional[threading.Event] = None
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.future: Optional[asyncio.Future] = None
+
+
+class _ClassStats:
+    def __init__(self, window: int) -> None:
+        self.admitted = 0
+        self.rejected: Dict[str, int] = {}
+        self.waits: deque[float] = deque(maxlen=window)
+
+
+class Scheduler:
+    """
+    Admits at most *concurrency* calls at once; the rest queue by priority
+    class and, within a class, fairly across tenants.  Shared by threads
+    and coroutines.
+    """
+
+    def __init__(
+        self,
+        concurrency: int = 32,
+        *,
+        max_queue: int = 1024,
+        weights: Optional[Mapping[str, float]] = None,
+        alpha: float = 0.2,
+        window: int = 2048,
+    ) -> None:
+        """
+        max_queue – waiting calls (all classes) before shedding starts.
+        weights   – tenant → share of its class (default 1).
+        alpha     – EWMA factor for the time calls hold a slot.
+        window    – recent wait times kept per class for the percentiles.
+        """
+        if concurrency < 1:
+            raise ValueError("concurrency must be >= 1")
+        self._concurrency = concurrency
+        self._max_queue = max_queue
+        self._weights = dict(weights or {})
+        self._alpha = alpha
+        self._lock = threading.Lock()
+        self._queues: List[List[Tuple[float, int, _Waiter]]] = [[] for _ in _NAMES]
+        self._depth = [0] * len(_NAMES)
+        self._virtual = [0.0] * len(_NAMES)                 # per class
+        self._tags: Dict[Tuple[int, str], float] = {}        # (class, tenant) → last finish tag
+        self._seq = itertools.count()
+        self._in_flight = 0
+        self._service: Optional[float] = None               # EWMA seconds a call holds a slot
+        self._stats = [_ClassStats(window) for _ in _NAMES]
+
+    @property
+    def concurrency(self) -> int:
+        return self._concurrency
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    @property
+    def queued(self) -> int:
+        return sum(self._depth)
+
+    # ── admission ──────────────────────────────────────────────────────────
+    def acquire(self, request: RequestContext, cost: float = 1.0) -> float:
+        """Block until the call may start; returns the grant time (pass it to :meth:`release`)."""
+        with self._lock:
+            waiter = self._enqueue(request, cost)
+            if waiter.state == _GRANTED:
+                return waiter.granted
+            waiter.event = threading.Event()
+        waiter.event.wait(self._patience(waiter))
+        return self._outcome(waiter)
+
+    async def aacquire(self, request: RequestContext, cost: float = 1.0) -> float:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            waiter = self._enqueue(request, cost)
+            if waiter.state == _GRANTED:
+                return waiter.granted
+            waiter.loop, waiter.future = loop, loop.create_future()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), self._patience(waiter))
+        except asyncio.TimeoutError:
+            pass
+        except asyncio.CancelledError:
+            with self._lock:
+                if waiter.state == _WAITING:
+                    self._abandon(waiter)
+                elif waiter.state == _GRANTED:          # granted as we were cancelled
+                    self._in_flight -= 1
+                    self._dispatch()
+            raise
+        return self._outcome(waiter)
+
+    def release(self, granted: float) -> None:
+        """Free the slot taken at *granted* and start the next waiter."""
+        held = time.monotonic() - granted
+        with self._lock:
+            self._in_flight -= 1
+            self._service = held if self._service is None else (
+                (1 - self._alpha) * self._service + self._alpha * held
+            )
+            self._dispatch()
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth, admissions, rejections and recent wait times per class."""
+        with self._lock:
+            classes: Dict[str, Any] = {}
+            for name in _NAMES:
+                rank = PRIORITIES[name]
+                s = self._stats[rank]
+                waits = sorted(s.waits)
+                classes[name] = {
+                    "queued": self._depth[rank],
+                    "admitted": s.admitted,
+                    "rejected": dict(s.rejected),
+                    "wait_mean": sum(waits) / len(waits) if waits else None,
+                    "wait_p50": _percentile(waits, 0.50),
+                    "wait_p95": _percentile(waits, 0.95),
+                    "wait_p99": _percentile(waits, 0.99),
+                }
+            return {
+                "concurrency": self._concurrency,
+                "in_flight": self._in_flight,
+                "queued": sum(self._depth),
+                "service_time": self._service,
+                "priorities": classes,
+            }
+
+    # ── internals (lock held) ──────────────────────────────────────────────
+    def _enqueue(self, request: RequestContext, cost: float) -> _Waiter:
+        rank = PRIORITIES[request.priority or "default"]
+        now = time.monotonic()
+        if request.deadline is not None and now + self._expected_wait(rank) + (self._service or 0.0) > request.deadline:
+            self._reject(rank, "deadline")
+            raise OverloadedError(
+                "deadline can't be met at the current queue length", reason="deadline"
+            )
+        tenant = request.tenant
+        waiter = _Waiter(rank, tenant, 0.0, next(self._seq), request.deadline)
+        if self._in_flight < self._concurrency and not any(self._depth):     # idle: no queuing
+            self._grant(waiter, now)
+            return waiter
+
+        if sum(self._depth) >= self._max_queue:
+            victim = self._shed_candidate(rank)
+            if victim is None:
+                self._reject(rank, "queue_full")
+                raise OverloadedError("scheduler queue is full", reason="queue_full", retry_after=self._service)
+            self._abandon(victim)
+            victim.state, victim.reason = _REJECTED, "shed"
+            self._reject(victim.rank, "shed")
+            _signal(victim)
+
+        # start-time fair queuing: a tenant's calls are spaced by cost / weight
+        key = (rank, tenant)
+        waiter.start = max(self._virtual[rank], self._tags.get(key, 0.0))
+        self._tags[key] = waiter.start + cost / self._weights.get(tenant, 1.0)
+        if len(self._tags) > 4 * self._max_queue:
+            self._tags = {k: v for k, v in self._tags.items() if v > self._virtual[k[0]]}
+        heapq.heappush(self._queues[rank], (waiter.start, waiter.seq, waiter))
+        self._depth[rank] += 1
+        self._dispatch()
+        return waiter
+
+    def _dispatch(self) -> None:
+        while self._in_flight < self._concurrency:
+            waiter = self._pop()
+            if waiter is None:
+                return
+            now = time.monotonic()
+            if waiter.deadline is not None and now + (self._service or 0.0) > waiter.deadline:
+                waiter.state, waiter.reason = _REJECTED, "deadline"
+                self._reject(waiter.rank, "deadline")
+                _signal(waiter)
+                continue
+            self._virtual[waiter.rank] = max(self._virtual[waiter.rank], waiter.start)
+            self._grant(waiter, now)
+            _signal(waiter)
+
+    def _grant(self, waiter: _Waiter, now: float) -> None:
+        waiter.state, waiter.granted = _GRANTED, now
+        self._in_flight += 1
+        stats = self._stats[waiter.rank]
+        stats.admitted += 1
+        stats.waits.append(now - waiter.enqueued)
+
+    def _pop(self) -> Optional[_Waiter]:
+        for rank, heap in enumerate(self._queues):
+            while heap:
+                waiter = heapq.heappop(heap)[2]
+                if waiter.state == _WAITING:
+                    self._depth[rank] -= 1
+                    return waiter
+        return None
+
+    def _shed_candidate(self, rank: int) -> Optional[_Waiter]:
+        """The newest waiter of the least important class below *rank*."""
+        for lower in range(len(_NAMES) - 1, rank, -1):
+            waiting = [w for _, _, w in self._queues[lower] if w.state == _WAITING]
+            if waiting:
+                return max(waiting, key=lambda w: w.seq)
+        return None
+
+    def _abandon(self, waiter: _Waiter) -> None:
+        waiter.state = _ABANDONED
+        self._depth[waiter.rank] -= 1
+
+    def _expected_wait(self, rank: int) -> float:
+        ahead = sum(self._depth[: rank + 1])
+        if not ahead and self._in_flight < self._concurrency:
+            return 0.0
+        return (ahead + 1) / self._concurrency * (self._service or 0.0)
+
+    def _patience(self, waiter: _Waiter) -> Optional[float]:
+        """How long *waiter* may queue and still finish by its deadline."""
+        if waiter.deadline is None:
+            return None
+        return max(0.0, waiter.deadline - time.monotonic() - (self._service or 0.0))
+
+    def _reject(self, rank: int, reason: str) -> None:
+        rejected = self._stats[rank].rejected
+        rejected[reason] = rejected.get(reason, 0) + 1
+
+    def _outcome(self, waiter: _Waiter) -> float:
+        with self._lock:
+            if waiter.state == _WAITING:                # patience ran out in the queue
+                self._abandon(waiter)
+                waiter.state, waiter.reason = _REJECTED, "deadline"
+                self._reject(waiter.rank, "deadline")
+            if waiter.state == _GRANTED:
+                return waiter.granted
+        if waiter.reason == "deadline":
+            raise OverloadedError("deadline can't be met at the current queue length", reason="deadline")
+        raise OverloadedError(
+            "shed to make room for higher-priority requests", reason=waiter.reason, retry_after=self._service
+        )
+
+
+def _signal(waiter: _Waiter) -> None:
+    if waiter.event is not None:
+        waiter.event.set()
+    elif waiter.loop is not None and waiter.future is not None:
+        waiter.loop.call_soon_threadsafe(_resolve, waiter.future)
+
+
+def _resolve(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+def _percentile(ordered: List[float], q: float) -> Optional[float]:
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class SchedulerRegistry:
+    """One :class:`Scheduler` per provider, sized from ``Settings``."""
+
+    def __init__(self) -> None:
+        self._schedulers: Dict[str, Scheduler] = {}
+        self._lock = threading.Lock()
+
+    def get(self, provider: str) -> Scheduler:
+        with self._lock:
+            scheduler = self._schedulers.get(provider)
+            if scheduler is None:
+                scheduler = self._schedulers[provider] = Scheduler(
+                    settings.scheduler_concurrency.get(provider, settings.scheduler_default_concurrency),
+                    max_queue=settings.scheduler_max_queue,
+                    weights=settings.scheduler_tenant_weights,
+                )
+            return scheduler
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            schedulers = dict(self._schedulers)
+        return {name: s.stats() for name, s in schedulers.items()}
+
+
+schedulers = SchedulerRegistry()
+
+
+# ── client wrapper ─────────────────────────────────────────────────────────
+class ScheduledClient(DelegatingClient):
+    """Admits calls to the wrapped client through its provider's :class:`Scheduler`."""
+
+    def __init__(
+        self,
+        inner: AbstractModelClient,
+        *,
+        scheduler: Optional[Scheduler] = None,
+        priority: str = "default",
+    ) -> None:
+        """priority – class for calls made outside any ``scheduling()`` block."""
+        super().__init__(inner)
+        if priority not in PRIORITIES:
+            raise ValueError(f"unknown priority {priority!r}; choose from {', '.join(_NAMES)}")
+        self._scheduler = scheduler or schedulers.get(inner.provider or type(inner).__name__)
+        self._priority = priority
+
+    @property
+    def scheduler(self) -> Scheduler:
+        return self._scheduler
+
+    def respond(
+        self,
+        messages: Iterable[message],
+        *,
+        stream: bool = False,
+        **kwargs: Any,
+    ) -> ChatResponse:
+        msgs = list(messages)
+        request = self._request()
+        arrived = time.monotonic()
+        granted = self._scheduler.acquire(request, self._cost(msgs, kwargs))
+        _note(request, granted - arrived)
+        try:
+            reply = self._inner.respond(msgs, stream=stream, **kwargs)
+        except BaseException:
+            self._scheduler.release(granted)
+            raise
+        if stream:
+            release = ReleaseOnce(lambda: self._scheduler.release(granted))
+            return reply.pipe(lambda chunks: self._track(chunks, release))
+        self._scheduler.release(granted)
+        return reply
+
+    async def arespond(
+        self,
+        messages: Iterable[message],
+        *,
+        stream: bool = False,
+        **kwargs: Any,
+    ) -> ChatResponse:
+        msgs = list(messages)
+        request = self._request()
+        arrived = time.monotonic()
+        granted = await self._scheduler.aacquire(request, self._cost(msgs, kwargs))
+        _note(request, granted - arrived)
+        try:
+            reply = await self._inner.arespond(msgs, stream=stream, **kwargs)
+        except BaseException:
+            self._scheduler.release(granted)
+            raise
+        if stream:
+            release = ReleaseOnce(lambda: self._scheduler.release(granted))
+            return reply.pipe(lambda chunks: self._atrack(chunks, release))
+        self._scheduler.release(granted)
+        return reply
+
+    # A stream holds its slot until it is exhausted, closed or dropped
+    # (*release* frees it when a stream that was never read is collected).
+    def _track(self, chunks: Iterable[ChatChunk], release: ReleaseOnce) -> Generator[ChatChunk, None, None]:
+        try:
+            yield from chunks
+        finally:
+            release()
+
+    async def _atrack(self, chunks: AsyncIterable[ChatChunk], release: ReleaseOnce) -> AsyncGenerator[ChatChunk, None]:
+        try:
+            async for chunk in chunks:
+                yield chunk
+        finally:
+            await _aclose(chunks)
+            release()
+
+    def _request(self) -> RequestContext:
+        request = _request.get()
+        return request if request.priority is not None else replace(request, priority=self._priority)
+
+    def _cost(self, msgs: List[message], kwargs: Mapping[str, Any]) -> float:
+        """Fair-queuing cost: estimated prompt + reply tokens."""
+        reply = kwargs.get("max_tokens") or settings.expected_output_tokens
+        return count_messages(msgs, self.provider, self.model) + reply
+
+
+def _note(request: RequestContext, wait: float) -> None:
+    record = current_call()
+    if record is not None:
+        record.queue_wait = wait
+        record.attributes["priority"] = request.priority
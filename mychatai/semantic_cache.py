@@ -0,0 +1,362 @@
+"""
+Semantic (embedding-similarity) response cache for ``ChatService``.
+
+Paraphrases such as "What is camera calibration?" and "explain camera
+calibration" never share an exact-match key.  This cache embeds each
+question and answers from the most similar stored question once their
+cosine similarity reaches *threshold*:
+
+    from mychatai.semantic_cache import SemanticCache, OllamaEmbedder
+    cache = SemanticCache(OllamaEmbedder(), path="~/.mychatai/semantic", threshold=0.9)
+    chat = ChatService(OllamaClient(), semantic_cache=cache)
+    cache.stats.as_dict()       # hits, misses, near misses, mean hit similarity, ...
+
+Vectors are unit-normalised float32 rows of one matrix, memory-mapped from
+``vectors.f32`` when *path* is given (metadata in ``index.db`` next to it).
+A lookup is a single matrix-vector product over that matrix.  Answers are
+only shared between calls with the same provider, model, system prompt and
+sampling options (the *scope*).
+
+Needs NumPy (``pip install -e .[semantic]``).
+"""
+from __future__ import annotations
+
+import asyncio
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Sequence, Union
+
+import numpy as np
+
+from .cache import CacheStats
+from .config import settings
+
+if TYPE_CHECKING:
+    from .clients.ollama import OllamaClient
+
+
+# ── Embedders ──────────────────────────────────────────────────────────────
+class Embedder(ABC):
+    """Turns texts into vectors (one row per text)."""
+
+    @abstractmethod
+    def embed(self, texts: Sequence[str]) -> Any:
+        """An (n, dim) array-like of embeddings."""
+
+    async def aembed(self, texts: Sequence[str]) -> Any:
+        """Async :meth:`embed`; runs it on a worker thread unless overridden."""
+        return await asyncio.to_thread(self.embed, list(texts))
+
+
+class OllamaEmbedder(Embedder):
+    """Embeddings from a local Ollama server (``/api/embed``)."""
+
+    def __init__(self, model: Optional[str] = None, *, client: Optional["OllamaClient"] = None) -> None:
+        if client is None:
+            from .clients.ollama import OllamaClient
+            client = OllamaClient()
+        self._client = client
+        self._model = model or settings.ollama_embed_model
+
+    def embed(self, texts: Sequence[str]) -> Any:
+        return self._client.embed(texts, model=self._model)
+
+    async def aembed(self, texts: Sequence[str]) -> Any:
+        return await self._client.aembed(texts, model=self._model)
+
+
+class SentenceTransformerEmbedder(Embedder):
+    """In-process embeddings with ``sentence-transformers`` (optional dependency)."""
+
+    def __init__(self, model_name: str = "all-MiniLM-L6-v2", **model_kwargs: Any) -> None:
+        from sentence_transformers import SentenceTransformer
+
+        self._model = SentenceTransformer(model_name, **model_kwargs)
+
+    def embed(self, texts: Sequence[str]) -> Any:
+        return self._model.encode(list(texts), convert_to_numpy=True)
+
+
+class _FunctionEmbedder(Embedder):
+    def __init__(self, fn: Callable[[Sequence[str]], Any]) -> None:
+        self._fn = fn
+
+    def embed(self, texts: Sequence[str]) -> Any:
+        return self._fn(texts)
+
+
+# ── Stats & results ────────────────────────────────────────────────────────
+@dataclass
+class SemanticCacheStats(CacheStats):
+    near_misses: int = 0            # best match fell just short of the threshold
+    rejected: int = 0               # hits reported wrong through SemanticCache.reject()
+    similarity_total: float = 0.0   # summed similarity of all hits
+
+    @property
+    def mean_hit_similarity(self) -> float:
+        return self.similarity_total / self.hits if self.hits else 0.0
+
+    @property
+    def precision(self) -> float:
+        """Share of hits not rejected as wrong answers."""
+        return 1.0 - self.rejected / self.hits if self.hits else 1.0
+
+    def as_dict(self) -> dict[str, float]:
+        return {
+            **super().as_dict(),
+            "mean_hit_similarity": self.mean_hit_similarity,
+            "precision": self.precision,
+        }
+
+
+@dataclass
+class SemanticHit:
+    answer: str
+    question: str           # the stored question that matched
+    similarity: float
+    slot: int
+
+
+# ── The cache ──────────────────────────────────────────────────────────────
+class SemanticCache:
+    """
+    embedder     – an :class:`Embedder` or a plain ``texts -> vectors`` callable.
+    path         – directory to persist the index in (None = in memory).
+    threshold    – minimum cosine similarity for a hit
+                   (default ``settings.semantic_cache_threshold``).
+    max_entries  – least recently used entries are evicted beyond this.
+    ttl          – seconds an entry stays valid (None = forever).
+    near_miss    – misses within this distance below *threshold* are
+                   counted as ``stats.near_misses`` (a threshold-tuning aid).
+    """
+
+    _GROWTH = 1024                  # rows added to the vector file at a time
+
+    def __init__(
+        self,
+        embedder: Union[Embedder, Callable[[Sequence[str]], Any]],
+        *,
+        path: Union[str, Path, None] = None,
+        threshold: Optional[float] = None,
+        max_entries: int = 10_000,
+        ttl: Optional[float] = None,
+        near_miss: float = 0.05,
+    ) -> None:
+        self._embedder = embedder if isinstance(embedder, Embedder) else _FunctionEmbedder(embedder)
+        self.threshold = settings.semantic_cache_threshold if threshold is None else threshold
+        self._max_entries = max_entries
+        self._ttl = ttl
+        self._near_miss = near_miss
+        self.stats = SemanticCacheStats()
+        self._lock = threading.RLock()
+
+        self._dir = Path(path).expanduser() if path is not None else None
+        if self._dir is not None:
+            self._dir.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(
+            self._dir / "index.db" if self._dir else ":memory:",
+            check_same_thread=False,
+            isolation_level=None,
+        )
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            " slot INTEGER PRIMARY KEY, scope TEXT NOT NULL, question TEXT NOT NULL,"
+            " answer TEXT NOT NULL, created REAL NOT NULL, accessed REAL NOT NULL,"
+            " hits INTEGER NOT NULL DEFAULT 0)"
+        )
+        self._db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER)")
+
+        # Per-slot mirrors of the metadata the search needs, kept as arrays so
+        # masking and eviction are vectorised.  scope id -1 = free slot.
+        self._vectors: Optional[np.ndarray] = None
+        self._dim = 0
+        self._size = 0                              # slots ever used (high-water mark)
+        self._scope_of = np.full(0, -1, dtype=np.int32)
+        self._created = np.zeros(0)
+        self._accessed = np.zeros(0)
+        self._scope_ids: Dict[str, int] = {}
+        self._free: List[int] = []
+        self._load()
+
+    # ── public API ─────────────────────────────────────────────────────────
+    def embed(self, text: str) -> np.ndarray:
+        """The unit-length embedding of *text*."""
+        return _unit(self._embedder.embed([text]))
+
+    async def aembed(self, text: str) -> np.ndarray:
+        return _unit(await self._embedder.aembed([text]))
+
+    def search(self, vector: np.ndarray, scope: str = "") -> Optional[SemanticHit]:
+        """The best stored answer for an embedded question, if similar enough."""
+        with self._lock:
+            scope_id = self._scope_ids.get(scope)
+            if scope_id is None or self._vectors is None or vector.shape[0] != self._dim:
+                self.stats.misses += 1
+                return None
+            n = self._size
+            similarity = self._vectors[:n] @ vector
+            valid = self._scope_of[:n] == scope_id
+            if self._ttl is not None:
+                valid &= self._created[:n] >= time.time() - self._ttl
+            similarity = np.where(valid, similarity, -np.inf)
+            slot = int(np.argmax(similarity))
+            best = float(similarity[slot])
+            if best < self.threshold:
+                self.stats.misses += 1
+                if best >= self.threshold - self._near_miss:
+                    self.stats.near_misses += 1
+                return None
+
+            now = time.time()
+            self._accessed[slot] = now
+            self._db.execute(
+                "UPDATE entries SET accessed = ?, hits = hits + 1 WHERE slot = ?", (now, slot)
+            )
+            question, answer = self._db.execute(
+                "SELECT question, answer FROM entries WHERE slot = ?", (slot,)
+            ).fetchone()
+            self.stats.hits += 1
+            self.stats.similarity_total += best
+            return SemanticHit(answer, question, best, slot)
+
+    def add(self, vector: np.ndarray, question: str, answer: str, scope: str = "") -> None:
+        """Store *answer* for an embedded question."""
+        with self._lock:
+            if self._vectors is None:
+                self._dim = vector.shape[0]
+                self._db.execute("INSERT OR REPLACE INTO meta VALUES ('dim', ?)", (self._dim,))
+            elif vector.shape[0] != self._dim:
+                raise ValueError(f"embedding has {vector.shape[0]} dimensions, index has {self._dim}")
+            if self._ttl is not None:
+                self._expire()
+            slot = self._take_slot()
+            scope_id = self._scope_ids.setdefault(scope, len(self._scope_ids))
+            now = time.time()
+            self._vectors[slot] = vector            # type: ignore[index]
+            self._scope_of[slot] = scope_id
+            self._created[slot] = self._accessed[slot] = now
+            self._db.execute(
+                "INSERT OR REPLACE INTO entries (slot, scope, question, answer, created, accessed)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (slot, scope, question, answer, now, now),
+            )
+
+    def lookup(self, question: str, scope: str = "") -> Optional[SemanticHit]:
+        return self.search(self.embed(question), scope)
+
+    async def alookup(self, question: str, scope: str = "") -> Optional[SemanticHit]:
+        return self.search(await self.aembed(question), scope)
+
+    def store(self, question: str, answer: str, scope: str = "") -> None:
+        self.add(self.embed(question), question, answer, scope)
+
+    async def astore(self, question: str, answer: str, scope: str = "") -> None:
+        self.add(await self.aembed(question), question, answer, scope)
+
+    def reject(self, hit: SemanticHit) -> None:
+        """Report a hit as a wrong answer: it is dropped and counted in ``stats.rejected``."""
+        with self._lock:
+            self.stats.rejected += 1
+            self._release(hit.slot)
+
+    def flush(self) -> None:
+        """Write the vector file to disk (metadata is written as it changes)."""
+        with self._lock:
+            if isinstance(self._vectors, np.memmap):
+                self._vectors.flush()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._db.execute("DELETE FROM entries")
+            self._scope_of[:] = -1
+            self._free = list(range(self._size - 1, -1, -1))
+
+    def close(self) -> None:
+        with self._lock:
+            self.flush()
+            self._vectors = None
+            self._db.close()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._size - len(self._free)
+
+    # ── internals ──────────────────────────────────────────────────────────
+    def _load(self) -> None:
+        row = self._db.execute("SELECT value FROM meta WHERE key = 'dim'").fetchone()
+        if row is None:
+            return
+        self._dim = row[0]
+        entries = self._db.execute("SELECT slot, scope, created, accessed FROM entries").fetchall()
+        self._size = max((slot for slot, *_ in entries), default=-1) + 1
+        self._grow(self._size)
+        used = set()
+        for slot, scope, created, accessed in entries:
+            self._scope_of[slot] = self._scope_ids.setdefault(scope, len(self._scope_ids))
+            self._created[slot], self._accessed[slot] = created, accessed
+            used.add(slot)
+        self._free = [slot for slot in range(self._size - 1, -1, -1) if slot not in used]
+
+    def _take_slot(self) -> int:
+        if len(self) >= self._max_entries:          # evict the least recently used
+            live = self._scope_of[: self._size] >= 0
+            slot = int(np.argmin(np.where(live, self._accessed[: self._size], np.inf)))
+            self._release(slot)
+            self.stats.evictions += 1
+        if self._free:
+            return self._free.pop()
+        self._grow(self._size + 1)
+        self._size += 1
+        return self._size - 1
+
+    def _release(self, slot: int) -> None:
+        if self._scope_of[slot] < 0:
+            return
+        self._scope_of[slot] = -1
+        self._free.append(slot)
+        self._db.execute("DELETE FROM entries WHERE slot = ?", (slot,))
+
+    def _expire(self) -> None:
+        stale = np.flatnonzero(
+            (self._scope_of[: self._size] >= 0)
+            & (self._created[: self._size] < time.time() - self._ttl)  # type: ignore[operator]
+        )
+        for slot in stale:
+            self._release(int(slot))
+        self.stats.evictions += len(stale)
+
+    def _grow(self, rows: int) -> None:
+        """Make room for at least *rows* vectors."""
+        capacity = 0 if self._vectors is None else self._vectors.shape[0]
+        if rows <= capacity:
+            return
+        capacity = -(-rows // self._GROWTH) * self._GROWTH
+        if self._dir is None:
+            vectors = np.zeros((capacity, self._dim), dtype=np.float32)
+            if self._vectors is not None:
+                vectors[: self._vectors.shape[0]] = self._vectors
+        else:
+            # the file only grows, so existing rows keep their offsets
+            path = self._dir / "vectors.f32"
+            if self._vectors is not None:
+                self._vectors.flush()   # type: ignore[union-attr]
+            with open(path, "ab") as f:
+                f.truncate(max(f.tell(), capacity * self._dim * 4))
+            vectors = np.memmap(path, dtype=np.float32, mode="r+", shape=(capacity, self._dim))
+        self._vectors = vectors
+        extra = capacity - self._scope_of.shape[0]
+        self._scope_of = np.concatenate([self._scope_of, np.full(extra, -1, dtype=np.int32)])
+        self._created = np.concatenate([self._created, np.zeros(extra)])
+        self._accessed = np.concatenate([self._accessed, np.zeros(extra)])
+
+
+def _unit(vectors: Any) -> np.ndarray:
+    vector = np.asarray(vectors, dtype=np.float32)[0]
+    norm = float(np.linalg.norm(vector))
+    return vector / norm if norm else vector
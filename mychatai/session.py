@@ -0,0 +1,423 @@
+"""
+Multi-turn conversations with bounded payloads.
+
+    chat = ChatService(OpenAIClient())
+    session = chat.session()                        # in-memory history
+    session.ask("What is camera calibration?")
+    session.ask("And how does it relate to epipolar geometry?")
+
+    # persistent, resumable by id, older turns condensed instead of dropped
+    session = chat.session("user-42", store=SQLiteSessionStore("~/.mychatai/sessions.db"),
+                           summarize=True)
+
+Turns are appended incrementally with their token counts, so each request
+only re-checks a running total.  When system prompt + history + question
+would exceed the context budget, the oldest turns fall out of the payload
+(they stay in the store), or with ``summarize`` are condensed into a
+summary that rides along in the system prompt.
+"""
+from __future__ import annotations
+
+import asyncio
+import sqlite3
+import threading
+import uuid
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    AsyncGenerator,
+    AsyncIterator,
+    Callable,
+    Dict,
+    Generator,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
+
+from .clients.base import message
+from .config import settings
+from .tokens import MESSAGE_OVERHEAD, tokenizer_for
+
+if TYPE_CHECKING:
+    from .chat_service import ChatService
+
+_SUMMARY_ROLE = "summary"
+
+_SUMMARY_PROMPT = (
+    "Summarise the conversation below for your own future reference. Keep facts, "
+    "names, numbers, decisions and open questions; drop pleasantries. Reply with "
+    "the summary only."
+)
+
+
+def approx_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token) plus per-message overhead."""
+    return len(text) // 4 + MESSAGE_OVERHEAD
+
+
+def _model_counter(service: "ChatService") -> Callable[[str], int]:
+    count = tokenizer_for(service.client.provider or "", service.client.model).count
+    return lambda text: count(text) + MESSAGE_OVERHEAD
+
+
+@dataclass
+class Turn:
+    """One stored message and its token count."""
+
+    role: str
+    content: str
+    tokens: int
+    _message: Optional[message] = field(default=None, repr=False, compare=False)
+
+    @property
+    def message(self) -> message:
+        """The chat-format dict, built once."""
+        if self._message is None:
+            self._message = {"role": self.role, "content": self.content}
+        return self._message
+
+
+# ── Stores ─────────────────────────────────────────────────────────────────
+class SessionStore(ABC):
+    """Persistence for conversation turns, keyed by session id."""
+
+    @abstractmethod
+    def load(self, session_id: str) -> List[Turn]:
+        """All stored turns, oldest first (a summary, if any, comes first)."""
+
+    @abstractmethod
+    def append(self, session_id: str, turns: Sequence[Turn]) -> None:
+        """Add *turns* after the existing ones."""
+
+    @abstractmethod
+    def compact(self, session_id: str, count: int, summary: Turn) -> None:
+        """Replace the first *count* turns with *summary*."""
+
+    @abstractmethod
+    def clear(self, session_id: str) -> None:
+        """Forget the session."""
+
+
+class MemorySessionStore(SessionStore):
+    """Process-local store; history is lost on exit."""
+
+    def __init__(self) -> None:
+        self._sessions: Dict[str, List[Turn]] = {}
+        self._lock = threading.Lock()
+
+    def load(self, session_id: str) -> List[Turn]:
+        with self._lock:
+            return list(self._sessions.get(session_id, ()))
+
+    def append(self, session_id: str, turns: Sequence[Turn]) -> None:
+        with self._lock:
+            self._sessions.setdefault(session_id, []).extend(turns)
+
+    def compact(self, session_id: str, count: int, summary: Turn) -> None:
+        with self._lock:
+            self._sessions.setdefault(session_id, [])[:count] = [summary]
+
+    def clear(self, session_id: str) -> None:
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+
+class SQLiteSessionStore(SessionStore):
+    """On-disk store; sessions survive restarts and can be shared between processes."""
+
+    def __init__(self, path: str | Path) -> None:
+        self._path = Path(path).expanduser()
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self._path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS turns ("
+            " session TEXT NOT NULL, seq INTEGER NOT NULL,"
+            " role TEXT NOT NULL, content TEXT NOT NULL, tokens INTEGER NOT NULL,"
+            " PRIMARY KEY (session, seq))"
+        )
+
+    def load(self, session_id: str) -> List[Turn]:
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT role, content, tokens FROM turns WHERE session = ? ORDER BY seq",
+                (session_id,),
+            ).fetchall()
+        return [Turn(role, content, tokens) for role, content, tokens in rows]
+
+    def append(self, session_id: str, turns: Sequence[Turn]) -> None:
+        with self._lock:
+            (last,) = self._db.execute(
+                "SELECT COALESCE(MAX(seq), -1) FROM turns WHERE session = ?", (session_id,)
+            ).fetchone()
+            self._db.executemany(
+                "INSERT INTO turns (session, seq, role, content, tokens) VALUES (?, ?, ?, ?, ?)",
+                [(session_id, last + 1 + i, t.role, t.content, t.tokens) for i, t in enumerate(turns)],
+            )
+
+    def compact(self, session_id: str, count: int, summary: Turn) -> None:
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT seq FROM turns WHERE session = ? ORDER BY seq LIMIT ?", (session_id, count)
+            ).fetchall()
+            if not rows:
+                return
+            self._db.execute("BEGIN")
+            try:
+                # the summary takes the slot of the newest turn it replaces
+                self._db.execute(
+                    "DELETE FROM turns WHERE session = ? AND seq <= ?", (session_id, rows[-1][0])
+                )
+                self._db.execute(
+                    "INSERT INTO turns (session, seq, role, content, tokens) VALUES (?, ?, ?, ?, ?)",
+                    (session_id, rows[-1][0], summary.role, summary.content, summary.tokens),
+                )
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+
+    def clear(self, session_id: str) -> None:
+        with self._lock:
+            self._db.execute("DELETE FROM turns WHERE session = ?", (session_id,))
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+# ── Session ────────────────────────────────────────────────────────────────
+Summarizer = Callable[[Optional[str], List[Turn]], str]
+
+
+class ChatSession:
+    """
+    One conversation on a ``ChatService``.  Not thread-safe: a conversation
+    is sequential, so give each concurrent conversation its own session.
+    """
+
+    def __init__(
+        self,
+        service: "ChatService",
+        *,
+        session_id: Optional[str] = None,
+        store: Optional[SessionStore] = None,
+        system_prompt: Optional[str] = None,
+        template: Optional[str] = None,
+        context_tokens: Optional[int] = None,
+        reply_tokens: Optional[int] = None,
+        summarize: Union[bool, Summarizer] = False,
+        token_counter: Optional[Callable[[str], int]] = None,
+    ) -> None:
+        """
+        system_prompt   – defaults to the service's prompt layout (see ``prompt_cache``).
+        template        – format string for user turns, e.g. ``"{question}"`` to
+                          send them verbatim; defaults to the service's layout.
+        context_tokens  – budget for system prompt + history + question
+                          (default ``settings.session_context_tokens``)…
+        reply_tokens    – …minus this much, kept free for the answer.
+        summarize       – condense turns that no longer fit instead of dropping
+                          them: True asks the session's own model, or pass
+                          ``fn(previous_summary, turns) -> str``.
+        token_counter   – ``fn(text) -> tokens`` used for every stored message;
+                          defaults to the model's tokenizer (see ``mychatai.tokens``).
+        """
+        self._service = service
+        self.session_id = session_id or uuid.uuid4().hex
+        self._store = store if store is not None else MemorySessionStore()
+        default_system, default_template = service.prompt_layout()
+        self._system = system_prompt if system_prompt is not None else default_system
+        self._template = template if template is not None else default_template
+        self._budget = (context_tokens or settings.session_context_tokens) - (
+            reply_tokens if reply_tokens is not None else settings.session_reply_tokens
+        )
+        self._count = token_counter or _model_counter(service)
+        if summarize is True:
+            self._summarizer: Optional[Summarizer] = self._summarize_with_model
+        else:
+            self._summarizer = summarize or None
+
+        turns = self._store.load(self.session_id)
+        self._summary: Optional[Turn] = None
+        if turns and turns[0].role == _SUMMARY_ROLE:
+            self._summary = turns.pop(0)
+        self._turns = turns
+        self._start = 0                                 # first turn still in the payload
+        self._window = sum(t.tokens for t in turns)     # tokens of turns[_start:]
+        self._system_tokens = self._count(self._system)
+
+    # ── asking ─────────────────────────────────────────────────────────────
+    def ask(self, question: str, stream: bool = False, **model_kwargs: Any) -> str | Generator[str, None, None]:
+        """Send *question* with the fitted history; the exchange is stored once answered."""
+        user = self._user_turn(question)
+        messages = self._prepare(user)
+        reply = self._service.complete(messages, stream=stream, **model_kwargs)
+        if stream:
+            return self._recording(user, reply)
+        self._commit(user, reply)
+        return reply
+
+    async def aask(
+        self, question: str, stream: bool = False, **model_kwargs: Any
+    ) -> str | AsyncGenerator[str, None]:
+        """Async :meth:`ask`; condensing asks the model asynchronously too."""
+        user = self._user_turn(question)
+        messages = await self._aprepare(user)
+        reply = await self._service.acomplete(messages, stream=stream, **model_kwargs)
+        if stream:
+            return self._arecording(user, reply)
+        self._commit(user, reply)
+        return reply
+
+    def messages(self, question: Optional[str] = None) -> List[message]:
+        """
+        The payload that would be sent for *question* (or the history alone).
+        Changes nothing: turns that :meth:`ask` would condense are left out,
+        but the summary isn't rewritten until it does.
+        """
+        user = self._user_turn(question) if question is not None else None
+        start, _, _ = self._fit(user)
+        return self._payload(start, user)
+
+    @property
+    def history(self) -> List[Turn]:
+        """Every stored turn (older ones may no longer be sent)."""
+        return list(self._turns)
+
+    @property
+    def summary(self) -> Optional[str]:
+        return self._summary.content if self._summary else None
+
+    @property
+    def window_tokens(self) -> int:
+        """Tokens of history currently sent with each request."""
+        return self._window
+
+    def reset(self) -> None:
+        """Forget the conversation (in the store too)."""
+        self._store.clear(self.session_id)
+        self._turns, self._summary, self._start, self._window = [], None, 0, 0
+
+    # ── internals ──────────────────────────────────────────────────────────
+    def _user_turn(self, question: str) -> Turn:
+        content = self._template.format(question=question)
+        return Turn("user", content, self._count(content))
+
+    # Planning (_fit, _payload) only reads the session; _prepare / _aprepare
+    # then apply the plan, condensing through the summarizer if it says so.
+    def _fit(self, user: Optional[Turn]) -> Tuple[int, int, bool]:
+        """(first turn to send, tokens from there on, whether the turns before it get condensed)."""
+        budget = self._budget - self._system_tokens - (user.tokens if user else 0)
+        if self._summary is not None:
+            budget -= self._summary.tokens
+        if self._window <= budget:
+            return self._start, self._window, False
+        if self._summarizer is None:
+            start, window = self._trim(budget)
+            return start, window, False
+        start, window = self._trim(budget // 2)            # free half the budget at once
+        return start, window, start > 0
+
+    def _trim(self, budget: int) -> Tuple[int, int]:
+        """Where the payload starts once the oldest turns are dropped until the rest fits."""
+        turns, start, window = self._turns, self._start, self._window
+        while start < len(turns) and (
+            window > budget or turns[start].role != "user"   # start on a user turn
+        ):
+            window -= turns[start].tokens
+            start += 1
+        return start, window
+
+    def _payload(self, start: int, user: Optional[Turn]) -> List[message]:
+        system = self._system
+        if self._summary is not None:
+            system = f"{system}\n\nSummary of the conversation so far:\n{self._summary.content}"
+        messages = [{"role": "system", "content": system}]
+        messages.extend(t.message for t in self._turns[start:])
+        if user is not None:
+            messages.append(user.message)
+        return messages
+
+    def _prepare(self, user: Turn) -> List[message]:
+        start, window, condense = self._fit(user)
+        if condense:
+            assert self._summarizer is not None
+            self._condense(start, window, self._summarizer(*self._to_condense(start)))
+        else:
+            self._start, self._window = start, window
+        return self._payload(self._start, user)
+
+    async def _aprepare(self, user: Turn) -> List[message]:
+        start, window, condense = self._fit(user)
+        if condense:
+            previous, dropped = self._to_condense(start)
+            if self._summarizer == self._summarize_with_model:
+                text = await self._service.acomplete(_summary_request(previous, dropped), stream=False)
+            else:
+                text = await asyncio.to_thread(self._summarizer, previous, dropped)   # type: ignore[arg-type]
+            self._condense(start, window, text)
+        else:
+            self._start, self._window = start, window
+        return self._payload(self._start, user)
+
+    def _to_condense(self, start: int) -> Tuple[Optional[str], List[Turn]]:
+        return (self._summary.content if self._summary else None), self._turns[:start]
+
+    def _condense(self, start: int, window: int, text: str) -> None:
+        """Replace the turns before *start* with the summary *text*."""
+        summary = Turn(_SUMMARY_ROLE, text, self._count(text))
+        self._store.compact(self.session_id, start + (self._summary is not None), summary)
+        self._summary = summary
+        self._turns = self._turns[start:]
+        self._start, self._window = 0, window
+
+    def _summarize_with_model(self, previous: Optional[str], turns: List[Turn]) -> str:
+        return self._service.complete(_summary_request(previous, turns), stream=False)
+
+    def _commit(self, user: Turn, reply: str) -> None:
+        assistant = Turn("assistant", reply, self._count(reply))
+        self._store.append(self.session_id, [user, assistant])
+        self._turns += (user, assistant)
+        self._window += user.tokens + assistant.tokens
+
+    def _recording(self, user: Turn, tokens: Iterator[str]) -> Generator[str, None, None]:
+        # Stored once the reply is complete, or with whatever the caller
+        # received if they stop reading early; a failed call stores nothing.
+        parts: List[str] = []
+        try:
+            for token in tokens:
+                parts.append(token)
+                yield token
+        except GeneratorExit:
+            if parts:
+                self._commit(user, "".join(parts))
+            raise
+        self._commit(user, "".join(parts))
+
+    async def _arecording(self, user: Turn, tokens: AsyncIterator[str]) -> AsyncGenerator[str, None]:
+        parts: List[str] = []
+        try:
+            async for token in tokens:
+                parts.append(token)
+                yield token
+        except GeneratorExit:
+            if parts:
+                self._commit(user, "".join(parts))
+            raise
+        self._commit(user, "".join(parts))
+
+
+def _summary_request(previous: Optional[str], turns: List[Turn]) -> List[message]:
+    transcript = "\n".join(f"{t.role.upper()}: {t.content}" for t in turns)
+    if previous:
+        transcript = f"Earlier summary: {previous}\n\n{transcript}"
+    return [{"role": "system", "content": _SUMMARY_PROMPT}, {"role": "user", "content": transcript}]
@@ -0,0 +1,342 @@
+"""
+Single-flight coalescing of identical in-flight requests.
+
+When N callers ask the same thing at the same time only the first (the
+*leader*) reaches the provider; the others wait for and share its result:
+
+    from mychatai.singleflight import flights
+    reply = flights.do(key, lambda: client.chat(messages))
+
+Streams are fanned out from one upstream token stream.  Every subscriber
+replays the tokens buffered so far and then follows the live stream, so a
+late joiner sees the whole reply.  Whichever subscriber is furthest ahead
+pulls the next token from upstream; nobody waits for a slow reader.
+
+A key leaves the in-flight table as soon as its call finishes (or its
+stream is exhausted), so later requests start a fresh call; pair this with
+``mychatai.cache`` to also serve those from memory.  Nobody pays for a call
+nobody is waiting for: when the last subscriber closes a stream early (or
+drops it unread) the upstream stream is closed, and when the last waiter of
+an async call is cancelled the call is cancelled.
+"""
+from __future__ import annotations
+
+import asyncio
+import threading
+from typing import (
+    Any,
+    AsyncGenerator,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    Generator,
+    Hashable,
+    Iterator,
+    List,
+    Optional,
+    TypeVar,
+)
+
+from .clients.base import ReleaseOnce
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """Per-key deduplication for sync and async calls and token streams."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self._streams: Dict[Hashable, _SharedStream] = {}
+        self._acalls: Dict[Hashable, _ACall] = {}
+        self._astreams: Dict[Hashable, _ASharedStream] = {}
+        self.coalesced = 0              # requests that piggy-backed on a leader
+
+    # ── sync ───────────────────────────────────────────────────────────────
+    def do(self, key: Hashable, fn: Callable[[], T]) -> T:
+        """Run *fn* once per concurrent *key*; every caller gets its result."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            return call.wait()
+
+        try:
+            call.result = fn()
+        except BaseException as exc:
+            call.error = exc
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+        return call.result
+
+    def stream(self, key: Hashable, factory: Callable[[], Iterator[str]]) -> Generator[str, None, None]:
+        """
+        Subscribe to the shared token stream for *key*.
+
+        *factory* opens the upstream stream; it is only called for the
+        leader, lazily on first iteration, so errors reach every subscriber.
+        """
+        with self._lock:
+            shared = self._streams.get(key)
+            if shared is None or shared.abandoned:
+                shared = self._streams[key] = _SharedStream(
+                    factory, lambda s: self._forget(self._streams, key, s), self._lock
+                )
+            else:
+                self.coalesced += 1
+            return shared.subscribe()
+
+    # ── async ──────────────────────────────────────────────────────────────
+    async def ado(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        """
+        Async :meth:`do`.  A cancelled caller never cancels the call while
+        others still wait for it; the last one to go cancels it.
+        """
+        loop_key = (asyncio.get_running_loop(), key)
+        with self._lock:
+            call = self._acalls.get(loop_key)
+            if call is None:
+                call = self._acalls[loop_key] = _ACall(asyncio.ensure_future(fn()))
+                call.task.add_done_callback(lambda t: self._forget(self._acalls, loop_key, call))
+            else:
+                self.coalesced += 1
+            call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        finally:
+            with self._lock:
+                call.waiters -= 1
+                orphaned = not call.waiters and not call.task.done()
+                if orphaned and self._acalls.get(loop_key) is call:
+                    del self._acalls[loop_key]
+            if orphaned:
+                call.task.cancel()
+
+    def astream(
+        self, key: Hashable, factory: Callable[[], Awaitable[AsyncIterator[str]]]
+    ) -> AsyncGenerator[str, None]:
+        """Async :meth:`stream`; *factory* is awaited lazily by the first reader."""
+        loop_key = (asyncio.get_running_loop(), key)
+        with self._lock:
+            shared = self._astreams.get(loop_key)
+            if shared is None or shared.abandoned:
+                shared = self._astreams[loop_key] = _ASharedStream(
+                    factory, lambda s: self._forget(self._astreams, loop_key, s), self._lock
+                )
+            else:
+                self.coalesced += 1
+            return shared.subscribe()
+
+    def in_flight(self) -> int:
+        """Number of distinct upstream calls currently running."""
+        return len(self._calls) + len(self._streams) + len(self._acalls) + len(self._astreams)
+
+    def _forget(self, table: Dict[Hashable, Any], key: Hashable, entry: Any) -> None:
+        with self._lock:
+            if table.get(key) is entry:
+                del table[key]
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+    def wait(self) -> Any:
+        self.done.wait()
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+class _ACall:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Future) -> None:
+        self.task = task
+        self.waiters = 0
+
+
+class _SharedStream:
+    """Token buffer fed from one upstream iterator, readable by many threads."""
+
+    def __init__(
+        self,
+        factory: Callable[[], Iterator[str]],
+        on_done: Callable[[Any], None],
+        lock: threading.Lock,
+    ) -> None:
+        """lock – the group's table lock; joining and leaving happen under it."""
+        self._factory = factory
+        self._source: Optional[Iterator[str]] = None
+        self._on_done = on_done
+        self._buffer: List[str] = []
+        self._done = False
+        self._error: Optional[BaseException] = None
+        self._pull_lock = threading.Lock()      # one upstream reader at a time
+        self._lock = lock
+        self._subscribers = 0
+        self.abandoned = False                  # every subscriber left before the end
+
+    def subscribe(self) -> Generator[str, None, None]:
+        """A new reader (the caller holds the group lock)."""
+        self._subscribers += 1
+        return self._read(ReleaseOnce(self._leave))
+
+    def _read(self, leave: ReleaseOnce) -> Generator[str, None, None]:
+        try:
+            i = 0
+            while True:
+                if i < len(self._buffer):
+                    yield self._buffer[i]
+                    i += 1
+                elif self._done:
+                    if self._error is not None:
+                        raise self._error
+                    return
+                else:
+                    with self._pull_lock:
+                        # another subscriber may have pulled while we waited
+                        if i >= len(self._buffer) and not self._done:
+                            self._pull()
+        finally:
+            leave()
+
+    def _leave(self) -> None:
+        with self._lock:
+            self._subscribers -= 1
+            if self._subscribers or self._done:
+                return
+            self.abandoned = True
+        with self._pull_lock:
+            self._done = True
+            source, self._source = self._source, None
+        close = getattr(source, "close", None)
+        if close is not None:
+            close()
+        self._on_done(self)
+
+    def _pull(self) -> None:
+        try:
+            if self._source is None:
+                self._source = iter(self._factory())
+            self._buffer.append(next(self._source))
+        except StopIteration:
+            self._finish(None)
+        except Exception as exc:
+            self._finish(exc)
+
+    def _finish(self, error: Optional[BaseException]) -> None:
+        self._error = error
+        self._done = True
+        self._on_done(self)
+
+
+class _ASharedStream:
+    """Async counterpart of :class:`_SharedStream`."""
+
+    def __init__(
+        self,
+        factory: Callable[[], Awaitable[AsyncIterator[str]]],
+        on_done: Callable[[Any], None],
+        lock: threading.Lock,
+    ) -> None:
+        self._factory = factory
+        self._source: Optional[AsyncIterator[str]] = None
+        self._on_done = on_done
+        self._buffer: List[str] = []
+        self._done = False
+        self._error: Optional[BaseException] = None
+        self._pending: Optional[asyncio.Future] = None
+        self._loop = asyncio.get_running_loop()
+        self._lock = lock
+        self._subscribers = 0
+        self._closing: Optional[asyncio.Future] = None
+        self.abandoned = False
+
+    def subscribe(self) -> AsyncGenerator[str, None]:
+        self._subscribers += 1
+        return self._read(ReleaseOnce(self._leave))
+
+    async def _read(self, leave: ReleaseOnce) -> AsyncGenerator[str, None]:
+        try:
+            i = 0
+            while True:
+                if i < len(self._buffer):
+                    yield self._buffer[i]
+                    i += 1
+                elif self._done:
+                    if self._error is not None:
+                        raise self._error
+                    return
+                else:
+                    if self._pending is None:
+                        self._pending = asyncio.ensure_future(self._pull())
+                    # shielded: a subscriber going away must not cancel the shared read
+                    await asyncio.shield(self._pending)
+        finally:
+            leave()
+
+    def _leave(self) -> None:
+        # synchronous: it also runs from ReleaseOnce.__del__, outside any coroutine
+        with self._lock:
+            self._subscribers -= 1
+            if self._subscribers or self._done:
+                return
+            self.abandoned = True
+        self._done = True
+        try:
+            self._loop.call_soon_threadsafe(self._close)
+        except RuntimeError:                    # loop already closed
+            pass
+        self._on_done(self)
+
+    def _close(self) -> None:
+        if self._pending is not None:
+            self._pending.cancel()              # _pull closes the source on its way out
+        elif self._source is not None:
+            self._closing = asyncio.ensure_future(_aclose(self._source))
+
+    async def _pull(self) -> None:
+        try:
+            if self._source is None:
+                self._source = (await self._factory()).__aiter__()
+            self._buffer.append(await self._source.__anext__())
+        except StopAsyncIteration:
+            self._finish(None)
+        except asyncio.CancelledError:
+            if self.abandoned and self._source is not None:
+                await _aclose(self._source)
+            raise
+        except Exception as exc:
+            self._finish(exc)
+        finally:
+            self._pending = None
+
+    def _finish(self, error: Optional[BaseException]) -> None:
+        self._error = error
+        self._done = True
+        self._on_done(self)
+
+
+async def _aclose(source: Any) -> None:
+    aclose = getattr(source, "aclose", None)
+    if aclose is not None:
+        await aclose()
+
+
+# Process-wide group; ChatService(coalesce=True) uses this one.
+flights = SingleFlight()
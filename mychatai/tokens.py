@@ -0,0 +1,252 @@
+"""
+Token counting, model limits and pre-flight cost / latency estimates.
+
+    from mychatai.tokens import count_messages, estimate, validate
+
+    count_messages(messages, "openai", "gpt-4o-mini")          # exact with tiktoken
+    est = estimate(messages, "anthropic", "claude-sonnet-4-20250514", max_tokens=500)
+    est.prompt_tokens, est.cost, est.latency
+    validate(messages, "ollama", "llama3.2", max_tokens=1024)  # ContextWindowError if too big
+
+OpenAI models are counted exactly when ``tiktoken`` is installed
+(``pip install -e .[tokens]``).  All other models, and OpenAI without
+tiktoken, use a fast approximation of ~4 UTF-8 bytes per token.  One
+tokenizer instance is cached per model family.
+
+Context windows, output limits, list prices (USD per million tokens at the
+time of writing) and typical latencies come from a small built-in table;
+override or extend it with ``Settings.model_info``, keyed by
+``"provider:model"``, model or provider:
+
+    MODEL_INFO='{"ollama:llama3.2": {"context_window": 32768}, "openai": {"input_cost": 0}}'
+"""
+from __future__ import annotations
+
+import math
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, fields, replace
+from functools import lru_cache
+from typing import Dict, Iterable, Mapping, Optional
+
+from .config import settings
+from .exceptions import ContextWindowError
+
+MESSAGE_OVERHEAD = 4        # role / separator tokens every chat format adds per message
+REPLY_PRIMING = 3           # tokens that open the assistant's reply
+
+
+# ── tokenizers ─────────────────────────────────────────────────────────────
+class Tokenizer(ABC):
+    name: str = ""
+
+    @abstractmethod
+    def count(self, text: str) -> int:
+        """Number of tokens in *text*."""
+
+
+class ApproxTokenizer(Tokenizer):
+    """~*bytes_per_token* UTF-8 bytes per token: no dependencies, O(1) for ASCII."""
+
+    def __init__(self, bytes_per_token: float = 4.0) -> None:
+        self._per_token = bytes_per_token
+        self.name = f"approx/{bytes_per_token:g}"
+
+    def count(self, text: str) -> int:
+        # non-Latin scripts take 2-3 bytes and roughly a token per character
+        size = len(text) if text.isascii() else len(text.encode("utf-8"))
+        return math.ceil(size / self._per_token)
+
+
+class TiktokenTokenizer(Tokenizer):
+    def __init__(self, encoding: str) -> None:
+        import tiktoken
+
+        self._encoding = tiktoken.get_encoding(encoding)
+        self.name = encoding
+
+    def count(self, text: str) -> int:
+        return len(self._encoding.encode_ordinary(text))
+
+
+_O200K_PREFIXES = ("gpt-4o", "gpt-4.1", "gpt-4.5", "gpt-5", "o1", "o3", "o4", "chatgpt")
+
+
+def tokenizer_family(provider: str, model: str) -> str:
+    """The tokenizer family *model* uses: a tiktoken encoding or ``"approx"``."""
+    if provider == "openai":
+        if model.startswith(("gpt-4", "gpt-3.5")) and not model.startswith(_O200K_PREFIXES):
+            return "cl100k_base"
+        return "o200k_base"
+    return "approx"
+
+
+@lru_cache(maxsize=None)
+def _family_tokenizer(family: str) -> Tokenizer:
+    if family != "approx":
+        try:
+            return TiktokenTokenizer(family)
+        except Exception:       # not installed, or the encoding can't be downloaded
+            pass
+    return ApproxTokenizer()
+
+
+def tokenizer_for(provider: str = "", model: str = "") -> Tokenizer:
+    """The (shared) tokenizer for *provider* / *model*."""
+    return _family_tokenizer(tokenizer_family(provider, model))
+
+
+def count_tokens(text: str, provider: str = "", model: str = "") -> int:
+    return tokenizer_for(provider, model).count(text)
+
+
+def count_messages(messages: Iterable[Mapping[str, str]], provider: str = "", model: str = "") -> int:
+    """Prompt tokens of a chat payload, including per-message framing."""
+    tokenizer = tokenizer_for(provider, model)
+    return REPLY_PRIMING + sum(
+        tokenizer.count(str(m.get("content", ""))) + MESSAGE_OVERHEAD for m in messages
+    )
+
+
+# ── model limits, prices & typical latency ─────────────────────────────────
+@dataclass(frozen=True)
+class ModelInfo:
+    context_window: int
+    max_output_tokens: int
+    input_cost: float = 0.0             # USD per 1M prompt tokens
+    output_cost: float = 0.0            # USD per 1M completion tokens
+    ttft: float = 0.6                   # typical seconds to first token
+    tokens_per_second: float = 60.0     # typical generation speed
+
+
+# Longest matching model prefix wins; then the provider's default.
+_MODELS: Dict[str, ModelInfo] = {
+    "gpt-4o-mini": ModelInfo(128_000, 16_384, 0.15, 0.60, 0.5, 80),
+    "gpt-4o": ModelInfo(128_000, 16_384, 2.50, 10.00, 0.6, 70),
+    "gpt-4.1-nano": ModelInfo(1_047_576, 32_768, 0.10, 0.40, 0.4, 120),
+    "gpt-4.1-mini": ModelInfo(1_047_576, 32_768, 0.40, 1.60, 0.5, 80),
+    "gpt-4.1": ModelInfo(1_047_576, 32_768, 2.00, 8.00, 0.6, 60),
+    "gpt-4-turbo": ModelInfo(128_000, 4_096, 10.00, 30.00, 0.8, 30),
+    "gpt-3.5-turbo": ModelInfo(16_385, 4_096, 0.50, 1.50, 0.4, 90),
+    "o3-mini": ModelInfo(200_000, 100_000, 1.10, 4.40, 3.0, 90),
+    "o4-mini": ModelInfo(200_000, 100_000, 1.10, 4.40, 3.0, 90),
+    "claude-opus-4": ModelInfo(200_000, 32_000, 15.00, 75.00, 1.5, 40),
+    "claude-sonnet-4": ModelInfo(200_000, 64_000, 3.00, 15.00, 1.0, 60),
+    "claude-3-7-sonnet": ModelInfo(200_000, 64_000, 3.00, 15.00, 1.0, 60),
+    "claude-3-5-haiku": ModelInfo(200_000, 8_192, 0.80, 4.00, 0.6, 70),
+    "gemini-2.5-pro": ModelInfo(1_048_576, 65_536, 1.25, 10.00, 2.0, 90),
+    "gemini-2.5-flash": ModelInfo(1_048_576, 65_536, 0.30, 2.50, 0.8, 150),
+    "gemini-2.0-flash": ModelInfo(1_048_576, 8_192, 0.10, 0.40, 0.5, 150),
+    "deepseek-chat": ModelInfo(64_000, 8_192, 0.27, 1.10, 1.5, 40),
+    "deepseek-reasoner": ModelInfo(64_000, 32_768, 0.55, 2.19, 3.0, 40),
+}
+
+_PROVIDER_DEFAULTS: Dict[str, ModelInfo] = {
+    "openai": ModelInfo(128_000, 16_384, 2.50, 10.00),
+    "anthropic": ModelInfo(200_000, 8_192, 3.00, 15.00, 1.0),
+    "gemini": ModelInfo(1_048_576, 8_192, 0.30, 2.50, 0.8),
+    "deepseek": ModelInfo(64_000, 8_192, 0.27, 1.10, 1.5, 40),
+    # Ollama's default num_ctx; local models are free but slower to start
+    "ollama": ModelInfo(4_096, 4_096, 0.0, 0.0, 0.3, 30),
+}
+_FALLBACK = ModelInfo(128_000, 4_096)
+
+_INFO_FIELDS = frozenset(f.name for f in fields(ModelInfo))
+
+
+def model_info(provider: str = "", model: str = "") -> ModelInfo:
+    """Limits, prices and typical latency for *model* (see the module docstring)."""
+    matches = [prefix for prefix in _MODELS if model.startswith(prefix)]
+    if matches:
+        info = _MODELS[max(matches, key=len)]
+    else:
+        info = _PROVIDER_DEFAULTS.get(provider, _FALLBACK)
+    overrides = settings.model_info
+    for key in (provider, model, f"{provider}:{model}"):       # most specific applied last
+        if key and key in overrides:
+            info = replace(info, **{k: v for k, v in overrides[key].items() if k in _INFO_FIELDS})
+    return info
+
+
+# ── estimates ──────────────────────────────────────────────────────────────
+@dataclass
+class Estimate:
+    """What a call is expected to take before it is sent."""
+
+    prompt_tokens: int
+    output_tokens: int          # requested max_tokens, else the expected reply size
+    context_window: int
+    cost: float                 # USD
+    latency: float              # seconds until the last token
+
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.output_tokens
+
+    @property
+    def fits(self) -> bool:
+        return self.total_tokens <= self.context_window
+
+
+def estimate(
+    messages: Iterable[Mapping[str, str]],
+    provider: str = "",
+    model: str = "",
+    *,
+    max_tokens: Optional[int] = None,
+    ttft: Optional[float] = None,
+    tokens_per_second: Optional[float] = None,
+    prompt_tokens: Optional[int] = None,
+) -> Estimate:
+    """
+    Pre-flight tokens, cost and latency of one call.
+
+    The reply is assumed to be *max_tokens* long when given, else
+    ``settings.expected_output_tokens`` (capped at the model's output
+    limit).  *ttft* / *tokens_per_second* override the table's typical
+    values, e.g. with a router's measurements.
+    """
+    info = model_info(provider, model)
+    if prompt_tokens is None:
+        prompt_tokens = count_messages(messages, provider, model)
+    output = max_tokens if max_tokens is not None else min(
+        settings.expected_output_tokens, info.max_output_tokens
+    )
+    speed = tokens_per_second or info.tokens_per_second
+    return Estimate(
+        prompt_tokens=prompt_tokens,
+        output_tokens=output,
+        context_window=info.context_window,
+        cost=(prompt_tokens * info.input_cost + output * info.output_cost) / 1e6,
+        latency=(info.ttft if ttft is None else ttft) + output / speed,
+    )
+
+
+def validate(
+    messages: Iterable[Mapping[str, str]],
+    provider: str = "",
+    model: str = "",
+    *,
+    max_tokens: Optional[int] = None,
+) -> int:
+    """
+    Raise :class:`ContextWindowError` unless the prompt plus *max_tokens*
+    fits *model*'s context window; returns the prompt's token count.
+    """
+    info = model_info(provider, model)
+    prompt_tokens = count_messages(messages, provider, model)
+    needed = prompt_tokens + (max_tokens or 0)
+    if needed > info.context_window:
+        raise ContextWindowError(
+            f"{provider}:{model}: {prompt_tokens} prompt tokens"
+            + (f" + {max_tokens} max_tokens" if max_tokens else "")
+            + f" exceed the {info.context_window}-token context window",
+            provider=provider,
+            prompt_tokens=prompt_tokens,
+            context_window=info.context_window,
+        )
+    return prompt_tokens
+
+
+def default_max_tokens(provider: str, model: str) -> int:
+    """The model's output limit, for APIs that require ``max_tokens``."""
+    return model_info(provider, model).max_output_tokens
@@ -0,0 +1,213 @@
+"""
+Process-wide registry of pooled HTTP transports.
+
+Every client asks the registry for its ``httpx`` client instead of building
+one, so connections (and their TCP + TLS handshakes) are reused across
+client instances, ``ChatService`` objects and requests:
+
+    from mychatai.transport import transports
+    http = transports.client("https://api.openai.com/v1", credentials=key)
+
+Transports are keyed by base URL, a fingerprint of the credentials and the
+timeout.  Pool limits, keep-alive and HTTP/2 come from ``Settings``; HTTP/2
+is only switched on when the optional ``h2`` package is installed and the
+caller says the provider speaks it.
+"""
+from __future__ import annotations
+
+import hashlib
+import importlib.util
+import threading
+import time
+from dataclasses import dataclass, asdict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+from .config import settings
+from .instrumentation import current_call
+
+_H2_AVAILABLE = importlib.util.find_spec("h2") is not None
+_CONNECT_PHASES = ("connection.connect_tcp.", "connection.start_tls.")
+
+_Key = Tuple[str, str, float, bool]
+
+
+@dataclass
+class TransportStats:
+    """Counters describing how well the shared pools are being reused."""
+
+    registry_hits: int = 0          # client() calls served by an existing pool
+    registry_misses: int = 0        # client() calls that had to build a pool
+    requests: int = 0               # HTTP requests sent through any pool
+    connections_opened: int = 0     # fresh TCP connections (the rest hit keep-alive)
+
+    @property
+    def connection_reuse_ratio(self) -> float:
+        """Share of requests that rode an already-open connection."""
+        if not self.requests:
+            return 0.0
+        return max(0.0, 1.0 - self.connections_opened / self.requests)
+
+    def as_dict(self) -> dict[str, float]:
+        return {**asdict(self), "connection_reuse_ratio": self.connection_reuse_ratio}
+
+
+class TransportRegistry:
+    """Hands out one long-lived ``httpx`` client per (base URL, credentials)."""
+
+    def __init__(
+        self,
+        *,
+        max_connections: int | None = None,
+        max_keepalive_connections: int | None = None,
+        keepalive_expiry: float | None = None,
+        http2: bool | None = None,
+    ) -> None:
+        self._limits = httpx.Limits(
+            max_connections=max_connections or settings.http_max_connections,
+            max_keepalive_connections=(
+                max_keepalive_connections or settings.http_max_keepalive_connections
+            ),
+            keepalive_expiry=keepalive_expiry or settings.http_keepalive_expiry,
+        )
+        self._http2 = (settings.http2 if http2 is None else http2) and _H2_AVAILABLE
+        self._sync: Dict[_Key, httpx.Client] = {}
+        self._async: Dict[_Key, httpx.AsyncClient] = {}
+        self._lock = threading.Lock()
+        self._listeners: List[Callable[[httpx.Response], None]] = []
+        self.stats = TransportStats()
+
+    # ------------------------------------------------------------------ #
+    def client(
+        self,
+        base_url: str,
+        *,
+        credentials: Optional[str] = None,
+        timeout: float | None = None,
+        http2: bool = True,
+    ) -> httpx.Client:
+        """Shared sync client for *base_url* (built on first use)."""
+        key = self._key(base_url, credentials, timeout, http2)
+        with self._lock:
+            pooled = self._sync.get(key)
+            if pooled is not None and not pooled.is_closed:
+                self.stats.registry_hits += 1
+                return pooled
+            self.stats.registry_misses += 1
+            pooled = self._sync[key] = httpx.Client(
+                **self._options(key),
+                event_hooks={"request": [self._on_request], "response": [self._on_response]},
+            )
+            return pooled
+
+    def async_client(
+        self,
+        base_url: str,
+        *,
+        credentials: Optional[str] = None,
+        timeout: float | None = None,
+        http2: bool = True,
+    ) -> httpx.AsyncClient:
+        """
+        Shared async client for *base_url*.
+
+        Async pools bind their connections to the event loop that first uses
+        them, so share them within one long-lived loop (a server), not across
+        repeated ``asyncio.run`` calls.
+        """
+        key = self._key(base_url, credentials, timeout, http2)
+        with self._lock:
+            pooled = self._async.get(key)
+            if pooled is not None and not pooled.is_closed:
+                self.stats.registry_hits += 1
+                return pooled
+            self.stats.registry_misses += 1
+            pooled = self._async[key] = httpx.AsyncClient(
+                **self._options(key),
+                event_hooks={"request": [self._aon_request], "response": [self._aon_response]},
+            )
+            return pooled
+
+    def add_response_listener(self, listener: Callable[[httpx.Response], None]) -> None:
+        """
+        Call *listener* with every response (headers only, body unread).
+
+        Listeners run inline on the requesting thread / task, so they can
+        consult context variables set by the caller; keep them cheap.
+        """
+        if listener not in self._listeners:
+            self._listeners.append(listener)
+
+    def close(self) -> None:
+        """Close every sync pool (async pools need :meth:`aclose`)."""
+        with self._lock:
+            pools, self._sync = list(self._sync.values()), {}
+        for pool in pools:
+            pool.close()
+
+    async def aclose(self) -> None:
+        """Close every pool, sync and async."""
+        self.close()
+        with self._lock:
+            pools, self._async = list(self._async.values()), {}
+        for pool in pools:
+            await pool.aclose()
+
+    # ── internals ──────────────────────────────────────────────────────────
+    def _key(
+        self, base_url: str, credentials: Optional[str], timeout: float | None, http2: bool
+    ) -> _Key:
+        fingerprint = (
+            hashlib.sha256(credentials.encode()).hexdigest()[:16] if credentials else ""
+        )
+        return (
+            base_url.rstrip("/"),
+            fingerprint,
+            float(timeout or settings.request_timeout),
+            http2 and self._http2,
+        )
+
+    def _options(self, key: _Key) -> dict[str, Any]:
+        _, _, timeout, http2 = key
+        return {
+            "timeout": timeout,
+            "limits": self._limits,
+            "http2": http2,
+            "follow_redirects": True,
+        }
+
+    # Request hooks count traffic and attach an httpcore trace callback, which
+    # tells us whether the request had to open a new connection.
+    def _on_request(self, request: httpx.Request) -> None:
+        self.stats.requests += 1
+        request.extensions["trace"] = self._trace
+
+    async def _aon_request(self, request: httpx.Request) -> None:
+        self.stats.requests += 1
+        request.extensions["trace"] = self._atrace
+
+    def _on_response(self, response: httpx.Response) -> None:
+        for listener in self._listeners:
+            listener(response)
+
+    async def _aon_response(self, response: httpx.Response) -> None:
+        self._on_response(response)
+
+    def _trace(self, event: str, info: dict[str, Any]) -> None:
+        if event == "connection.connect_tcp.complete":
+            self.stats.connections_opened += 1
+        if event.startswith(_CONNECT_PHASES):
+            call = current_call()
+            if call is not None:
+                # subtract at ".started", add at ".complete"/".failed": the
+                # record ends up holding the TCP + TLS time of this call
+                now = time.perf_counter()
+                call.connect += -now if event.endswith(".started") else now
+
+    async def _atrace(self, event: str, info: dict[str, Any]) -> None:
+        self._trace(event, info)
+
+
+# One registry per process; import this rather than building your own.
+transports = TransportRegistry()
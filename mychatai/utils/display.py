@@ -1,11 +1,20 @@
 """ Helpers for streaming token display in notebooks or CLI"""
+from __future__ import annotations
 
 import sys
-from typing import Generator
-
-def stream_to_stdout(chunks: Generator[str, None, None]) -> None:
-    """ Print each token immediately for nicer UX."""
-    for token in chunks:
-        sys.stdout.write(token) # push raw token to console
-        sys.stdout.flush()      # force it to appear right away
-    print()                     # final newline
\ No newline at end of file
+from typing import Iterable, Optional
+
+from .sinks import BufferedSink, FlushPolicy, StreamSink, pipe
+
+
+def stream_to_stdout(chunks: Iterable[str], policy: Optional[FlushPolicy] = None) -> str:
+    """
+    Print tokens as they arrive and return the full text.
+
+    Writes are coalesced (see ``mychatai.utils.sinks``): every ~50 ms on a
+    terminal, in 64 KiB blocks when stdout is a pipe or file.
+    """
+    out = sys.stdout
+    text = pipe(chunks, BufferedSink(StreamSink(out), policy or FlushPolicy.for_stream(out)))
+    print()                     # final newline
+    return text
@@ -0,0 +1,307 @@
+"""
+Streaming output sinks: where tokens go once they leave ``ChatService``.
+
+Writing and flushing every token costs a syscall per token.
+:class:`BufferedSink` instead keeps the token strings in a list and writes
+them with one ``"".join`` once its :class:`FlushPolicy` says so (enough
+time or characters since the last flush), and at close:
+
+    from mychatai.utils.sinks import BufferedSink, FileSink, StreamSink, TeeSink, pipe
+
+    sink = BufferedSink(TeeSink(StreamSink(sys.stdout), FileSink("answer.md")))
+    text = pipe(chat.answer(question, stream=True), sink)       # closes the sink
+
+The async twins (:class:`AsyncBufferedSink`, :class:`AsyncStreamWriterSink`,
+:func:`apipe`, ...) await the destination on flush, so a slow reader (e.g. a
+socket's ``drain()``) slows down token consumption instead of letting the
+buffer grow.
+
+The policy is checked as tokens arrive; text still pending when the stream
+pauses is written with the next token or at close.
+"""
+from __future__ import annotations
+
+import asyncio
+import inspect
+import socket
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, AsyncIterable, Awaitable, Callable, IO, Iterable, List, Optional, Union
+
+
+@dataclass(frozen=True)
+class FlushPolicy:
+    """Flush once *interval* seconds have passed or *max_chars* are pending."""
+
+    interval: Optional[float] = 0.05        # None: flush on size (and close) only
+    max_chars: int = 8192
+
+    def due(self, pending_chars: int, since_flush: float) -> bool:
+        return pending_chars >= self.max_chars or (
+            self.interval is not None and since_flush >= self.interval
+        )
+
+    @classmethod
+    def for_stream(cls, stream: Any) -> "FlushPolicy":
+        """Interactive for a terminal, throughput-oriented for pipes and files."""
+        isatty = getattr(stream, "isatty", None)
+        if isatty is not None and isatty():
+            return cls(interval=0.05, max_chars=8192)
+        return cls(interval=None, max_chars=64 * 1024)
+
+
+# ── sync sinks ─────────────────────────────────────────────────────────────
+class Sink(ABC):
+    """Destination for streamed text."""
+
+    @abstractmethod
+    def write(self, text: str) -> None: ...
+
+    def flush(self) -> None:
+        """Push written text to its destination."""
+
+    def close(self) -> None:
+        self.flush()
+
+    def __enter__(self) -> "Sink":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+
+class StreamSink(Sink):
+    """A text stream such as ``sys.stdout``; left open on close."""
+
+    def __init__(self, stream: IO[str]) -> None:
+        self._stream = stream
+
+    def write(self, text: str) -> None:
+        self._stream.write(text)
+
+    def flush(self) -> None:
+        self._stream.flush()
+
+
+class FileSink(StreamSink):
+    """A file opened (and closed) by the sink."""
+
+    def __init__(self, path: Union[str, Path], mode: str = "a", encoding: str = "utf-8") -> None:
+        super().__init__(open(Path(path).expanduser(), mode, encoding=encoding))
+
+    def close(self) -> None:
+        self._stream.close()
+
+
+class SocketSink(Sink):
+    """A connected socket (``sendall`` blocks while the peer is slow)."""
+
+    def __init__(self, sock: socket.socket, encoding: str = "utf-8") -> None:
+        self._sock = sock
+        self._encoding = encoding
+
+    def write(self, text: str) -> None:
+        self._sock.sendall(text.encode(self._encoding))
+
+
+class CallbackSink(Sink):
+    def __init__(self, callback: Callable[[str], Any]) -> None:
+        self._callback = callback
+
+    def write(self, text: str) -> None:
+        self._callback(text)
+
+
+class TeeSink(Sink):
+    """Write everything to several sinks."""
+
+    def __init__(self, *sinks: Sink) -> None:
+        self._sinks = sinks
+
+    def write(self, text: str) -> None:
+        for sink in self._sinks:
+            sink.write(text)
+
+    def flush(self) -> None:
+        for sink in self._sinks:
+            sink.flush()
+
+    def close(self) -> None:
+        for sink in self._sinks:
+            sink.close()
+
+
+class BufferedSink(Sink):
+    """Coalesce small writes into one write + flush per :class:`FlushPolicy` window."""
+
+    def __init__(self, sink: Sink, policy: Optional[FlushPolicy] = None) -> None:
+        self._sink = sink
+        self._policy = policy or FlushPolicy()
+        self._pending: List[str] = []
+        self._chars = 0
+        self._flushed = time.monotonic()
+
+    def write(self, text: str) -> None:
+        self._pending.append(text)
+        self._chars += len(text)
+        if self._policy.due(self._chars, time.monotonic() - self._flushed):
+            self.flush()
+
+    def flush(self) -> None:
+        if self._pending:
+            self._sink.write(self._pending[0] if len(self._pending) == 1 else "".join(self._pending))
+            self._pending.clear()
+            self._chars = 0
+        self._sink.flush()
+        self._flushed = time.monotonic()
+
+    def close(self) -> None:
+        self.flush()
+        self._sink.close()
+
+
+def pipe(tokens: Iterable[str], sink: Sink, *, close: bool = True) -> str:
+    """Write every token to *sink* and return the full text."""
+    parts: List[str] = []
+    try:
+        for token in tokens:
+            parts.append(token)
+            sink.write(token)
+    finally:
+        if close:
+            sink.close()
+        else:
+            sink.flush()
+    return "".join(parts)
+
+
+# ── async sinks ────────────────────────────────────────────────────────────
+class AsyncSink(ABC):
+    """Async destination for streamed text."""
+
+    @abstractmethod
+    async def write(self, text: str) -> None: ...
+
+    async def flush(self) -> None:
+        """Push written text on (and wait until the destination accepted it)."""
+
+    async def aclose(self) -> None:
+        await self.flush()
+
+    async def __aenter__(self) -> "AsyncSink":
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self.aclose()
+
+
+class AsyncStreamWriterSink(AsyncSink):
+    """An ``asyncio.StreamWriter``; flush waits for ``drain()`` (backpressure)."""
+
+    def __init__(self, writer: asyncio.StreamWriter, encoding: str = "utf-8", *, close: bool = True) -> None:
+        self._writer = writer
+        self._encoding = encoding
+        self._close = close
+
+    async def write(self, text: str) -> None:
+        self._writer.write(text.encode(self._encoding))
+
+    async def flush(self) -> None:
+        await self._writer.drain()
+
+    async def aclose(self) -> None:
+        await self.flush()
+        if self._close:
+            self._writer.close()
+            await self._writer.wait_closed()
+
+
+class AsyncCallbackSink(AsyncSink):
+    """Calls *callback* per write; awaited when it is a coroutine function."""
+
+    def __init__(self, callback: Callable[[str], Union[Awaitable[Any], Any]]) -> None:
+        self._callback = callback
+
+    async def write(self, text: str) -> None:
+        result = self._callback(text)
+        if inspect.isawaitable(result):
+            await result
+
+
+class SyncSinkAdapter(AsyncSink):
+    """Use a (fast, local) sync :class:`Sink` where an async one is expected."""
+
+    def __init__(self, sink: Sink) -> None:
+        self._sink = sink
+
+    async def write(self, text: str) -> None:
+        self._sink.write(text)
+
+    async def flush(self) -> None:
+        self._sink.flush()
+
+    async def aclose(self) -> None:
+        self._sink.close()
+
+
+class AsyncTeeSink(AsyncSink):
+    """Write to several async sinks concurrently."""
+
+    def __init__(self, *sinks: AsyncSink) -> None:
+        self._sinks = sinks
+
+    async def write(self, text: str) -> None:
+        await asyncio.gather(*(sink.write(text) for sink in self._sinks))
+
+    async def flush(self) -> None:
+        await asyncio.gather(*(sink.flush() for sink in self._sinks))
+
+    async def aclose(self) -> None:
+        await asyncio.gather(*(sink.aclose() for sink in self._sinks))
+
+
+class AsyncBufferedSink(AsyncSink):
+    """Async :class:`BufferedSink`."""
+
+    def __init__(self, sink: AsyncSink, policy: Optional[FlushPolicy] = None) -> None:
+        self._sink = sink
+        self._policy = policy or FlushPolicy()
+        self._pending: List[str] = []
+        self._chars = 0
+        self._flushed = time.monotonic()
+
+    async def write(self, text: str) -> None:
+        self._pending.append(text)
+        self._chars += len(text)
+        if self._policy.due(self._chars, time.monotonic() - self._flushed):
+            await self.flush()
+
+    async def flush(self) -> None:
+        if self._pending:
+            text = self._pending[0] if len(self._pending) == 1 else "".join(self._pending)
+            self._pending.clear()
+            self._chars = 0
+            await self._sink.write(text)
+        await self._sink.flush()
+        self._flushed = time.monotonic()
+
+    async def aclose(self) -> None:
+        await self.flush()
+        await self._sink.aclose()
+
+
+async def apipe(tokens: AsyncIterable[str], sink: AsyncSink, *, close: bool = True) -> str:
+    """Async :func:`pipe`."""
+    parts: List[str] = []
+    try:
+        async for token in tokens:
+            parts.append(token)
+            await sink.write(token)
+    finally:
+        if close:
+            await sink.aclose()
+        else:
+            await sink.flush()
+    return "".join(parts)
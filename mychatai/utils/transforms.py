@@ -0,0 +1,161 @@
+"""
+Generator middleware for token streams.
+
+Each transform takes an iterator of text chunks and returns another one;
+the chunk strings themselves are passed on, never copied, except where a
+transform must join them (one join per emitted piece):
+
+    from mychatai.utils.transforms import apply, coalesce, markdown_blocks
+
+    for block in apply(chat.answer(q, stream=True), markdown_blocks):
+        render(block)                       # whole paragraphs / code fences
+
+    # accumulated text at most every 50 ms (UI updates)
+    for text in accumulate(coalesce(tokens, FlushPolicy(interval=0.05))):
+        ...
+
+Every transform has an async twin (``acoalesce``, ``aaccumulate``, ...) for
+async token streams.
+"""
+from __future__ import annotations
+
+import time
+from typing import AsyncIterator, Callable, Iterable, Iterator, List, Optional
+
+from .sinks import FlushPolicy
+
+Transform = Callable[[Iterator[str]], Iterator[str]]
+
+_FENCE = "```"
+
+
+def apply(tokens: Iterable[str], *transforms: Transform) -> Iterator[str]:
+    """Chain *transforms* left to right over *tokens*."""
+    stream: Iterator[str] = iter(tokens)
+    for transform in transforms:
+        stream = transform(stream)
+    return stream
+
+
+def coalesce(tokens: Iterable[str], policy: Optional[FlushPolicy] = None) -> Iterator[str]:
+    """Merge tokens into larger chunks as *policy* allows, plus whatever is left at the end."""
+    policy = policy or FlushPolicy()
+    pending: List[str] = []
+    chars = 0
+    emitted = time.monotonic()
+    for token in tokens:
+        pending.append(token)
+        chars += len(token)
+        if policy.due(chars, time.monotonic() - emitted):
+            yield pending[0] if len(pending) == 1 else "".join(pending)
+            pending.clear()
+            chars = 0
+            emitted = time.monotonic()
+    if pending:
+        yield "".join(pending)
+
+
+def accumulate(tokens: Iterable[str]) -> Iterator[str]:
+    """The text so far after each chunk (always at least one item)."""
+    parts: List[str] = []
+    for token in tokens:
+        parts.append(token)
+        yield "".join(parts)
+    if not parts:
+        yield ""
+
+
+def markdown_blocks(tokens: Iterable[str]) -> Iterator[str]:
+    """
+    Whole Markdown blocks: text up to a blank line, with fenced code blocks
+    kept in one piece.  Whatever is left at the end is emitted as is.
+    """
+    splitter = _MarkdownBlocks()
+    for token in tokens:
+        yield from splitter.feed(token)
+    yield from splitter.finish()
+
+
+# ── async twins ────────────────────────────────────────────────────────────
+async def acoalesce(tokens: AsyncIterator[str], policy: Optional[FlushPolicy] = None) -> AsyncIterator[str]:
+    policy = policy or FlushPolicy()
+    pending: List[str] = []
+    chars = 0
+    emitted = time.monotonic()
+    async for token in tokens:
+        pending.append(token)
+        chars += len(token)
+        if policy.due(chars, time.monotonic() - emitted):
+            yield pending[0] if len(pending) == 1 else "".join(pending)
+            pending.clear()
+            chars = 0
+            emitted = time.monotonic()
+    if pending:
+        yield "".join(pending)
+
+
+async def aaccumulate(tokens: AsyncIterator[str]) -> AsyncIterator[str]:
+    parts: List[str] = []
+    async for token in tokens:
+        parts.append(token)
+        yield "".join(parts)
+    if not parts:
+        yield ""
+
+
+async def amarkdown_blocks(tokens: AsyncIterator[str]) -> AsyncIterator[str]:
+    splitter = _MarkdownBlocks()
+    async for token in tokens:
+        for block in splitter.feed(token):
+            yield block
+    for block in splitter.finish():
+        yield block
+
+
+class _MarkdownBlocks:
+    """Incremental block splitter; each character is scanned about once."""
+
+    def __init__(self) -> None:
+        self._buf = ""
+        self._pos = 0                   # scanning resumes here
+        self._in_fence = False
+        self._fence_only = False        # the open fence starts its block
+
+    def feed(self, token: str) -> List[str]:
+        self._buf += token
+        blocks: List[str] = []
+        while True:
+            buf = self._buf
+            if self._in_fence:
+                close = buf.find(_FENCE, self._pos)
+                if close == -1:
+                    self._pos = max(self._pos, len(buf) - len(_FENCE) + 1)
+                    return blocks
+                line_end = buf.find("\n", close + len(_FENCE))
+                if line_end == -1:
+                    self._pos = close           # re-read the closing fence later
+                    return blocks
+                self._in_fence = False
+                self._pos = line_end + 1
+                if self._fence_only:
+                    blocks.append(self._cut(self._pos))
+                continue
+            blank = buf.find("\n\n", self._pos)
+            fence = buf.find(_FENCE, self._pos)
+            if fence != -1 and (blank == -1 or fence < blank):
+                self._in_fence = True
+                self._fence_only = not buf[:fence].strip()
+                self._pos = fence + len(_FENCE)
+                continue
+            if blank == -1:
+                # "\n\n" or "```" may be split across tokens
+                self._pos = max(self._pos, len(buf) - len(_FENCE) + 1)
+                return blocks
+            blocks.append(self._cut(blank + 2))
+
+    def finish(self) -> List[str]:
+        return [self._cut(len(self._buf))] if self._buf else []
+
+    def _cut(self, end: int) -> str:
+        block, self._buf, self._pos = self._buf[:end], self._buf[end:], 0
+        return block
@@ -1,36 +1,56 @@
 #!/usr/bin/env python
 import click
-from mychatai import ChatService, OpenAIClient, OllamaClient, GeminiClient,AnthropicClient, DeepSeekClient
-from mychatai.utils.display import stream_to_stdout
+from mychatai.providers import providers
 
-@click.command()
+
+class DefaultGroup(click.Group):
+    """A group that runs its ``default`` command when no sub-command is named."""
+
+    def __init__(self, *args, default: str, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._default = default
+
+    def parse_args(self, ctx: click.Context, args: list) -> list:
+        if not args or (args[0] not in self.commands and args[0] not in ("--help", "-h")):
+            args = [self._default, *args]       # `ask "question"` = `ask question "question"`
+        return super().parse_args(ctx, args)
+
+
+def provider_option(f):
+    return click.option(
+        "--provider", "-p",
+        # built-ins (openai, ollama, anthropic, gemini, deepseek, auto) + installed plugins;
+        # only the chosen provider's SDK is imported
+        type=click.Choice(providers.names()),
+        default="openai",
+        show_default=True,
+    )(f)
+
+
+def require_configured(provider: str) -> None:
+    if not providers.configured(provider):
+        raise click.UsageError(
+            f"{provider}: {providers.spec(provider).credential.upper()} is not set"
+        )
+
+
+@click.group(cls=DefaultGroup, default="question", context_settings={"help_option_names": ["-h", "--help"]})
+def main() -> None:
+    """Ask an LLM a question from the shell (or many: `ask batch`)."""
+
+
+@main.command()
 @click.argument("question")
-@click.option(
-    "--provider", "-p",
-    #type=click.Choice(["openai", "ollama", "gemini"]),
-    type=click.Choice(["openai", "ollama", "anthropic", "gemini", "deepseek"]),
-    default="openai",
-    show_default=True,
-)
+@provider_option
 @click.option("--stream/--no-stream", default=True, show_default=True)
-def main(question: str, provider: str, stream: bool) -> None:
+def question(question: str, provider: str, stream: bool) -> None:
     """Ask an LLM a question from the shell."""
-    if provider not in ["openai", "ollama", "gemini", "anthropic", "deepseek"]:
-        raise click.BadParameter(f"Invalid provider: {provider}")   
-    # Initialize the appropriate client based on the provider
-    if provider == "openai":
-        client = OpenAIClient()
-    elif provider == "ollama":
-        client = OllamaClient()
-    elif provider == "gemini":
-        client = GeminiClient()
-    elif provider == "anthropic":
-        client = AnthropicClient()
-    elif provider == "deepseek":
-        client = DeepSeekClient()
-    else:
-        raise click.BadParameter(f"Unsupported provider: {provider}")
-    
+    from mychatai import ChatService
+    from mychatai.utils.display import stream_to_stdout
+
+    require_configured(provider)
+    client = providers.create(provider)   # "auto" = fastest healthy configured provider
+
     # Create the ChatService with the selected client
     chat   = ChatService(client)
 
@@ -41,5 +61,61 @@ def main(question: str, provider: str, stream: bool) -> None:
     else:
         click.echo(answer)
 
+
+@main.command()
+@click.argument("source", default="-")
+@click.option("--output", "-o", default="answers.jsonl", show_default=True,
+              help="Results JSONL; also the checkpoint a rerun resumes from.")
+@provider_option
+@click.option("--format", "fmt", type=click.Choice(["jsonl", "csv", "text"]), default=None,
+              help="Input format  [default: from the file suffix; text for stdin]")
+@click.option("--field", default="question", show_default=True, help="JSONL / CSV question field.")
+@click.option("--id-field", default="id", show_default=True, help="JSONL / CSV id field (else the row number).")
+@click.option("--workers", "-w", default=2, show_default=True, help="Worker processes.")
+@click.option("--concurrency", "-c", default=16, show_default=True, help="Requests in flight per worker.")
+@click.option("--max-tokens", type=int, default=None, help="Cap each answer's length.")
+@click.option("--resume/--restart", default=True, show_default=True,
+              help="Skip questions already answered in --output, or start it over.")
+@click.option("--progress/--quiet", default=True, show_default=True)
+def batch(
+    source: str,
+    output: str,
+    provider: str,
+    fmt: str,
+    field: str,
+    id_field: str,
+    workers: int,
+    concurrency: int,
+    max_tokens: int,
+    resume: bool,
+    progress: bool,
+) -> None:
+    """Answer every question in SOURCE (JSONL, CSV or lines of text; - is stdin)."""
+    from mychatai.bulk import run_bulk
+
+    require_configured(provider)
+    model_kwargs = {"max_tokens": max_tokens} if max_tokens else {}
+    try:
+        stats = run_bulk(
+            source,
+            output,
+            provider=provider,
+            workers=workers,
+            concurrency=concurrency,
+            fmt=fmt,
+            field=field,
+            id_field=id_field,
+            resume=resume,
+            model_kwargs=model_kwargs,
+            progress=progress,
+        )
+    except KeyboardInterrupt:
+        raise click.ClickException(f"interrupted; rerun the same command to resume from {output}") from None
+    except (RuntimeError, ValueError) as exc:
+        raise click.ClickException(str(exc)) from exc
+    if stats.failed:
+        raise SystemExit(1)
+
+
 if __name__ == "__main__":
     main()
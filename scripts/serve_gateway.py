@@ -0,0 +1,34 @@
+#!/usr/bin/env python
+import os
+from typing import Optional
+
+import click
+
+from mychatai.config import settings
+
+
+@click.command()
+@click.option("--host", default="0.0.0.0", show_default=True)
+@click.option("--port", default=8000, show_default=True)
+@click.option("--workers", default=1, show_default=True, help="Processes; each has its own pools.")
+@click.option("--provider", default=None, help=f"Default provider [default: {settings.gateway_provider}]")
+def main(host: str, port: int, workers: int, provider: Optional[str]) -> None:
+    """Serve an OpenAI-compatible /v1/chat/completions endpoint."""
+    try:
+        import uvicorn
+    except ImportError:
+        raise click.UsageError("the gateway needs an ASGI server: pip install -e .[gateway]") from None
+    if provider:
+        os.environ["GATEWAY_PROVIDER"] = provider   # worker processes re-read the environment
+        settings.gateway_provider = provider
+    uvicorn.run(
+        "mychatai.gateway:app",
+        host=host,
+        port=port,
+        workers=workers,
+        timeout_graceful_shutdown=10,
+    )
+
+
+if __name__ == "__main__":
+    main()
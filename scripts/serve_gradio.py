@@ -1,68 +1,86 @@
 #!/usr/bin/env python
+import asyncio
+from typing import Dict
+
 import gradio as gr
 from gradio.exceptions import Error as GradioError
 
-from mychatai import (
-    ChatService,
-    OpenAIClient,
-    OllamaClient,
-    GeminiClient,
-    AnthropicClient,
-    DeepSeekClient,
-)
-from mychatai.config import settings   # ← to check which keys exist
+from mychatai import ChatService, settings
+from mychatai.exceptions import ProviderError
+from mychatai.providers import providers
+from mychatai.scheduler import ScheduledClient, scheduling
+from mychatai.utils.sinks import FlushPolicy
+from mychatai.utils.transforms import aaccumulate, acoalesce
+
+
+# ── Long-lived services, one per provider ────────────────────────────────────
+# Clients (and their pooled HTTP connections) live as long as the server; the
+# router keeps its latency / error estimates across clicks.  Calls go through
+# the provider's scheduler at interactive priority, ahead of any batch work
+# sharing this process.
+_services: Dict[str, ChatService] = {}
+_slots: Dict[str, asyncio.Semaphore] = {}
 
 
-# ── Build a client based on dropdown choice ──────────────────────────────────
 def make_client(provider: str):
-    if provider == "openai":
-        if not settings.openai_api_key:
-            raise GradioError("OPENAI_API_KEY not set in this environment.")
-        return OpenAIClient()
+    if provider not in providers:
+        raise GradioError(f"Unknown provider: {provider}")
+    if not providers.configured(provider):
+        raise GradioError(f"{providers.spec(provider).credential.upper()} not set in this environment.")
+    return providers.create(provider)       # imports only this provider's SDK
 
-    if provider == "ollama":
-        return OllamaClient()
 
-    if provider == "gemini":
-        if not settings.gemini_api_key:
-            raise GradioError("GOOGLE_API_KEY (Gemini) not set.")
-        return GeminiClient()
+def service_for(provider: str) -> ChatService:
+    service = _services.get(provider)
+    if service is None:
+        service = _services[provider] = ChatService(ScheduledClient(make_client(provider), priority="interactive"))
+    return service
 
-    if provider == "anthropic":
-        if not settings.anthropic_api_key:
-            raise GradioError("ANTHROPIC_API_KEY not set.")
-        return AnthropicClient()
 
-    if provider == "deepseek":
-        if not settings.deepseek_api_key:
-            raise GradioError("DEEPSEEK_API_KEY not set.")
-        return DeepSeekClient()
+def concurrency_for(provider: str) -> int:
+    return settings.ui_concurrency.get(provider, settings.ui_default_concurrency)
 
-    raise GradioError(f"Unknown provider: {provider}")
 
+def slots_for(provider: str) -> asyncio.Semaphore:
+    # created lazily so the semaphore belongs to Gradio's event loop
+    slots = _slots.get(provider)
+    if slots is None:
+        slots = _slots[provider] = asyncio.Semaphore(concurrency_for(provider))
+    return slots
 
-# ── Core inference function Gradio calls ─────────────────────────────────────
-def chat_with_llm(provider: str, question: str, stream: bool):
-    chat = ChatService(make_client(provider))
 
-    answer_iter = chat.answer(question, stream=stream)
-    if stream:
-        # answer_iter is a generator
-        for token in answer_iter:              # type: ignore[arg-type]
-            yield token
-    else:
-        yield answer_iter                      # full string
+# ── Core inference function Gradio calls ─────────────────────────────────────
+async def chat_with_llm(provider: str, question: str, stream: bool, request: gr.Request):
+    chat = service_for(provider)
+    try:
+        async with slots_for(provider):
+            # one browser session = one tenant for fair queuing
+            with scheduling(tenant=request.session_hash or ""):
+                reply = await chat.aanswer(question, stream=stream)
+            if not stream:
+                yield reply
+                return
+            tokens = reply
+            # the text so far, at most once per interval, plus the final text
+            updates = FlushPolicy(interval=settings.ui_update_interval_ms / 1000, max_chars=1 << 30)
+            try:
+                async for text in aaccumulate(acoalesce(tokens, updates)):
+                    yield text
+            finally:
+                await tokens.aclose()           # page closed / request cancelled
+    except ProviderError as exc:
+        raise GradioError(f"{provider}: {exc}") from exc
 
 # ── Gradio UI setup ───────────────────────────────────────────────────────────
 with gr.Blocks(title="MyChatAI") as demo:
     gr.Markdown("Chat with LLMs")
-    
+
     with gr.Row():
         provider = gr.Dropdown(
-            choices=["openai", "ollama", "gemini", "anthropic", "deepseek"],
+            choices=providers.names(),
             label="LLM Provider",
             value="ollama",
-            interactive=True, 
+            interactive=True,
         )
         question = gr.Textbox(label="Ask a question:", placeholder="Type your question here...")
         stream = gr.Checkbox(label="Stream response", value=True)
@@ -70,14 +88,19 @@ with gr.Blocks(title="MyChatAI") as demo:
     answer_box = gr.Textbox(label="Answer")
 
     ask_btn = gr.Button("Ask")
-    
+
     ask_btn.click(
         chat_with_llm,
         inputs=[provider, question, stream],
         outputs=answer_box,
-        api_name="chat_with_llm"
+        api_name="chat_with_llm",
+        # the queue admits up to the sum of the per-provider limits; each
+        # provider's own limit is enforced inside chat_with_llm
+        concurrency_limit=sum(concurrency_for(name) for name in providers.names()),
     )
 
+demo.queue(max_size=settings.ui_queue_size)
+
 # ── Launch the Gradio app ───────────────────────────────────────────────────
 if __name__ == "__main__":
-    demo.launch(server_name="0.0.0.0", server_port=7860, share=True, debug=True)
\ No newline at end of file
+    demo.launch(server_name="0.0.0.0", server_port=7860, share=True, debug=True)
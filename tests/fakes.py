@@ -0,0 +1,88 @@
+"""In-memory model clients for the tests."""
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+from mychatai.clients.base import StructuredClient, message
+from mychatai.clients.response import ChatChunk, ChatResponse, Usage
+
+
+class FakeClient(StructuredClient):
+    """
+    Replies with *reply*, streamed one word per chunk, followed by a final
+    chunk carrying *finish_reason* and usage.  Records every call's kwargs
+    and how many streams were opened and closed.
+    """
+
+    def __init__(
+        self,
+        reply: str = "the quick brown fox",
+        *,
+        provider: str = "fake",
+        model: str = "fake-1",
+        finish_reason: str = "stop",
+        delay: float = 0.0,
+        errors: Optional[List[BaseException]] = None,
+    ) -> None:
+        """delay – seconds before each chunk; errors – raised by the next calls, in order."""
+        self.provider = provider
+        self._model = model
+        self.reply = reply
+        self.finish_reason = finish_reason
+        self.delay = delay
+        self.errors = list(errors or [])
+        self.calls: List[Dict[str, Any]] = []
+        self.opened = 0
+        self.closed = 0
+
+    @property
+    def usage(self) -> Usage:
+        return Usage(prompt_tokens=3, completion_tokens=len(self.reply.split()))
+
+    def respond(self, messages: Iterable[message], *, stream: bool = False, **kwargs: Any) -> ChatResponse:
+        self._call(messages, kwargs)
+        if stream:
+            return ChatResponse(self.provider, self.model, chunks=self._chunks())
+        time.sleep(self.delay)
+        return ChatResponse(
+            self.provider, self.model, text=self.reply, finish_reason=self.finish_reason, usage=self.usage
+        )
+
+    async def arespond(self, messages: Iterable[message], *, stream: bool = False, **kwargs: Any) -> ChatResponse:
+        self._call(messages, kwargs)
+        if stream:
+            return ChatResponse(self.provider, self.model, chunks=self._achunks())
+        await asyncio.sleep(self.delay)
+        return ChatResponse(
+            self.provider, self.model, text=self.reply, finish_reason=self.finish_reason, usage=self.usage
+        )
+
+    def _call(self, messages: Iterable[message], kwargs: Dict[str, Any]) -> None:
+        self.calls.append({"messages": list(messages), **kwargs})
+        if self.errors:
+            raise self.errors.pop(0)
+
+    def _pieces(self) -> List[ChatChunk]:
+        words = self.reply.split(" ")
+        pieces = [ChatChunk(w if i == 0 else " " + w) for i, w in enumerate(words)]
+        return pieces + [ChatChunk(finish_reason=self.finish_reason, usage=self.usage, id="fake-id")]
+
+    def _chunks(self):
+        self.opened += 1
+        try:
+            for chunk in self._pieces():
+                time.sleep(self.delay)
+                yield chunk
+        finally:
+            self.closed += 1
+
+    async def _achunks(self):
+        self.opened += 1
+        try:
+            for chunk in self._pieces():
+                await asyncio.sleep(self.delay)
+                yield chunk
+        finally:
+            self.closed += 1
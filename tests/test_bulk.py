@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+import io
+import json
+
+import pytest
+
+from benchmarks.mock_server import MockConfig, MockLLMServer
+from mychatai.bulk import completed_ids, read_questions, run_bulk
+from mychatai.clients.ollama import OllamaClient
+
+
+def test_read_questions_formats():
+    jsonl = io.StringIO('{"id": "a", "question": "one"}\n"two"\n{"question": ""}\n')
+    assert list(read_questions(jsonl, "jsonl")) == [("a", "one"), (1, "two")]
+    csv = io.StringIO("id,question\nx,first\ny,second\n")
+    assert list(read_questions(csv, "csv")) == [("x", "first"), ("y", "second")]
+    assert list(read_questions(io.StringIO("q1\n\nq2\n"), "text")) == [(0, "q1"), (2, "q2")]
+
+
+def test_completed_ids_skip_failures_and_torn_lines(tmp_path):
+    out = tmp_path / "answers.jsonl"
+    out.write_text(
+        json.dumps({"id": 0, "answer": "a", "error": None}) + "\n"
+        + json.dumps({"id": 1, "answer": None, "error": "ProviderError: down"}) + "\n"
+        + json.dumps({"id": [2, "b"], "answer": "c", "error": None}) + "\n"
+        + '{"id": 3, "ans',
+        encoding="utf-8",
+    )
+    assert completed_ids(out) == {0, (2, "b")}
+
+
+def test_run_resumes_where_it_stopped(tmp_path, monkeypatch):
+    source = tmp_path / "questions.txt"
+    source.write_text("".join(f"question {n}\n" for n in range(6)), encoding="utf-8")
+    out = tmp_path / "answers.jsonl"
+    out.write_text(
+        json.dumps({"id": 0, "question": "question 0", "answer": "earlier", "error": None}) + "\n"
+        + json.dumps({"id": 1, "question": "question 1", "answer": None, "error": "boom"}) + "\n",
+        encoding="utf-8",
+    )
+    with MockLLMServer(MockConfig(tokens=3)) as server:
+        monkeypatch.setenv("OLLAMA_URL", f"{server.url}/api/chat")      # read by the worker processes
+        stats = run_bulk(
+            source, out, provider="ollama", workers=1, concurrency=4,
+            model_kwargs={"max_tokens": 8}, progress=False,
+        )
+    assert (stats.skipped, stats.ok, stats.failed) == (1, 5, 0)
+    records = [json.loads(line) for line in out.read_text(encoding="utf-8").splitlines()]
+    assert sorted(r["id"] for r in records if r["error"] is None) == [0, 1, 2, 3, 4, 5]
+    assert records[0]["answer"] == "earlier"
+
+
+@pytest.mark.parametrize("kwargs, options", [
+    ({"max_tokens": 8}, {"num_predict": 8}),
+    ({"max_tokens": 8, "temperature": 0.2}, {"num_predict": 8, "temperature": 0.2}),
+    ({"max_tokens": 8, "options": {"num_predict": 4}}, {"num_predict": 4}),
+    ({"max_tokens": None}, {}),
+])
+def test_ollama_translates_sampling_arguments(kwargs, options):
+    payload = OllamaClient(model="m")._payload([], False, kwargs)
+    assert payload.get("options", {}) == options
+    assert "max_tokens" not in payload
@@ -0,0 +1,141 @@
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from mychatai import cache as cache_module
+from mychatai.cache import LRUCache, SQLiteCache, acollect, collect, make_key
+from mychatai.chat_service import ChatService
+from tests.fakes import FakeClient
+
+MESSAGES = [{"role": "user", "content": "hi"}]
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache_module.time, "monotonic", clock)
+    monkeypatch.setattr(cache_module.time, "time", clock)
+    return clock
+
+
+def test_key_ignores_formatting_and_non_semantic_kwargs():
+    key = make_key("openai", "gpt-4o", [{"role": "User", "content": " hi \n"}], {"temperature": 0, "stream": True})
+    assert key == make_key("openai", "gpt-4o", MESSAGES, {"temperature": 0, "timeout": 5})
+    assert key != make_key("openai", "gpt-4o", MESSAGES, {"temperature": 1})
+    assert key != make_key("openai", "gpt-4o-mini", MESSAGES, {"temperature": 0})
+    assert key != make_key("openai", "gpt-4o", [{"role": "user", "content": "hello"}], {"temperature": 0})
+
+
+def test_lru_evicts_least_recently_used():
+    cache = LRUCache(maxsize=2)
+    cache.set("a", "1")
+    cache.set("b", "2")
+    assert cache.get("a") == "1"
+    cache.set("c", "3")
+    assert cache.get("b") is None
+    assert (len(cache), cache.stats.hits, cache.stats.misses, cache.stats.evictions) == (2, 1, 1, 1)
+
+
+def test_lru_ttl(clock):
+    cache = LRUCache(ttl=10)
+    cache.set("a", "1")
+    clock.now += 9
+    assert cache.get("a") == "1"
+    clock.now += 2
+    assert cache.get("a") is None
+    assert cache.stats.evictions == 1
+
+
+def test_sqlite_survives_reopen_and_expires(tmp_path, clock):
+    path = tmp_path / "cache.db"
+    cache = SQLiteCache(path, ttl=10)
+    cache.set("a", "1")
+    cache.close()
+    cache = SQLiteCache(path, ttl=10)
+    assert cache.get("a") == "1"
+    clock.now += 11
+    assert cache.get("a") is None
+    assert len(cache) == 0
+    cache.close()
+
+
+def test_sqlite_trims_to_max_entries(tmp_path, clock):
+    cache = SQLiteCache(tmp_path / "cache.db", max_entries=2)
+    for key in "abc":
+        clock.now += 1
+        cache.set(key, key)
+    assert len(cache) == 2
+    assert cache.get("a") is None
+    cache.close()
+
+
+def test_stream_is_cached_once_consumed_and_replayed():
+    client = FakeClient("the quick brown fox")
+    service = ChatService(client, cache=LRUCache())
+    assert "".join(service.complete(MESSAGES, stream=True)) == "the quick brown fox"
+    replayed = list(service.complete(MESSAGES, stream=True))
+    assert "".join(replayed) == "the quick brown fox" and len(replayed) == 4
+    assert service.complete(MESSAGES) == "the quick brown fox"
+    assert len(client.calls) == 1
+    assert service.cache.stats.hits == 2
+
+
+def test_abandoned_stream_is_not_cached():
+    client = FakeClient("the quick brown fox")
+    service = ChatService(client, cache=LRUCache())
+    tokens = service.complete(MESSAGES, stream=True)
+    next(tokens)
+    tokens.close()
+    service.complete(MESSAGES)
+    assert len(client.calls) == 2
+
+
+def test_respond_hits_the_same_cache():
+    client = FakeClient("the quick brown fox")
+    service = ChatService(client, cache=LRUCache())
+    assert service.respond(MESSAGES).usage is not None
+    reply = service.respond(MESSAGES, stream=True)
+    assert "".join(c.text for c in reply) == "the quick brown fox"
+    assert len(client.calls) == 1
+
+
+def test_collect_closes_an_abandoned_source():
+    closed, done = [], []
+
+    def tokens():
+        try:
+            yield from ["a", "b", "c"]
+        finally:
+            closed.append(True)
+
+    source = tokens()
+    stream = collect(source, done.append)
+    assert next(stream) == "a"
+    stream.close()
+    assert closed == [True] and done == []
+    assert list(collect(iter(["a", "b"]), done.append)) == ["a", "b"] and done == ["ab"]
+
+    async def atokens():
+        try:
+            for token in ["a", "b"]:
+                yield token
+        finally:
+            closed.append(True)
+
+    async def main():
+        stream = acollect(atokens(), done.append)
+        assert await stream.__anext__() == "a"
+        await stream.aclose()
+
+    asyncio.run(main())
+    assert closed == [True, True] and done == ["ab"]
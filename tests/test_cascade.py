@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import asyncio
+import contextvars
+
+from mychatai.clients.cascade import CascadeClient, min_length, refusal
+from tests.fakes import FakeClient
+
+MESSAGES = [{"role": "user", "content": "hi"}]
+GOOD = "a perfectly reasonable local answer"
+CLOUD = "the cloud answer, which is long enough"
+
+
+def test_confident_draft_is_kept():
+    draft, fallback = FakeClient(GOOD), FakeClient(CLOUD)
+    cascade = CascadeClient(draft, fallback)
+    assert cascade.chat(MESSAGES) == GOOD
+    assert fallback.calls == []
+    assert cascade.stats.accepted == 1
+
+
+def test_weak_draft_escalates():
+    cascade = CascadeClient(FakeClient("I cannot help with that."), FakeClient(CLOUD), checks=[refusal()])
+    assert cascade.chat(MESSAGES) == CLOUD
+    assert "".join(cascade.chat(MESSAGES, stream=True)) == CLOUD
+    assert cascade.stats.escalated == 2
+
+
+def test_stream_holds_back_until_committed():
+    draft = FakeClient(GOOD)
+    cascade = CascadeClient(draft, FakeClient(CLOUD), checks=[min_length(10)], commit_chars=5)
+    assert "".join(cascade.chat(MESSAGES, stream=True)) == GOOD
+
+
+def test_raced_fallback_runs_in_callers_context():
+    marker = contextvars.ContextVar("marker", default=None)
+    seen = []
+
+    class Probe(FakeClient):
+        def respond(self, messages, *, stream=False, **kwargs):
+            seen.append(marker.get())
+            return super().respond(messages, stream=stream, **kwargs)
+
+    cascade = CascadeClient(FakeClient("no"), Probe(CLOUD), race=True)
+    marker.set("caller")
+    assert cascade.chat(MESSAGES) == CLOUD
+    assert "".join(cascade.chat(MESSAGES, stream=True)) == CLOUD
+    assert seen == ["caller", "caller"]
+
+
+def test_async_escalation():
+    async def main():
+        cascade = CascadeClient(FakeClient("no"), FakeClient(CLOUD), race=True)
+        assert await cascade.achat(MESSAGES) == CLOUD
+        tokens = await cascade.achat(MESSAGES, stream=True)
+        assert "".join([t async for t in tokens]) == CLOUD
+
+    asyncio.run(main())
+
+
+def test_replies_keep_the_answering_clients_metadata():
+    draft = FakeClient("I cannot help with that.", finish_reason="stop")
+    fallback = FakeClient(CLOUD, finish_reason="length")
+    cascade = CascadeClient(draft, fallback, checks=[refusal()])
+    reply = cascade.respond(MESSAGES)
+    assert (reply.finish_reason, reply.usage.completion_tokens) == ("length", 7)
+    reply = cascade.respond(MESSAGES, stream=True)
+    assert "".join(c.text for c in reply) == CLOUD
+    assert (reply.finish_reason, reply.id) == ("length", "fake-id")
+    assert draft.closed == 1
+
+    async def main():
+        raced = CascadeClient(draft, fallback, checks=[refusal()], race=True)
+        reply = await raced.arespond(MESSAGES, stream=True)
+        return "".join([c.text async for c in reply]), reply
+
+    text, reply = asyncio.run(main())
+    assert text == CLOUD and reply.usage.completion_tokens == 7
@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from mychatai.clients.decoding import NDJSONDecoder, iter_ndjson
+from mychatai.clients.ollama import _achunks, _chunks
+
+FRAMES = [
+    {"message": {"content": "Hel"}, "done": False},
+    {"message": {"content": "lo"}, "done": False},
+    {"message": {"content": ""}, "done": True, "done_reason": "length", "prompt_eval_count": 4, "eval_count": 2},
+]
+BODY = b"".join(json.dumps(f).encode() + b"\n" for f in FRAMES)
+
+
+def _split(body, size):
+    return [body[i:i + size] for i in range(0, len(body), size)]
+
+
+@pytest.mark.parametrize("size", [1, 2, 7, 64, len(BODY)])
+def test_records_split_across_chunks(size):
+    assert list(iter_ndjson(_split(BODY, size))) == FRAMES
+
+
+def test_blank_lines_and_crlf_are_skipped():
+    decoder = NDJSONDecoder()
+    assert list(decoder.feed(b'{"a": 1}\r\n\r\n\n{"b"')) == [{"a": 1}]
+    assert list(decoder.feed(b": 2}\n")) == [{"b": 2}]
+    assert list(decoder.flush()) == []
+
+
+def test_flush_returns_the_unterminated_last_line():
+    decoder = NDJSONDecoder()
+    assert list(decoder.feed(b'{"a": 1}\n{"b": 2}')) == [{"a": 1}]
+    assert list(decoder.flush()) == [{"b": 2}]
+    assert list(decoder.flush()) == []
+
+
+def test_ollama_stream_keeps_a_final_frame_without_newline():
+    body = BODY.rstrip(b"\n")
+    chunks = list(_chunks(httpx.Response(200, content=iter(_split(body, 5)))))
+    assert "".join(c.text for c in chunks) == "Hello"
+    assert chunks[-1].finish_reason == "length"
+    assert chunks[-1].usage.completion_tokens == 2
+
+
+def test_ollama_async_stream_keeps_a_final_frame_without_newline():
+    async def blocks():
+        for block in _split(BODY.rstrip(b"\n"), 3):
+            yield block
+
+    async def main():
+        return [c async for c in _achunks(httpx.Response(200, content=blocks()))]
+
+    chunks = asyncio.run(main())
+    assert "".join(c.text for c in chunks) == "Hello"
+    assert chunks[-1].finish_reason == "length"
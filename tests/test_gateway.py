@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+import asyncio
+import json
+
+import pytest
+
+from mychatai.chat_service import ChatService
+from mychatai.clients.router import Route, RouterClient
+from mychatai.gateway import Gateway
+from tests.fakes import FakeClient
+
+
+def _request(body):
+    return {"type": "http.request", "body": json.dumps(body).encode(), "more_body": False}
+
+
+async def _call(gateway, body, *, disconnect_after=None):
+    """Run one request; the client disconnects after *disconnect_after* body events."""
+    sent = []
+    gone = asyncio.Event()
+    events = [_request(body)]
+
+    async def receive():
+        if events:
+            return events.pop(0)
+        await gone.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(event):
+        sent.append(event)
+        if disconnect_after is not None and len(sent) > disconnect_after:
+            gone.set()
+
+    scope = {"type": "http", "method": "POST", "path": "/v1/chat/completions", "headers": []}
+    await gateway(scope, receive, send)
+    return sent
+
+
+def _gateway(client, **service_kwargs):
+    return Gateway(services={"fake": ChatService(client, **service_kwargs)}, limits={})
+
+
+def _sse(sent):
+    body = b"".join(e.get("body", b"") for e in sent if e["type"] == "http.response.body")
+    events = [line[len(b"data: "):] for line in body.split(b"\n\n") if line]
+    assert events[-1] == b"[DONE]"
+    return [json.loads(e) for e in events[:-1]]
+
+
+def test_completion_forwards_finish_reason_and_usage():
+    client = FakeClient("cut off here", finish_reason="length")
+    sent = asyncio.run(_call(_gateway(client), {"model": "fake", "messages": [{"role": "user", "content": "hi"}]}))
+    reply = json.loads(sent[-1]["body"])
+    assert reply["choices"][0]["message"]["content"] == "cut off here"
+    assert reply["choices"][0]["finish_reason"] == "length"
+    assert reply["usage"] == {"prompt_tokens": 3, "completion_tokens": 3, "total_tokens": 6}
+
+
+def test_stream_is_openai_sse_with_usage_last():
+    client = FakeClient("a b c", finish_reason="max_tokens")
+    body = {"model": "fake", "stream": True, "messages": [{"role": "user", "content": "hi"}]}
+    events = _sse(asyncio.run(_call(_gateway(client), body)))
+    assert events[0]["choices"][0]["delta"] == {"role": "assistant", "content": ""}
+    assert "".join(e["choices"][0]["delta"].get("content", "") for e in events) == "a b c"
+    last = events[-1]
+    assert last["choices"][0]["finish_reason"] == "length"
+    assert last["usage"]["total_tokens"] == 6
+    assert client.closed == 1
+
+
+@pytest.mark.parametrize("coalesce", [False, True])
+def test_disconnect_closes_the_upstream_stream(coalesce):
+    client = FakeClient("one two three four five six", delay=0.02)
+    body = {"model": "fake", "stream": True, "messages": [{"role": "user", "content": "hi"}]}
+
+    async def main():
+        sent = await _call(_gateway(client, coalesce=coalesce), body, disconnect_after=2)
+        await asyncio.sleep(0.05)       # let the shared stream's close run
+        return sent
+
+    sent = asyncio.run(main())
+    assert not any(e.get("body") == b"data: [DONE]\n\n" for e in sent)
+    assert client.opened == 1
+    assert client.closed == 1
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_routed_default_model_keeps_finish_reason_and_usage(stream):
+    router = RouterClient([Route(FakeClient("cut off", provider="ollama", model="llama3.2", finish_reason="length"))])
+    gateway = Gateway(services={"auto": ChatService(router)}, limits={})
+    body = {"model": "auto", "stream": stream, "messages": [{"role": "user", "content": "hi"}]}
+    sent = asyncio.run(_call(gateway, body))
+    last = _sse(sent)[-1] if stream else json.loads(sent[-1]["body"])
+    assert last["choices"][0]["finish_reason"] == "length"
+    assert last["usage"] == {"prompt_tokens": 3, "completion_tokens": 2, "total_tokens": 5}
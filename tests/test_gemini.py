@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+genai = pytest.importorskip("google.generativeai")
+
+from mychatai.clients.gemini import GeminiClient, _chunk, _text  # noqa: E402
+
+MESSAGES = [{"role": "system", "content": "be brief"}, {"role": "user", "content": "hi"}]
+
+
+def _reply(*texts, finish_reason=0, usage=None):
+    return genai.protos.GenerateContentResponse(
+        candidates=[{"content": {"parts": [{"text": t} for t in texts]}, "finish_reason": finish_reason}],
+        usage_metadata=usage,
+    )
+
+
+class FakeAsyncService:
+    """Stands in for the asyncio GenerativeService client."""
+
+    def __init__(self, *replies):
+        self.replies = replies
+        self.requests = []
+
+    async def generate_content(self, request, **options):
+        self.requests.append(request)
+        return self.replies[-1]
+
+    async def stream_generate_content(self, request, **options):
+        self.requests.append(request)
+
+        async def chunks():
+            for reply in self.replies:
+                yield reply
+
+        return chunks()
+
+
+class FakeStream:
+    """A REST / gRPC response stream: iterable, with ``cancel()``."""
+
+    def __init__(self, replies):
+        self._replies = iter(replies)
+        self.cancelled = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self._replies)
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class FakeService:
+    def __init__(self, *replies):
+        self.replies = replies
+        self.streams = []
+
+    def generate_content(self, request, **options):
+        return self.replies[-1]
+
+    def stream_generate_content(self, request, **options):
+        self.streams.append(FakeStream(self.replies))
+        return self.streams[-1]
+
+
+def test_text_tolerates_chunks_without_parts():
+    assert _text(_reply("a", "b")) == "ab"
+    assert _text(_reply(finish_reason=2)) == ""
+    assert _text(genai.protos.GenerateContentResponse()) == ""
+    chunk = _chunk(_reply(finish_reason=2))
+    assert (chunk.text, chunk.finish_reason) == ("", "MAX_TOKENS")
+
+
+def test_grpc_arespond_uses_the_asyncio_client():
+    client = GeminiClient("gemini-test", api_key="key", transport="grpc")
+    service = client._async_client = FakeAsyncService(
+        _reply("Hel"),
+        _reply("lo"),
+        _reply(finish_reason=1, usage={"prompt_token_count": 4, "candidates_token_count": 2}),
+    )
+
+    async def main():
+        reply = await client.arespond(MESSAGES, stream=True, max_tokens=5)
+        assert [c.text async for c in reply] == ["Hel", "lo", ""]
+        return reply
+
+    reply = asyncio.run(main())
+    assert (reply.text, reply.finish_reason) == ("Hello", "STOP")
+    assert reply.usage.completion_tokens == 2
+    request = service.requests[0]
+    assert request.model == "models/gemini-test"
+    assert request.system_instruction.parts[0].text == "be brief"
+    assert request.generation_config.max_output_tokens == 5
+
+
+def test_abandoned_rest_streams_are_cancelled():
+    client = GeminiClient("gemini-test", api_key="key")
+    service = client._client = FakeService(_reply("a"), _reply("b"), _reply("c", finish_reason=1))
+
+    reply = client.respond(MESSAGES, stream=True)
+    chunks = iter(reply)
+    assert next(chunks).text == "a"
+    chunks.close()
+    assert service.streams[0].cancelled
+
+    async def main():
+        reply = await client.arespond(MESSAGES, stream=True)
+        chunks = reply.__aiter__()
+        assert (await chunks.__anext__()).text == "a"
+        await chunks.aclose()
+        reply = await client.arespond(MESSAGES, stream=True)
+        return [c.text async for c in reply], reply
+
+    texts, reply = asyncio.run(main())
+    assert service.streams[1].cancelled
+    assert (texts, reply.finish_reason) == (["a", "b", "c"], "STOP")
@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+import os
+
+import pytest
+
+from mychatai.prompts import DEFAULT, TemplateRegistry, _builtin
+
+
+def _write(path, text, bump=0):
+    path.write_text(text, encoding="utf-8")
+    if bump:        # coarse filesystem clocks: make sure the mtime moves
+        stat = path.stat()
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + bump))
+
+
+@pytest.fixture
+def sql(tmp_path):
+    directory = tmp_path / "sql"
+    directory.mkdir()
+    _write(directory / "system.txt", "You write SQL.")
+    _write(directory / "user.txt", "Question: {question}\nPlease answer with a query.")
+    return directory
+
+
+def test_set_is_compiled_once_and_reloaded_on_edit(tmp_path, sql):
+    registry = TemplateRegistry(tmp_path, reload_interval=0)
+    first = registry.get("sql")
+    assert registry.get("sql") is first
+    assert first.messages("top customers?")[1]["content"] == "Question: top customers?\nPlease answer with a query."
+    assert first.instructions == "For every question you receive, answer with a query."
+
+    _write(sql / "system.txt", "You write PostgreSQL.", bump=10**9)
+    second = registry.get("sql")
+    assert second is not first
+    assert second.system == "You write PostgreSQL."
+
+
+def test_added_provider_variant_is_picked_up(tmp_path, sql):
+    registry = TemplateRegistry(tmp_path, reload_interval=0)
+    assert registry.get("sql", "ollama").system == "You write SQL."
+    _write(sql / "system.ollama.txt", "Be terse.")
+    assert registry.get("sql", "ollama").system == "Be terse."
+    assert registry.get("sql", "openai").system == "You write SQL."
+
+
+def test_edits_wait_for_the_reload_interval(tmp_path, sql):
+    registry = TemplateRegistry(tmp_path, reload_interval=3600)
+    first = registry.get("sql")
+    _write(sql / "system.txt", "changed", bump=10**9)
+    assert registry.get("sql") is first
+    registry.clear()
+    assert registry.get("sql").system == "changed"
+
+
+def test_missing_files_fall_back_to_default(tmp_path):
+    (tmp_path / "bare").mkdir()
+    registry = TemplateRegistry(tmp_path)
+    template = registry.get("bare")
+    assert template.system == _builtin().system
+    assert template.user == _builtin().user
+    assert registry.names() == ["bare", DEFAULT]
+    assert TemplateRegistry(tmp_path).get(DEFAULT) is _builtin()
+
+
+def test_bad_templates_and_names_are_rejected(tmp_path, sql):
+    registry = TemplateRegistry(tmp_path, reload_interval=0)
+    with pytest.raises(ValueError, match="unknown prompt template"):
+        registry.get("nope")
+    with pytest.raises(ValueError, match="unknown prompt template"):
+        registry.get("..")
+    _write(sql / "user.txt", "{question} and {context}", bump=10**9)
+    with pytest.raises(ValueError, match="exactly one plain {question}"):
+        registry.get("sql")
@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import time
+
+import pytest
+
+from mychatai.exceptions import ProviderError, RateLimitError, RetryableProviderError
+from mychatai.instrumentation import CallRecord, current_call, instrumentation
+from mychatai.retry import RetryingClient, RetryPolicy
+from tests.fakes import FakeClient
+
+MESSAGES = [{"role": "user", "content": "hi"}]
+FAST = RetryPolicy(max_attempts=3, base_delay=0.001, max_delay=0.01)
+
+
+def test_backoff_grows_and_honours_retry_after():
+    policy = RetryPolicy(base_delay=1, multiplier=2, max_delay=5, jitter=0)
+    assert [policy.delay(n, Exception()) for n in (1, 2, 3, 4)] == [1, 2, 4, 5]
+    error = RateLimitError("slow down")
+    error.retry_after = 9
+    assert policy.delay(1, error) == 9
+
+
+def test_deadline_and_attempts_bound_retries():
+    policy = RetryPolicy(max_attempts=3, deadline=1.0)
+    now = time.monotonic()
+    assert policy.allows(1, now, 0.5)
+    assert not policy.allows(1, now, 2.0)
+    assert not policy.allows(3, now, 0.0)
+
+
+def test_retries_transient_errors_only():
+    inner = FakeClient(errors=[RetryableProviderError("blip"), RetryableProviderError("blip")])
+    client = RetryingClient(inner, FAST)
+    assert client.chat(MESSAGES) == "the quick brown fox"
+    assert client.retries == 2
+
+    inner = FakeClient(errors=[ProviderError("bad request")])
+    with pytest.raises(ProviderError):
+        RetryingClient(inner, FAST).chat(MESSAGES)
+    assert len(inner.calls) == 1
+
+
+def test_gives_up_after_max_attempts():
+    inner = FakeClient(errors=[RetryableProviderError("down")] * 5)
+    with pytest.raises(RetryableProviderError):
+        RetryingClient(inner, FAST).chat(MESSAGES)
+    assert len(inner.calls) == 3
+
+
+def test_stream_retried_before_first_chunk():
+    inner = FakeClient(errors=[RetryableProviderError("blip")])
+    reply = RetryingClient(inner, FAST).respond(MESSAGES, stream=True)
+    assert reply.text == ""                  # prefetched, not yet consumed
+    assert "".join(c.text for c in reply) == "the quick brown fox"
+    assert reply.usage.completion_tokens == 4
+
+
+def test_hedge_fires_backup_and_closes_loser():
+    inner = FakeClient(delay=0.05)
+    client = RetryingClient(inner, FAST, hedge=0.01)
+    assert client.chat(MESSAGES) == "the quick brown fox"
+    assert client.hedges == 1
+    assert len(inner.calls) == 2
+
+
+def test_hedged_attempts_keep_the_callers_context():
+    marker = contextvars.ContextVar("marker", default=None)
+    seen = []
+
+    class Probe(FakeClient):
+        def respond(self, messages, *, stream=False, **kwargs):
+            seen.append((marker.get(), current_call()))
+            return super().respond(messages, stream=stream, **kwargs)
+
+    client = RetryingClient(Probe(delay=0.05), FAST, hedge=0.01)
+    record = CallRecord("fake", "fake-1", False)
+    marker.set("caller")
+    instrumentation.run(record, lambda: client.chat(MESSAGES))
+    assert seen == [("caller", record), ("caller", record)]
+    assert record.hedged
+
+
+def test_async_hedge():
+    async def main():
+        inner = FakeClient(delay=0.05)
+        client = RetryingClient(inner, FAST, hedge=0.01)
+        assert await client.achat(MESSAGES) == "the quick brown fox"
+        assert client.hedges == 1
+
+    asyncio.run(main())
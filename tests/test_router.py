@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from mychatai.clients.router import Route, RouterClient
+from mychatai.exceptions import ProviderError
+from tests.fakes import FakeClient
+
+MESSAGES = [{"role": "user", "content": "hi"}]
+
+
+def test_routes_default_to_list_price():
+    route = Route(FakeClient(provider="openai", model="gpt-4o"))
+    assert route.cost_per_1k == pytest.approx((2.50 + 10.00) / 2 / 1000)
+    assert route.list_price
+    assert Route(FakeClient(provider="ollama", model="llama3.2")).cost_per_1k == 0.0
+    assert not Route(FakeClient(provider="openai", model="gpt-4o"), cost_per_1k=0.0).list_price
+
+
+def test_cost_ceiling_filters_bare_clients():
+    local = FakeClient("local", provider="ollama", model="llama3.2")
+    cloud = FakeClient("cloud", provider="anthropic", model="claude-opus-4")
+    router = RouterClient([cloud, local], max_cost_per_1k=0.01)
+    assert [r.client for r in router.ranked()] == [local]
+    assert router.chat(MESSAGES) == "local"
+    with pytest.raises(ProviderError):
+        router.ranked(max_cost_per_1k=-1)
+
+
+def test_fails_over_on_provider_errors():
+    broken = FakeClient(provider="openai", model="gpt-4o", errors=[ProviderError("down")])
+    healthy = FakeClient("second", provider="anthropic", model="claude-sonnet-4")
+    router = RouterClient([broken, healthy])
+    assert router.chat(MESSAGES) == "second"
+    assert router.stats()["openai:gpt-4o"]["calls"] >= 1
+
+
+def test_programming_errors_are_not_swallowed():
+    broken = FakeClient(provider="openai", model="gpt-4o", errors=[TypeError("bug")])
+    router = RouterClient([broken, FakeClient(provider="anthropic", model="claude-sonnet-4")])
+    with pytest.raises(TypeError):
+        router.chat(MESSAGES)
+
+
+def test_stream_fails_over_before_first_token():
+    async def main():
+        broken = FakeClient(provider="openai", model="gpt-4o", errors=[ProviderError("down")])
+        router = RouterClient([broken, FakeClient("a b", provider="anthropic", model="claude-sonnet-4")])
+        tokens = await router.achat(MESSAGES, stream=True)
+        assert "".join([t async for t in tokens]) == "a b"
+
+    asyncio.run(main())
+
+
+def test_abandoned_stream_closes_the_route():
+    client = FakeClient("a b c", provider="anthropic", model="claude-sonnet-4")
+    tokens = RouterClient([client]).chat(MESSAGES, stream=True)
+    assert next(tokens) == "a"
+    tokens.close()
+    assert client.closed == 1
+
+
+def test_replies_keep_the_routes_metadata():
+    client = FakeClient("a b", provider="anthropic", model="claude-sonnet-4", finish_reason="length")
+    router = RouterClient([Route(client)])
+    reply = router.respond(MESSAGES)
+    assert (reply.finish_reason, reply.usage.completion_tokens) == ("length", 2)
+    reply = router.respond(MESSAGES, stream=True)
+    assert "".join(c.text for c in reply) == "a b"
+    assert (reply.finish_reason, reply.usage.completion_tokens, reply.id) == ("length", 2, "fake-id")
+    assert router.stats()["anthropic:claude-sonnet-4"]["throughput"] is not None
+
+    async def main():
+        reply = await router.arespond(MESSAGES, stream=True)
+        return [c.text async for c in reply], reply
+
+    texts, reply = asyncio.run(main())
+    assert "".join(texts) == "a b" and reply.finish_reason == "length"
@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+import asyncio
+import gc
+
+import pytest
+
+from mychatai.exceptions import OverloadedError
+from mychatai.scheduler import RequestContext, ScheduledClient, Scheduler, current_request, scheduling
+from tests.fakes import FakeClient
+
+MESSAGES = [{"role": "user", "content": "hi"}]
+
+
+async def _drain(scheduler, requests, held):
+    """Queue *requests* behind a held slot, then release one at a time; grant order."""
+    order = []
+
+    async def call(name, request):
+        granted = await scheduler.aacquire(request)
+        order.append(name)
+        await asyncio.sleep(0)
+        scheduler.release(granted)
+
+    tasks = [asyncio.ensure_future(call(name, request)) for name, request in requests]
+    await asyncio.sleep(0.01)
+    scheduler.release(held)
+    await asyncio.gather(*tasks)
+    return order
+
+
+def test_priority_classes_are_served_in_order():
+    async def main():
+        scheduler = Scheduler(1)
+        held = scheduler.acquire(RequestContext())
+        order = await _drain(scheduler, [
+            ("batch", RequestContext("batch")),
+            ("default", RequestContext("default")),
+            ("interactive", RequestContext("interactive")),
+        ], held)
+        assert order == ["interactive", "default", "batch"]
+
+    asyncio.run(main())
+
+
+def test_tenants_share_a_class_fairly():
+    async def main():
+        scheduler = Scheduler(1)
+        held = scheduler.acquire(RequestContext())
+        flood = [(f"a{i}", RequestContext("default", "a")) for i in range(4)]
+        order = await _drain(scheduler, flood + [("b0", RequestContext("default", "b"))], held)
+        assert order.index("b0") <= 1
+
+    asyncio.run(main())
+
+
+def test_unmeetable_deadline_is_rejected_up_front():
+    scheduler = Scheduler(1)
+    scheduler._service = 1.0                     # calls have been holding a slot for ~1s
+    held = scheduler.acquire(RequestContext())
+    with scheduling(timeout=0.5):
+        with pytest.raises(OverloadedError) as caught:
+            scheduler.acquire(current_request())
+    assert caught.value.reason == "deadline"
+    scheduler.release(held)
+
+
+def test_full_queue_sheds_lower_priority_work():
+    async def main():
+        scheduler = Scheduler(1, max_queue=1)
+        held = scheduler.acquire(RequestContext())
+        batch = asyncio.ensure_future(scheduler.aacquire(RequestContext("batch")))
+        await asyncio.sleep(0.01)
+        interactive = asyncio.ensure_future(scheduler.aacquire(RequestContext("interactive")))
+        await asyncio.sleep(0.01)
+        with pytest.raises(OverloadedError) as caught:
+            await batch
+        assert caught.value.reason == "shed"
+        with pytest.raises(OverloadedError) as caught:
+            await scheduler.aacquire(RequestContext("batch"))
+        assert caught.value.reason == "queue_full"
+        scheduler.release(held)
+        scheduler.release(await interactive)
+        assert scheduler.in_flight == 0
+        assert scheduler.stats()["priorities"]["batch"]["rejected"] == {"shed": 1, "queue_full": 1}
+
+    asyncio.run(main())
+
+
+def test_stream_releases_its_slot_when_done_or_closed():
+    scheduler = Scheduler(1)
+    client = ScheduledClient(FakeClient(), scheduler=scheduler)
+    assert "".join(client.chat(MESSAGES, stream=True)) == "the quick brown fox"
+    assert scheduler.in_flight == 0
+    reply = client.respond(MESSAGES, stream=True)
+    assert scheduler.in_flight == 1
+    reply.close()
+    assert scheduler.in_flight == 0
+
+
+def test_unread_stream_releases_its_slot_when_dropped():
+    scheduler = Scheduler(1)
+    client = ScheduledClient(FakeClient(), scheduler=scheduler)
+    tokens = client.chat(MESSAGES, stream=True)
+    assert scheduler.in_flight == 1
+    del tokens
+    gc.collect()
+    assert scheduler.in_flight == 0
+
+    async def main():
+        tokens = await client.achat(MESSAGES, stream=True)
+        assert scheduler.in_flight == 1
+        del tokens
+        gc.collect()
+        assert scheduler.in_flight == 0
+
+    asyncio.run(main())
@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from mychatai.semantic_cache import SemanticCache  # noqa: E402
+
+# unit vectors for a few questions; "calibration?" is 0.8 similar to "calibrate"
+VECTORS = {
+    "calibrate": [1.0, 0.0, 0.0],
+    "calibration?": [0.8, 0.6, 0.0],
+    "weather": [0.0, 0.0, 1.0],
+}
+
+
+def _embed(texts):
+    return [VECTORS[t] if t in VECTORS else [0.0, 1.0, 0.0] for t in texts]
+
+
+def _vector(i, dim=4):
+    vector = np.zeros(dim, dtype=np.float32)
+    vector[i % dim] = 1.0
+    vector[(i + 1) % dim] = (i // dim + 1) / 10    # keep rows distinct
+    return vector / np.linalg.norm(vector)
+
+
+@pytest.fixture
+def small_growth(monkeypatch):
+    monkeypatch.setattr(SemanticCache, "_GROWTH", 4)
+
+
+@pytest.mark.parametrize("persist", [False, True])
+def test_rows_survive_growth(small_growth, tmp_path, persist):
+    cache = SemanticCache(_embed, path=tmp_path if persist else None, threshold=0.999)
+    vectors = [_vector(i) for i in range(10)]
+    for i, vector in enumerate(vectors):
+        cache.add(vector, f"q{i}", f"a{i}")
+    assert len(cache) == 10
+    assert cache._vectors.shape == (12, 4)
+    assert [cache.search(v).answer for v in vectors] == [f"a{i}" for i in range(10)]
+    if persist:
+        assert (tmp_path / "vectors.f32").stat().st_size == 12 * 4 * 4
+
+
+def test_scopes_are_isolated():
+    cache = SemanticCache(_embed, threshold=0.9)
+    cache.store("calibrate", "openai answer", scope="openai")
+    assert cache.lookup("calibrate", scope="ollama") is None
+    cache.store("calibrate", "ollama answer", scope="ollama")
+    assert cache.lookup("calibrate", scope="openai").answer == "openai answer"
+    assert cache.lookup("calibrate", scope="ollama").answer == "ollama answer"
+    assert cache.lookup("calibrate") is None
+
+
+def test_threshold_and_near_misses():
+    cache = SemanticCache(_embed, threshold=0.85, near_miss=0.1)
+    cache.store("calibrate", "answer")
+    assert cache.lookup("calibration?") is None           # 0.8: a near miss
+    assert cache.lookup("weather") is None                # 0.0: a plain miss
+    assert (cache.stats.misses, cache.stats.near_misses) == (2, 1)
+
+    cache.threshold = 0.8
+    hit = cache.lookup("calibration?")
+    assert (hit.answer, hit.question) == ("answer", "calibrate")
+    assert hit.similarity == pytest.approx(0.8)
+    assert cache.stats.mean_hit_similarity == pytest.approx(0.8)
+
+
+def test_reloads_from_disk(small_growth, tmp_path):
+    cache = SemanticCache(_embed, path=tmp_path, threshold=0.9)
+    cache.store("calibrate", "answer", scope="s")
+    for i in range(6):
+        cache.add(_vector(i, dim=3), f"q{i}", f"a{i}", scope="t")
+    hit = cache.lookup("calibrate", scope="s")
+    cache.reject(hit)
+    cache.store("weather", "sunny", scope="s")             # reuses the rejected slot
+    cache.close()
+
+    cache = SemanticCache(_embed, path=tmp_path, threshold=0.9)
+    assert len(cache) == 7
+    assert cache.lookup("weather", scope="s").answer == "sunny"
+    assert cache.lookup("calibrate", scope="s") is None
+    assert cache.search(_vector(5, dim=3), scope="t").answer == "a5"
+    cache.store("calibrate", "again", scope="s")
+    assert len(cache) == 8
+    assert cache.lookup("calibrate", scope="s").answer == "again"
+
+
+def test_dimension_mismatch_is_rejected():
+    cache = SemanticCache(_embed)
+    cache.store("calibrate", "answer")
+    with pytest.raises(ValueError):
+        cache.add(np.ones(5, dtype=np.float32), "q", "a")
+    assert cache.search(np.ones(5, dtype=np.float32)) is None
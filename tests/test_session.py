@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import asyncio
+
+from mychatai.chat_service import ChatService
+from mychatai.session import MemorySessionStore, SQLiteSessionStore
+from tests.fakes import FakeClient
+
+
+def _session(client=None, **kwargs):
+    service = ChatService(client or FakeClient("ok"))
+    kwargs.setdefault("system_prompt", "sys")
+    kwargs.setdefault("template", "{question}")
+    kwargs.setdefault("token_counter", lambda text: len(text.split()))
+    kwargs.setdefault("reply_tokens", 0)
+    return service.session(**kwargs)
+
+
+def _contents(messages):
+    return [m["content"] for m in messages[1:]]
+
+
+def test_history_is_sent_and_stored():
+    session = _session()
+    assert session.ask("one two") == "ok"
+    assert session.ask("three") == "ok"
+    assert _contents(session.messages("four")) == ["one two", "ok", "three", "ok", "four"]
+    assert [t.role for t in session.history] == ["user", "assistant"] * 2
+
+
+def test_oldest_turns_fall_out_of_the_payload():
+    client = FakeClient("ok")
+    session = _session(client, context_tokens=6)
+    for question in ("a b", "c d", "e f"):
+        session.ask(question)
+    sent = _contents(client.calls[-1]["messages"])
+    assert sent == ["c d", "ok", "e f"]
+    assert len(session.history) == 6                 # still stored
+
+
+def test_messages_does_not_change_the_session():
+    session = _session(context_tokens=6)
+    session.ask("a b")
+    session.ask("c d")
+    window = session.window_tokens
+    assert _contents(session.messages("e f g h")) == ["e f g h"]
+    assert _contents(session.messages()) == ["c d", "ok"]
+    assert session.window_tokens == window
+    assert len(session.history) == 4
+
+
+def test_stream_is_stored_once_read():
+    session = _session(FakeClient("x y z"))
+    assert "".join(session.ask("q", stream=True)) == "x y z"
+    assert [t.content for t in session.history] == ["q", "x y z"]
+
+
+def test_condensed_turns_become_a_summary():
+    summaries = []
+
+    def summarize(previous, turns):
+        summaries.append((previous, [t.content for t in turns]))
+        return "S"
+
+    store = MemorySessionStore()
+    session = _session(context_tokens=10, summarize=summarize, store=store, session_id="s")
+    for question in ("a b", "c d", "e f"):
+        session.ask(question)
+
+    # messages() plans without condensing
+    assert summaries == []
+    session.messages("g h i j")
+    assert summaries == []
+
+    session.ask("g h i j")
+    assert summaries == [(None, ["a b", "ok", "c d", "ok", "e f", "ok"])]
+    assert session.summary == "S"
+    payload = session.messages()
+    assert payload[0]["content"].endswith("Summary of the conversation so far:\nS")
+    assert [t.role for t in store.load("s")][0] == "summary"
+
+
+def test_model_summary_in_aask_is_asynchronous(tmp_path):
+    class NoSync(FakeClient):
+        def respond(self, *args, **kwargs):
+            raise AssertionError("aask must not make blocking calls")
+
+    async def main():
+        store = SQLiteSessionStore(tmp_path / "sessions.db")
+        session = _session(NoSync("ok"), context_tokens=10, summarize=True, store=store, session_id="s")
+        for question in ("a b", "c d", "e f", "g h i j"):
+            assert await session.aask(question) == "ok"
+        assert session.summary == "ok"
+        resumed = _session(NoSync("ok"), store=store, session_id="s")
+        assert resumed.summary == "ok"
+        store.close()
+
+    asyncio.run(main())
@@ -0,0 +1,241 @@
+from __future__ import annotations
+
+import asyncio
+import gc
+import threading
+import time
+
+import pytest
+
+from mychatai.chat_service import ChatService
+from mychatai.singleflight import SingleFlight
+from tests.fakes import FakeClient
+
+MESSAGES = [{"role": "user", "content": "hi"}]
+
+
+def _upstream(tokens, events, delay=0.0):
+    def factory():
+        events.append("open")
+        try:
+            for token in tokens:
+                time.sleep(delay)
+                yield token
+        finally:
+            events.append("closed")
+    return factory
+
+
+async def _aupstream(tokens, events, delay=0.0):
+    events.append("open")
+    try:
+        for token in tokens:
+            await asyncio.sleep(delay)
+            yield token
+    finally:
+        events.append("closed")
+
+
+# ── sync ───────────────────────────────────────────────────────────────────
+def test_do_runs_once_for_concurrent_callers():
+    group = SingleFlight()
+    calls = []
+    gate = threading.Event()
+
+    def fn():
+        calls.append(1)
+        gate.wait(1)
+        return "reply"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(group.do("k", fn))) for _ in range(5)]
+    for t in threads:
+        t.start()
+    time.sleep(0.05)
+    gate.set()
+    for t in threads:
+        t.join()
+
+    assert results == ["reply"] * 5
+    assert len(calls) == 1
+    assert group.coalesced == 4
+    assert group.in_flight() == 0
+
+
+def test_do_error_reaches_every_caller():
+    group = SingleFlight()
+    with pytest.raises(KeyError):
+        group.do("k", lambda: {}["missing"])
+    assert group.in_flight() == 0
+
+
+def test_stream_fans_out_and_late_joiner_replays():
+    group = SingleFlight()
+    events = []
+    factory = _upstream(["a", "b", "c"], events)
+
+    first = group.stream("k", factory)
+    assert next(first) == "a"
+    second = group.stream("k", factory)
+    assert list(first) == ["b", "c"]
+    assert list(second) == ["a", "b", "c"]
+    assert events == ["open", "closed"]
+    assert group.in_flight() == 0
+
+
+def test_stream_closes_upstream_when_last_subscriber_leaves():
+    group = SingleFlight()
+    events = []
+    factory = _upstream(["a", "b", "c", "d"], events)
+
+    first = group.stream("k", factory)
+    second = group.stream("k", factory)
+    assert next(first) == "a"
+    first.close()
+    assert events == ["open"]           # second is still subscribed
+    assert next(second) == "a"
+    second.close()
+
+    assert events == ["open", "closed"]
+    assert group.in_flight() == 0
+    assert list(group.stream("k", factory)) == ["a", "b", "c", "d"]   # a fresh call
+
+
+def test_stream_dropped_unread_releases_key():
+    group = SingleFlight()
+    events = []
+    stream = group.stream("k", _upstream(["a"], events))
+    assert group.in_flight() == 1
+    del stream
+    gc.collect()
+    assert group.in_flight() == 0
+    assert events == []                 # never opened
+
+
+# ── async ──────────────────────────────────────────────────────────────────
+def test_ado_coalesces_and_survives_one_cancelled_caller():
+    async def main():
+        group = SingleFlight()
+        calls = []
+
+        async def fn():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return "reply"
+
+        first = asyncio.ensure_future(group.ado("k", fn))
+        second = asyncio.ensure_future(group.ado("k", fn))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        assert await second == "reply"
+        assert len(calls) == 1
+        assert group.in_flight() == 0
+
+    asyncio.run(main())
+
+
+def test_ado_cancels_call_when_last_caller_is_cancelled():
+    async def main():
+        group = SingleFlight()
+        events = []
+
+        async def fn():
+            try:
+                await asyncio.sleep(10)
+            finally:
+                events.append("cancelled")
+
+        callers = [asyncio.ensure_future(group.ado("k", fn)) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        for caller in callers:
+            caller.cancel()
+        await asyncio.gather(*callers, return_exceptions=True)
+        await asyncio.sleep(0)
+        assert events == ["cancelled"]
+        assert group.in_flight() == 0
+
+    asyncio.run(main())
+
+
+def test_astream_fans_out():
+    async def main():
+        group = SingleFlight()
+        events = []
+
+        async def factory():
+            return _aupstream(["a", "b", "c"], events, delay=0.01)
+
+        async def read():
+            return [t async for t in group.astream("k", factory)]
+
+        assert await asyncio.gather(read(), read(), read()) == [["a", "b", "c"]] * 3
+        assert events == ["open", "closed"]
+        assert group.coalesced == 2
+        assert group.in_flight() == 0
+
+    asyncio.run(main())
+
+
+def test_astream_closes_upstream_when_abandoned():
+    async def main():
+        group = SingleFlight()
+        events = []
+
+        async def factory():
+            return _aupstream(["a", "b", "c", "d"], events, delay=0.01)
+
+        stream = group.astream("k", factory)
+        assert await stream.__anext__() == "a"
+        await stream.aclose()
+        for _ in range(3):
+            await asyncio.sleep(0)
+        assert events == ["open", "closed"]
+        assert group.in_flight() == 0
+
+    asyncio.run(main())
+
+
+def test_astream_cancelled_reader_closes_upstream():
+    async def main():
+        group = SingleFlight()
+        events = []
+
+        async def factory():
+            return _aupstream(["a", "b"], events, delay=10)
+
+        async def read():
+            return [t async for t in group.astream("k", factory)]
+
+        reader = asyncio.ensure_future(read())
+        await asyncio.sleep(0.01)
+        reader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await reader
+        await asyncio.sleep(0.01)
+        assert events == ["open", "closed"]
+        assert group.in_flight() == 0
+
+    asyncio.run(main())
+
+
+def test_coalesced_replies_are_per_caller_copies():
+    client = FakeClient("a b c", delay=0.01)
+    service = ChatService(client, coalesce=SingleFlight())
+
+    async def read(reply):
+        return [chunk async for chunk in reply]
+
+    async def main():
+        first = await service.arespond(MESSAGES, stream=True)
+        second = await service.arespond(MESSAGES, stream=True)
+        a, b = await asyncio.gather(read(first), read(second))
+        replies = await asyncio.gather(service.arespond(MESSAGES), service.arespond(MESSAGES))
+        return first, second, a, b, replies
+
+    first, second, a, b, replies = asyncio.run(main())
+    assert len(client.calls) == 2                       # one stream, one complete reply
+    assert [c.text for c in a] == [c.text for c in b]
+    assert not any(x is y for x, y in zip(a, b))
+    assert [c.index for c in a] == [c.index for c in b] == [0, 1, 2, 3]
+    assert first.usage == second.usage and first.finish_reason == second.finish_reason == "stop"
+    assert replies[0] is not replies[1] and replies[0].text == replies[1].text == "a b c"
@@ -0,0 +1,156 @@
+from __future__ import annotations
+
+import asyncio
+import io
+
+import pytest
+
+from mychatai.utils import sinks
+from mychatai.utils.sinks import AsyncBufferedSink, AsyncCallbackSink, BufferedSink, FlushPolicy, Sink, pipe
+from mychatai.utils.transforms import _MarkdownBlocks, amarkdown_blocks, coalesce, markdown_blocks
+
+TEXT = "Intro line.\n\n```py\na = 1\n\nb = 2\n```\nAfter.\n\nEnd"
+BLOCKS = ["Intro line.\n\n", "```py\na = 1\n\nb = 2\n```\n", "After.\n\n", "End"]
+
+
+class RecordingSink(Sink):
+    def __init__(self):
+        self.writes = []
+        self.flushes = 0
+        self.closed = False
+
+    def write(self, text):
+        self.writes.append(text)
+
+    def flush(self):
+        self.flushes += 1
+
+    def close(self):
+        self.closed = True
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(sinks.time, "monotonic", clock)
+    return clock
+
+
+def _split(text, size):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+# ── FlushPolicy / BufferedSink ─────────────────────────────────────────────
+def test_policy_is_due_on_size_or_interval():
+    policy = FlushPolicy(interval=0.05, max_chars=10)
+    assert not policy.due(9, 0.04)
+    assert policy.due(10, 0.0)
+    assert policy.due(1, 0.05)
+    assert not FlushPolicy(interval=None, max_chars=10).due(9, 60.0)
+
+
+def test_policy_for_stream():
+    class Terminal(io.StringIO):
+        def isatty(self):
+            return True
+
+    assert FlushPolicy.for_stream(Terminal()).interval == 0.05
+    assert FlushPolicy.for_stream(io.StringIO()) == FlushPolicy(interval=None, max_chars=64 * 1024)
+
+
+def test_buffered_sink_joins_writes_until_size_is_reached(clock):
+    inner = RecordingSink()
+    sink = BufferedSink(inner, FlushPolicy(interval=None, max_chars=6))
+    for token in ["ab", "cd", "ef", "g"]:
+        sink.write(token)
+    assert (inner.writes, inner.flushes) == (["abcdef"], 1)
+    sink.close()
+    assert inner.writes == ["abcdef", "g"]
+    assert inner.closed
+
+
+def test_buffered_sink_flushes_on_interval(clock):
+    inner = RecordingSink()
+    sink = BufferedSink(inner, FlushPolicy(interval=0.05, max_chars=1000))
+    sink.write("a")
+    clock.now = 0.04
+    sink.write("b")
+    assert inner.writes == []
+    clock.now = 0.05
+    sink.write("c")
+    assert inner.writes == ["abc"]
+    clock.now = 0.09                # the window restarts at the flush
+    sink.write("d")
+    assert inner.writes == ["abc"]
+
+
+def test_pipe_returns_the_text_and_closes_the_sink():
+    inner = RecordingSink()
+    assert pipe(["a", "b", "c"], BufferedSink(inner, FlushPolicy(interval=None))) == "abc"
+    assert (inner.writes, inner.closed) == (["abc"], True)
+
+    inner = RecordingSink()
+    pipe(["a"], BufferedSink(inner), close=False)
+    assert (inner.writes, inner.closed) == (["a"], False)
+
+
+def test_async_buffered_sink():
+    writes = []
+
+    async def main():
+        sink = AsyncBufferedSink(AsyncCallbackSink(writes.append), FlushPolicy(interval=None, max_chars=4))
+        for token in ["ab", "cd", "e"]:
+            await sink.write(token)
+        assert writes == ["abcd"]
+        await sink.aclose()
+
+    asyncio.run(main())
+    assert writes == ["abcd", "e"]
+
+
+def test_coalesce_keeps_the_tail():
+    tokens = ["a", "bc", "d", "efg", "h"]
+    assert list(coalesce(tokens, FlushPolicy(interval=None, max_chars=3))) == ["abc", "defg", "h"]
+
+
+# ── Markdown blocks ────────────────────────────────────────────────────────
+@pytest.mark.parametrize("size", [1, 2, 3, 5, len(TEXT)])
+def test_markdown_blocks(size):
+    assert list(markdown_blocks(_split(TEXT, size))) == BLOCKS
+
+
+@pytest.mark.parametrize("cut", range(1, len(TEXT)))
+def test_markdown_blocks_split_anywhere(cut):
+    # covers "\n\n" and "```" (opening and closing) split between two tokens
+    assert list(markdown_blocks([TEXT[:cut], TEXT[cut:]])) == BLOCKS
+
+
+def test_markdown_blocks_async():
+    async def tokens():
+        for token in _split(TEXT, 2):
+            yield token
+
+    async def main():
+        return [block async for block in amarkdown_blocks(tokens())]
+
+    assert asyncio.run(main()) == BLOCKS
+
+
+def test_fence_inside_a_paragraph_stays_with_it():
+    splitter = _MarkdownBlocks()
+    assert splitter.feed("Run ``") == []
+    assert splitter.feed("`\nx\n\ny\n``") == []
+    assert splitter.feed("`\nmore\n\nnext") == ["Run ```\nx\n\ny\n```\nmore\n\n"]
+    assert splitter.finish() == ["next"]
+
+
+def test_unclosed_fence_is_emitted_at_the_end():
+    assert list(markdown_blocks(["```\ncode\n\n", "still code"])) == ["```\ncode\n\nstill code"]
@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from mychatai.clients.response import Usage
+from mychatai.instrumentation import InstrumentedClient, instrumentation
+from mychatai.ratelimit import ProviderLimiter, RateLimitedClient
+from mychatai.retry import RetryingClient
+from mychatai.scheduler import ScheduledClient, Scheduler
+from mychatai.tokens import count_messages
+from tests.fakes import FakeClient
+
+MESSAGES = [{"role": "user", "content": "hi"}]
+
+
+def _stack(inner, scheduler=None):
+    return InstrumentedClient(
+        RetryingClient(
+            ScheduledClient(
+                RateLimitedClient(inner, limiter=ProviderLimiter()),
+                scheduler=scheduler or Scheduler(4),
+            )
+        )
+    )
+
+
+@pytest.fixture
+def records():
+    seen = []
+    instrumentation.add_hook(seen.append)
+    yield seen
+    instrumentation.remove_hook(seen.append)
+
+
+def test_wrappers_keep_usage_and_finish_reason():
+    client = _stack(FakeClient(finish_reason="length"))
+    reply = client.respond(MESSAGES)
+    assert reply.text == "the quick brown fox"
+    assert reply.finish_reason == "length"
+    assert reply.usage == Usage(3, 4)
+    assert client.chat(MESSAGES) == "the quick brown fox"
+
+
+def test_wrapped_stream_reports_usage_and_measures(records):
+    scheduler = Scheduler(1)
+    client = _stack(FakeClient(), scheduler)
+    reply = client.respond(MESSAGES, stream=True)
+    assert [c.text for c in reply if c.text] == ["the", " quick", " brown", " fox"]
+    assert reply.finish_reason == "stop"
+    assert reply.id == "fake-id"
+    assert reply.usage == Usage(3, 4)
+    assert scheduler.in_flight == 0
+    assert records[-1].chunks == 4
+    assert records[-1].completion_tokens == 4
+
+
+def test_wrapped_async_stream():
+    async def main():
+        inner = FakeClient()
+        scheduler = Scheduler(1)
+        client = _stack(inner, scheduler)
+        reply = await client.arespond(MESSAGES, stream=True)
+        text = "".join([c.text async for c in reply])
+        assert text == "the quick brown fox"
+        assert reply.usage == Usage(3, 4)
+        assert scheduler.in_flight == 0
+        assert inner.closed == 1
+        assert await client.achat(MESSAGES) == text
+
+    asyncio.run(main())
+
+
+def test_closing_wrapped_stream_closes_upstream():
+    inner = FakeClient()
+    scheduler = Scheduler(1)
+    reply = _stack(inner, scheduler).respond(MESSAGES, stream=True)
+    chunks = iter(reply)
+    next(chunks)
+    reply.close()
+    chunks.close()
+    assert inner.closed == 1
+    assert scheduler.in_flight == 0
+
+
+class RecordingLimiter(ProviderLimiter):
+    def __init__(self):
+        super().__init__()
+        self.released = []
+
+    def release(self, error=None, *, output_tokens=0, reserved=0):
+        self.released.append(output_tokens)
+        super().release(error, output_tokens=output_tokens, reserved=reserved)
+
+
+def test_rate_limited_stream_charges_reported_usage():
+    limiter = RecordingLimiter()
+    client = RateLimitedClient(FakeClient("one two three"), limiter=limiter)
+    assert "".join(client.respond(MESSAGES, stream=True).texts()) == "one two three"
+    assert limiter.released == [3]          # the provider's completion_tokens, not chars / 4
+
+
+def test_rate_limited_stream_without_usage_counts_tokens():
+    limiter = RecordingLimiter()
+    client = RateLimitedClient(FakeClient("one two three"), limiter=limiter)
+    chunks = iter(client.respond(MESSAGES, stream=True))
+    next(chunks)
+    chunks.close()                          # closed before the usage chunk
+    assert limiter.released == [1]
+
+
+def test_unread_rate_limited_stream_frees_its_slot():
+    limiter = RecordingLimiter()
+    client = RateLimitedClient(FakeClient(), limiter=limiter)
+    reply = client.respond(MESSAGES, stream=True)
+    del reply
+    assert limiter.released == [0]
+    assert limiter.concurrency.in_flight == 0
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_capped_call_costs_prompt_plus_actual_output(monkeypatch, stream):
+    monkeypatch.setattr("mychatai.ratelimit.time.monotonic", lambda: 1000.0)   # no refill
+    limiter = ProviderLimiter(tpm=100_000)
+    client = RateLimitedClient(FakeClient("one two three"), limiter=limiter)
+    reply = client.respond(MESSAGES, stream=stream, max_tokens=500)
+    assert ("".join(reply.texts()) if stream else reply.text) == "one two three"
+    prompt = count_messages(MESSAGES, "fake", "fake-1")
+    assert 100_000 - limiter.tokens._level == prompt + 3
+
+
+def test_uncapped_call_is_charged_after_the_fact(monkeypatch):
+    monkeypatch.setattr("mychatai.ratelimit.time.monotonic", lambda: 1000.0)
+    limiter = ProviderLimiter(tpm=100_000)
+    RateLimitedClient(FakeClient("one two three"), limiter=limiter).respond(MESSAGES)
+    assert 100_000 - limiter.tokens._level == count_messages(MESSAGES, "fake", "fake-1") + 3